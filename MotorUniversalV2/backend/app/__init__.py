@@ -8,6 +8,7 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_caching import Cache
 from flasgger import Swagger
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
 
 # Inicializar extensiones
@@ -33,6 +34,10 @@ def create_app(config_name='development'):
     # Cargar configuración
     app.config.from_object(config[config_name])
     
+    # request.remote_addr = IP que agregó el proxy de confianza (no la que envía el cliente)
+    if app.config['TRUSTED_PROXY_COUNT'] > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
+    
     # Inicializar extensiones
     db.init_app(app)
     migrate.init_app(app, db)
@@ -116,6 +121,16 @@ def create_app(config_name='development'):
     app.register_blueprint(user_management_bp)
     print("[INIT] ✅ user-management registrado")
     
+    # Trabajos en segundo plano (progreso, cancelación y resultados)
+    from app.routes.jobs import bp as jobs_bp
+    app.register_blueprint(jobs_bp)
+    print("[INIT] ✅ jobs registrado")
+    
+    # Búsqueda unificada del catálogo
+    from app.routes.search import bp as search_bp
+    app.register_blueprint(search_bp)
+    print("[INIT] ✅ search registrado")
+    
     print("[INIT] ✅ Todos los blueprints registrados correctamente")
     
     # Verificar y agregar columna label_style si no existe
@@ -129,6 +144,34 @@ def create_app(config_name='development'):
     # Callbacks JWT
     register_jwt_callbacks(app)
     
+    # Versionado del catálogo del dashboard de candidatos
+    from app.services.dashboard_read_model import register_dashboard_events
+    register_dashboard_events()
+    
+    # Versión de autorización de usuarios (identidad desde claims del JWT)
+    from app.utils.identity import register_identity_events
+    register_identity_events()
+    
+    # Invalidación del snapshot de estadísticas
+    from app.services.stats_snapshot_service import register_stats_events
+    register_stats_events()
+    
+    # Índice de búsqueda de usuarios (user_search_tokens)
+    from app.services.user_search_service import register_user_search_events
+    register_user_search_events()
+    
+    # Índice de búsqueda del catálogo (exámenes, materiales, ECM)
+    from app.services.catalog_search_service import register_catalog_search_events
+    register_catalog_search_events()
+    
+    # Índice de acceso de candidatos (grupos, asignaciones y ventanas)
+    from app.services.entitlement_service import register_entitlement_events
+    register_entitlement_events()
+    
+    # Caché de la verificación pública de certificados CONOCER
+    from app.services.certificate_verification_service import register_verification_events
+    register_verification_events()
+    
     # Shell context
     @app.shell_context_processor
     def make_shell_context():
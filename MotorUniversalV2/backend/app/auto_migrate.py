@@ -213,8 +213,297 @@ def check_and_add_question_types():
         if added_count > 0:
             print(f"\n✅ Auto-migración question_types completada: {added_count} tipos agregados")
         else:
-            print(f"✅ Tipos de pregunta actualizados: todos ya existen")
+            print("✅ Tipos de pregunta actualizados: todos ya existen")
                 
     except Exception as e:
         print(f"❌ Error en auto-migración question_types: {e}")
         db.session.rollback()
+
+
+def check_and_add_study_reading_columns():
+    """Verificar y agregar columnas de caché de contenido a study_readings"""
+    print("🔍 Verificando esquema de study_readings...")
+    
+    try:
+        inspector = inspect(db.engine)
+        tables = inspector.get_table_names()
+        
+        if 'study_readings' not in tables:
+            print("  ⚠️  Tabla study_readings no existe, saltando...")
+            return
+        
+        dialect = db.engine.dialect.name
+        if dialect == 'mssql':
+            text_type, binary_type = 'NVARCHAR(MAX)', 'VARBINARY(MAX)'
+        elif dialect == 'postgresql':
+            text_type, binary_type = 'TEXT', 'BYTEA'
+        else:
+            text_type, binary_type = 'TEXT', 'BLOB'
+        
+        # Columnas que deben existir para la caché de lecturas procesadas
+        required_columns = {
+            'content_rendered': text_type,
+            'content_etag': 'VARCHAR(64)',
+            'content_gzip': binary_type
+        }
+        
+        existing_columns = [col['name'] for col in inspector.get_columns('study_readings')]
+        
+        added_count = 0
+        for column_name, column_def in required_columns.items():
+            if column_name not in existing_columns:
+                print(f"  📝 [study_readings] Agregando columna: {column_name}...")
+                try:
+                    db.session.execute(text(f"ALTER TABLE study_readings ADD {column_name} {column_def}"))
+                    db.session.commit()
+                    print(f"     ✓ Columna {column_name} agregada a study_readings")
+                    added_count += 1
+                except Exception as e:
+                    print(f"     ❌ Error al agregar {column_name}: {e}")
+                    db.session.rollback()
+        
+        if added_count > 0:
+            print(f"\n✅ Auto-migración study_readings completada: {added_count} columnas agregadas")
+        else:
+            print("✅ Esquema study_readings actualizado: todas las columnas ya existen")
+                
+    except Exception as e:
+        print(f"❌ Error en auto-migración study_readings: {e}")
+        db.session.rollback()
+
+
+def check_and_create_tables():
+    """Crear tablas auxiliares nuevas si no existen"""
+    print("🔍 Verificando tablas auxiliares...")
+    
+    from app.models.blob_tombstone import BlobTombstone
+    from app.models.job import Job, JobArtifact
+    from app.models.user_search import UserSearchToken
+    from app.models.maintenance_marker import MaintenanceMarker
+    from app.models.result_analytics import (
+        ResultCategoryFact, ResultDailyRollup, ResultCategoryRollup,
+        ResultScopeDailyRollup, ResultScopeCategoryRollup, ResultGroupMonthlyRollup
+    )
+    
+    # Modelos cuyas tablas se crean automáticamente (sin ALTER sobre tablas existentes)
+    models = [
+        BlobTombstone, Job, JobArtifact, UserSearchToken, MaintenanceMarker,
+        ResultCategoryFact, ResultDailyRollup, ResultCategoryRollup,
+        ResultScopeDailyRollup, ResultScopeCategoryRollup, ResultGroupMonthlyRollup
+    ]
+    
+    try:
+        existing_tables = inspect(db.engine).get_table_names()
+        created_count = 0
+        for model in models:
+            table_name = model.__tablename__
+            if table_name in existing_tables:
+                continue
+            print(f"  📝 Creando tabla: {table_name}...")
+            try:
+                model.__table__.create(bind=db.engine, checkfirst=True)
+                print(f"     ✓ Tabla {table_name} creada")
+                created_count += 1
+            except Exception as e:
+                print(f"     ❌ Error al crear {table_name}: {e}")
+        
+        if created_count > 0:
+            print(f"\n✅ Auto-migración de tablas completada: {created_count} tablas creadas")
+        else:
+            print("✅ Tablas auxiliares: todas ya existen")
+    
+    except Exception as e:
+        print(f"❌ Error en auto-migración de tablas: {e}")
+        db.session.rollback()
+
+
+def _create_missing_indexes(table, index_names):
+    """Crear los índices del modelo que falten en la tabla (devuelve cuántos se crearon)"""
+    existing_indexes = {ix['name'] for ix in inspect(db.engine).get_indexes(table.name)}
+    created_count = 0
+    for index in table.indexes:
+        if index.name not in index_names or index.name in existing_indexes:
+            continue
+        print(f"  📝 [{table.name}] Creando índice: {index.name}...")
+        try:
+            index.create(bind=db.engine)
+            print(f"     ✓ Índice {index.name} creado")
+            created_count += 1
+        except Exception as e:
+            print(f"     ❌ Error al crear {index.name}: {e}")
+    return created_count
+
+
+def check_and_add_conocer_columns():
+    """Verificar y agregar columnas e índices de reconciliación a conocer_certificates"""
+    print("🔍 Verificando esquema de conocer_certificates...")
+    
+    from app.models.conocer_certificate import ConocerCertificate
+    
+    try:
+        inspector = inspect(db.engine)
+        tables = inspector.get_table_names()
+        
+        if 'conocer_certificates' not in tables:
+            print("  ⚠️  Tabla conocer_certificates no existe, saltando...")
+            return
+        
+        datetime_type = 'TIMESTAMP' if db.engine.dialect.name == 'postgresql' else 'DATETIME'
+        
+        # Columnas que deben existir para la reconciliación contra el contenedor
+        required_columns = {
+            'blob_checked_at': datetime_type
+        }
+        
+        existing_columns = [col['name'] for col in inspector.get_columns('conocer_certificates')]
+        
+        added_count = 0
+        for column_name, column_def in required_columns.items():
+            if column_name not in existing_columns:
+                print(f"  📝 [conocer_certificates] Agregando columna: {column_name}...")
+                try:
+                    db.session.execute(text(f"ALTER TABLE conocer_certificates ADD {column_name} {column_def}"))
+                    db.session.commit()
+                    print(f"     ✓ Columna {column_name} agregada a conocer_certificates")
+                    added_count += 1
+                except Exception as e:
+                    print(f"     ❌ Error al agregar {column_name}: {e}")
+                    db.session.rollback()
+        
+        # La reconciliación busca los certificados de cada página de blobs por blob_name
+        added_count += _create_missing_indexes(ConocerCertificate.__table__, {'ix_conocer_certificates_blob_name'})
+        
+        if added_count > 0:
+            print(f"\n✅ Auto-migración conocer_certificates completada: {added_count} cambios aplicados")
+        else:
+            print("✅ Esquema conocer_certificates actualizado: columnas e índices ya existen")
+                
+    except Exception as e:
+        print(f"❌ Error en auto-migración conocer_certificates: {e}")
+        db.session.rollback()
+
+
+def check_and_add_user_columns():
+    """Verificar y agregar la versión de autorización a users (claims del token)"""
+    print("🔍 Verificando esquema de users...")
+    
+    try:
+        inspector = inspect(db.engine)
+        tables = inspector.get_table_names()
+        
+        if 'users' not in tables:
+            print("  ⚠️  Tabla users no existe, saltando...")
+            return
+        
+        # Columnas que deben existir para validar los claims de identidad
+        required_columns = {
+            'auth_version': 'INTEGER NOT NULL DEFAULT 0'
+        }
+        
+        existing_columns = [col['name'] for col in inspector.get_columns('users')]
+        
+        added_count = 0
+        for column_name, column_def in required_columns.items():
+            if column_name not in existing_columns:
+                print(f"  📝 [users] Agregando columna: {column_name}...")
+                try:
+                    db.session.execute(text(f"ALTER TABLE users ADD {column_name} {column_def}"))
+                    db.session.commit()
+                    print(f"     ✓ Columna {column_name} agregada a users")
+                    added_count += 1
+                except Exception as e:
+                    print(f"     ❌ Error al agregar {column_name}: {e}")
+                    db.session.rollback()
+        
+        if added_count > 0:
+            print(f"\n✅ Auto-migración users completada: {added_count} columnas agregadas")
+        else:
+            print("✅ Esquema users actualizado: todas las columnas ya existen")
+                
+    except Exception as e:
+        print(f"❌ Error en auto-migración users: {e}")
+        db.session.rollback()
+
+
+def check_and_create_listing_indexes():
+    """Crear los índices de paginación keyset de los listados si no existen"""
+    print("🔍 Verificando índices de listados...")
+    
+    from app.models.exam import Exam
+    from app.models.study_content import StudyMaterial
+    from app.models.user import User
+    from app.models.partner import Partner
+    
+    # Índices compuestos que usan los listados con ?cursor=
+    listing_indexes = [
+        (Exam, {'ix_exams_listing', 'ix_exams_published_name'}),
+        (StudyMaterial, {'ix_study_contents_listing'}),
+        (User, {'ix_users_created_at_id', 'ix_users_role_created_at_id', 'ix_users_candidate_search'}),
+        (Partner, {'ix_partners_listing'})
+    ]
+    
+    try:
+        existing_tables = inspect(db.engine).get_table_names()
+        created_count = 0
+        for model, index_names in listing_indexes:
+            if model.__tablename__ not in existing_tables:
+                print(f"  ⚠️  Tabla {model.__tablename__} no existe, saltando...")
+                continue
+            created_count += _create_missing_indexes(model.__table__, index_names)
+        
+        if created_count > 0:
+            print(f"\n✅ Auto-migración de índices completada: {created_count} índices creados")
+        else:
+            print("✅ Índices de listados: todos ya existen")
+    
+    except Exception as e:
+        print(f"❌ Error en auto-migración de índices: {e}")
+        db.session.rollback()
+
+
+def check_and_add_job_artifact_columns():
+    """Verificar y agregar la columna de vencimiento de job_artifacts (descargas únicas)"""
+    print("🔍 Verificando esquema de job_artifacts...")
+    
+    from app.models.job import JobArtifact
+    
+    try:
+        inspector = inspect(db.engine)
+        tables = inspector.get_table_names()
+        
+        if 'job_artifacts' not in tables:
+            print("  ⚠️  Tabla job_artifacts no existe, saltando...")
+            return
+        
+        datetime_type = 'TIMESTAMP' if db.engine.dialect.name == 'postgresql' else 'DATETIME'
+        
+        # Columnas que deben existir para las salidas sensibles (credenciales)
+        required_columns = {
+            'expires_at': datetime_type
+        }
+        
+        existing_columns = [col['name'] for col in inspector.get_columns('job_artifacts')]
+        
+        added_count = 0
+        for column_name, column_def in required_columns.items():
+            if column_name not in existing_columns:
+                print(f"  📝 [job_artifacts] Agregando columna: {column_name}...")
+                try:
+                    db.session.execute(text(f"ALTER TABLE job_artifacts ADD {column_name} {column_def}"))
+                    db.session.commit()
+                    print(f"     ✓ Columna {column_name} agregada a job_artifacts")
+                    added_count += 1
+                except Exception as e:
+                    print(f"     ❌ Error al agregar {column_name}: {e}")
+                    db.session.rollback()
+        
+        added_count += _create_missing_indexes(JobArtifact.__table__, {'ix_job_artifacts_expires_at'})
+        
+        if added_count > 0:
+            print(f"\n✅ Auto-migración job_artifacts completada: {added_count} cambios aplicados")
+        else:
+            print("✅ Esquema job_artifacts actualizado: columnas e índices ya existen")
+                
+    except Exception as e:
+        print(f"❌ Error en auto-migración job_artifacts: {e}")
+        db.session.rollback()
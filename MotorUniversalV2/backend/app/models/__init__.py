@@ -26,6 +26,14 @@ from app.models.student_progress import (
     StudentTopicProgress
 )
 from app.models.conocer_certificate import ConocerCertificate
+from app.models.blob_tombstone import BlobTombstone
+from app.models.job import Job, JobArtifact
+from app.models.user_search import UserSearchToken
+from app.models.maintenance_marker import MaintenanceMarker
+from app.models.result_analytics import (
+    ResultCategoryFact, ResultDailyRollup, ResultCategoryRollup,
+    ResultScopeDailyRollup, ResultScopeCategoryRollup, ResultGroupMonthlyRollup
+)
 from app.models.competency_standard import CompetencyStandard, DeletionRequest
 from app.models.partner import (
     Partner,
@@ -63,6 +71,17 @@ __all__ = [
     'StudentContentProgress',
     'StudentTopicProgress',
     'ConocerCertificate',
+    'BlobTombstone',
+    'Job',
+    'JobArtifact',
+    'UserSearchToken',
+    'MaintenanceMarker',
+    'ResultCategoryFact',
+    'ResultDailyRollup',
+    'ResultCategoryRollup',
+    'ResultScopeDailyRollup',
+    'ResultScopeCategoryRollup',
+    'ResultGroupMonthlyRollup',
     'CompetencyStandard',
     'DeletionRequest',
     'Partner',
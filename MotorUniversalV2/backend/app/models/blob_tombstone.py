@@ -0,0 +1,61 @@
+"""
+Modelo de Lápida de Blob (Blob Tombstone)
+Registra blobs de Azure Storage pendientes de eliminar por el recolector diferido
+"""
+from datetime import datetime
+from app import db
+
+
+class BlobTombstone(db.Model):
+    """
+    Blob pendiente de eliminación
+    
+    Se inserta en la misma transacción que borra (o reemplaza) la fila que lo
+    referenciaba. Un proceso en segundo plano (services.blob_gc_service) elimina
+    los blobs en lote y con reintentos, de modo que un fallo entre el borrado del
+    blob y el commit nunca deja referencias colgando.
+    """
+    
+    __tablename__ = 'blob_tombstones'
+    
+    STATUS_PENDING = 'pending'
+    STATUS_DELETED = 'deleted'
+    STATUS_FAILED = 'failed'
+    STATUS_SKIPPED = 'skipped'  # Otra fila (p. ej. un clon) aún referencia el blob
+    
+    id = db.Column(db.Integer, primary_key=True)
+    blob_url = db.Column(db.Text, nullable=False)  # URL original (sin SAS)
+    account_name = db.Column(db.String(100), nullable=False)
+    container_name = db.Column(db.String(100), nullable=False)
+    blob_name = db.Column(db.String(1024), nullable=False)
+    reason = db.Column(db.String(100))  # Ej: exercise_deleted, video_replaced
+    
+    # Estado y reintentos
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    not_before = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)  # Backoff entre reintentos
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    deleted_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<BlobTombstone {self.container_name}/{self.blob_name} {self.status}>'
+    
+    def to_dict(self):
+        """Convertir a diccionario"""
+        return {
+            'id': self.id,
+            'blob_url': self.blob_url,
+            'account_name': self.account_name,
+            'container_name': self.container_name,
+            'blob_name': self.blob_name,
+            'reason': self.reason,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'not_before': self.not_before.isoformat() if self.not_before else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
+        }
@@ -37,12 +37,13 @@ class ConocerCertificate(db.Model):
     evaluation_date = db.Column(db.Date)  # Fecha de evaluación
     
     # Archivo en Azure Blob Storage
-    blob_name = db.Column(db.String(500), nullable=False)  # Nombre del blob (ruta completa)
+    blob_name = db.Column(db.String(500), nullable=False, index=True)  # Nombre del blob (ruta completa)
     blob_container = db.Column(db.String(100), default='conocer-certificates')  # Contenedor
     blob_tier = db.Column(db.String(20), default='Cool')  # Hot, Cool, Archive
     file_size = db.Column(db.Integer)  # Tamaño en bytes
     file_hash = db.Column(db.String(64))  # SHA-256 del archivo para verificar integridad
     content_type = db.Column(db.String(100), default='application/pdf')
+    blob_checked_at = db.Column(db.DateTime)  # Última reconciliación en que se encontró el blob
     
     # Estado
     status = db.Column(db.String(20), default='active', nullable=False)  # active, archived, revoked
@@ -94,7 +95,8 @@ class ConocerCertificate(db.Model):
                 'blob_tier': self.blob_tier,
                 'file_size': self.file_size,
                 'file_hash': self.file_hash,
-                'content_type': self.content_type
+                'content_type': self.content_type,
+                'blob_checked_at': self.blob_checked_at.isoformat() if self.blob_checked_at else None
             }
         
         return data
@@ -17,6 +17,12 @@ class Exam(db.Model):
     
     __tablename__ = 'exams'
     
+    # Índices de los listados (orden de la paginación keyset)
+    __table_args__ = (
+        db.Index('ix_exams_listing', 'is_published', 'updated_at', 'id'),
+        db.Index('ix_exams_published_name', 'is_published', 'name', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     version = db.Column(db.String(50), nullable=False)  # Versión del examen (ej: 1.0, 2.0)
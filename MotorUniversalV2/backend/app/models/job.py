@@ -0,0 +1,117 @@
+"""
+Modelos de Trabajos en Segundo Plano (Jobs)
+Operaciones masivas (importación de candidatos, alta masiva en grupos, ...)
+que se ejecutan fuera del request en el worker (scripts/job_worker.py)
+"""
+from datetime import datetime
+from app import db
+
+
+class Job(db.Model):
+    """
+    Trabajo en segundo plano
+
+    El worker guarda un checkpoint al confirmar cada bloque; si el proceso muere,
+    el trabajo se reencola y el handler continúa desde el último checkpoint.
+    """
+
+    __tablename__ = 'jobs'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+
+    FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+    id = db.Column(db.String(36), primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, index=True)  # candidate_import, group_members_bulk
+    status = db.Column(db.String(20), default=STATUS_QUEUED, nullable=False, index=True)
+
+    # Entrada, avance y salida del handler
+    payload = db.Column(db.JSON)
+    checkpoint = db.Column(db.JSON)  # Estado para reanudar tras el último bloque confirmado
+    progress = db.Column(db.JSON)  # {'processed', 'total', ...} definido por el handler
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+
+    # Control de ejecución
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    locked_by = db.Column(db.String(100))  # host:pid del worker
+    heartbeat_at = db.Column(db.DateTime)
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+
+    created_by = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    artifacts = db.relationship('JobArtifact', backref='job', lazy='dynamic', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.job_type} {self.status}>'
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
+
+    def to_dict(self, include_result=True):
+        """Convertir a diccionario"""
+        data = {
+            'id': self.id,
+            'type': self.job_type,
+            'status': self.status,
+            'progress': self.progress or {},
+            'error': self.error,
+            'attempts': self.attempts,
+            'cancel_requested': self.cancel_requested,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'artifacts': [
+                a.to_dict() for a in self.artifacts.filter(JobArtifact.kind == JobArtifact.KIND_OUTPUT)
+            ]
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
+
+
+class JobArtifact(db.Model):
+    """
+    Archivo asociado a un trabajo: entrada (archivo subido), salida descargable
+    o temporal del handler (staging: no se lista ni se descarga)
+
+    Las salidas con expires_at (p. ej. credenciales con contraseñas) se eliminan
+    al descargarlas por primera vez o al vencer (job_service.purge_expired_artifacts).
+    """
+
+    __tablename__ = 'job_artifacts'
+
+    KIND_INPUT = 'input'
+    KIND_OUTPUT = 'output'
+    KIND_STAGING = 'staging'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(36), db.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False, index=True)
+    kind = db.Column(db.String(10), nullable=False, default=KIND_OUTPUT)
+    name = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False)
+    size_bytes = db.Column(db.Integer)
+    data = db.deferred(db.Column(db.LargeBinary))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, index=True)  # Descarga única con vencimiento
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'content_type': self.content_type,
+            'size_bytes': self.size_bytes,
+            'download_url': f'/api/jobs/{self.job_id}/artifacts/{self.id}',
+            'single_use': self.expires_at is not None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,25 @@
+"""
+Modelo de Marcas de Mantenimiento
+Registra que una reconstrucción de datos derivados (índice de búsqueda,
+analítica de resultados) terminó completa, para que startup.sh no la repita
+"""
+from datetime import datetime
+from app import db
+
+
+class MaintenanceMarker(db.Model):
+    """
+    Marca de una tarea de mantenimiento terminada
+
+    La escribe la propia reconstrucción al terminar (services.maintenance_service);
+    si se interrumpe, la marca no existe y el siguiente arranque la vuelve a lanzar.
+    """
+
+    __tablename__ = 'maintenance_markers'
+
+    name = db.Column(db.String(100), primary_key=True)  # Ej: user_search_index, results_analytics
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    details = db.Column(db.JSON)
+
+    def __repr__(self):
+        return f'<MaintenanceMarker {self.name}>'
@@ -29,6 +29,11 @@ class Partner(db.Model):
     
     __tablename__ = 'partners'
     
+    # Índice del listado (orden de la paginación keyset)
+    __table_args__ = (
+        db.Index('ix_partners_listing', 'is_active', 'name', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     legal_name = db.Column(db.String(300))  # Razón social
@@ -53,14 +58,22 @@ class Partner(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relaciones
-    state_presences = db.relationship('PartnerStatePresence', backref='partner', lazy='dynamic', cascade='all, delete-orphan')
-    campuses = db.relationship('Campus', backref='partner', lazy='dynamic', cascade='all, delete-orphan')
+    # Ordenadas por id, igual que services/partner_hierarchy_service
+    state_presences = db.relationship('PartnerStatePresence', backref='partner', lazy='dynamic', cascade='all, delete-orphan',
+                                      order_by='PartnerStatePresence.id')
+    campuses = db.relationship('Campus', backref='partner', lazy='dynamic', cascade='all, delete-orphan',
+                               order_by='Campus.id')
     # Relación muchos-a-muchos con usuarios (candidatos)
     users = db.relationship('User', secondary='user_partners', lazy='dynamic',
                            backref=db.backref('partners', lazy='dynamic'))
     
-    def to_dict(self, include_states=False, include_campuses=False):
-        """Convertir a diccionario"""
+    def to_dict(self, include_states=False, include_campuses=False, states=None, campuses=None):
+        """
+        Convertir a diccionario
+
+        states / campuses: presencias y planteles ya serializados por
+        services/partner_hierarchy_service (evita una consulta por partner)
+        """
         data = {
             'id': self.id,
             'name': self.name,
@@ -77,11 +90,11 @@ class Partner(db.Model):
         }
         
         if include_states:
-            data['states'] = [sp.to_dict() for sp in self.state_presences.all()]
+            data['states'] = states if states is not None else [sp.to_dict() for sp in self.state_presences.all()]
             
         if include_campuses:
-            data['campuses'] = [c.to_dict() for c in self.campuses.all()]
-            data['campus_count'] = self.campuses.count()
+            data['campuses'] = campuses if campuses is not None else [c.to_dict() for c in self.campuses.all()]
+            data['campus_count'] = len(data['campuses'])
             
         return data
 
@@ -154,9 +167,11 @@ class Campus(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relaciones
-    groups = db.relationship('CandidateGroup', backref='campus', lazy='dynamic', cascade='all, delete-orphan')
+    groups = db.relationship('CandidateGroup', backref='campus', lazy='dynamic', cascade='all, delete-orphan',
+                             order_by='CandidateGroup.id')
     
-    def to_dict(self, include_groups=False, include_partner=False):
+    def to_dict(self, include_groups=False, include_partner=False, group_count=None, groups=None, partner=None):
+        """group_count / groups / partner: valores precargados (partner_hierarchy_service)"""
         data = {
             'id': self.id,
             'partner_id': self.partner_id,
@@ -174,14 +189,17 @@ class Campus(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'group_count': self.groups.count() if self.groups else 0,
+            'group_count': group_count if group_count is not None else self.groups.count(),
         }
         
         if include_groups:
-            data['groups'] = [g.to_dict() for g in self.groups.all()]
+            data['groups'] = groups if groups is not None else [g.to_dict() for g in self.groups.all()]
             
         if include_partner:
-            data['partner'] = self.partner.to_dict() if self.partner else None
+            if partner is not None:
+                data['partner'] = partner
+            else:
+                data['partner'] = self.partner.to_dict() if self.partner else None
             
         return data
 
@@ -211,9 +229,11 @@ class CandidateGroup(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relación con miembros
-    members = db.relationship('GroupMember', backref='group', lazy='dynamic', cascade='all, delete-orphan')
+    members = db.relationship('GroupMember', backref='group', lazy='dynamic', cascade='all, delete-orphan',
+                              order_by='GroupMember.id')
     
-    def to_dict(self, include_members=False, include_campus=False):
+    def to_dict(self, include_members=False, include_campus=False, member_count=None, members=None, campus=None):
+        """member_count / members / campus: valores precargados (partner_hierarchy_service)"""
         data = {
             'id': self.id,
             'campus_id': self.campus_id,
@@ -226,14 +246,17 @@ class CandidateGroup(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'member_count': self.members.count() if self.members else 0,
+            'member_count': member_count if member_count is not None else self.members.count(),
         }
         
         if include_members:
-            data['members'] = [m.to_dict(include_user=True) for m in self.members.all()]
+            data['members'] = members if members is not None else [m.to_dict(include_user=True) for m in self.members.all()]
             
         if include_campus:
-            data['campus'] = self.campus.to_dict(include_partner=True) if self.campus else None
+            if campus is not None:
+                data['campus'] = campus
+            else:
+                data['campus'] = self.campus.to_dict(include_partner=True) if self.campus else None
             
         return data
 
@@ -349,74 +372,10 @@ class GroupExam(db.Model):
             data['group'] = self.group.to_dict()
             
         if include_materials and self.exam:
-            # Obtener materiales de estudio asociados al examen
-            from app.models.study_content import StudyMaterial
-            from sqlalchemy import text
-            
-            # Verificar si hay personalizaciones para este group_exam
-            custom_materials = self.custom_materials.all() if self.custom_materials else []
-            has_customizations = len(custom_materials) > 0
-            
-            materials = []
-            
-            if has_customizations:
-                # Si hay personalizaciones, usar solo los materiales marcados como incluidos
-                included_ids = [cm.study_material_id for cm in custom_materials if cm.is_included]
-                if included_ids:
-                    try:
-                        placeholders = ','.join([str(id) for id in included_ids])
-                        query = f'''
-                            SELECT sc.id, sc.title, sc.description, sc.image_url
-                            FROM study_contents sc
-                            WHERE sc.id IN ({placeholders})
-                        '''
-                        linked_materials = db.session.execute(text(query)).fetchall()
-                        
-                        for m in linked_materials:
-                            materials.append({
-                                'id': m[0],
-                                'title': m[1],
-                                'description': m[2],
-                                'cover_image_url': m[3],
-                                'is_custom': True,
-                            })
-                    except Exception:
-                        pass
-            else:
-                # Sin personalizaciones: usar materiales vinculados al examen que estén PUBLICADOS
-                # Buscar por relación muchos a muchos usando la tabla intermedia
-                try:
-                    linked_materials = db.session.execute(text('''
-                        SELECT sc.id, sc.title, sc.description, sc.image_url
-                        FROM study_contents sc
-                        INNER JOIN study_material_exams sme ON sc.id = sme.study_material_id
-                        WHERE sme.exam_id = :exam_id AND sc.is_published = 1
-                    '''), {'exam_id': self.exam.id}).fetchall()
-                    
-                    for m in linked_materials:
-                        materials.append({
-                            'id': m[0],
-                            'title': m[1],
-                            'description': m[2],
-                            'cover_image_url': m[3],
-                            'is_custom': False,
-                        })
-                except Exception:
-                    pass
-                
-                # También buscar por campo exam_id directo (legacy) - solo publicados
-                if not materials:
-                    legacy_materials = StudyMaterial.query.filter_by(exam_id=self.exam.id, is_published=True).all()
-                    materials = [{
-                        'id': m.id,
-                        'title': m.title,
-                        'description': m.description,
-                        'cover_image_url': getattr(m, 'cover_image_url', m.image_url),
-                        'is_custom': False,
-                    } for m in legacy_materials]
-            
-            data['study_materials'] = materials
-            data['has_custom_materials'] = has_customizations
+            # Para listas usar group_exam_material_service.resolve_group_exam_materials
+            # con todos los grupo-exámenes a la vez
+            from app.services.group_exam_material_service import resolve_group_exam_materials
+            data.update(resolve_group_exam_materials([self])[self.id])
             
         return data
 
@@ -0,0 +1,164 @@
+"""
+Modelos de Analítica de Resultados
+Desglose por categoría/tema de cada resultado (extraído de answers_data) y
+acumulados por grupo, plantel y partner para los tableros de coordinadores
+"""
+from app import db
+
+
+class ResultCategoryFact(db.Model):
+    """
+    Puntos de un resultado en un tema de una categoría
+
+    Una fila por (resultado, categoría, tema) con lo obtenido y el máximo,
+    tomados de evaluation_breakdown al guardar el resultado.
+    """
+
+    __tablename__ = 'result_category_facts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    result_id = db.Column(db.String(36), db.ForeignKey('results.id', ondelete='CASCADE'), nullable=False, index=True)
+    category = db.Column(db.String(200), nullable=False)
+    topic = db.Column(db.String(200), nullable=False, default='')
+    earned = db.Column(db.Float, nullable=False, default=0)
+    max_score = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResultCategoryFact {self.result_id} {self.category}/{self.topic}>'
+
+
+class ResultDailyRollup(db.Model):
+    """
+    Acumulado de resultados completados por (grupo, examen, día)
+
+    Se incrementa al guardar cada resultado; los tableros de grupo, plantel y
+    partner suman estas filas en lugar de recorrer results.
+    """
+
+    __tablename__ = 'result_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'exam_id', 'day', name='uq_result_daily_rollups_key'),
+        db.Index('ix_result_daily_rollups_group_day', 'group_id', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('candidate_groups.id', ondelete='CASCADE'), nullable=False)
+    exam_id = db.Column(db.Integer, nullable=False)
+    competency_standard_id = db.Column(db.Integer, nullable=True)  # ECM del examen (historial unificado)
+    day = db.Column(db.Date, nullable=False)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)  # Suma de score (0-100)
+    duration_sum = db.Column(db.Integer, nullable=False, default=0)  # Suma de duration_seconds
+
+    def __repr__(self):
+        return f'<ResultDailyRollup g={self.group_id} e={self.exam_id} {self.day}>'
+
+
+class ResultCategoryRollup(db.Model):
+    """Acumulado por (grupo, examen, día, categoría, tema) de los puntos obtenidos y posibles"""
+
+    __tablename__ = 'result_category_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'exam_id', 'day', 'category', 'topic', name='uq_result_category_rollups_key'),
+        db.Index('ix_result_category_rollups_group_day', 'group_id', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('candidate_groups.id', ondelete='CASCADE'), nullable=False)
+    exam_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(200), nullable=False)
+    topic = db.Column(db.String(200), nullable=False, default='')
+
+    results = db.Column(db.Integer, nullable=False, default=0)
+    earned = db.Column(db.Float, nullable=False, default=0)
+    max_score = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResultCategoryRollup g={self.group_id} {self.category}/{self.topic} {self.day}>'
+
+
+class ResultScopeDailyRollup(db.Model):
+    """
+    Acumulado de resultados completados por (plantel o partner, examen, día)
+
+    Es la suma de los ResultDailyRollup de los grupos del plantel o partner:
+    sus tableros leen una fila por examen y día, sin importar cuántos grupos tengan.
+    """
+
+    __tablename__ = 'result_scope_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_id', 'exam_id', 'day', name='uq_result_scope_daily_rollups_key'),
+        db.Index('ix_result_scope_daily_rollups_scope_day', 'scope', 'scope_id', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)  # campus | partner
+    scope_id = db.Column(db.Integer, nullable=False)
+    exam_id = db.Column(db.Integer, nullable=False)
+    competency_standard_id = db.Column(db.Integer, nullable=True)
+    day = db.Column(db.Date, nullable=False)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    duration_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResultScopeDailyRollup {self.scope}={self.scope_id} e={self.exam_id} {self.day}>'
+
+
+class ResultScopeCategoryRollup(db.Model):
+    """Acumulado por (plantel o partner, examen, día, categoría, tema) de los puntos obtenidos y posibles"""
+
+    __tablename__ = 'result_scope_category_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_id', 'exam_id', 'day', 'category', 'topic',
+                            name='uq_result_scope_category_rollups_key'),
+        db.Index('ix_result_scope_category_rollups_scope_day', 'scope', 'scope_id', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)  # campus | partner
+    scope_id = db.Column(db.Integer, nullable=False)
+    exam_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(200), nullable=False)
+    topic = db.Column(db.String(200), nullable=False, default='')
+
+    results = db.Column(db.Integer, nullable=False, default=0)
+    earned = db.Column(db.Float, nullable=False, default=0)
+    max_score = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResultScopeCategoryRollup {self.scope}={self.scope_id} {self.category}/{self.topic} {self.day}>'
+
+
+class ResultGroupMonthlyRollup(db.Model):
+    """
+    Acumulado de resultados completados por (grupo, examen, mes)
+
+    El desglose por grupo de los tableros de plantel y partner suma los meses
+    completos del rango aquí y solo los días de los meses parciales en
+    ResultDailyRollup.
+    """
+
+    __tablename__ = 'result_group_monthly_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'exam_id', 'month', name='uq_result_group_monthly_rollups_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('candidate_groups.id', ondelete='CASCADE'), nullable=False)
+    exam_id = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Date, nullable=False)  # Primer día del mes
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    duration_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ResultGroupMonthlyRollup g={self.group_id} e={self.exam_id} {self.month}>'
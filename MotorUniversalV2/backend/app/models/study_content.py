@@ -39,7 +39,11 @@ class StudyMaterial(db.Model):
     """Modelo de material de estudio (curso principal)"""
     
     __tablename__ = 'study_contents'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Índice del listado (orden de la paginación keyset)
+        db.Index('ix_study_contents_listing', 'is_published', 'updated_at', 'id'),
+        {'extend_existing': True}
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -63,34 +67,20 @@ class StudyMaterial(db.Model):
     # Nueva relación muchos a muchos
     exams = db.relationship('Exam', secondary=study_material_exams, backref=db.backref('linked_study_materials', lazy='dynamic'))
     
-    def to_dict(self, include_sessions=False):
-        """Convierte el material a diccionario"""
-        # Obtener lista de exámenes vinculados (con manejo de error si la tabla no existe)
-        linked_exams = []
-        exam_ids = []
-        try:
-            if self.exams:
-                linked_exams = [{
-                    'id': e.id,
-                    'name': e.name,
-                    'version': e.version
-                } for e in self.exams]
-                exam_ids = [e.id for e in self.exams]
-        except Exception:
-            # La tabla study_material_exams puede no existir aún
-            pass
+    def to_dict(self, include_sessions=False, summary=None, include_reading_content=True):
+        """
+        Convierte el material a diccionario
+        
+        Args:
+            include_sessions: Incluir sesiones con sus temas
+            include_reading_content: Incluir el HTML de las lecturas en los temas
+            summary: Agregados precalculados (ver services.study_material_service).
+                     Si se provee, no se recorren sesiones ni exámenes por material.
+        """
+        if summary is None:
+            summary = self._compute_summary()
         
-        # Calcular total de sesiones y temas
-        sessions_count = self.sessions.count() if self.sessions else 0
-        topics_count = 0
-        total_estimated_time = 0
-        if self.sessions:
-            for session in self.sessions.all():
-                if session.topics:
-                    for topic in session.topics.all():
-                        topics_count += 1
-                        if topic.estimated_time_minutes:
-                            total_estimated_time += topic.estimated_time_minutes
+        sessions_count = summary['sessions_count']
         
         data = {
             'id': self.id,
@@ -100,13 +90,13 @@ class StudyMaterial(db.Model):
             'is_published': self.is_published,
             'order': self.order,
             'exam_id': self.exam_id,
-            'exam_title': self.exam.title if self.exam else None,
-            'exam_ids': exam_ids,
-            'linked_exams': linked_exams,
+            'exam_title': summary['exam_title'],
+            'exam_ids': summary['exam_ids'],
+            'linked_exams': summary['linked_exams'],
             'sessions_count': sessions_count,
-            'topics_count': topics_count,
+            'topics_count': summary['topics_count'],
             'total_sessions': sessions_count,  # Para compatibilidad
-            'estimated_time_minutes': total_estimated_time,
+            'estimated_time_minutes': summary['estimated_time_minutes'],
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_by': self.updated_by,
@@ -114,10 +104,25 @@ class StudyMaterial(db.Model):
         }
         
         if include_sessions:
-            data['sessions'] = [s.to_dict(include_topics=True) for s in self.sessions.all()]
+            data['sessions'] = [
+                s.to_dict(include_topics=True, include_reading_content=include_reading_content)
+                for s in self.sessions.all()
+            ]
         
         return data
 
+    def _compute_summary(self):
+        """Calcular agregados de este material (un solo material, p. ej. detalle)"""
+        from app.services.study_material_service import get_material_summaries
+        return get_material_summaries([self.id]).get(self.id) or {
+            'sessions_count': 0,
+            'topics_count': 0,
+            'estimated_time_minutes': 0,
+            'exam_title': None,
+            'exam_ids': [],
+            'linked_exams': []
+        }
+
 
 class StudySession(db.Model):
     """Modelo de sesión de estudio"""
@@ -138,7 +143,7 @@ class StudySession(db.Model):
     # Relaciones
     topics = db.relationship('StudyTopic', backref='session', lazy='dynamic', cascade='all, delete-orphan', order_by='StudyTopic.order')
     
-    def to_dict(self, include_topics=False):
+    def to_dict(self, include_topics=False, include_reading_content=True):
         """Convierte la sesión a diccionario"""
         data = {
             'id': self.id,
@@ -152,7 +157,10 @@ class StudySession(db.Model):
         }
         
         if include_topics:
-            data['topics'] = [t.to_dict(include_elements=True) for t in self.topics.all()]
+            data['topics'] = [
+                t.to_dict(include_elements=True, include_reading_content=include_reading_content)
+                for t in self.topics.all()
+            ]
         
         return data
 
@@ -186,7 +194,7 @@ class StudyTopic(db.Model):
     downloadable_exercise = db.relationship('StudyDownloadableExercise', backref='topic', uselist=False, cascade='all, delete-orphan')
     interactive_exercise = db.relationship('StudyInteractiveExercise', backref='topic', uselist=False, cascade='all, delete-orphan')
     
-    def to_dict(self, include_elements=False):
+    def to_dict(self, include_elements=False, include_reading_content=True):
         """Convierte el tema a diccionario"""
         data = {
             'id': self.id,
@@ -208,7 +216,7 @@ class StudyTopic(db.Model):
         }
         
         if include_elements:
-            data['reading'] = self.reading.to_dict() if self.reading else None
+            data['reading'] = self.reading.to_dict(include_content=include_reading_content) if self.reading else None
             data['video'] = self.video.to_dict() if self.video else None
             data['downloadable_exercise'] = self.downloadable_exercise.to_dict() if self.downloadable_exercise else None
             data['interactive_exercise'] = self.interactive_exercise.to_dict(include_steps=True) if self.interactive_exercise else None
@@ -228,24 +236,47 @@ class StudyReading(db.Model):
     content = db.Column(db.Text)
     estimated_time_minutes = db.Column(db.Integer)
     
+    # Caché de contenido procesado (se calcula al guardar, ver services.reading_service)
+    content_rendered = db.Column(db.Text)  # HTML normalizado, sin imágenes base64
+    content_etag = db.Column(db.String(64))  # SHA-256 del HTML procesado
+    content_gzip = db.deferred(db.Column(db.LargeBinary))  # HTML procesado comprimido con gzip
+    
     # Auditoría
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self, wrap_content: bool = True):
-        """Convierte la lectura a diccionario"""
-        # Normalizar espacios para permitir ajuste de línea automático por CSS
-        processed_content = normalize_html_spaces(self.content) if self.content else self.content
+    def get_rendered_content(self):
+        """HTML listo para servir; usa la caché si existe (lecturas anteriores a la caché se normalizan al vuelo)"""
+        if not self.content:
+            return self.content
+        if self.content_rendered is not None and self.content_etag:
+            return self.content_rendered
+        return normalize_html_spaces(self.content) if self.content else self.content
+    
+    def to_dict(self, wrap_content: bool = True, include_content: bool = True):
+        """
+        Convierte la lectura a diccionario
         
-        return {
+        Args:
+            wrap_content: Se mantiene por compatibilidad
+            include_content: Incluir el HTML completo. Si es False solo se devuelve
+                             content_url para obtenerlo por separado (cacheable, con Range)
+        """
+        data = {
             'id': self.id,
             'topic_id': self.topic_id,
             'title': self.title,
-            'content': processed_content,
+            'content_url': f'/api/study-contents/readings/{self.id}/content' if self.id else None,
+            'content_etag': self.content_etag,
             'estimated_time_minutes': self.estimated_time_minutes,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        
+        if include_content:
+            data['content'] = self.get_rendered_content()
+        
+        return data
 
 
 class StudyVideo(db.Model):
@@ -3,23 +3,43 @@ Modelo de Usuario
 """
 from datetime import datetime
 from app import db
+import os
 from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
 
+# Cambiar estos parámetros re-hashea las contraseñas en el siguiente login
 ph = PasswordHasher(
-    time_cost=3,
-    memory_cost=65536,
-    parallelism=4,
+    time_cost=int(os.getenv('ARGON2_TIME_COST', 3)),
+    memory_cost=int(os.getenv('ARGON2_MEMORY_COST', 65536)),
+    parallelism=int(os.getenv('ARGON2_PARALLELISM', 4)),
     hash_len=32,
     salt_len=16
 )
 
+# Permisos por rol (también los usa la identidad del request, utils/identity)
+ROLE_PERMISSIONS = {
+    'admin': ['*'],  # Todos los permisos
+    'editor': ['exams:create', 'exams:read', 'exams:update', 'exams:delete'],
+    'soporte': ['users:read', 'vouchers:create', 'vouchers:read'],
+    'candidato': ['exams:read', 'evaluations:create'],
+    'auxiliar': ['users:read', 'exams:read']
+}
+
+# Roles disponibles en el sistema (sin alumno)
+AVAILABLE_ROLES = ('admin', 'editor', 'soporte', 'coordinator', 'candidato', 'auxiliar')
+
 
 class User(db.Model):
     """Modelo de usuario con autenticación"""
     
     __tablename__ = 'users'
     
+    # Índices de los listados (orden de la paginación keyset)
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_role_created_at_id', 'role', 'created_at', 'id'),
+        db.Index('ix_users_candidate_search', 'role', 'is_active', 'first_surname', 'name', 'id'),
+    )
+    
     id = db.Column(db.String(36), primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     username = db.Column(db.String(100), unique=True, nullable=False, index=True)
@@ -41,6 +61,8 @@ class User(db.Model):
     role = db.Column(db.String(20), nullable=False, default='candidato')  # admin, editor, soporte, coordinator, candidato, auxiliar
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     is_verified = db.Column(db.Boolean, default=False, nullable=False)
+    # Versión de autorización: sube al cambiar role / is_active (claim 'av' del token, utils/identity)
+    auth_version = db.Column(db.Integer, default=0, nullable=False)
     
     # Opciones de documentos/certificados habilitados para el usuario
     # El reporte de evaluación está habilitado por default para todos
@@ -74,32 +96,29 @@ class User(db.Model):
         return ' '.join(parts)
     
     def set_password(self, password):
-        """Hashear contraseña con Argon2"""
-        self.password_hash = ph.hash(password)
-    
-    def check_password(self, password):
-        """Verificar contraseña"""
-        try:
-            ph.verify(self.password_hash, password)
-            # Rehash si es necesario (auto-upgrade)
-            if ph.check_needs_rehash(self.password_hash):
-                self.password_hash = ph.hash(password)
-                db.session.commit()
-            return True
-        except VerifyMismatchError:
-            return False
+        """Hashear contraseña con Argon2 (en el pool de hashing)"""
+        from app.utils.password_hashing import hash_password
+        self.password_hash = hash_password(password)
+    
+    def check_password(self, password, admission=False):
+        """
+        Verificar contraseña en el pool de hashing
+        
+        Args:
+            admission: Aplicar el control de admisión del login
+                (lanza PasswordHashingBusy si la cola está llena)
+        """
+        from app.utils.password_hashing import verify_password
+        is_valid, new_hash = verify_password(self.password_hash, password, admission=admission)
+        if is_valid and new_hash:
+            # Rehash si cambiaron los parámetros de Argon2 (auto-upgrade)
+            self.password_hash = new_hash
+            db.session.commit()
+        return is_valid
     
     def has_permission(self, permission):
         """Verificar si el usuario tiene un permiso específico"""
-        role_permissions = {
-            'admin': ['*'],  # Todos los permisos
-            'editor': ['exams:create', 'exams:read', 'exams:update', 'exams:delete'],
-            'soporte': ['users:read', 'vouchers:create', 'vouchers:read'],
-            'candidato': ['exams:read', 'evaluations:create'],
-            'auxiliar': ['users:read', 'exams:read']
-        }
-        
-        permissions = role_permissions.get(self.role, [])
+        permissions = ROLE_PERMISSIONS.get(self.role, [])
         return '*' in permissions or permission in permissions
     
     def to_dict(self, include_private=False, include_partners=False):
@@ -0,0 +1,25 @@
+"""
+Modelo del Índice de Búsqueda de Usuarios
+Tokens normalizados (minúsculas, sin acentos) por usuario para buscar por
+prefijo con un índice en lugar de ILIKE '%term%' sobre toda la tabla users
+"""
+from app import db
+
+
+class UserSearchToken(db.Model):
+    """
+    Token de búsqueda de un usuario
+
+    La clave primaria (token, user_id) agrupa los tokens en orden, de modo que
+    una búsqueda por prefijo es un rango del índice. Lo mantiene
+    services.user_search_service al crear o modificar usuarios.
+    """
+
+    __tablename__ = 'user_search_tokens'
+
+    token = db.Column(db.String(120), primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True, index=True)
+    weight = db.Column(db.SmallInteger, nullable=False, default=1)  # 3: curp/email, 2: nombre, 1: otros
+
+    def __repr__(self):
+        return f'<UserSearchToken {self.token} {self.user_id}>'
@@ -12,6 +12,8 @@ from flask_jwt_extended import (
 from app import db, cache
 from app.models.user import User
 from app.utils.rate_limit import rate_limit_login, rate_limit_register
+from app.utils.password_hashing import PasswordHashingBusy
+from app.utils.identity import identity_claims
 from datetime import datetime
 import redis
 
@@ -148,7 +150,19 @@ def login():
         (User.username == username) | (User.email == username)
     ).first()
     
-    if not user or not user.check_password(password):
+    try:
+        is_valid = user is not None and user.check_password(password, admission=True)
+    except PasswordHashingBusy as e:
+        # Ráfaga de logins (inicio de examen): rechazar rápido en lugar de agotar el timeout
+        response = jsonify({
+            'error': 'Servicio ocupado',
+            'message': 'Hay muchos inicios de sesión en este momento. Intenta de nuevo en unos segundos.',
+            'retry_after': e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    
+    if not is_valid:
         return jsonify({'error': 'Credenciales inválidas'}), 401
     
     if not user.is_active:
@@ -162,10 +176,7 @@ def login():
     access_token = create_access_token(
         identity=user.id,
         fresh=True,
-        additional_claims={
-            'role': user.role,
-            'username': user.username
-        }
+        additional_claims=identity_claims(user)
     )
     refresh_token = create_refresh_token(identity=user.id)
     
@@ -192,7 +203,16 @@ def refresh():
         description: Token refrescado
     """
     identity = get_jwt_identity()
-    access_token = create_access_token(identity=identity, fresh=False)
+    user = User.query.get(identity)
+    if not user or not user.is_active:
+        return jsonify({'error': 'Usuario inactivo'}), 401
+    
+    # Claims frescos: rol y versión de autorización actuales
+    access_token = create_access_token(
+        identity=identity,
+        fresh=False,
+        additional_claims=identity_claims(user)
+    )
     
     return jsonify({
         'access_token': access_token
@@ -1,14 +1,18 @@
 """
 Rutas para gestión de Certificados CONOCER
 """
+import os
+import hashlib
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, current_app, redirect, Response, stream_with_context, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models import User
 from app.models.conocer_certificate import ConocerCertificate
-from app.services.conocer_blob_service import get_conocer_blob_service
-import io
+from app.services.conocer_blob_service import ConocerBlobService, get_conocer_blob_service
+from app.services.certificate_verification_service import verify_certificate
+from app.utils.identity import get_current_identity
+from app.utils.rate_limit import rate_limit_public_verification
 
 # Lazy import para Azure (puede no estar instalado)
 ResourceNotFoundError = None
@@ -28,6 +32,16 @@ def _get_azure_exceptions():
 
 conocer_bp = Blueprint('conocer', __name__)
 
+DOWNLOAD_MODES = ('auto', 'stream', 'redirect')
+
+# A partir de este tamaño la descarga (mode=auto) se redirige a un URL SAS
+CONOCER_REDIRECT_MIN_BYTES = int(os.getenv('CONOCER_REDIRECT_MIN_BYTES', 2 * 1024 * 1024))
+
+# Verificación pública: el CDN guarda poco tiempo los resultados para que una
+# revocación se refleje pronto (el caché de Redis se invalida al instante)
+VERIFY_CACHE_CONTROL = 'public, max-age=60, s-maxage=300, stale-while-revalidate=60'
+VERIFY_NOT_FOUND_CACHE_CONTROL = 'public, max-age=60, s-maxage=60'
+
 
 @conocer_bp.route('/certificates', methods=['GET'])
 @jwt_required()
@@ -107,8 +121,17 @@ def download_certificate(certificate_id):
     Si el certificado está en Archive tier, inicia la rehidratación
     y retorna un mensaje indicando el tiempo estimado.
     
+    Query params:
+        - mode: auto (default), stream o redirect. En auto, los archivos de
+          CONOCER_REDIRECT_MIN_BYTES o más se redirigen (302) a un URL SAS y
+          los demás se envían por bloques
+    
+    Headers:
+        - Range / If-Range: descarga parcial (un solo rango de bytes)
+    
     Returns:
-        PDF del certificado o mensaje de estado si está en Archive
+        PDF del certificado (200/206), redirección al URL SAS (302)
+        o mensaje de estado si está en Archive
     """
     current_user_id = get_jwt_identity()
     
@@ -120,28 +143,32 @@ def download_certificate(certificate_id):
     if not certificate:
         return jsonify({'error': 'Certificado no encontrado'}), 404
     
+    mode = request.args.get('mode', 'auto')
+    if mode not in DOWNLOAD_MODES:
+        return jsonify({'error': f"mode inválido. Usa {', '.join(DOWNLOAD_MODES)}"}), 400
+    
     try:
         blob_service = get_conocer_blob_service()
-        content, properties = blob_service.download_certificate(certificate.blob_name)
-        
-        # Verificar integridad del archivo
-        import hashlib
-        file_hash = hashlib.sha256(content).hexdigest()
-        if certificate.file_hash and file_hash != certificate.file_hash:
-            current_app.logger.warning(
-                f"Hash mismatch para certificado {certificate_id}: "
-                f"esperado {certificate.file_hash}, obtenido {file_hash}"
-            )
         
         # Crear nombre de archivo para descarga
         filename = f"CONOCER_{certificate.standard_code}_{certificate.certificate_number}.pdf"
         
-        return send_file(
-            io.BytesIO(content),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        redirect_large = mode == 'auto' and (certificate.file_size or 0) >= CONOCER_REDIRECT_MIN_BYTES
+        if (mode == 'redirect' or redirect_large) and isinstance(blob_service, ConocerBlobService):
+            download_url = blob_service.generate_download_url(certificate.blob_name, filename=filename)
+            if download_url:
+                response = redirect(download_url, code=302)
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+            # Sin URL (p. ej. en Archive): el streaming reporta la rehidratación
+        
+        return _stream_certificate(certificate, blob_service, filename)
+        
+    except RangeNotSatisfiable as e:
+        response = jsonify({'error': 'Rango no satisfacible'})
+        response.status_code = 416
+        response.headers['Content-Range'] = f'bytes */{e.size}'
+        return response
         
     except Exception as e:
         error_msg = str(e)
@@ -159,6 +186,109 @@ def download_certificate(certificate_id):
         return jsonify({'error': 'Error al descargar el certificado'}), 500
 
 
+class RangeNotSatisfiable(Exception):
+    """El header Range no cae dentro del archivo"""
+    
+    def __init__(self, size):
+        super().__init__(f'Rango fuera de 0-{size}')
+        self.size = size
+
+
+def _select_range(size, etag):
+    """
+    (offset, length) pedido en el header Range, o None para el archivo completo
+    
+    Se ignora el rango si If-Range no coincide con el ETag actual o si se
+    piden varios rangos (se envía el archivo completo).
+    """
+    if request.range is None:
+        return None
+    if request.headers.get('If-Range') and request.if_range.etag != (etag or '').strip('"'):
+        return None
+    
+    bounds = request.range.range_for_length(size)
+    if bounds is None:
+        if request.range.units == 'bytes' and len(request.range.ranges) == 1:
+            raise RangeNotSatisfiable(size)
+        return None
+    start, stop = bounds
+    return start, stop - start
+
+
+def _stream_certificate(certificate, blob_service, filename):
+    """
+    Respuesta por bloques del PDF (200 completo o 206 parcial)
+    
+    En descargas completas el SHA-256 se calcula bloque por bloque y se
+    compara con file_hash al terminar de enviar el archivo.
+    """
+    chunks, info = blob_service.stream_certificate(certificate.blob_name, select_range=_select_range)
+    partial = info['length'] != info['size']
+    
+    if partial or not certificate.file_hash:
+        body = chunks
+    else:
+        body = _verified_chunks(chunks, certificate.id, certificate.file_hash)
+    
+    headers = {
+        'Content-Length': str(info['length']),
+        'Accept-Ranges': 'bytes',
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'private, no-store',
+    }
+    if info['etag']:
+        headers['ETag'] = info['etag']
+    if partial:
+        end = info['offset'] + info['length'] - 1
+        headers['Content-Range'] = f"bytes {info['offset']}-{end}/{info['size']}"
+    
+    return Response(
+        stream_with_context(body),
+        status=206 if partial else 200,
+        mimetype=info['content_type'] or 'application/pdf',
+        headers=headers,
+        direct_passthrough=True
+    )
+
+
+def _verified_chunks(chunks, certificate_id, expected_hash):
+    """Enviar los bloques actualizando el SHA-256; verificar al completar la descarga"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+    # Si el cliente corta la descarga no se llega aquí (no hay hash completo)
+    _record_integrity(certificate_id, expected_hash, digest.hexdigest())
+
+
+def _record_integrity(certificate_id, expected_hash, file_hash):
+    """Registrar (o limpiar) en metadata_json una diferencia de hash del archivo"""
+    try:
+        certificate = ConocerCertificate.query.get(certificate_id)
+        metadata = dict(certificate.metadata_json or {})
+        
+        if file_hash == expected_hash:
+            if 'integrity_mismatch' not in metadata:
+                return
+            metadata.pop('integrity_mismatch')
+        else:
+            current_app.logger.warning(
+                f"Hash mismatch para certificado {certificate_id}: "
+                f"esperado {expected_hash}, obtenido {file_hash}"
+            )
+            metadata['integrity_mismatch'] = {
+                'detected_at': datetime.utcnow().isoformat(),
+                'expected': expected_hash,
+                'actual': file_hash
+            }
+        
+        certificate.metadata_json = metadata
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error registrando integridad del certificado {certificate_id}: {e}")
+
+
 @conocer_bp.route('/certificates/<int:certificate_id>/download-url', methods=['GET'])
 @jwt_required()
 def get_download_url(certificate_id):
@@ -317,8 +447,7 @@ def upload_certificate():
     Returns:
         Certificado creado con metadata
     """
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_identity()
     
     # Verificar permisos
     if current_user.role not in ['admin', 'editor']:
@@ -366,7 +495,7 @@ def upload_certificate():
             metadata={
                 'curp': request.form['curp'],
                 'standard_name': request.form['standard_name'],
-                'uploaded_by': current_user_id
+                'uploaded_by': current_user.id
             }
         )
         
@@ -419,6 +548,79 @@ def upload_certificate():
         return jsonify({'error': 'Error al subir el certificado'}), 500
 
 
+@conocer_bp.route('/admin/certificates/bulk', methods=['POST'])
+@jwt_required()
+def bulk_upload_certificates():
+    """
+    Carga masiva de certificados CONOCER desde un ZIP (solo admin/editor)
+
+    Form data:
+        - file: ZIP con los PDF (required)
+        - manifest: CSV con una fila por certificado (optional si el ZIP
+          incluye manifest.csv). Columnas: file, curp, certificate_number,
+          standard_code, standard_name, issue_date (requeridas) y user_id,
+          expiration_date, evaluation_date, competency_level,
+          evaluation_center_name, evaluation_center_code, evaluator_name
+
+    Se valida el ZIP y los encabezados del manifiesto y se encola como trabajo
+    'conocer_ingest'. Responde 202 con el job_id; el progreso, el resumen y
+    el reporte por fila se consultan en /api/jobs/<job_id>.
+    """
+    from app.services.conocer_ingest_service import ConocerIngestError, open_ingest
+    from app.services.job_service import enqueue_job
+
+    current_user = get_current_identity()
+
+    if current_user.role not in ['admin', 'editor']:
+        return jsonify({'error': 'No tiene permisos para esta acción'}), 403
+
+    if 'file' not in request.files:
+        return jsonify({'error': 'No se envió ningún archivo'}), 400
+
+    file = request.files['file']
+    if not file.filename or not file.filename.lower().endswith('.zip'):
+        return jsonify({'error': 'El archivo debe ser un ZIP'}), 400
+
+    manifest = request.files.get('manifest')
+    if manifest and manifest.filename and not manifest.filename.lower().endswith('.csv'):
+        return jsonify({'error': 'El manifiesto debe ser un archivo CSV'}), 400
+
+    try:
+        zip_data = file.read()
+        manifest_data = manifest.read() if manifest and manifest.filename else None
+
+        # Validar ZIP y encabezados antes de encolar
+        try:
+            archive, _, rows = open_ingest(zip_data, manifest_data)
+            archive.close()
+        except ConocerIngestError as e:
+            return jsonify({'error': str(e)}), 400
+
+        inputs = [('certificados.zip', zip_data, 'application/zip')]
+        if manifest_data is not None:
+            inputs.append(('manifest.csv', manifest_data, 'text/csv'))
+
+        job = enqueue_job(
+            'conocer_ingest',
+            payload={'filename': file.filename, 'uploaded_by': current_user.id},
+            created_by=current_user.id,
+            inputs=inputs,
+            progress={'processed': 0, 'total': len(rows), 'created': 0, 'errors': 0, 'skipped': 0}
+        )
+
+        return jsonify({
+            'message': 'Carga de certificados en proceso',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}"
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error iniciando carga masiva de certificados: {e}")
+        return jsonify({'error': 'Error al iniciar la carga masiva'}), 500
+
+
 @conocer_bp.route('/admin/certificates/<int:certificate_id>/archive', methods=['POST'])
 @jwt_required()
 def archive_certificate(certificate_id):
@@ -430,8 +632,7 @@ def archive_certificate(certificate_id):
     Returns:
         Estado actualizado del certificado
     """
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_identity()
     
     if current_user.role != 'admin':
         return jsonify({'error': 'Solo administradores pueden archivar certificados'}), 403
@@ -475,8 +676,7 @@ def get_user_certificates_admin(user_id):
     Returns:
         Lista de certificados del usuario
     """
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_identity()
     
     if current_user.role not in ['admin', 'editor', 'soporte']:
         return jsonify({'error': 'No tiene permisos para esta acción'}), 403
@@ -491,36 +691,77 @@ def get_user_certificates_admin(user_id):
     })
 
 
+@conocer_bp.route('/admin/certificates/reconcile', methods=['POST'])
+@jwt_required()
+def reconcile_certificates():
+    """
+    Reconciliar la tabla de certificados con el contenedor (solo admin)
+
+    Se ejecuta como trabajo en segundo plano 'conocer_reconcile': recorre los
+    blobs por páginas y reporta blobs huérfanos, certificados sin archivo y
+    etiquetas de índice faltantes.
+
+    JSON body:
+        - fix_tags: Corregir las etiquetas user_id/standard_code (default false)
+
+    Returns:
+        202 con job_id (progreso y resumen en /api/jobs/<job_id>)
+    """
+    current_user = get_current_identity()
+
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Solo administradores pueden reconciliar certificados'}), 403
+
+    try:
+        from app.services.job_service import enqueue_job
+
+        data = request.get_json(silent=True) or {}
+        job = enqueue_job(
+            'conocer_reconcile',
+            payload={'fix_tags': bool(data.get('fix_tags'))},
+            created_by=current_user.id,
+            progress={'phase': 'blobs', 'blobs_scanned': 0}
+        )
+        return jsonify({
+            'message': 'Reconciliación en proceso',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}"
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error iniciando reconciliación de certificados: {e}")
+        return jsonify({'error': 'Error al iniciar la reconciliación'}), 500
+
+
 @conocer_bp.route('/verify/<certificate_number>', methods=['GET'])
+@rate_limit_public_verification()
 def verify_certificate_public(certificate_number):
     """
     Verificar un certificado públicamente por su número de folio
     
-    Este endpoint es público para permitir verificación externa.
+    Este endpoint es público para permitir verificación externa. Se sirve
+    desde el caché de verificación (filtro de Bloom + Redis) y con
+    Cache-Control público para que el CDN absorba las consultas repetidas.
     
     Returns:
         Información básica del certificado si existe
     """
-    certificate = ConocerCertificate.query.filter_by(
-        certificate_number=certificate_number
-    ).first()
+    payload, _ = verify_certificate(certificate_number.strip())
     
-    if not certificate:
-        return jsonify({
+    if payload is None:
+        g.verification_miss = True
+        response = jsonify({
             'valid': False,
             'message': 'Certificado no encontrado'
-        }), 404
+        })
+        response.status_code = 404
+        response.headers['Cache-Control'] = VERIFY_NOT_FOUND_CACHE_CONTROL
+        return response
     
     # Retornar solo información pública
-    return jsonify({
-        'valid': True,
-        'certificate_number': certificate.certificate_number,
-        'standard_code': certificate.standard_code,
-        'standard_name': certificate.standard_name,
-        'issue_date': certificate.issue_date.isoformat() if certificate.issue_date else None,
-        'expiration_date': certificate.expiration_date.isoformat() if certificate.expiration_date else None,
-        'is_expired': certificate.is_expired,
-        'status': certificate.status,
-        'evaluation_center_name': certificate.evaluation_center_name,
-        'verification_url': certificate.verification_url
-    })
+    response = jsonify(payload)
+    response.headers['Cache-Control'] = VERIFY_CACHE_CONTROL
+    response.add_etag()
+    return response.make_conditional(request)
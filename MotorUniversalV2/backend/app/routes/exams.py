@@ -14,6 +14,13 @@ from app.models.answer import Answer
 from app.models.exercise import Exercise, ExerciseStep, ExerciseAction
 from app.utils.rate_limit import rate_limit_exams, rate_limit_evaluation, rate_limit_pdf
 from app.utils.cache_utils import invalidate_on_exam_complete
+from app.services.dashboard_read_model import record_result_event
+from app.services.results_analytics_service import record_result as record_result_analytics
+from app.services.export_service import export_format, export_response, ExportError, results_query, result_rows, RESULT_COLUMNS
+from app.services.catalog_search_service import matching_ids
+from app.services.entitlement_service import candidate_scope, can_access_exam, can_submit_exam
+from app.utils.identity import get_current_identity
+from app.utils.pagination import paginate_listing, CursorError
 
 bp = Blueprint('exams', __name__)
 
@@ -24,8 +31,7 @@ def require_permission(permission):
         from functools import wraps
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
+            user = get_current_identity()
             
             if not user or not user.has_permission(permission):
                 return jsonify({'error': 'Permiso denegado'}), 403
@@ -146,23 +152,15 @@ def get_exams():
       200:
         description: Lista de exámenes
     """
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     is_published = request.args.get('is_published', type=bool)
     published_only = request.args.get('published_only', type=bool)
     search = request.args.get('search', '', type=str).strip()
     
     query = Exam.query
     
-    # Filtrar por búsqueda
+    # Filtrar por búsqueda (índice del catálogo en memoria, sin ILIKE sobre description)
     if search:
-        search_filter = f'%{search}%'
-        query = query.filter(
-            db.or_(
-                Exam.name.ilike(search_filter),
-                Exam.description.ilike(search_filter)
-            )
-        )
+        query = query.filter(Exam.id.in_(matching_ids('exam', search)))
     
     # Filtrar por publicado si se especifica
     if is_published is not None:
@@ -172,28 +170,30 @@ def get_exams():
     if published_only:
         query = query.filter_by(is_published=True)
     
-    # Para candidatos, solo mostrar exámenes publicados
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    # Para candidatos, solo mostrar exámenes publicados (y asignados a sus grupos, si tiene)
+    user = get_current_identity()
     if user and user.role in ['alumno', 'candidato']:
         query = query.filter_by(is_published=True)
+        entitlements = candidate_scope(user)
+        if entitlements is not None:
+            query = query.filter(Exam.id.in_(entitlements.exam_ids()))
     
     # Ordenar: publicados primero, luego por fecha de actualización (más recientes primero)
     # Esto asegura que al publicar un examen de la página 2+, aparezca en la primera página
-    pagination = query.order_by(
-        Exam.is_published.desc(),
-        Exam.updated_at.desc()
-    ).paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
-    )
+    # (?cursor= activa la paginación keyset sobre el índice ix_exams_listing)
+    try:
+        exams, meta = paginate_listing(
+            query,
+            [(Exam.is_published, True), (Exam.updated_at, True), (Exam.id, True)],
+            scope='exams',
+            model=Exam
+        )
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'exams': [exam.to_dict() for exam in pagination.items],
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': pagination.page
+        'exams': [exam.to_dict() for exam in exams],
+        **meta
     }), 200
 
 
@@ -549,6 +549,9 @@ def get_exam(exam_id):
     if not exam:
         return jsonify({'error': 'Examen no encontrado'}), 404
     
+    if not can_access_exam(get_current_identity(), exam_id):
+        return jsonify({'error': 'El examen no está asignado a tus grupos o está fuera de su periodo'}), 403
+    
     include_details = request.args.get('include_details', 'false').lower() == 'true'
     
     return jsonify(exam.to_dict(include_details=include_details)), 200
@@ -1226,78 +1229,47 @@ def update_exercise(exercise_id):
 def delete_exercise(exercise_id):
     """
     Eliminar un ejercicio, todos sus pasos, acciones e imágenes del blob storage
+
+    Las imágenes se registran para borrado diferido (blob_tombstones) en la misma
+    transacción; el recolector en segundo plano las elimina en lote.
     """
-    import sys
-    from app.utils.azure_storage import AzureStorageService
+    from app.services.blob_gc_service import enqueue_blob_deletion
     
-    # Forzar flush para que los logs se muestren inmediatamente
-    def log(msg):
-        print(msg, flush=True)
-        sys.stdout.flush()
-    
-    log(f"\n{'='*50}")
-    log(f"=== ELIMINAR EJERCICIO ===")
-    log(f"{'='*50}")
-    log(f"Exercise ID: {exercise_id}")
+    print(f"\n=== ELIMINAR EJERCICIO ===")
+    print(f"Exercise ID: {exercise_id}")
     
     exercise = Exercise.query.get(exercise_id)
     if not exercise:
-        log(f"ERROR: Ejercicio {exercise_id} no encontrado")
+        print(f"ERROR: Ejercicio {exercise_id} no encontrado")
         return jsonify({'error': 'Ejercicio no encontrado'}), 404
     
-    # Obtener todos los pasos para eliminar sus imágenes
-    steps = exercise.steps.all()
-    log(f"📊 Ejercicio tiene {len(steps)} pasos")
-    
-    # Eliminar imágenes de blob storage
-    storage = AzureStorageService()
-    images_deleted = 0
-    images_failed = 0
-    
-    if len(steps) > 0:
-        log(f"\n🗑️  ELIMINANDO IMÁGENES DEL BLOB STORAGE:")
+    try:
+        # Obtener todos los pasos para programar el borrado de sus imágenes
+        steps = exercise.steps.all()
+        step_ids = [step.id for step in steps]
+        total_actions = ExerciseAction.query.filter(ExerciseAction.step_id.in_(step_ids)).count() if step_ids else 0
+        
+        images_scheduled = 0
         for step in steps:
-            if step.image_url:
-                log(f"  → Eliminando imagen del paso {step.step_number}: {step.image_url[:80]}...")
-                try:
-                    if storage.delete_file(step.image_url):
-                        images_deleted += 1
-                        log(f"    ✓ Imagen eliminada exitosamente")
-                    else:
-                        images_failed += 1
-                        log(f"    ✗ No se pudo eliminar imagen")
-                except Exception as e:
-                    images_failed += 1
-                    log(f"    ✗ Error al eliminar imagen: {str(e)}")
-    
-    # Contar acciones antes de eliminar
-    total_actions = sum(step.actions.count() for step in steps)
-    log(f"\n📊 Ejercicio tiene {total_actions} acciones en total")
-    
-    # Eliminar ejercicio (cascade eliminará pasos y acciones automáticamente)
-    log(f"\n🗑️  ELIMINANDO EJERCICIO DE LA BASE DE DATOS...")
-    db.session.delete(exercise)
-    db.session.commit()
+            if step.image_url and enqueue_blob_deletion(step.image_url, reason='exercise_deleted'):
+                images_scheduled += 1
+        
+        # Eliminar ejercicio (cascade eliminará pasos y acciones automáticamente)
+        db.session.delete(exercise)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"ERROR al eliminar ejercicio {exercise_id}: {e}")
+        return jsonify({'error': str(e)}), 500
     
-    log(f"\n{'='*50}")
-    log(f"✅ RESUMEN DE ELIMINACIÓN:")
-    log(f"{'='*50}")
-    log(f"✓ Ejercicio eliminado de la base de datos")
-    log(f"✓ {len(steps)} pasos eliminados (cascade)")
-    log(f"✓ {total_actions} acciones eliminadas (cascade)")
-    log(f"✓ {images_deleted} imágenes eliminadas del blob storage")
-    if images_failed > 0:
-        log(f"✗ {images_failed} imágenes no se pudieron eliminar")
-    log(f"{'='*50}")
-    log(f"=== FIN ELIMINAR EJERCICIO ===")
-    log(f"{'='*50}\n")
+    print(f"✓ Ejercicio eliminado: {len(steps)} pasos, {total_actions} acciones, {images_scheduled} imágenes programadas para borrado")
+    print(f"=== FIN ELIMINAR EJERCICIO ===")
     
     return jsonify({
         'message': 'Ejercicio eliminado exitosamente',
         'steps_deleted': len(steps),
         'actions_deleted': total_actions,
-        'images_deleted': images_deleted,
-        'images_failed': images_failed
+        'images_scheduled': images_scheduled
     }), 200
 
 
@@ -1492,7 +1464,7 @@ def delete_step(step_id):
     """
     Eliminar un paso y su imagen del blob storage
     """
-    from app.utils.azure_storage import AzureStorageService
+    from app.services.blob_gc_service import enqueue_blob_deletion
     
     print(f"\n=== ELIMINAR PASO ===")
     print(f"Step ID: {step_id}")
@@ -1507,18 +1479,10 @@ def delete_step(step_id):
     deleted_step_number = step.step_number
     print(f"Eliminando paso #{deleted_step_number} del ejercicio {exercise_id}")
     
-    # Si tiene imagen, eliminarla del blob storage
+    # Si tiene imagen, programar su borrado del blob storage (se confirma con el commit)
     image_deleted = False
     if step.image_url:
-        try:
-            storage = AzureStorageService()
-            image_deleted = storage.delete_file(step.image_url)
-            if image_deleted:
-                print(f"Imagen eliminada del blob: {step.image_url}")
-            else:
-                print(f"No se pudo eliminar imagen del blob: {step.image_url}")
-        except Exception as e:
-            print(f"Error al eliminar imagen del blob: {str(e)}")
+        image_deleted = enqueue_blob_deletion(step.image_url, reason='step_deleted') is not None
     
     db.session.delete(step)
     db.session.commit()
@@ -1766,6 +1730,80 @@ def options_action_item(action_id):
     return response
 
 
+# ============= EDICIÓN MASIVA DE PASOS Y ACCIONES =============
+
+@bp.route('/exercises/<exercise_id>/bulk', methods=['PATCH'])
+@jwt_required()
+@require_permission('exams:update')
+def bulk_patch_exercise(exercise_id):
+    """
+    Aplicar en una sola transacción cambios a varios pasos y acciones
+    (posición, tamaño, orden, etiqueta) y devolver el estado actualizado
+    ---
+    tags:
+      - Exercises
+    parameters:
+      - name: body
+        in: body
+        schema:
+          type: object
+          properties:
+            steps:
+              type: array
+              items:
+                type: object
+            actions:
+              type: array
+              items:
+                type: object
+    responses:
+      200:
+        description: Ejercicio con pasos y acciones actualizados
+      400:
+        description: Datos inválidos o IDs ajenos al ejercicio
+      404:
+        description: Ejercicio no encontrado
+    """
+    from app.services.exercise_bulk_service import apply_bulk_patch, BulkPatchError
+    
+    exercise = Exercise.query.get(exercise_id)
+    if not exercise:
+        return jsonify({'error': 'Ejercicio no encontrado'}), 404
+    
+    data = request.get_json() or {}
+    
+    try:
+        summary = apply_bulk_patch(
+            exercise_id,
+            ExerciseStep,
+            ExerciseAction,
+            steps=data.get('steps'),
+            actions=data.get('actions')
+        )
+        db.session.commit()
+    except BulkPatchError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    
+    return jsonify({
+        'message': 'Cambios aplicados exitosamente',
+        **summary,
+        'exercise': exercise.to_dict(include_steps=True)
+    }), 200
+
+
+@bp.route('/exercises/<exercise_id>/bulk', methods=['OPTIONS'])
+def options_exercise_bulk(exercise_id):
+    response = jsonify({'status': 'ok'})
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'PATCH,OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = 'Authorization,Content-Type'
+    return response
+
+
 # ============= UPLOAD DE IMAGEN PARA STEP =============
 
 @bp.route('/steps/<step_id>/upload-image', methods=['POST'])
@@ -2495,6 +2533,9 @@ def evaluate_exam(exam_id):
         if not exam:
             return jsonify({'error': 'Examen no encontrado'}), 404
         
+        if not can_submit_exam(get_current_identity(), exam):
+            return jsonify({'error': 'El examen no está asignado a tus grupos o está fuera de su periodo'}), 403
+        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No se proporcionaron datos'}), 400
@@ -2711,6 +2752,9 @@ def save_exam_result(exam_id):
         if not exam:
             return jsonify({'error': 'Examen no encontrado'}), 404
         
+        if not can_submit_exam(get_current_identity(), exam):
+            return jsonify({'error': 'El examen no está asignado a tus grupos o está fuera de su periodo'}), 403
+        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No se proporcionaron datos'}), 400
@@ -2761,10 +2805,13 @@ def save_exam_result(exam_id):
         result.end_date = db.func.now()
         
         db.session.add(result)
+        # Desglose por categoría y acumulados de los grupos del candidato (misma transacción)
+        record_result_analytics(result)
         db.session.commit()
         
         # Invalidar cache del dashboard del usuario para que vea los resultados actualizados
         invalidate_on_exam_complete(str(user_id), exam_id, exam.competency_standard_id)
+        record_result_event(str(user_id), exam_id, exam.competency_standard_id)
         
         print(f"✅ Resultado guardado: id={result.id}, score={score}, percentage={percentage}, aprobado={result_value == 1}")
         print(f"=== FIN GUARDAR RESULTADO ===\n")
@@ -2845,6 +2892,39 @@ def get_my_exam_results(exam_id):
         }), 500
 
 
+@bp.route('/<int:exam_id>/my-results/export', methods=['GET'])
+@jwt_required()
+def export_my_exam_results(exam_id):
+    """
+    Exporta los resultados del usuario actual (mismo historial por ECM que
+    /my-results) con su desglose por categoría y tema. format=csv|xlsx
+    """
+    try:
+        from app.models.result import Result
+        
+        user_id = get_jwt_identity()
+        fmt = export_format(request.args.get('format'))
+        
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'error': 'Examen no encontrado'}), 404
+        
+        criteria = [Result.user_id == str(user_id)]
+        if exam.competency_standard_id:
+            criteria.append(Result.competency_standard_id == exam.competency_standard_id)
+        else:
+            criteria.append(Result.exam_id == exam_id)
+        
+        return export_response(f'mis_resultados_{exam_id}', RESULT_COLUMNS,
+                               result_rows(results_query(*criteria)), fmt, sheet_title='Resultados')
+        
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"ERROR en export_my_exam_results: {str(e)}")
+        return jsonify({'error': 'Error al exportar resultados', 'message': str(e)}), 500
+
+
 @bp.route('/results/<result_id>/upload-report', methods=['POST'])
 @jwt_required()
 def upload_result_report(result_id):
@@ -2892,6 +2972,7 @@ def upload_result_report(result_id):
         # Actualizar el resultado con la URL del reporte
         result.report_url = report_url
         db.session.commit()
+        record_result_event(str(user_id), result.exam_id, result.competency_standard_id)
         
         print(f"✅ Reporte PDF guardado: {report_url}")
         print(f"=== FIN SUBIR REPORTE ===\n")
@@ -3698,6 +3779,7 @@ def request_pdf_generation(result_id):
         if hasattr(result, 'pdf_status'):
             result.pdf_status = 'processing'
             db.session.commit()
+            record_result_event(str(user_id), result.exam_id, result.competency_standard_id)
         
         # Encolar la generación
         queued = queue_pdf_generation(
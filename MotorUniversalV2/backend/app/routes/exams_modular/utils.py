@@ -3,8 +3,7 @@ Utilidades compartidas para el módulo de exámenes
 """
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import get_jwt_identity
-from app.models.user import User
+from app.utils.identity import get_current_identity
 
 
 def require_permission(permission):
@@ -12,8 +11,7 @@ def require_permission(permission):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
+            user = get_current_identity()
             
             if not user or not user.has_permission(permission):
                 return jsonify({'error': 'Permiso denegado'}), 403
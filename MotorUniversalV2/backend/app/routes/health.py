@@ -5,6 +5,7 @@ from flask import Blueprint, jsonify
 from sqlalchemy import text
 from app import db
 from datetime import datetime
+from app.utils.password_hashing import get_hash_pool_stats
 
 bp = Blueprint('health', __name__)
 
@@ -31,6 +32,7 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.utcnow().isoformat(),
         'database': db_status,
+        'password_hashing': get_hash_pool_stats(),
         'version': '2.0.0'
     }), 200
 
@@ -0,0 +1,203 @@
+"""
+Rutas de trabajos en segundo plano
+Consulta de progreso (polling y SSE), cancelación y descarga de resultados
+"""
+from flask import Blueprint, request, jsonify, g, Response, send_file, stream_with_context
+from functools import wraps
+from flask_jwt_extended import jwt_required
+from app import db
+from app.utils.identity import get_current_identity
+from app.models.job import Job, JobArtifact
+import io
+import json
+from datetime import datetime
+import time
+
+bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+# Un stream SSE ocupa un hilo de gunicorn: se cierra a los pocos segundos y el
+# navegador reconecta (campo retry) si el trabajo sigue en curso
+SSE_MAX_SECONDS = 30
+SSE_POLL_SECONDS = 1
+
+
+def job_user_required(f):
+    """Decorador que carga el usuario autenticado (admin, coordinator o editor)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        user = get_current_identity()
+        if not user:
+            return jsonify({'error': 'No autorizado'}), 401
+        if user.role not in ['admin', 'coordinator', 'editor']:
+            return jsonify({'error': 'Acceso denegado'}), 403
+        g.current_user = user
+        return f(*args, **kwargs)
+    return decorated
+
+
+def _get_own_job(job_id):
+    """Trabajo visible para el usuario actual (admin ve todos) o None"""
+    job = Job.query.get(job_id)
+    if not job:
+        return None
+    current_user = g.current_user
+    if current_user.role != 'admin' and job.created_by != current_user.id:
+        return None
+    return job
+
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+@job_user_required
+def list_jobs():
+    """Listar los trabajos del usuario actual (sin el resultado completo)"""
+    try:
+        job_type = request.args.get('type')
+        status = request.args.get('status')
+        limit = min(request.args.get('limit', 20, type=int), 100)
+
+        query = Job.query.filter(Job.created_by == g.current_user.id)
+        if job_type:
+            query = query.filter(Job.job_type == job_type)
+        if status:
+            query = query.filter(Job.status == status)
+
+        jobs = query.order_by(Job.created_at.desc()).limit(limit).all()
+        return jsonify({'jobs': [job.to_dict(include_result=False) for job in jobs]})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<job_id>', methods=['GET'])
+@jwt_required()
+@job_user_required
+def get_job(job_id):
+    """Consultar estado, progreso y resultado de un trabajo"""
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(job.to_dict())
+
+
+@bp.route('/<job_id>/events', methods=['GET'])
+@jwt_required()
+@job_user_required
+def stream_job_events(job_id):
+    """
+    Progreso del trabajo como Server-Sent Events
+
+    Eventos: 'progress' (cada cambio de estado/avance) y 'done' (al terminar,
+    con el trabajo completo). El stream se cierra tras SSE_MAX_SECONDS.
+    """
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+
+    def generate():
+        yield f"retry: {SSE_POLL_SECONDS * 2000}\n\n"
+        last = None
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        while True:
+            db.session.expire_all()
+            current = db.session.get(Job, job_id)
+            # No mantener la transacción abierta entre sondeos
+            db.session.rollback()
+            if current is None:
+                break
+
+            if current.is_finished:
+                yield f"event: done\ndata: {json.dumps(current.to_dict())}\n\n"
+                break
+
+            snapshot = {'status': current.status, 'progress': current.progress or {}}
+            if snapshot != last:
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+                last = snapshot
+
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(SSE_POLL_SECONDS)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@bp.route('/<job_id>/artifacts/<int:artifact_id>', methods=['GET'])
+@jwt_required()
+@job_user_required
+def download_job_artifact(job_id, artifact_id):
+    """
+    Descargar un archivo de resultado del trabajo
+
+    Los archivos sensibles (expires_at, p. ej. credenciales) se entregan una sola
+    vez: se eliminan al descargarlos y responden 410 si ya vencieron.
+    """
+    job = _get_own_job(job_id)
+    if not job:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+
+    artifact = JobArtifact.query.filter_by(
+        id=artifact_id, job_id=job.id, kind=JobArtifact.KIND_OUTPUT
+    ).first()
+    if not artifact:
+        return jsonify({'error': 'Archivo no encontrado o ya descargado'}), 404
+
+    if artifact.expires_at is not None and artifact.expires_at < datetime.utcnow():
+        try:
+            db.session.delete(artifact)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+        return jsonify({'error': 'El archivo venció y ya no está disponible'}), 410
+
+    # Leer antes del DELETE: tras el commit el objeto ya no se puede recargar
+    data, name, content_type = artifact.data, artifact.name, artifact.content_type
+    single_use = artifact.expires_at is not None
+    if single_use:
+        # Descarga única: solo se entrega si este request fue el que lo eliminó
+        try:
+            deleted = JobArtifact.query.filter_by(id=artifact.id).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+        if not deleted:
+            return jsonify({'error': 'Archivo no encontrado o ya descargado'}), 404
+
+    response = send_file(
+        io.BytesIO(data),
+        mimetype=content_type,
+        as_attachment=True,
+        download_name=name
+    )
+    if single_use:
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@bp.route('/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+@job_user_required
+def cancel_job(job_id):
+    """Solicitar la cancelación (se aplica al terminar el bloque en curso)"""
+    try:
+        from app.services.job_service import request_cancel
+
+        job = _get_own_job(job_id)
+        if not job:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+        if job.is_finished:
+            return jsonify({'error': 'El trabajo ya terminó'}), 400
+
+        job = request_cancel(job)
+        return jsonify({
+            'message': 'Cancelación solicitada',
+            'job': job.to_dict(include_result=False)
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -2,6 +2,7 @@
 Rutas para gestión de Partners, Planteles y Grupos
 Solo accesibles por coordinadores y admins
 """
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify, g
 from functools import wraps
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -10,16 +11,30 @@ from app.models import (
     Partner, PartnerStatePresence, Campus, CandidateGroup, GroupMember,
     User, MEXICAN_STATES
 )
+from app.services.stats_snapshot_service import get_stats_snapshot
+from app.utils.identity import get_current_identity
+from app.utils.pagination import paginate_listing, CursorError
+from app.services.user_search_service import apply_user_search
+from app.services.catalog_search_service import matching_ids
+from app.services.partner_hierarchy_service import serialize_partners, serialize_campuses, serialize_groups
+from app.services.results_analytics_service import get_analytics, analytics_rows, ANALYTICS_COLUMNS
+from app.services.export_service import (
+    export_format, export_response, ExportError, member_rows, MEMBER_COLUMNS, results_query, result_rows, RESULT_COLUMNS
+)
 
 bp = Blueprint('partners', __name__, url_prefix='/api/partners')
 
+# Altas masivas mayores a este tamaño se procesan como trabajo en segundo plano
+GROUP_BULK_SYNC_LIMIT = 200
+# Movimientos entre grupos: una transacción por solicitud
+GROUP_MOVE_LIMIT = 1000
+
 
 def coordinator_required(f):
     """Decorador que requiere rol de coordinador o admin"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_identity()
         if not user:
             return jsonify({'error': 'No autorizado'}), 401
         if user.role not in ['admin', 'coordinator']:
@@ -46,8 +61,6 @@ def get_mexican_states():
 def get_partners():
     """Listar todos los partners"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         search = request.args.get('search', '')
         active_only = request.args.get('active_only', 'true').lower() == 'true'
         
@@ -66,17 +79,21 @@ def get_partners():
                 )
             )
         
-        query = query.order_by(Partner.name)
-        
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # (?cursor= activa la paginación keyset sobre ix_partners_listing)
+        partners, meta = paginate_listing(
+            query,
+            [(Partner.name, False), (Partner.id, False)],
+            scope='partners',
+            model=Partner
+        )
         
         return jsonify({
-            'partners': [p.to_dict(include_states=True) for p in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+            'partners': serialize_partners(partners, include_states=True),
+            **meta
         })
         
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -89,7 +106,7 @@ def get_partner(partner_id):
     try:
         partner = Partner.query.get_or_404(partner_id)
         return jsonify({
-            'partner': partner.to_dict(include_states=True, include_campuses=True)
+            'partner': serialize_partners([partner], include_states=True, include_campuses=True)[0]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -301,7 +318,7 @@ def get_campuses(partner_id):
         return jsonify({
             'partner_id': partner_id,
             'partner_name': partner.name,
-            'campuses': [c.to_dict(include_groups=True) for c in campuses],
+            'campuses': serialize_campuses(campuses, include_groups=True),
             'total': len(campuses)
         })
         
@@ -393,7 +410,7 @@ def get_campus(campus_id):
     try:
         campus = Campus.query.get_or_404(campus_id)
         return jsonify({
-            'campus': campus.to_dict(include_groups=True, include_partner=True)
+            'campus': serialize_campuses([campus], include_groups=True, include_partner=True)[0]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -468,7 +485,7 @@ def get_groups(campus_id):
         return jsonify({
             'campus_id': campus_id,
             'campus_name': campus.name,
-            'groups': [g.to_dict(include_members=True) for g in groups],
+            'groups': serialize_groups(groups, include_members=True),
             'total': len(groups)
         })
         
@@ -520,7 +537,7 @@ def get_group(group_id):
     try:
         group = CandidateGroup.query.get_or_404(group_id)
         return jsonify({
-            'group': group.to_dict(include_members=True, include_campus=True)
+            'group': serialize_groups([group], include_members=True, include_campus=True)[0]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -600,6 +617,32 @@ def get_group_members(group_id):
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/groups/<int:group_id>/members/export', methods=['GET'])
+@jwt_required()
+@coordinator_required
+def export_group_members(group_id):
+    """
+    Exportar miembros de un grupo (CSV o Excel en streaming)
+
+    Query params: status (mismo filtro que el listado), format (csv/xlsx)
+    """
+    try:
+        group = CandidateGroup.query.get_or_404(group_id)
+        fmt = export_format(request.args.get('format'))
+
+        query = GroupMember.query.filter_by(group_id=group_id)
+        status_filter = request.args.get('status')
+        if status_filter:
+            query = query.filter(GroupMember.status == status_filter)
+
+        return export_response(f'miembros_grupo_{group.id}', MEMBER_COLUMNS, member_rows(query), fmt,
+                               sheet_title='Miembros')
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/groups/<int:group_id>/members', methods=['POST'])
 @jwt_required()
 @coordinator_required
@@ -651,11 +694,48 @@ def add_group_member(group_id):
         return jsonify({'error': str(e)}), 500
 
 
+def _add_members_sync_or_job(group, user_ids, initial_errors=None):
+    """
+    Alta masiva en el request (201) o como trabajo 'group_members_bulk' (202)
+    según GROUP_BULK_SYNC_LIMIT
+    """
+    from app.services.group_member_service import add_members_bulk
+    from app.services.job_service import enqueue_job
+    
+    if len(user_ids) > GROUP_BULK_SYNC_LIMIT:
+        job = enqueue_job(
+            'group_members_bulk',
+            payload={'group_id': group.id, 'user_ids': user_ids, 'initial_errors': initial_errors or []},
+            created_by=g.current_user.id,
+            progress={'processed': 0, 'total': len(user_ids), 'added': 0, 'errors': len(initial_errors or [])}
+        )
+        return jsonify({
+            'message': 'Alta masiva en proceso',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}"
+        }), 202
+    
+    results = add_members_bulk(group, user_ids, initial_errors=initial_errors)
+    
+    return jsonify({
+        'message': f'{len(results["added"])} miembros agregados',
+        'added': results['added'],
+        'errors': results['errors']
+    }), 201
+
+
 @bp.route('/groups/<int:group_id>/members/bulk', methods=['POST'])
 @jwt_required()
 @coordinator_required
 def add_group_members_bulk(group_id):
-    """Agregar múltiples candidatos al grupo"""
+    """
+    Agregar múltiples candidatos al grupo
+    
+    Hasta GROUP_BULK_SYNC_LIMIT usuarios se procesan en el request (201). Listas
+    mayores se encolan como trabajo 'group_members_bulk' y se responde 202 con
+    el job_id (progreso y resultado en /api/jobs/<job_id>).
+    """
     try:
         group = CandidateGroup.query.get_or_404(group_id)
         data = request.get_json()
@@ -664,47 +744,89 @@ def add_group_members_bulk(group_id):
         if not user_ids:
             return jsonify({'error': 'Se requiere al menos un ID de usuario'}), 400
         
-        added = []
-        errors = []
+        return _add_members_sync_or_job(group, user_ids)
         
-        current_count = GroupMember.query.filter_by(group_id=group_id).count()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/groups/<int:group_id>/members/roster', methods=['POST'])
+@jwt_required()
+@coordinator_required
+def add_group_members_roster(group_id):
+    """
+    Agregar candidatos al grupo desde una lista CSV o Excel
+    
+    El archivo (campo 'file') debe tener encabezado con columna 'curp' o 'email'.
+    Las filas sin usuario se reportan en errors con su número de fila; el resto
+    sigue el mismo flujo que /members/bulk (201 o 202 con job_id).
+    """
+    try:
+        from app.services.group_member_service import parse_roster, resolve_roster, RosterError
         
-        for user_id in user_ids:
-            # Verificar capacidad
-            if current_count >= group.max_members:
-                errors.append({'user_id': user_id, 'error': 'Capacidad máxima alcanzada'})
-                continue
-            
-            user = User.query.get(user_id)
-            if not user:
-                errors.append({'user_id': user_id, 'error': 'Usuario no encontrado'})
-                continue
-                
-            if user.role != 'candidato':
-                errors.append({'user_id': user_id, 'error': 'No es candidato'})
-                continue
-            
-            existing = GroupMember.query.filter_by(group_id=group_id, user_id=user_id).first()
-            if existing:
-                errors.append({'user_id': user_id, 'error': 'Ya es miembro'})
-                continue
-            
-            member = GroupMember(
-                group_id=group_id,
-                user_id=user_id,
-                status='active'
-            )
-            db.session.add(member)
-            added.append(user_id)
-            current_count += 1
+        group = CandidateGroup.query.get_or_404(group_id)
         
-        db.session.commit()
+        if 'file' not in request.files:
+            return jsonify({'error': 'No se envió ningún archivo'}), 400
+        file = request.files['file']
+        if not file.filename:
+            return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
+        
+        try:
+            entries = parse_roster(file.filename, file.read())
+        except RosterError as e:
+            return jsonify({'error': str(e)}), 400
+        if not entries:
+            return jsonify({'error': 'La lista no tiene filas con CURP o email'}), 400
+        
+        user_ids, errors = resolve_roster(entries)
+        if not user_ids:
+            return jsonify({
+                'message': '0 miembros agregados',
+                'added': [],
+                'errors': errors
+            }), 200
+        
+        return _add_members_sync_or_job(group, user_ids, initial_errors=errors)
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/groups/<int:group_id>/members/move', methods=['POST'])
+@jwt_required()
+@coordinator_required
+def move_group_members(group_id):
+    """
+    Mover candidatos de otro grupo a este grupo (una sola transacción)
+    
+    Body: {'source_group_id': int, 'user_ids': [...]} (hasta GROUP_MOVE_LIMIT)
+    """
+    try:
+        from app.services.group_member_service import move_members
+        
+        group = CandidateGroup.query.get_or_404(group_id)
+        data = request.get_json() or {}
+        
+        source_group_id = data.get('source_group_id')
+        user_ids = data.get('user_ids', [])
+        if not source_group_id or not user_ids:
+            return jsonify({'error': 'Se requieren source_group_id y user_ids'}), 400
+        if source_group_id == group_id:
+            return jsonify({'error': 'El grupo origen y el destino son el mismo'}), 400
+        if len(user_ids) > GROUP_MOVE_LIMIT:
+            return jsonify({'error': f'Se pueden mover hasta {GROUP_MOVE_LIMIT} candidatos por solicitud'}), 400
+        
+        source_group = CandidateGroup.query.get_or_404(source_group_id)
+        results = move_members(source_group, group, user_ids)
         
         return jsonify({
-            'message': f'{len(added)} miembros agregados',
-            'added': added,
-            'errors': errors
-        }), 201
+            'message': f'{len(results["moved"])} miembros movidos',
+            'moved': results['moved'],
+            'errors': results['errors']
+        })
         
     except Exception as e:
         db.session.rollback()
@@ -768,8 +890,6 @@ def search_candidates():
     try:
         search = request.args.get('search', '')
         exclude_group_id = request.args.get('exclude_group_id', type=int)
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         
         query = User.query.filter(
             User.role == 'candidato',
@@ -777,16 +897,8 @@ def search_candidates():
         )
         
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    User.name.ilike(search_term),
-                    User.first_surname.ilike(search_term),
-                    User.second_surname.ilike(search_term),
-                    User.email.ilike(search_term),
-                    User.curp.ilike(search_term)
-                )
-            )
+            # Índice de tokens (user_search_tokens) ordenado por relevancia
+            query = apply_user_search(query, search)
         
         # Excluir candidatos que ya están en un grupo específico
         if exclude_group_id:
@@ -795,12 +907,17 @@ def search_candidates():
             ).subquery()
             query = query.filter(~User.id.in_(existing_members))
         
-        query = query.order_by(User.first_surname, User.name)
-        
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # (?cursor= activa la paginación keyset sobre ix_users_candidate_search)
+        users, meta = paginate_listing(
+            query,
+            [(User.first_surname, False), (User.name, False), (User.id, False)],
+            scope='candidates',
+            model=User,
+            allow_cursor=not search
+        )
         
         candidates = []
-        for user in pagination.items:
+        for user in users:
             candidates.append({
                 'id': user.id,
                 'email': user.email,
@@ -814,11 +931,11 @@ def search_candidates():
         
         return jsonify({
             'candidates': candidates,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+            **meta
         })
         
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -831,10 +948,8 @@ def search_candidates():
 def get_dashboard():
     """Obtener estadísticas generales para coordinador"""
     try:
-        total_partners = Partner.query.filter_by(is_active=True).count()
-        total_campuses = Campus.query.filter_by(is_active=True).count()
-        total_groups = CandidateGroup.query.filter_by(is_active=True).count()
-        total_members = GroupMember.query.filter_by(status='active').count()
+        # Contadores desde el snapshot de estadísticas (una sola consulta, en caché)
+        counters = get_stats_snapshot()['partners']
         
         # Partners por estado
         partners_by_state = db.session.query(
@@ -851,22 +966,134 @@ def get_dashboard():
         
         return jsonify({
             'stats': {
-                'total_partners': total_partners,
-                'total_campuses': total_campuses,
-                'total_groups': total_groups,
-                'total_members': total_members
+                'total_partners': counters['partners'],
+                'total_campuses': counters['campuses'],
+                'total_groups': counters['groups'],
+                'total_members': counters['members']
             },
             'partners_by_state': [
                 {'state': state, 'count': count} 
                 for state, count in partners_by_state
             ],
-            'recent_groups': [g.to_dict(include_campus=True) for g in recent_groups]
+            'recent_groups': serialize_groups(recent_groups, include_campus=True)
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# ============== ANALÍTICA DE RESULTADOS ==============
+
+def _analytics_response(scope, scope_id, export):
+    """
+    Tablero (JSON) o exportación (CSV en streaming) de resultados del alcance
+
+    Query params:
+        - from, to: Rango de días YYYY-MM-DD (inclusive)
+        - exam_id: Filtrar por examen
+        - format: csv (default) o xlsx, solo en /export
+    """
+    try:
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else None
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'Las fechas deben tener formato YYYY-MM-DD'}), 400
+    exam_id = request.args.get('exam_id', type=int)
+
+    if export:
+        try:
+            fmt = export_format(request.args.get('format'))
+        except ExportError as e:
+            return jsonify({'error': str(e)}), 400
+        return export_response(
+            f'resultados_{scope}_{scope_id}', ANALYTICS_COLUMNS,
+            analytics_rows(scope, scope_id, date_from, date_to, exam_id), fmt, sheet_title='Resultados'
+        )
+    return jsonify(get_analytics(scope, scope_id, date_from, date_to, exam_id))
+
+
+@bp.route('/groups/<int:group_id>/analytics', methods=['GET'])
+@bp.route('/groups/<int:group_id>/analytics/export', methods=['GET'], endpoint='export_group_analytics')
+@jwt_required()
+@coordinator_required
+def get_group_analytics(group_id):
+    """Tasa de aprobación, promedios y debilidades por categoría de un grupo"""
+    try:
+        CandidateGroup.query.get_or_404(group_id)
+        return _analytics_response('group', group_id, request.path.endswith('/export'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/campuses/<int:campus_id>/analytics', methods=['GET'])
+@bp.route('/campuses/<int:campus_id>/analytics/export', methods=['GET'], endpoint='export_campus_analytics')
+@jwt_required()
+@coordinator_required
+def get_campus_analytics(campus_id):
+    """Analítica de resultados de todos los grupos de un plantel"""
+    try:
+        Campus.query.get_or_404(campus_id)
+        return _analytics_response('campus', campus_id, request.path.endswith('/export'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/<int:partner_id>/analytics', methods=['GET'])
+@bp.route('/<int:partner_id>/analytics/export', methods=['GET'], endpoint='export_partner_analytics')
+@jwt_required()
+@coordinator_required
+def get_partner_analytics(partner_id):
+    """Analítica de resultados de todos los grupos de un partner"""
+    try:
+        Partner.query.get_or_404(partner_id)
+        return _analytics_response('partner', partner_id, request.path.endswith('/export'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/groups/<int:group_id>/results/export', methods=['GET'])
+@jwt_required()
+@coordinator_required
+def export_group_results(group_id):
+    """
+    Exportar los resultados de los miembros de un grupo con su desglose por
+    categoría y tema (una fila por resultado, categoría y tema)
+
+    Query params:
+        - from, to: Rango de fechas YYYY-MM-DD (fecha del resultado, inclusive)
+        - exam_id: Filtrar por examen
+        - status: 0=en proceso, 1=completado, 2=abandonado
+        - format: csv (default) o xlsx
+    """
+    try:
+        from app.models.result import Result
+
+        group = CandidateGroup.query.get_or_404(group_id)
+        fmt = export_format(request.args.get('format'))
+
+        criteria = [Result.user_id.in_(db.select(GroupMember.user_id).where(GroupMember.group_id == group_id))]
+        try:
+            if request.args.get('from'):
+                criteria.append(Result.created_at >= datetime.strptime(request.args['from'], '%Y-%m-%d'))
+            if request.args.get('to'):
+                criteria.append(Result.created_at < datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1))
+        except ValueError:
+            return jsonify({'error': 'Las fechas deben tener formato YYYY-MM-DD'}), 400
+        exam_id = request.args.get('exam_id', type=int)
+        if exam_id:
+            criteria.append(Result.exam_id == exam_id)
+        status = request.args.get('status', type=int)
+        if status is not None:
+            criteria.append(Result.status == status)
+
+        return export_response(f'resultados_grupo_{group.id}', RESULT_COLUMNS,
+                               result_rows(results_query(*criteria)), fmt, sheet_title='Resultados')
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ============== ASOCIACIÓN USUARIO-PARTNER ==============
 
 @bp.route('/<int:partner_id>/users', methods=['GET'])
@@ -884,14 +1111,7 @@ def get_partner_users(partner_id):
         query = partner.users
         
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    User.name.ilike(search_term),
-                    User.email.ilike(search_term),
-                    User.curp.ilike(search_term)
-                )
-            )
+            query = apply_user_search(query, search)
         
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
@@ -971,28 +1191,33 @@ def get_user_partners(user_id):
         user = User.query.get_or_404(user_id)
         current_user = g.current_user
         
-        partners_data = []
-        for partner in user.partners.all():
-            # Si el coordinador no es admin, solo puede ver sus propios partners
-            # (esto requeriría una relación coordinator-partner, por ahora todos los coordinadores ven todos)
-            partner_dict = partner.to_dict(include_states=True, include_campuses=True)
-            # Obtener grupos del usuario en este partner
-            user_groups = []
-            for campus in partner.campuses.all():
-                for group in campus.groups.all():
-                    membership = GroupMember.query.filter_by(
-                        group_id=group.id,
-                        user_id=user_id
-                    ).first()
-                    if membership:
-                        user_groups.append({
-                            'group': group.to_dict(),
-                            'campus': campus.to_dict(),
-                            'membership_status': membership.status,
-                            'joined_at': membership.joined_at.isoformat() if membership.joined_at else None
-                        })
-            partner_dict['user_groups'] = user_groups
-            partners_data.append(partner_dict)
+        partners = user.partners.all()
+        partners_data = serialize_partners(partners, include_states=True, include_campuses=True)
+
+        # Membresías del usuario en los grupos de estos partners (una consulta)
+        memberships = {}
+        if partners:
+            rows = db.session.query(GroupMember, CandidateGroup, Campus).join(
+                CandidateGroup, CandidateGroup.id == GroupMember.group_id
+            ).join(
+                Campus, Campus.id == CandidateGroup.campus_id
+            ).filter(
+                GroupMember.user_id == user_id,
+                Campus.partner_id.in_([p.id for p in partners])
+            ).order_by(Campus.id, CandidateGroup.id).all()
+            groups = serialize_groups([group for _, group, _ in rows])
+            campuses = {c['id']: c for c in serialize_campuses({campus for _, _, campus in rows})}
+            for (membership, _, campus), group_dict in zip(rows, groups):
+                memberships.setdefault(campus.partner_id, []).append({
+                    'group': group_dict,
+                    'campus': campuses[campus.id],
+                    'membership_status': membership.status,
+                    'joined_at': membership.joined_at.isoformat() if membership.joined_at else None
+                })
+
+        # Sin relación coordinador-partner, por ahora todos los coordinadores ven todos
+        for partner_dict in partners_data:
+            partner_dict['user_groups'] = memberships.get(partner_dict['id'], [])
         
         return jsonify({
             'user_id': user_id,
@@ -1092,6 +1317,29 @@ def get_my_partners():
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/my-study-materials', methods=['GET'])
+@jwt_required()
+def get_my_study_materials():
+    """
+    Materiales de estudio asignados al candidato actual por sus grupos
+    
+    Une los materiales efectivos (con personalizaciones) de los exámenes activos
+    y vigentes de sus grupos; cada material indica qué exámenes lo asignan.
+    """
+    try:
+        from app.services.group_exam_material_service import get_candidate_study_materials
+        
+        materials = get_candidate_study_materials(get_jwt_identity())
+        
+        return jsonify({
+            'materials': materials,
+            'total': len(materials)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/available', methods=['GET'])
 @jwt_required()
 def get_available_partners():
@@ -1214,13 +1462,23 @@ def get_group_exams(group_id):
         from app.models import GroupExam, Exam
         from app.models.study_content import StudyMaterial
         
+        from app.services.group_exam_material_service import resolve_group_exam_materials
+        from sqlalchemy.orm import joinedload
+        
         group = CandidateGroup.query.get_or_404(group_id)
         
-        group_exams = GroupExam.query.filter_by(group_id=group_id, is_active=True).all()
+        group_exams = GroupExam.query.options(joinedload(GroupExam.exam)).filter_by(
+            group_id=group_id, is_active=True
+        ).all()
+        
+        # Materiales de todos los grupo-exámenes en bloque (caché por versión de personalización)
+        materials = resolve_group_exam_materials([ge for ge in group_exams if ge.exam])
         
         exams_data = []
         for ge in group_exams:
-            exam_data = ge.to_dict(include_exam=True, include_materials=True)
+            exam_data = ge.to_dict(include_exam=True)
+            if ge.exam:
+                exam_data.update(materials[ge.id])
             exams_data.append(exam_data)
         
         return jsonify({
@@ -1339,29 +1597,33 @@ def get_available_exams():
         from app.models.study_content import StudyMaterial
         
         search = request.args.get('search', '')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         
         query = Exam.query.filter(Exam.is_published == True)
         
         if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    Exam.name.ilike(search_term),
-                    Exam.standard.ilike(search_term),
-                    Exam.description.ilike(search_term)
-                )
-            )
+            query = query.filter(Exam.id.in_(matching_ids('exam', search, published_only=True)))
+        
+        # (?cursor= activa la paginación keyset sobre ix_exams_published_name)
+        exams, meta = paginate_listing(
+            query,
+            [(Exam.name, False), (Exam.id, False)],
+            scope='available-exams',
+            model=Exam
+        )
         
-        query = query.order_by(Exam.name)
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        # Materiales publicados por examen de la página (una consulta agrupada)
+        exam_ids = [exam.id for exam in exams]
+        materials_counts = {}
+        if exam_ids:
+            materials_counts = dict(db.session.query(
+                StudyMaterial.exam_id, db.func.count(StudyMaterial.id)
+            ).filter(
+                StudyMaterial.exam_id.in_(exam_ids),
+                StudyMaterial.is_published == True
+            ).group_by(StudyMaterial.exam_id).all())
         
         exams_data = []
-        for exam in pagination.items:
-            # Contar materiales de estudio asociados
-            materials_count = StudyMaterial.query.filter_by(exam_id=exam.id, is_published=True).count()
-            
+        for exam in exams:
             exams_data.append({
                 'id': exam.id,
                 'name': exam.name,
@@ -1371,16 +1633,16 @@ def get_available_exams():
                 'duration_minutes': exam.duration_minutes,
                 'passing_score': exam.passing_score,
                 'is_published': exam.is_published,
-                'study_materials_count': materials_count
+                'study_materials_count': materials_counts.get(exam.id, 0)
             })
         
         return jsonify({
             'exams': exams_data,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+            **meta
         })
         
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1393,68 +1655,41 @@ def get_available_exams():
 def get_group_exam_materials(group_exam_id):
     """Obtener materiales disponibles y seleccionados para un grupo-examen"""
     try:
-        from app.models import GroupExam, GroupExamMaterial
+        from app.models import GroupExam
         from app.models.study_content import StudyMaterial
-        from sqlalchemy import text
+        from app.services.group_exam_material_service import get_customizations, get_linked_material_ids
         
         group_exam = GroupExam.query.get_or_404(group_exam_id)
         
-        # Obtener materiales vinculados al examen (desde study_material_exams)
-        linked_material_ids = []
-        try:
-            result = db.session.execute(text('''
-                SELECT study_material_id FROM study_material_exams 
-                WHERE exam_id = :exam_id
-            '''), {'exam_id': group_exam.exam_id})
-            linked_material_ids = [r[0] for r in result.fetchall()]
-        except Exception:
-            pass
-        
-        # Obtener materiales personalizados para este group_exam
-        custom_materials = GroupExamMaterial.query.filter_by(group_exam_id=group_exam_id).all()
-        custom_dict = {cm.study_material_id: cm.is_included for cm in custom_materials}
-        
-        # Obtener todos los materiales publicados para selección adicional
-        all_published = StudyMaterial.query.filter_by(is_published=True).all()
+        # Materiales vinculados al examen (study_material_exams) y personalizaciones
+        linked_material_ids = get_linked_material_ids([group_exam.exam_id]).get(group_exam.exam_id, [])
+        custom_dict = get_customizations([group_exam_id]).get(group_exam_id, {})
         
-        # Construir respuesta
-        materials_data = []
+        # Todos los materiales publicados (los vinculados se muestran primero)
+        all_published = StudyMaterial.query.filter_by(is_published=True).all()
         
-        # Primero los materiales vinculados al examen (solo mostrar publicados en esta sección)
-        for mat in StudyMaterial.query.filter(StudyMaterial.id.in_(linked_material_ids), StudyMaterial.is_published == True).all():
-            # Por defecto incluido SOLO si está vinculado Y publicado
-            is_included = custom_dict.get(mat.id, True)
-            materials_data.append({
+        linked_set = set(linked_material_ids)
+        linked_data, other_data = [], []
+        for mat in all_published:
+            is_linked = mat.id in linked_set
+            # Por defecto incluido SOLO si está vinculado y publicado
+            (linked_data if is_linked else other_data).append({
                 'id': mat.id,
                 'title': mat.title,
                 'description': mat.description,
                 'cover_image_url': mat.image_url,
                 'is_published': mat.is_published,
-                'is_linked': True,  # Vinculado directamente al examen
-                'is_included': is_included,
+                'is_linked': is_linked,
+                'is_included': custom_dict.get(mat.id, is_linked),
             })
-        
-        # Luego los materiales publicados que no están vinculados
-        linked_set = set(linked_material_ids)
-        for mat in all_published:
-            if mat.id not in linked_set:
-                is_included = custom_dict.get(mat.id, False)  # Por defecto no incluido
-                materials_data.append({
-                    'id': mat.id,
-                    'title': mat.title,
-                    'description': mat.description,
-                    'cover_image_url': mat.image_url,
-                    'is_published': mat.is_published,
-                    'is_linked': False,  # No vinculado directamente
-                    'is_included': is_included,
-                })
+        materials_data = linked_data + other_data
         
         return jsonify({
             'group_exam_id': group_exam_id,
             'exam_id': group_exam.exam_id,
             'exam_name': group_exam.exam.name if group_exam.exam else None,
             'materials': materials_data,
-            'has_customizations': len(custom_materials) > 0
+            'has_customizations': len(custom_dict) > 0
         })
         
     except Exception as e:
@@ -1468,6 +1703,8 @@ def update_group_exam_materials(group_exam_id):
     """Actualizar materiales seleccionados para un grupo-examen"""
     try:
         from app.models import GroupExam, GroupExamMaterial
+        from app.services.group_exam_material_service import invalidate_group_exam_materials
+        from app.services.entitlement_service import mark_entitlements_changed
         
         group_exam = GroupExam.query.get_or_404(group_exam_id)
         data = request.get_json()
@@ -1477,6 +1714,8 @@ def update_group_exam_materials(group_exam_id):
         
         # Eliminar configuraciones anteriores
         GroupExamMaterial.query.filter_by(group_exam_id=group_exam_id).delete()
+        # Los miembros del grupo ven otro conjunto de materiales
+        mark_entitlements_changed(group_ids=[group_exam.group_id])
         
         # Crear nuevas configuraciones
         for mat_config in materials_config:
@@ -1492,6 +1731,7 @@ def update_group_exam_materials(group_exam_id):
                 db.session.add(gem)
         
         db.session.commit()
+        invalidate_group_exam_materials(group_exam_id)
         
         return jsonify({
             'message': 'Materiales actualizados exitosamente',
@@ -1510,12 +1750,17 @@ def reset_group_exam_materials(group_exam_id):
     """Resetear materiales a los vinculados por defecto del examen"""
     try:
         from app.models import GroupExam, GroupExamMaterial
+        from app.services.group_exam_material_service import invalidate_group_exam_materials
+        from app.services.entitlement_service import mark_entitlements_changed
         
         group_exam = GroupExam.query.get_or_404(group_exam_id)
         
         # Eliminar todas las personalizaciones
         GroupExamMaterial.query.filter_by(group_exam_id=group_exam_id).delete()
+        # Los miembros del grupo ven otro conjunto de materiales
+        mark_entitlements_changed(group_ids=[group_exam.group_id])
         db.session.commit()
+        invalidate_group_exam_materials(group_exam_id)
         
         return jsonify({
             'message': 'Materiales reseteados a valores por defecto',
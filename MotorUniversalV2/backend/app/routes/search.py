@@ -0,0 +1,63 @@
+"""
+Rutas de búsqueda unificada del catálogo
+Exámenes, materiales de estudio y estándares ECM con facetas
+"""
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from app.utils.identity import get_current_identity
+from app.services.catalog_search_service import search_catalog, DOC_TYPES
+
+bp = Blueprint('search', __name__, url_prefix='/api/search')
+
+
+@bp.route('', methods=['GET'])
+@jwt_required()
+def search():
+    """
+    Buscar en el catálogo
+
+    Query params:
+        - q: Texto a buscar (tolera un error de tipeo por palabra)
+        - type: exam, material, standard (separados por coma; default: todos)
+        - is_published: true/false
+        - ecm: Código ECM (ej: EC0217)
+        - page, per_page
+
+    Respuesta: results, total, pages, current_page, facets (type, is_published, ecm)
+    y corrections ({término: token usado} cuando se aplicó tolerancia a errores).
+    """
+    try:
+        user = get_current_identity()
+        if not user:
+            return jsonify({'error': 'No autorizado'}), 401
+
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'El parámetro q es requerido'}), 400
+
+        types = [t.strip() for t in request.args.get('type', '').split(',') if t.strip()]
+        invalid = [t for t in types if t not in DOC_TYPES]
+        if invalid:
+            return jsonify({'error': f"Tipo inválido: {', '.join(invalid)}"}), 400
+
+        is_published = request.args.get('is_published')
+        if is_published is not None:
+            is_published = is_published.lower() == 'true'
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+
+        result = search_catalog(
+            q,
+            types=types or None,
+            # Candidatos: solo exámenes y materiales publicados y ECM activos
+            published_only=user.role in ['alumno', 'candidato'],
+            is_published=is_published,
+            ecm=request.args.get('ecm'),
+            page=page,
+            per_page=per_page
+        )
+        return jsonify({'query': q, **result})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
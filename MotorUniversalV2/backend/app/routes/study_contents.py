@@ -9,7 +9,6 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import text
 from app import db
-from app.models.user import User
 from app.models.study_content import (
     StudyMaterial,
     StudySession,
@@ -24,9 +23,18 @@ from app.models.study_content import (
 )
 from app.models.exam import Exam
 from app.models.student_progress import StudentContentProgress, StudentTopicProgress
-from app.utils.azure_storage import azure_storage
+from app.utils.azure_storage import azure_storage, SAS_MIN_REMAINING_HOURS
+from app.utils.sas_cache import get_signed_video_url, attach_signed_video_urls
 from app.utils.rate_limit import rate_limit_study_contents, rate_limit_upload
 from app.utils.cache_utils import invalidate_on_progress_update
+from app.services.study_material_service import get_material_summaries, serialize_materials
+from app.services.reading_service import prepare_reading, accepts_gzip, render_reading_html, compute_etag, compress_gzip
+from app.services.blob_gc_service import enqueue_blob_deletion
+from app.services.dashboard_read_model import record_progress_event
+from app.services.catalog_search_service import matching_ids
+from app.services.entitlement_service import candidate_scope, can_access_material
+from app.utils.identity import get_current_identity
+from app.utils.pagination import paginate_listing, CursorError
 
 study_contents_bp = Blueprint('study_contents', __name__)
 
@@ -35,8 +43,7 @@ def admin_or_editor_required(fn):
     """Decorador para verificar que el usuario sea admin o editor"""
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_identity()
         
         if not user or user.role not in ['admin', 'editor']:
             return jsonify({'error': 'Permiso denegado'}), 403
@@ -45,10 +52,24 @@ def admin_or_editor_required(fn):
     return wrapper
 
 
+def _enqueue_topic_blobs(topic, reason):
+    """
+    Programar el borrado diferido de los archivos de un tema (video, descargable,
+    imágenes del ejercicio interactivo). No hace commit: se confirma con el borrado.
+    """
+    if topic.video and topic.video.video_url:
+        enqueue_blob_deletion(topic.video.video_url, reason=reason)
+    if topic.downloadable_exercise and topic.downloadable_exercise.file_url:
+        enqueue_blob_deletion(topic.downloadable_exercise.file_url, reason=reason)
+    if topic.interactive_exercise:
+        for step in topic.interactive_exercise.steps.all():
+            if step.image_url:
+                enqueue_blob_deletion(step.image_url, reason=reason)
+
+
 def get_current_user():
-    """Obtener el usuario actual"""
-    user_id = get_jwt_identity()
-    return User.query.get(user_id)
+    """Obtener el usuario actual (identidad del token, sin consultar la BD)"""
+    return get_current_identity()
 
 
 def ensure_study_material_exams_table():
@@ -119,7 +140,8 @@ def list_materials_public():
     """Listar todos los materiales - endpoint público de diagnóstico"""
     try:
         materials = StudyMaterial.query.all()
-        return jsonify([{'id': m.id, 'title': m.title, 'exam_ids': m.to_dict().get('exam_ids', [])} for m in materials]), 200
+        summaries = get_material_summaries(m.id for m in materials)
+        return jsonify([{'id': m.id, 'title': m.title, 'exam_ids': summaries.get(m.id, {}).get('exam_ids', [])} for m in materials]), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -280,43 +302,45 @@ def fix_sessions_fk():
 def get_materials():
     """Obtener todos los materiales de estudio"""
     try:
-        from app.models.user import User
-        
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         search = request.args.get('search', '')
         published_only = request.args.get('published_only', type=bool)
         
         query = StudyMaterial.query
         
         if search:
-            query = query.filter(StudyMaterial.title.ilike(f'%{search}%'))
+            query = query.filter(StudyMaterial.id.in_(matching_ids('material', search)))
         
         # Filtrar solo publicados si se solicita explícitamente
         if published_only:
             query = query.filter_by(is_published=True)
         
-        # Para candidatos, solo mostrar materiales publicados
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        # Para candidatos, solo mostrar materiales publicados (y asignados a sus grupos, si tiene)
+        user = get_current_identity()
         if user and user.role in ['alumno', 'candidato']:
             query = query.filter_by(is_published=True)
+            entitlements = candidate_scope(user)
+            if entitlements is not None:
+                query = query.filter(StudyMaterial.id.in_(entitlements.material_ids()))
         
         # Ordenar: publicados primero, luego por fecha de actualización (más recientes primero)
         # Esto asegura que al publicar un material de la página 2+, aparezca en la primera página
-        query = query.order_by(
-            StudyMaterial.is_published.desc(),
-            StudyMaterial.updated_at.desc()
+        # (?cursor= activa la paginación keyset sobre el índice ix_study_contents_listing)
+        materials, meta = paginate_listing(
+            query,
+            [(StudyMaterial.is_published, True), (StudyMaterial.updated_at, True), (StudyMaterial.id, True)],
+            scope='materials',
+            default_per_page=10,
+            model=StudyMaterial
         )
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
+        # Agregados de sesiones/temas/exámenes en bloque (evita N+1 por material)
         return jsonify({
-            'materials': [m.to_dict() for m in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+            'materials': serialize_materials(materials),
+            **meta
         }), 200
         
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -327,7 +351,14 @@ def get_material(material_id):
     """Obtener un material de estudio por ID"""
     try:
         material = StudyMaterial.query.get_or_404(material_id)
-        return jsonify(material.to_dict(include_sessions=True)), 200
+        if not can_access_material(get_current_identity(), material_id):
+            return jsonify({'error': 'El material no está asignado a tus grupos o está fuera de su periodo'}), 403
+        # ?reading_content=false devuelve solo el índice; las lecturas se piden por content_url
+        include_reading_content = request.args.get('reading_content', 'true').lower() != 'false'
+        data = material.to_dict(include_sessions=True, include_reading_content=include_reading_content)
+        # Firmar en lote los videos del material para reproducirlos sin pedir URL por video
+        attach_signed_video_urls(data)
+        return jsonify(data), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -416,7 +447,10 @@ def clone_material(material_id):
                         topic_id=new_topic.id,
                         title=original_topic.reading.title,
                         content=original_topic.reading.content,
-                        estimated_time_minutes=original_topic.reading.estimated_time_minutes
+                        estimated_time_minutes=original_topic.reading.estimated_time_minutes,
+                        content_rendered=original_topic.reading.content_rendered,
+                        content_etag=original_topic.reading.content_etag,
+                        content_gzip=original_topic.reading.content_gzip
                     )
                     db.session.add(new_reading)
                 
@@ -612,28 +646,12 @@ def delete_material(material_id):
     try:
         material = StudyMaterial.query.get_or_404(material_id)
         
-        # Eliminar archivos de Azure Storage antes de borrar el material
+        # Programar borrado de archivos de Azure Storage en la misma transacción
         for session in material.sessions:
             for topic in session.topics:
-                # Eliminar archivo de video si existe
-                if topic.video and topic.video.video_url and 'blob.core.windows.net' in topic.video.video_url:
-                    try:
-                        azure_storage.delete_video(topic.video.video_url)
-                    except Exception as e:
-                        print(f"Error eliminando video {topic.video.video_url}: {e}")
-                # Eliminar archivo descargable si existe
-                if topic.downloadable_exercise and topic.downloadable_exercise.file_url and 'blob.core.windows.net' in topic.downloadable_exercise.file_url:
-                    try:
-                        azure_storage.delete_downloadable(topic.downloadable_exercise.file_url)
-                    except Exception as e:
-                        print(f"Error eliminando descargable {topic.downloadable_exercise.file_url}: {e}")
-        
-        # Eliminar imagen de portada si existe
-        if material.image_url and 'blob.core.windows.net' in material.image_url:
-            try:
-                azure_storage.delete_file(material.image_url)
-            except Exception as e:
-                print(f"Error eliminando imagen de portada {material.image_url}: {e}")
+                _enqueue_topic_blobs(topic, reason='material_deleted')
+        if material.image_url:
+            enqueue_blob_deletion(material.image_url, reason='material_deleted')
         
         db.session.delete(material)
         db.session.commit()
@@ -775,14 +793,9 @@ def delete_session(material_id, session_id):
     try:
         session = StudySession.query.filter_by(id=session_id, material_id=material_id).first_or_404()
         
-        # Eliminar archivos de Azure Storage antes de borrar la sesión
+        # Programar borrado de archivos de Azure Storage en la misma transacción
         for topic in session.topics:
-            # Eliminar archivo de video si existe
-            if topic.video and topic.video.video_url and 'blob.core.windows.net' in topic.video.video_url:
-                azure_storage.delete_video(topic.video.video_url)
-            # Eliminar archivo descargable si existe
-            if topic.downloadable_exercise and topic.downloadable_exercise.file_url and 'blob.core.windows.net' in topic.downloadable_exercise.file_url:
-                azure_storage.delete_downloadable(topic.downloadable_exercise.file_url)
+            _enqueue_topic_blobs(topic, reason='session_deleted')
         
         db.session.delete(session)
         db.session.commit()
@@ -867,7 +880,8 @@ def get_topic(material_id, session_id, topic_id):
     """Obtener un tema por ID"""
     try:
         topic = StudyTopic.query.filter_by(id=topic_id, session_id=session_id).first_or_404()
-        return jsonify(topic.to_dict(include_elements=True)), 200
+        include_reading_content = request.args.get('reading_content', 'true').lower() != 'false'
+        return jsonify(topic.to_dict(include_elements=True, include_reading_content=include_reading_content)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -919,13 +933,8 @@ def delete_topic(material_id, session_id, topic_id):
     try:
         topic = StudyTopic.query.filter_by(id=topic_id, session_id=session_id).first_or_404()
         
-        # Eliminar archivos de Azure Storage antes de borrar el tema
-        # Eliminar video si existe
-        if topic.video and topic.video.video_url and 'blob.core.windows.net' in topic.video.video_url:
-            azure_storage.delete_video(topic.video.video_url)
-        # Eliminar archivo descargable si existe
-        if topic.downloadable_exercise and topic.downloadable_exercise.file_url and 'blob.core.windows.net' in topic.downloadable_exercise.file_url:
-            azure_storage.delete_downloadable(topic.downloadable_exercise.file_url)
+        # Programar borrado de archivos de Azure Storage en la misma transacción
+        _enqueue_topic_blobs(topic, reason='topic_deleted')
         
         db.session.delete(topic)
         db.session.commit()
@@ -951,9 +960,10 @@ def upsert_reading(material_id, session_id, topic_id):
         
         if topic.reading:
             # Actualizar
-            topic.reading.title = data.get('title', topic.reading.title)
-            topic.reading.content = data.get('content', topic.reading.content)
-            topic.reading.estimated_time_minutes = data.get('estimated_time_minutes', topic.reading.estimated_time_minutes)
+            reading = topic.reading
+            reading.title = data.get('title', reading.title)
+            reading.content = data.get('content', reading.content)
+            reading.estimated_time_minutes = data.get('estimated_time_minutes', reading.estimated_time_minutes)
         else:
             # Crear
             reading = StudyReading(
@@ -964,6 +974,9 @@ def upsert_reading(material_id, session_id, topic_id):
             )
             db.session.add(reading)
         
+        # Normalizar, extraer imágenes base64 y precomprimir una sola vez al guardar
+        prepare_reading(reading)
+        
         db.session.commit()
         
         return jsonify({
@@ -994,6 +1007,52 @@ def delete_reading(material_id, session_id, topic_id):
         return jsonify({'error': str(e)}), 500
 
 
+@study_contents_bp.route('/readings/<int:reading_id>/content', methods=['GET'])
+@jwt_required()
+def get_reading_content(reading_id):
+    """
+    Obtener el HTML procesado de una lectura como recurso independiente
+    
+    - ETag fuerte (If-None-Match -> 304)
+    - Content-Encoding: gzip si el cliente lo acepta (precomprimido al guardar)
+    - Range / 206 para lecturas grandes
+    """
+    try:
+        reading = StudyReading.query.get_or_404(reading_id)
+        
+        if reading.content_etag:
+            rendered, content_etag = reading.content_rendered or '', reading.content_etag
+        else:
+            # Lectura anterior a la caché: procesar al vuelo sin escribir en el GET
+            # (scripts/backfill_reading_cache.py la persiste con el mismo ETag)
+            rendered = render_reading_html(reading.content)
+            content_etag = compute_etag(rendered)
+        
+        gzip_body = None
+        if accepts_gzip(request.headers.get('Accept-Encoding')):
+            gzip_body = reading.content_gzip if reading.content_etag else compress_gzip(rendered)
+        if gzip_body:
+            body, etag = gzip_body, f'{content_etag}-gz'
+        else:
+            body, etag = rendered.encode('utf-8'), content_etag
+        
+        response = current_app.response_class(body, mimetype='text/html')
+        response.charset = 'utf-8'
+        if gzip_body:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'private, max-age=300, must-revalidate'
+        response.set_etag(etag)
+        if reading.updated_at:
+            response.last_modified = reading.updated_at
+        
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 # --- Endpoint para obtener URL de video con SAS token fresco ---
 @study_contents_bp.route('/video-url/<int:video_id>', methods=['GET'])
 @jwt_required()
@@ -1013,14 +1072,14 @@ def get_video_signed_url(video_id):
                 'requires_refresh': False
             }), 200
         
-        # Generar nueva URL con SAS token fresco
-        signed_url = azure_storage.generate_video_sas_url(video.video_url)
+        # URL con SAS vigente (reutilizada desde la caché compartida si aún tiene vigencia suficiente)
+        signed_url = get_signed_video_url(video.video_url)
         
         return jsonify({
             'video_url': signed_url,
             'video_type': video.video_type,
             'requires_refresh': True,
-            'expires_in_hours': 24
+            'expires_in_hours': SAS_MIN_REMAINING_HOURS
         }), 200
         
     except Exception as e:
@@ -1050,14 +1109,14 @@ def get_video_signed_url_by_topic(topic_id):
                 'requires_refresh': False
             }), 200
         
-        # Generar nueva URL con SAS token fresco
-        signed_url = azure_storage.generate_video_sas_url(video.video_url)
+        # URL con SAS vigente (reutilizada desde la caché compartida si aún tiene vigencia suficiente)
+        signed_url = get_signed_video_url(video.video_url)
         
         return jsonify({
             'video_url': signed_url,
             'video_type': video.video_type,
             'requires_refresh': True,
-            'expires_in_hours': 24
+            'expires_in_hours': SAS_MIN_REMAINING_HOURS
         }), 200
         
     except Exception as e:
@@ -1113,9 +1172,9 @@ def delete_video(material_id, session_id, topic_id):
     try:
         topic = StudyTopic.query.filter_by(id=topic_id, session_id=session_id).first_or_404()
         if topic.video:
-            # Eliminar archivo de Azure si existe
-            if topic.video.video_url and 'blob.core.windows.net' in topic.video.video_url:
-                azure_storage.delete_file(topic.video.video_url)
+            # Programar borrado del archivo de Azure (se confirma con el commit)
+            if topic.video.video_url:
+                enqueue_blob_deletion(topic.video.video_url, reason='video_deleted')
             db.session.delete(topic.video)
             db.session.commit()
         
@@ -1174,10 +1233,10 @@ def confirm_video_upload(material_id, session_id, topic_id):
         if not video_url:
             return jsonify({'error': 'URL del video es requerida'}), 400
         
-        # Eliminar video anterior si existe
+        # Programar borrado del video anterior si cambió
         if topic.video:
-            if topic.video.video_url and 'blob.core.windows.net' in topic.video.video_url:
-                azure_storage.delete_video(topic.video.video_url)
+            if topic.video.video_url and topic.video.video_url != video_url:
+                enqueue_blob_deletion(topic.video.video_url, reason='video_replaced')
             topic.video.title = title
             topic.video.description = description
             topic.video.video_url = video_url
@@ -1307,9 +1366,9 @@ def upload_video(material_id, session_id, topic_id):
         
         # Actualizar o crear el video en la BD
         if topic.video:
-            # Eliminar video anterior de Azure
-            if topic.video.video_url and 'blob.core.windows.net' in topic.video.video_url:
-                azure_storage.delete_video(topic.video.video_url)
+            # Programar borrado del video anterior de Azure
+            if topic.video.video_url and topic.video.video_url != video_url:
+                enqueue_blob_deletion(topic.video.video_url, reason='video_replaced')
             topic.video.title = title
             topic.video.description = description
             topic.video.video_url = video_url
@@ -1425,9 +1484,9 @@ def delete_downloadable(material_id, session_id, topic_id):
     try:
         topic = StudyTopic.query.filter_by(id=topic_id, session_id=session_id).first_or_404()
         if topic.downloadable_exercise:
-            # Eliminar archivo de Azure si existe
-            if topic.downloadable_exercise.file_url and 'blob.core.windows.net' in topic.downloadable_exercise.file_url:
-                azure_storage.delete_downloadable(topic.downloadable_exercise.file_url)
+            # Programar borrado del archivo de Azure (se confirma con el commit)
+            if topic.downloadable_exercise.file_url:
+                enqueue_blob_deletion(topic.downloadable_exercise.file_url, reason='downloadable_deleted')
             db.session.delete(topic.downloadable_exercise)
             db.session.commit()
         
@@ -1531,9 +1590,9 @@ def upload_downloadable(material_id, session_id, topic_id):
         
         # Actualizar o crear el ejercicio descargable
         if topic.downloadable_exercise:
-            # Eliminar archivo anterior
-            if topic.downloadable_exercise.file_url and 'blob.core.windows.net' in topic.downloadable_exercise.file_url:
-                azure_storage.delete_downloadable(topic.downloadable_exercise.file_url)
+            # Programar borrado del archivo anterior
+            if topic.downloadable_exercise.file_url and topic.downloadable_exercise.file_url != file_url:
+                enqueue_blob_deletion(topic.downloadable_exercise.file_url, reason='downloadable_replaced')
             
             topic.downloadable_exercise.title = title
             topic.downloadable_exercise.description = description
@@ -1944,6 +2003,50 @@ def delete_action(material_id, session_id, topic_id, step_id, action_id):
 
 # ==================== Upload de Imagen para Ejercicios Interactivos ====================
 
+@study_contents_bp.route('/<int:material_id>/sessions/<int:session_id>/topics/<int:topic_id>/interactive/bulk', methods=['PATCH'])
+@jwt_required()
+@admin_or_editor_required
+def bulk_patch_interactive(material_id, session_id, topic_id):
+    """
+    Aplicar en una sola transacción cambios a varios pasos y acciones del
+    ejercicio interactivo (posición, tamaño, orden, etiqueta)
+    
+    Body: {"steps": [{"id", "step_number"?, ...}], "actions": [{"id", "position_x"?, ...}]}
+    """
+    from app.services.exercise_bulk_service import apply_bulk_patch, BulkPatchError
+    
+    try:
+        topic = StudyTopic.query.filter_by(id=topic_id, session_id=session_id).first_or_404()
+        
+        if not topic.interactive_exercise:
+            return jsonify({'error': 'El tema no tiene un ejercicio interactivo'}), 404
+        
+        interactive = topic.interactive_exercise
+        data = request.get_json() or {}
+        
+        summary = apply_bulk_patch(
+            interactive.id,
+            StudyInteractiveExerciseStep,
+            StudyInteractiveExerciseAction,
+            steps=data.get('steps'),
+            actions=data.get('actions')
+        )
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Cambios aplicados exitosamente',
+            **summary,
+            'interactive_exercise': interactive.to_dict(include_steps=True)
+        }), 200
+        
+    except BulkPatchError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @study_contents_bp.route('/upload-image', methods=['POST'])
 @jwt_required()
 @admin_or_editor_required
@@ -2363,7 +2466,8 @@ def register_content_progress(content_type, content_id):
                 is_completed = True
         
         # Actualizar estado de completado
-        if is_completed and not progress.is_completed:
+        newly_completed = bool(is_completed and not progress.is_completed)
+        if newly_completed:
             progress.is_completed = True
             progress.completed_at = db.func.now()
         
@@ -2377,6 +2481,8 @@ def register_content_progress(content_type, content_id):
         
         # Invalidar cache del dashboard del usuario
         invalidate_on_progress_update(user_id)
+        if newly_completed:
+            record_progress_event(user_id, topic_id)
         
         # Actualizar progreso del tema
         update_topic_progress(user_id, topic_id)
@@ -3,17 +3,22 @@ Rutas para gestión de usuarios (admin y coordinadores)
 """
 from flask import Blueprint, request, jsonify, g
 from functools import wraps
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from app import db
 from app.models import User
+from app.models.user import AVAILABLE_ROLES
+from app.utils.helpers import validate_email, validate_password
+from app.services.stats_snapshot_service import get_stats_snapshot
+from app.utils.identity import get_current_identity
+from app.utils.pagination import paginate_listing, CursorError
+from app.services.candidate_import_service import open_candidate_sheet, CandidateImportError
+from app.services.user_search_service import apply_user_search
+from app.services.export_service import export_format, export_response, ExportError, user_rows, USER_COLUMNS
+import os
 import uuid
-import re
 
 bp = Blueprint('user_management', __name__, url_prefix='/api/user-management')
 
-# Roles disponibles en el sistema (sin alumno)
-AVAILABLE_ROLES = ['admin', 'editor', 'soporte', 'coordinator', 'candidato', 'auxiliar']
-
 # Roles que puede crear cada tipo de usuario
 ROLE_CREATE_PERMISSIONS = {
     'admin': ['editor', 'soporte', 'coordinator', 'candidato', 'auxiliar'],  # Todo menos admin
@@ -25,8 +30,7 @@ def management_required(f):
     """Decorador que requiere rol de admin o coordinator"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_identity()
         if not user:
             return jsonify({'error': 'No autorizado'}), 401
         if user.role not in ['admin', 'coordinator']:
@@ -40,8 +44,7 @@ def admin_required(f):
     """Decorador que requiere rol de admin"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_identity()
         if not user:
             return jsonify({'error': 'No autorizado'}), 401
         if user.role != 'admin':
@@ -51,26 +54,44 @@ def admin_required(f):
     return decorated
 
 
-def validate_email(email):
-    """Validar formato de email"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
+# ============== LISTAR USUARIOS ==============
 
-def validate_password(password):
-    """Validar requisitos de contraseña"""
-    if len(password) < 8:
-        return False, "La contraseña debe tener al menos 8 caracteres"
-    if not re.search(r'[A-Z]', password):
-        return False, "La contraseña debe tener al menos una mayúscula"
-    if not re.search(r'[a-z]', password):
-        return False, "La contraseña debe tener al menos una minúscula"
-    if not re.search(r'[0-9]', password):
-        return False, "La contraseña debe tener al menos un número"
-    return True, None
+def _filtered_users_query(current_user):
+    """
+    Consulta de usuarios con los filtros del listado (search, role, is_active)
 
+    Returns:
+        (query, search)
+    """
+    search = request.args.get('search', '')
+    role_filter = request.args.get('role', '')
+    active_filter = request.args.get('is_active', '')
+    
+    query = User.query
+    
+    # Coordinadores solo ven candidatos
+    if current_user.role == 'coordinator':
+        query = query.filter(User.role == 'candidato')
+    
+    # Filtros
+    if role_filter:
+        # Soportar múltiples roles separados por coma (ej: "admin,editor,soporte")
+        roles = [r.strip() for r in role_filter.split(',') if r.strip()]
+        if len(roles) == 1:
+            query = query.filter(User.role == roles[0])
+        elif len(roles) > 1:
+            query = query.filter(User.role.in_(roles))
+        
+    if active_filter != '':
+        is_active = active_filter.lower() == 'true'
+        query = query.filter(User.is_active == is_active)
+    
+    if search:
+        # Índice de tokens (user_search_tokens) ordenado por relevancia
+        query = apply_user_search(query, search)
+    
+    return query, search
 
-# ============== LISTAR USUARIOS ==============
 
 @bp.route('/users', methods=['GET'])
 @jwt_required()
@@ -78,55 +99,48 @@ def validate_password(password):
 def list_users():
     """Listar usuarios según permisos del solicitante"""
     try:
-        current_user = g.current_user
-        
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        search = request.args.get('search', '')
-        role_filter = request.args.get('role', '')
-        active_filter = request.args.get('is_active', '')
-        
-        query = User.query
-        
-        # Coordinadores solo ven candidatos
-        if current_user.role == 'coordinator':
-            query = query.filter(User.role == 'candidato')
-        
-        # Filtros
-        if role_filter:
-            # Soportar múltiples roles separados por coma (ej: "admin,editor,soporte")
-            roles = [r.strip() for r in role_filter.split(',') if r.strip()]
-            if len(roles) == 1:
-                query = query.filter(User.role == roles[0])
-            elif len(roles) > 1:
-                query = query.filter(User.role.in_(roles))
-            
-        if active_filter != '':
-            is_active = active_filter.lower() == 'true'
-            query = query.filter(User.is_active == is_active)
-        
-        if search:
-            search_term = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    User.name.ilike(search_term),
-                    User.first_surname.ilike(search_term),
-                    User.email.ilike(search_term),
-                    User.curp.ilike(search_term),
-                    User.username.ilike(search_term)
-                )
-            )
-        
-        query = query.order_by(User.created_at.desc())
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        query, search = _filtered_users_query(g.current_user)
+        
+        # (?cursor= activa la paginación keyset sobre ix_users_created_at_id / ix_users_role_created_at_id;
+        #  con búsqueda el orden es por relevancia y se pagina por página)
+        users, meta = paginate_listing(
+            query,
+            [(User.created_at, True), (User.id, True)],
+            scope='users',
+            model=User,
+            allow_cursor=not search
+        )
         
         return jsonify({
-            'users': [u.to_dict(include_private=True) for u in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+            'users': [u.to_dict(include_private=True) for u in users],
+            **meta
         })
         
+    except CursorError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/users/export', methods=['GET'])
+@jwt_required()
+@management_required
+def export_users():
+    """
+    Exportar usuarios (CSV o Excel en streaming)
+
+    Mismos filtros que el listado (search, role, is_active) y format=csv|xlsx.
+    """
+    try:
+        fmt = export_format(request.args.get('format'))
+        query, search = _filtered_users_query(g.current_user)
+        if not search:
+            query = query.order_by(User.created_at.desc(), User.id.desc())
+        
+        return export_response('usuarios', USER_COLUMNS, user_rows(query), fmt, sheet_title='Usuarios')
+        
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -433,23 +447,22 @@ def get_user_stats():
     try:
         current_user = g.current_user
         
-        base_query = User.query
+        # Contadores desde el snapshot de estadísticas (una sola consulta, en caché)
+        snapshot = get_stats_snapshot()
         
         # Coordinadores solo ven stats de candidatos
-        if current_user.role == 'coordinator':
-            base_query = base_query.filter(User.role == 'candidato')
-        
-        total_users = base_query.count()
-        active_users = base_query.filter(User.is_active == True).count()
-        inactive_users = base_query.filter(User.is_active == False).count()
-        verified_users = base_query.filter(User.is_verified == True).count()
+        counters = snapshot['candidates'] if current_user.role == 'coordinator' else snapshot['users']
+        total_users = counters['total']
+        active_users = counters['active']
+        inactive_users = counters['inactive']
+        verified_users = counters['verified']
         
         # Usuarios por rol (solo para admin)
-        users_by_role = []
         if current_user.role == 'admin':
-            for role in AVAILABLE_ROLES:
-                count = User.query.filter_by(role=role).count()
-                users_by_role.append({'role': role, 'count': count})
+            users_by_role = [
+                {'role': role, 'count': snapshot['users']['by_role'].get(role, 0)}
+                for role in AVAILABLE_ROLES
+            ]
         else:
             users_by_role = [{'role': 'candidato', 'count': total_users}]
         
@@ -518,12 +531,15 @@ def bulk_upload_candidates():
     - curp (opcional)
     - telefono (opcional)
     - password (opcional, si no se proporciona se genera uno automático)
+    
+    El archivo se valida (encabezados) y se encola como trabajo 'candidate_import'.
+    Responde 202 con el job_id; el progreso, el resultado y la hoja de
+    credenciales se consultan en /api/jobs/<job_id>.
     """
+    path = None
     try:
-        import io
-        import secrets
-        import string
-        from openpyxl import load_workbook
+        import tempfile
+        from app.services.job_service import enqueue_job
         
         current_user = g.current_user
         
@@ -540,224 +556,46 @@ def bulk_upload_candidates():
         if not file.filename.lower().endswith(('.xlsx', '.xls')):
             return jsonify({'error': 'El archivo debe ser formato Excel (.xlsx o .xls)'}), 400
         
-        # Leer el archivo Excel
-        try:
-            workbook = load_workbook(filename=io.BytesIO(file.read()), data_only=True)
-            sheet = workbook.active
-        except Exception as e:
-            return jsonify({'error': f'Error al leer el archivo Excel: {str(e)}'}), 400
-        
-        # Obtener encabezados (primera fila)
-        headers = []
-        for cell in sheet[1]:
-            value = cell.value
-            if value:
-                headers.append(str(value).strip().lower())
-            else:
-                headers.append('')
-        
-        # Mapeo de nombres de columna esperados
-        column_mapping = {
-            'email': ['email', 'correo', 'correo electronico', 'correo electrónico', 'e-mail'],
-            'nombre': ['nombre', 'name', 'nombres'],
-            'primer_apellido': ['primer_apellido', 'primer apellido', 'apellido paterno', 'apellido_paterno', 'first_surname', 'apellido1'],
-            'segundo_apellido': ['segundo_apellido', 'segundo apellido', 'apellido materno', 'apellido_materno', 'second_surname', 'apellido2'],
-            'genero': ['genero', 'género', 'sexo', 'gender'],
-            'curp': ['curp'],
-            'telefono': ['telefono', 'teléfono', 'phone', 'celular', 'cel'],
-            'password': ['password', 'contraseña', 'clave']
-        }
+        # Guardar en disco (streaming) en lugar de cargarlo en memoria
+        fd, path = tempfile.mkstemp(prefix='candidates-', suffix='.xlsx')
+        with os.fdopen(fd, 'wb') as tmp:
+            file.save(tmp)
         
-        # Encontrar índices de columnas
-        column_indices = {}
-        for field, aliases in column_mapping.items():
-            for i, header in enumerate(headers):
-                if header in aliases:
-                    column_indices[field] = i
-                    break
-        
-        # Verificar columnas requeridas
-        required_columns = ['email', 'nombre', 'primer_apellido']
-        missing_columns = [col for col in required_columns if col not in column_indices]
-        if missing_columns:
+        # Validar encabezados antes de encolar
+        try:
+            workbook, _, _, total_rows = open_candidate_sheet(path)
+            workbook.close()
+        except CandidateImportError as e:
             return jsonify({
-                'error': f'Faltan columnas requeridas: {", ".join(missing_columns)}',
+                'error': str(e),
                 'hint': 'Las columnas requeridas son: email, nombre, primer_apellido'
             }), 400
         
-        # Función para generar contraseña aleatoria
-        def generate_password(length=10):
-            alphabet = string.ascii_letters + string.digits
-            # Asegurar al menos una mayúscula, una minúscula y un número
-            password = [
-                secrets.choice(string.ascii_uppercase),
-                secrets.choice(string.ascii_lowercase),
-                secrets.choice(string.digits)
-            ]
-            password += [secrets.choice(alphabet) for _ in range(length - 3)]
-            secrets.SystemRandom().shuffle(password)
-            return ''.join(password)
-        
-        # Procesar filas
-        results = {
-            'created': [],
-            'errors': [],
-            'skipped': [],
-            'total_processed': 0
-        }
+        # El worker corre en otro proceso: el archivo viaja como entrada del trabajo
+        with open(path, 'rb') as f:
+            data = f.read()
         
-        for row_idx, row in enumerate(sheet.iter_rows(min_row=2), start=2):
-            results['total_processed'] += 1
-            
-            # Obtener valores de la fila
-            def get_cell_value(field):
-                if field not in column_indices:
-                    return None
-                idx = column_indices[field]
-                if idx < len(row):
-                    value = row[idx].value
-                    return str(value).strip() if value is not None else None
-                return None
-            
-            email = get_cell_value('email')
-            nombre = get_cell_value('nombre')
-            primer_apellido = get_cell_value('primer_apellido')
-            segundo_apellido = get_cell_value('segundo_apellido')
-            genero = get_cell_value('genero')
-            curp = get_cell_value('curp')
-            telefono = get_cell_value('telefono')
-            password = get_cell_value('password')
-            
-            # Validar campos requeridos
-            if not email or not nombre or not primer_apellido:
-                results['errors'].append({
-                    'row': row_idx,
-                    'email': email or '(vacío)',
-                    'error': 'Campos requeridos vacíos (email, nombre, primer_apellido)'
-                })
-                continue
-            
-            # Normalizar email
-            email = email.lower().strip()
-            
-            # Validar formato de email
-            if not validate_email(email):
-                results['errors'].append({
-                    'row': row_idx,
-                    'email': email,
-                    'error': 'Formato de email inválido'
-                })
-                continue
-            
-            # Verificar si el email ya existe
-            if User.query.filter_by(email=email).first():
-                results['skipped'].append({
-                    'row': row_idx,
-                    'email': email,
-                    'reason': 'Email ya registrado'
-                })
-                continue
-            
-            # Verificar CURP si se proporciona
-            if curp:
-                curp = curp.upper().strip()
-                if len(curp) != 18:
-                    results['errors'].append({
-                        'row': row_idx,
-                        'email': email,
-                        'error': f'CURP inválido: debe tener 18 caracteres'
-                    })
-                    continue
-                if User.query.filter_by(curp=curp).first():
-                    results['skipped'].append({
-                        'row': row_idx,
-                        'email': email,
-                        'reason': f'CURP {curp} ya registrado'
-                    })
-                    continue
-            
-            # Normalizar género
-            if genero:
-                genero = genero.upper()[0] if genero else None
-                if genero not in ['M', 'F', 'O']:
-                    genero = None
-            
-            # Generar contraseña si no se proporciona
-            generated_password = None
-            if not password:
-                generated_password = generate_password()
-                password = generated_password
-            else:
-                # Validar contraseña proporcionada
-                is_valid, error_msg = validate_password(password)
-                if not is_valid:
-                    results['errors'].append({
-                        'row': row_idx,
-                        'email': email,
-                        'error': f'Contraseña inválida: {error_msg}'
-                    })
-                    continue
-            
-            # Generar username único
-            base_username = email.split('@')[0]
-            username = base_username
-            counter = 1
-            while User.query.filter_by(username=username).first():
-                username = f"{base_username}{counter}"
-                counter += 1
-            
-            # Crear usuario
-            try:
-                new_user = User(
-                    id=str(uuid.uuid4()),
-                    email=email,
-                    username=username,
-                    name=nombre,
-                    first_surname=primer_apellido,
-                    second_surname=segundo_apellido or None,
-                    gender=genero,
-                    curp=curp or None,
-                    phone=telefono or None,
-                    role='candidato',
-                    is_active=True,
-                    is_verified=False
-                )
-                new_user.set_password(password)
-                db.session.add(new_user)
-                
-                results['created'].append({
-                    'row': row_idx,
-                    'email': email,
-                    'name': f"{nombre} {primer_apellido}",
-                    'username': username,
-                    'password': generated_password  # Solo si fue generada automáticamente
-                })
-            except Exception as e:
-                results['errors'].append({
-                    'row': row_idx,
-                    'email': email,
-                    'error': str(e)
-                })
-                continue
-        
-        # Commit de todos los usuarios creados
-        if results['created']:
-            db.session.commit()
+        job = enqueue_job(
+            'candidate_import',
+            payload={'filename': file.filename},
+            created_by=current_user.id,
+            inputs=[('upload.xlsx', data, file.mimetype or 'application/octet-stream')],
+            progress={'processed': 0, 'total': total_rows, 'created': 0, 'errors': 0, 'skipped': 0}
+        )
         
         return jsonify({
-            'message': f'Proceso completado: {len(results["created"])} usuarios creados',
-            'summary': {
-                'total_processed': results['total_processed'],
-                'created': len(results['created']),
-                'errors': len(results['errors']),
-                'skipped': len(results['skipped'])
-            },
-            'details': results
-        }), 200
+            'message': 'Importación en proceso',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}"
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+    finally:
+        if path and os.path.exists(path):
+            os.remove(path)
 
 
 @bp.route('/candidates/bulk-upload/template', methods=['GET'])
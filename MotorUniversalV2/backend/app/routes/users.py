@@ -5,11 +5,13 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db, cache
 from app.models.user import User
-from app.models.exam import Exam
-from app.models.voucher import Voucher
-from app.models.result import Result
 from app.utils.cache_utils import make_cache_key_with_user
 from app.utils.cdn_helper import transform_to_cdn_url
+from app.services.study_material_service import get_material_summaries
+from app.services.dashboard_read_model import get_candidate_dashboard
+from app.services.entitlement_service import candidate_scope
+from app.services.stats_snapshot_service import get_stats_snapshot
+from app.utils.identity import get_current_identity
 
 bp = Blueprint('users', __name__)
 
@@ -30,8 +32,7 @@ def get_users():
       403:
         description: Sin permisos
     """
-    user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
+    current_user = get_current_identity()
     
     if not current_user or not current_user.has_permission('users:read'):
         return jsonify({'error': 'Permiso denegado'}), 403
@@ -64,7 +65,7 @@ def get_users():
 def get_user(user_id):
     """Obtener información de un usuario"""
     current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_identity()
     
     user = User.query.get(user_id)
     
@@ -85,7 +86,7 @@ def get_user(user_id):
 def update_user(user_id):
     """Actualizar usuario"""
     current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_identity()
     
     user = User.query.get(user_id)
     
@@ -159,8 +160,7 @@ def update_document_options(user_id):
       404:
         description: Usuario no encontrado
     """
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_identity()
     
     # Solo admin puede actualizar opciones de documentos
     if current_user.role != 'admin':
@@ -202,270 +202,34 @@ def update_document_options(user_id):
 
 @bp.route('/me/dashboard', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=60, make_cache_key=make_cache_key_with_user)  # Cache por usuario, 60 segundos
 def get_dashboard():
     """
     Obtener datos del dashboard del usuario actual
     Incluye exámenes disponibles, resultados y materiales de estudio
     
-    OPTIMIZADO: Usa queries agregadas para evitar N+1
+    Se sirve desde el modelo de lectura (services.dashboard_read_model):
+    catálogo global versionado + hash por usuario actualizado por eventos
+    de resultados y progreso.
     
     IMPORTANTE: Los resultados se agrupan por ECM (competency_standard_id) cuando
     el examen tiene uno asociado, permitiendo ver el historial unificado de todas
     las versiones de examen para ese estándar de competencia.
     """
     try:
-        from sqlalchemy import func, and_, or_, case, literal
-        from sqlalchemy.orm import joinedload
-        
         user_id = get_jwt_identity()
         current_user = User.query.get(user_id)
         
         if not current_user:
             return jsonify({'error': 'Usuario no encontrado'}), 404
         
-        # ========== OPTIMIZACIÓN: Query única para exámenes con conteo de categorías ==========
-        # Usamos subquery para contar categorías en lugar de lazy loading
-        from app.models.category import Category
-        
-        category_counts = db.session.query(
-            Category.exam_id,
-            func.count(Category.id).label('count')
-        ).group_by(Category.exam_id).subquery()
-        
-        available_exams = db.session.query(
-            Exam,
-            func.coalesce(category_counts.c.count, 0).label('categories_count')
-        ).outerjoin(
-            category_counts, Exam.id == category_counts.c.exam_id
-        ).filter(
-            Exam.is_published == True
-        ).order_by(Exam.name).all()
-        
-        # ========== OPTIMIZACIÓN: Una sola query para todos los resultados ==========
-        user_results = Result.query.filter_by(user_id=str(user_id)).order_by(Result.created_at.desc()).all()
-        
-        # Crear diccionarios de resultados por ECM y por exam_id
-        results_by_ecm = {}
-        results_by_exam = {}
-        
-        for result in user_results:
-            if result.competency_standard_id:
-                ecm_id = result.competency_standard_id
-                if ecm_id not in results_by_ecm:
-                    results_by_ecm[ecm_id] = []
-                results_by_ecm[ecm_id].append(result.to_dict())
-            else:
-                exam_id = result.exam_id
-                if exam_id not in results_by_exam:
-                    results_by_exam[exam_id] = []
-                results_by_exam[exam_id].append(result.to_dict())
-        
-        # Construir lista de exámenes con resultados
-        exams_data = []
-        for exam, categories_count in available_exams:
-            if exam.competency_standard_id and exam.competency_standard_id in results_by_ecm:
-                exam_results = results_by_ecm.get(exam.competency_standard_id, [])
-            else:
-                exam_results = results_by_exam.get(exam.id, [])
-            
-            best_score = max([r['score'] for r in exam_results], default=None)
-            attempts = len(exam_results)
-            last_attempt = exam_results[0] if exam_results else None
-            is_completed = any(r['status'] == 1 for r in exam_results)
-            is_approved = any(r['result'] == 1 for r in exam_results)
-            approved_result = next((r for r in exam_results if r['result'] == 1), None)
-            
-            exams_data.append({
-                'id': exam.id,
-                'name': exam.name,
-                'description': exam.description,
-                'version': exam.version,
-                'time_limit_minutes': exam.duration_minutes,
-                'passing_score': exam.passing_score,
-                'is_published': exam.is_published,
-                'categories_count': categories_count,
-                'competency_standard_id': exam.competency_standard_id,
-                'user_stats': {
-                    'attempts': attempts,
-                    'best_score': best_score,
-                    'is_completed': is_completed,
-                    'is_approved': is_approved,
-                    'last_attempt': last_attempt,
-                    'approved_result': approved_result
-                }
-            })
-        
-        # Calcular estadísticas generales
-        total_exams = len(available_exams)
-        completed_exams = sum(1 for e in exams_data if e['user_stats']['is_completed'])
-        approved_exams = sum(1 for e in exams_data if e['user_stats']['is_approved'])
-        scores = [e['user_stats']['best_score'] for e in exams_data if e['user_stats']['best_score'] is not None]
-        average_score = sum(scores) / len(scores) if scores else 0
-        
-        # ========== OPTIMIZACIÓN: Materiales con queries agregadas ==========
-        materials_data = []
-        try:
-            from app.models.study_content import StudyMaterial, StudySession, StudyTopic, StudyReading, StudyVideo, StudyDownloadableExercise, StudyInteractiveExercise
-            from app.models.student_progress import StudentContentProgress
-            
-            # Query para obtener materiales publicados
-            available_materials = StudyMaterial.query.filter_by(is_published=True).order_by(StudyMaterial.order, StudyMaterial.title).all()
-            
-            if available_materials:
-                material_ids = [m.id for m in available_materials]
-                
-                # ========== OPTIMIZACIÓN: Contar sesiones por material en una query ==========
-                sessions_count_query = db.session.query(
-                    StudySession.material_id,
-                    func.count(StudySession.id).label('count')
-                ).filter(
-                    StudySession.material_id.in_(material_ids)
-                ).group_by(StudySession.material_id).all()
-                
-                sessions_count_map = {row[0]: row[1] for row in sessions_count_query}
-                
-                # ========== OPTIMIZACIÓN: Obtener todos los topic_ids de una vez ==========
-                sessions_subquery = db.session.query(StudySession.id).filter(
-                    StudySession.material_id.in_(material_ids)
-                ).subquery()
-                
-                all_topics = db.session.query(
-                    StudyTopic.id,
-                    StudySession.material_id
-                ).join(
-                    StudySession, StudyTopic.session_id == StudySession.id
-                ).filter(
-                    StudySession.material_id.in_(material_ids)
-                ).all()
-                
-                # Mapear topics por material
-                topics_by_material = {}
-                all_topic_ids = []
-                for topic_id, material_id in all_topics:
-                    if material_id not in topics_by_material:
-                        topics_by_material[material_id] = []
-                    topics_by_material[material_id].append(topic_id)
-                    all_topic_ids.append(topic_id)
-                
-                # ========== OPTIMIZACIÓN: Contar contenidos por tipo en queries agregadas ==========
-                content_counts = {}
-                
-                if all_topic_ids:
-                    # Contar readings
-                    readings = db.session.query(
-                        StudyReading.topic_id,
-                        StudyReading.id
-                    ).filter(StudyReading.topic_id.in_(all_topic_ids)).all()
-                    
-                    # Contar videos
-                    videos = db.session.query(
-                        StudyVideo.topic_id,
-                        StudyVideo.id
-                    ).filter(StudyVideo.topic_id.in_(all_topic_ids)).all()
-                    
-                    # Contar downloadables
-                    downloadables = db.session.query(
-                        StudyDownloadableExercise.topic_id,
-                        StudyDownloadableExercise.id
-                    ).filter(StudyDownloadableExercise.topic_id.in_(all_topic_ids)).all()
-                    
-                    # Contar ejercicios interactivos
-                    try:
-                        interactives = db.session.query(
-                            StudyInteractiveExercise.topic_id,
-                            StudyInteractiveExercise.id
-                        ).filter(StudyInteractiveExercise.topic_id.in_(all_topic_ids)).all()
-                    except:
-                        interactives = []
-                    
-                    # Crear mapeo de todos los content_ids por tipo
-                    all_content_ids = []
-                    content_type_map = {}  # content_id -> (content_type, topic_id)
-                    
-                    for topic_id, content_id in readings:
-                        all_content_ids.append(str(content_id))
-                        content_type_map[str(content_id)] = ('reading', topic_id)
-                    
-                    for topic_id, content_id in videos:
-                        all_content_ids.append(str(content_id))
-                        content_type_map[str(content_id)] = ('video', topic_id)
-                    
-                    for topic_id, content_id in downloadables:
-                        all_content_ids.append(str(content_id))
-                        content_type_map[str(content_id)] = ('downloadable', topic_id)
-                    
-                    for topic_id, content_id in interactives:
-                        all_content_ids.append(str(content_id))
-                        content_type_map[str(content_id)] = ('interactive', topic_id)
-                    
-                    # ========== OPTIMIZACIÓN: Una sola query para progreso del usuario ==========
-                    completed_content_ids = set()
-                    if all_content_ids:
-                        user_progress = db.session.query(
-                            StudentContentProgress.content_id
-                        ).filter(
-                            StudentContentProgress.user_id == str(user_id),
-                            StudentContentProgress.content_id.in_(all_content_ids),
-                            StudentContentProgress.is_completed == True
-                        ).all()
-                        
-                        completed_content_ids = {row[0] for row in user_progress}
-                    
-                    # Calcular totales y completados por material
-                    for material in available_materials:
-                        topic_ids_for_material = topics_by_material.get(material.id, [])
-                        total_contents = 0
-                        completed_contents = 0
-                        
-                        for content_id, (content_type, topic_id) in content_type_map.items():
-                            if topic_id in topic_ids_for_material:
-                                total_contents += 1
-                                if content_id in completed_content_ids:
-                                    completed_contents += 1
-                        
-                        content_counts[material.id] = {
-                            'total': total_contents,
-                            'completed': completed_contents
-                        }
-                
-                # Construir respuesta de materiales
-                for material in available_materials:
-                    sessions_count = sessions_count_map.get(material.id, 0)
-                    counts = content_counts.get(material.id, {'total': 0, 'completed': 0})
-                    total = counts['total']
-                    completed = counts['completed']
-                    
-                    progress_percentage = round((completed / total * 100)) if total > 0 else 0
-                    
-                    materials_data.append({
-                        'id': material.id,
-                        'title': material.title,
-                        'description': material.description,
-                        'image_url': transform_to_cdn_url(material.image_url) if material.image_url else None,
-                        'sessions_count': sessions_count,
-                        'progress': {
-                            'total_contents': total,
-                            'completed_contents': completed,
-                            'percentage': progress_percentage
-                        }
-                    })
-                    
-        except Exception as e:
-            print(f"[DASHBOARD] Error al obtener materiales: {e}")
-            import traceback
-            traceback.print_exc()
+        # Candidatos con grupos: solo lo asignado a sus grupos
+        dashboard = get_candidate_dashboard(user_id, entitlements=candidate_scope(get_current_identity()))
         
         return jsonify({
             'user': current_user.to_dict(),
-            'stats': {
-                'total_exams': total_exams,
-                'completed_exams': completed_exams,
-                'approved_exams': approved_exams,
-                'average_score': round(average_score, 1)
-            },
-            'exams': exams_data,
-            'materials': materials_data
+            'stats': dashboard['stats'],
+            'exams': dashboard['exams'],
+            'materials': dashboard['materials']
         }), 200
         
     except Exception as e:
@@ -495,10 +259,11 @@ def get_editor_dashboard():
         from app.models.exam import Exam
         from app.models.competency_standard import CompetencyStandard
         from app.models.study_content import StudyMaterial
+        from app.models.category import Category
         from sqlalchemy import func
+        from sqlalchemy.orm import joinedload
         
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
+        current_user = get_current_identity()
         
         if not current_user:
             return jsonify({'error': 'Usuario no encontrado'}), 404
@@ -507,10 +272,10 @@ def get_editor_dashboard():
         if current_user.role not in ['admin', 'editor']:
             return jsonify({'error': 'Acceso solo para editores'}), 403
         
-        # ===== ESTADÍSTICAS DE ESTÁNDARES (ECM) =====
-        total_standards = CompetencyStandard.query.count()
-        active_standards = CompetencyStandard.query.filter_by(is_active=True).count()
+        # ===== CONTADORES (snapshot en caché, una sola consulta) =====
+        snapshot = get_stats_snapshot()
         
+        # ===== ESTÁNDARES (ECM) =====
         # Estándares recientes (ordenados por updated_at, más reciente primero)
         recent_standards = CompetencyStandard.query.order_by(
             CompetencyStandard.updated_at.desc()
@@ -527,16 +292,23 @@ def get_editor_dashboard():
             'updated_at': s.updated_at.isoformat() if s.updated_at else None
         } for s in recent_standards]
         
-        # ===== ESTADÍSTICAS DE EXÁMENES =====
-        total_exams = Exam.query.count()
-        published_exams = Exam.query.filter_by(is_published=True).count()
-        draft_exams = Exam.query.filter_by(is_published=False).count()
-        
+        # ===== EXÁMENES =====
         # Exámenes recientes (ordenados por updated_at, más reciente primero)
-        recent_exams = Exam.query.order_by(
+        recent_exams = Exam.query.options(
+            joinedload(Exam.competency_standard)
+        ).order_by(
             Exam.updated_at.desc()
         ).limit(5).all()
         
+        # Conteo de categorías de los exámenes recientes en una sola query
+        recent_exam_ids = [e.id for e in recent_exams]
+        categories_by_exam = dict(db.session.query(
+            Category.exam_id,
+            func.count(Category.id)
+        ).filter(
+            Category.exam_id.in_(recent_exam_ids)
+        ).group_by(Category.exam_id).all()) if recent_exam_ids else {}
+        
         recent_exams_data = [{
             'id': e.id,
             'name': e.name,
@@ -544,7 +316,7 @@ def get_editor_dashboard():
             'is_published': e.is_published,
             'passing_score': e.passing_score,
             'duration_minutes': e.duration_minutes,
-            'total_categories': e.categories.count() if e.categories else 0,
+            'total_categories': categories_by_exam.get(e.id, 0),
             'created_at': e.created_at.isoformat() if e.created_at else None,
             'updated_at': e.updated_at.isoformat() if e.updated_at else None,
             'competency_standard': {
@@ -554,29 +326,18 @@ def get_editor_dashboard():
             } if e.competency_standard else None
         } for e in recent_exams]
         
-        # ===== ESTADÍSTICAS DE MATERIALES DE ESTUDIO =====
-        total_materials = StudyMaterial.query.count()
-        published_materials = StudyMaterial.query.filter_by(is_published=True).count()
-        draft_materials = StudyMaterial.query.filter_by(is_published=False).count()
-        
+        # ===== MATERIALES DE ESTUDIO =====
         # Materiales recientes (ordenados por updated_at, más reciente primero)
         recent_materials = StudyMaterial.query.order_by(
             StudyMaterial.updated_at.desc()
         ).limit(5).all()
         
+        # Agregados de sesiones/temas/tiempo en una sola pasada (evita N+1)
+        recent_summaries = get_material_summaries(m.id for m in recent_materials)
+        
         recent_materials_data = []
         for m in recent_materials:
-            # Calcular conteo de sesiones y temas
-            sessions_count = m.sessions.count() if m.sessions else 0
-            topics_count = 0
-            total_estimated_time = 0
-            if m.sessions:
-                for session in m.sessions.all():
-                    if session.topics:
-                        topics_count += session.topics.count()
-                        # Sumar tiempo estimado de cada tema
-                        for topic in session.topics.all():
-                            total_estimated_time += getattr(topic, 'estimated_time_minutes', 0) or 0
+            summary = recent_summaries.get(m.id, {})
             
             recent_materials_data.append({
                 'id': m.id,
@@ -584,48 +345,19 @@ def get_editor_dashboard():
                 'description': m.description,
                 'image_url': transform_to_cdn_url(m.image_url) if m.image_url else None,
                 'is_published': m.is_published,
-                'sessions_count': sessions_count,
-                'topics_count': topics_count,
-                'estimated_time_minutes': total_estimated_time,
+                'sessions_count': summary.get('sessions_count', 0),
+                'topics_count': summary.get('topics_count', 0),
+                'estimated_time_minutes': summary.get('estimated_time_minutes', 0),
                 'created_at': m.created_at.isoformat() if m.created_at else None,
                 'updated_at': m.updated_at.isoformat() if m.updated_at else None
             })
         
-        # ===== ESTADÍSTICAS DE PREGUNTAS =====
-        from app.models.question import Question, QuestionType
-        from app.models.topic import Topic
-        
-        total_questions = Question.query.count()
-        
-        # Contar preguntas por tipo usando un join con question_types
-        questions_by_type = db.session.query(
-            QuestionType.name,
-            func.count(Question.id)
-        ).join(Question, Question.question_type_id == QuestionType.id
-        ).group_by(QuestionType.name).all()
-        
-        questions_by_type_data = {qt_name: count for qt_name, count in questions_by_type}
-        
         # ===== RESUMEN RÁPIDO =====
         summary = {
-            'standards': {
-                'total': total_standards,
-                'active': active_standards
-            },
-            'exams': {
-                'total': total_exams,
-                'published': published_exams,
-                'draft': draft_exams
-            },
-            'materials': {
-                'total': total_materials,
-                'published': published_materials,
-                'draft': draft_materials
-            },
-            'questions': {
-                'total': total_questions,
-                'by_type': questions_by_type_data
-            }
+            'standards': snapshot['standards'],
+            'exams': snapshot['exams'],
+            'materials': snapshot['materials'],
+            'questions': snapshot['questions']
         }
         
         return jsonify({
@@ -0,0 +1,336 @@
+"""
+Recolector diferido de blobs (Blob GC)
+
+En lugar de borrar blobs de Azure dentro del request, las rutas registran una
+"lápida" (BlobTombstone) en la misma transacción que elimina o reemplaza la
+fila que los referenciaba. Un proceso en segundo plano (scripts/blob_gc_sweeper.py)
+los elimina en lote con la API de batch delete, con reintentos y backoff.
+Antes de cada lote se descartan (estado 'skipped') los blobs que otra fila
+sigue referenciando: los clones de materiales y exámenes copian las URLs tal cual.
+
+Además, reconcile_orphans() recorre el contenedor por prefijos y detecta blobs
+que ya no están referenciados por ninguna columna de la base de datos.
+"""
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, quote, unquote
+
+from sqlalchemy import or_
+
+from app import db
+from app.models.blob_tombstone import BlobTombstone
+
+# Límite de la API de batch delete de Azure Blob Storage
+BATCH_DELETE_LIMIT = 256
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+
+# Blobs más recientes que esto no se consideran huérfanos (uploads aún sin commit)
+ORPHAN_GRACE_HOURS = 24
+
+
+def parse_blob_url(blob_url):
+    """
+    Descomponer una URL de blob en (account_name, container_name, blob_name)
+
+    Returns:
+        tuple o None si la URL no es de Azure Blob Storage
+    """
+    if not blob_url or 'blob.core.windows.net' not in blob_url:
+        return None
+
+    from app.utils.cdn_helper import get_original_blob_url
+
+    base_url = get_original_blob_url(blob_url).split('?')[0]
+    parsed = urlparse(base_url)
+    parts = parsed.path.strip('/').split('/', 1)
+    if len(parts) < 2 or not parts[1]:
+        return None
+
+    account_name = parsed.netloc.split('.')[0]
+    return account_name, parts[0], unquote(parts[1])
+
+
+def enqueue_blob_deletion(blob_url, reason=None):
+    """
+    Registrar un blob para borrado diferido
+
+    No hace commit: la lápida se confirma junto con la transacción del llamador,
+    así el blob solo se borra si el cambio en la base de datos se confirmó.
+
+    Returns:
+        BlobTombstone o None si la URL no corresponde a Azure Blob Storage
+    """
+    parsed = parse_blob_url(blob_url)
+    if not parsed:
+        return None
+
+    account_name, container_name, blob_name = parsed
+    tombstone = BlobTombstone(
+        blob_url=blob_url.split('?')[0],
+        account_name=account_name,
+        container_name=container_name,
+        blob_name=blob_name,
+        reason=reason,
+        status=BlobTombstone.STATUS_PENDING,
+        attempts=0,
+        not_before=datetime.utcnow()
+    )
+    db.session.add(tombstone)
+    return tombstone
+
+
+def enqueue_blob_deletions(blob_urls, reason=None):
+    """Registrar varios blobs para borrado diferido (sin commit)"""
+    return [t for t in (enqueue_blob_deletion(url, reason) for url in blob_urls) if t]
+
+
+def _get_service_clients():
+    """Clientes de blob configurados, indexados por nombre de cuenta"""
+    from app.utils.azure_storage import azure_storage
+
+    clients = {}
+    for client in (azure_storage.blob_service_client, azure_storage.video_blob_client):
+        if client is not None:
+            clients[client.account_name] = client
+    return clients
+
+
+def _retry_delay(attempts):
+    """Backoff exponencial entre reintentos"""
+    return timedelta(seconds=RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+
+
+def sweep_tombstones(limit=1000, max_attempts=MAX_ATTEMPTS):
+    """
+    Eliminar en lote los blobs pendientes
+
+    Args:
+        limit: Máximo de lápidas a procesar en esta pasada
+        max_attempts: Intentos antes de marcar la lápida como fallida
+
+    Returns:
+        dict: {'processed', 'deleted', 'skipped', 'retried', 'failed'}
+    """
+    now = datetime.utcnow()
+    stats = {'processed': 0, 'deleted': 0, 'skipped': 0, 'retried': 0, 'failed': 0}
+
+    pending = BlobTombstone.query.filter(
+        BlobTombstone.status == BlobTombstone.STATUS_PENDING,
+        BlobTombstone.not_before <= now
+    ).order_by(BlobTombstone.id).limit(limit).all()
+
+    if not pending:
+        return stats
+
+    clients = _get_service_clients()
+
+    # Agrupar por (cuenta, contenedor) para usar batch delete
+    groups = {}
+    for tombstone in pending:
+        groups.setdefault((tombstone.account_name, tombstone.container_name), []).append(tombstone)
+
+    for (account_name, container_name), tombstones in groups.items():
+        client = clients.get(account_name)
+        if client is None:
+            # Cuenta no configurada en este proceso: reintentar más tarde
+            for tombstone in tombstones:
+                _mark_failure(tombstone, f'Cuenta {account_name} no configurada', now, max_attempts, stats)
+            continue
+
+        container_client = client.get_container_client(container_name)
+
+        for start in range(0, len(tombstones), BATCH_DELETE_LIMIT):
+            chunk = tombstones[start:start + BATCH_DELETE_LIMIT]
+
+            still_referenced = _still_referenced(chunk)
+            for tombstone in chunk:
+                if _tombstone_key(tombstone) in still_referenced:
+                    tombstone.status = BlobTombstone.STATUS_SKIPPED
+                    tombstone.last_error = 'Blob aún referenciado'
+                    stats['skipped'] += 1
+            chunk = [t for t in chunk if _tombstone_key(t) not in still_referenced]
+            if not chunk:
+                continue
+
+            try:
+                responses = list(container_client.delete_blobs(
+                    *[t.blob_name for t in chunk],
+                    raise_on_any_failure=False
+                ))
+            except Exception as e:
+                for tombstone in chunk:
+                    _mark_failure(tombstone, str(e), now, max_attempts, stats)
+                continue
+
+            for tombstone, response in zip(chunk, responses):
+                status_code = getattr(response, 'status_code', None)
+                # 202 = eliminado, 404 = ya no existía (idempotente)
+                if status_code in (200, 202, 404):
+                    tombstone.status = BlobTombstone.STATUS_DELETED
+                    tombstone.deleted_at = now
+                    tombstone.attempts += 1
+                    stats['deleted'] += 1
+                else:
+                    _mark_failure(tombstone, f'HTTP {status_code}', now, max_attempts, stats)
+
+    stats['processed'] = len(pending)
+    db.session.commit()
+    return stats
+
+
+def _mark_failure(tombstone, error, now, max_attempts, stats):
+    tombstone.attempts += 1
+    tombstone.last_error = error
+    if tombstone.attempts >= max_attempts:
+        tombstone.status = BlobTombstone.STATUS_FAILED
+        stats['failed'] += 1
+    else:
+        tombstone.not_before = now + _retry_delay(tombstone.attempts)
+        stats['retried'] += 1
+
+
+def _reference_columns():
+    """Columnas que guardan URLs de blobs"""
+    from app.models.exam import Exam
+    from app.models.exercise import ExerciseStep
+    from app.models.study_content import (
+        StudyMaterial,
+        StudyVideo,
+        StudyDownloadableExercise,
+        StudyInteractiveExerciseStep
+    )
+
+    return [
+        Exam.image_url,
+        ExerciseStep.image_url,
+        StudyMaterial.image_url,
+        StudyVideo.video_url,
+        StudyVideo.thumbnail_url,
+        StudyDownloadableExercise.file_url,
+        StudyInteractiveExerciseStep.image_url,
+    ]
+
+
+def _tombstone_key(tombstone):
+    return tombstone.account_name, tombstone.container_name, tombstone.blob_name
+
+
+def _like_pattern(value):
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _still_referenced(tombstones):
+    """
+    Claves (cuenta, contenedor, blob) de las lápidas que alguna fila sigue referenciando
+
+    Preselecciona por LIKE con el último segmento del nombre (tal cual y
+    codificado) y confirma comparando la URL descompuesta.
+    """
+    keys = {_tombstone_key(t) for t in tombstones}
+    patterns = set()
+    for _, _, blob_name in keys:
+        segment = blob_name.rsplit('/', 1)[-1]
+        patterns.update(_like_pattern(variant) for variant in (segment, quote(segment)))
+
+    referenced = set()
+    for column in _reference_columns():
+        rows = db.session.query(column).filter(
+            or_(*[column.like(pattern, escape='\\') for pattern in patterns])
+        )
+        for (url,) in rows:
+            parsed = parse_blob_url(url)
+            if parsed in keys:
+                referenced.add(parsed)
+    return referenced
+
+
+def _referenced_blob_names():
+    """
+    Conjunto de (cuenta, contenedor, blob) referenciados por la base de datos
+    """
+    referenced = set()
+    for column in _reference_columns():
+        rows = db.session.query(column).filter(
+            column.isnot(None),
+            column.like('%blob.core.windows.net%')
+        ).yield_per(1000)
+        for (url,) in rows:
+            parsed = parse_blob_url(url)
+            if parsed:
+                referenced.add(parsed)
+
+    # Blobs ya programados para borrado
+    for account_name, container_name, blob_name in db.session.query(
+        BlobTombstone.account_name, BlobTombstone.container_name, BlobTombstone.blob_name
+    ).filter(
+        BlobTombstone.status.notin_([BlobTombstone.STATUS_FAILED, BlobTombstone.STATUS_SKIPPED])
+    ).yield_per(1000):
+        referenced.add((account_name, container_name, blob_name))
+
+    return referenced
+
+
+def reconcile_orphans(prefixes, container_name=None, account_name=None,
+                      grace_hours=ORPHAN_GRACE_HOURS, enqueue=False, page_size=1000):
+    """
+    Buscar blobs huérfanos (sin referencia en la base de datos)
+
+    Solo deben incluirse prefijos cuyas referencias viven en columnas de URL
+    (p. ej. 'exercise-steps/', 'downloadables/'). Las imágenes referenciadas
+    dentro de HTML (lecturas, preguntas) no se pueden reconciliar así.
+
+    Args:
+        prefixes: Prefijos de blob a recorrer
+        container_name: Contenedor (default: contenedor general)
+        account_name: Cuenta (default: cuenta general)
+        grace_hours: Ignorar blobs modificados hace menos de estas horas
+        enqueue: Si es True, registra lápidas para los huérfanos encontrados
+        page_size: Tamaño de página del listado de blobs
+
+    Returns:
+        dict: {'scanned', 'orphans': [blob_name, ...], 'enqueued'}
+    """
+    from app.utils.azure_storage import azure_storage
+
+    clients = _get_service_clients()
+    if account_name is None and azure_storage.blob_service_client is not None:
+        account_name = azure_storage.blob_service_client.account_name
+    container_name = container_name or azure_storage.container_name
+
+    client = clients.get(account_name)
+    if client is None:
+        raise ValueError(f'Cuenta de almacenamiento {account_name} no configurada')
+
+    referenced = _referenced_blob_names()
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    container_client = client.get_container_client(container_name)
+
+    report = {'scanned': 0, 'orphans': [], 'enqueued': 0}
+    for prefix in prefixes:
+        pages = container_client.list_blobs(name_starts_with=prefix, results_per_page=page_size).by_page()
+        for page in pages:
+            for blob in page:
+                report['scanned'] += 1
+                last_modified = blob.last_modified.replace(tzinfo=None) if blob.last_modified else None
+                if last_modified and last_modified > cutoff:
+                    continue
+                if (account_name, container_name, blob.name) in referenced:
+                    continue
+                report['orphans'].append(blob.name)
+                if enqueue:
+                    db.session.add(BlobTombstone(
+                        blob_url=f'{container_client.url}/{blob.name}',
+                        account_name=account_name,
+                        container_name=container_name,
+                        blob_name=blob.name,
+                        reason='orphan_reconciliation',
+                        status=BlobTombstone.STATUS_PENDING,
+                        attempts=0,
+                        not_before=datetime.utcnow()
+                    ))
+                    report['enqueued'] += 1
+
+    if enqueue:
+        db.session.commit()
+    return report
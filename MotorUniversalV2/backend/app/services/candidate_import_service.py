@@ -0,0 +1,432 @@
+"""
+Motor de importación masiva de candidatos
+
+Procesa el Excel en streaming y por bloques:
+- openpyxl en modo read_only (no carga el libro completo en memoria)
+- Por bloque: una query IN para emails, una para CURPs y una para usernames
+- Hash de contraseñas en un pool de procesos acotado (utils.password_hashing)
+- INSERT en bloque y commit por bloque, con progreso tras cada bloque
+- Checkpoint (siguiente fila + resumen) en la misma transacción del bloque,
+  para reanudar una importación interrumpida sin duplicar ni perder filas
+- Las contraseñas generadas no van en el resumen ni en el checkpoint: se
+  entregan por bloque a credentials_callback (el handler las guarda como
+  archivo temporal del trabajo y arma la hoja de credenciales al final)
+
+Se ejecuta como trabajo en segundo plano (handler 'candidate_import' en
+services/job_handlers).
+"""
+import secrets
+import string
+import uuid
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.user import User
+from app.utils.helpers import validate_email, validate_password
+from app.utils.password_hashing import hash_passwords
+from app.services.user_search_service import index_user_rows
+
+IMPORT_CHUNK_SIZE = 500
+
+# Mapeo de nombres de columna esperados
+COLUMN_MAPPING = {
+    'email': ['email', 'correo', 'correo electronico', 'correo electrónico', 'e-mail'],
+    'nombre': ['nombre', 'name', 'nombres'],
+    'primer_apellido': ['primer_apellido', 'primer apellido', 'apellido paterno', 'apellido_paterno', 'first_surname', 'apellido1'],
+    'segundo_apellido': ['segundo_apellido', 'segundo apellido', 'apellido materno', 'apellido_materno', 'second_surname', 'apellido2'],
+    'genero': ['genero', 'género', 'sexo', 'gender'],
+    'curp': ['curp'],
+    'telefono': ['telefono', 'teléfono', 'phone', 'celular', 'cel'],
+    'password': ['password', 'contraseña', 'clave']
+}
+REQUIRED_COLUMNS = ['email', 'nombre', 'primer_apellido']
+
+
+class CandidateImportError(ValueError):
+    """El archivo no se puede importar (formato o columnas requeridas)"""
+
+
+def generate_password(length=10):
+    """Contraseña aleatoria con al menos una mayúscula, una minúscula y un número"""
+    alphabet = string.ascii_letters + string.digits
+    password = [
+        secrets.choice(string.ascii_uppercase),
+        secrets.choice(string.ascii_lowercase),
+        secrets.choice(string.digits)
+    ]
+    password += [secrets.choice(alphabet) for _ in range(length - 3)]
+    secrets.SystemRandom().shuffle(password)
+    return ''.join(password)
+
+
+def _column_indices(header_row):
+    headers = [str(value).strip().lower() if value else '' for value in header_row]
+    indices = {}
+    for field, aliases in COLUMN_MAPPING.items():
+        for i, header in enumerate(headers):
+            if header in aliases:
+                indices[field] = i
+                break
+    return indices
+
+
+def open_candidate_sheet(path):
+    """
+    Abrir el Excel en modo streaming y validar encabezados
+
+    Returns:
+        (workbook, sheet, column_indices, total_rows_estimado)
+
+    Raises:
+        CandidateImportError: si el archivo no se puede leer o faltan columnas
+    """
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(filename=path, read_only=True, data_only=True)
+        sheet = workbook.active
+        header_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
+    except Exception as e:
+        raise CandidateImportError(f'Error al leer el archivo Excel: {str(e)}')
+
+    if not header_row:
+        workbook.close()
+        raise CandidateImportError('El archivo está vacío')
+
+    indices = _column_indices(header_row)
+    missing = [col for col in REQUIRED_COLUMNS if col not in indices]
+    if missing:
+        workbook.close()
+        raise CandidateImportError(
+            f'Faltan columnas requeridas: {", ".join(missing)}. '
+            f'Las columnas requeridas son: email, nombre, primer_apellido'
+        )
+
+    total_rows = max((sheet.max_row or 1) - 1, 0)
+    return workbook, sheet, indices, total_rows
+
+
+def _iter_rows(sheet, indices, start_row=2):
+    """Generar (row_idx, dict) normalizando celdas a texto"""
+    for row_idx, values in enumerate(sheet.iter_rows(min_row=start_row, values_only=True), start=start_row):
+        if values is None or all(v is None or str(v).strip() == '' for v in values):
+            continue
+        row = {}
+        for field, idx in indices.items():
+            value = values[idx] if idx < len(values) else None
+            row[field] = str(value).strip() if value is not None else None
+        yield row_idx, row
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _existing_values(column, values):
+    """Valores que ya existen en users para una columna (una query IN)"""
+    values = [v for v in set(values) if v]
+    if not values:
+        return set()
+    return {v for (v,) in db.session.query(column).filter(column.in_(values)).all()}
+
+
+def _taken_usernames(bases, assigned):
+    """
+    Usernames ocupados que pueden chocar con las bases del bloque
+
+    Una query IN para las bases; solo para las que chocan se buscan los sufijos
+    existentes (base1, base2, ...) con LIKE 'base%'.
+    """
+    taken = _existing_values(User.username, bases) | (assigned & set(bases))
+    colliding = [b for b in set(bases) if b in taken]
+    for i in range(0, len(colliding), 50):
+        group = colliding[i:i + 50]
+        rows = db.session.query(User.username).filter(
+            db.or_(*[User.username.startswith(base, autoescape=True) for base in group])
+        ).all()
+        taken.update(username for (username,) in rows)
+    return taken | assigned
+
+
+def _validate_row(row_idx, row, summary, seen_emails, seen_curps):
+    """Normalizar y validar una fila; devuelve el dict listo o None si se descarta"""
+    email = row.get('email')
+    nombre = row.get('nombre')
+    primer_apellido = row.get('primer_apellido')
+
+    if not email or not nombre or not primer_apellido:
+        summary['errors'].append({
+            'row': row_idx,
+            'email': email or '(vacío)',
+            'error': 'Campos requeridos vacíos (email, nombre, primer_apellido)'
+        })
+        return None
+
+    email = email.lower().strip()
+    if not validate_email(email):
+        summary['errors'].append({'row': row_idx, 'email': email, 'error': 'Formato de email inválido'})
+        return None
+    if email in seen_emails:
+        summary['skipped'].append({'row': row_idx, 'email': email, 'reason': 'Email duplicado en el archivo'})
+        return None
+
+    curp = row.get('curp')
+    if curp:
+        curp = curp.upper().strip()
+        if len(curp) != 18:
+            summary['errors'].append({
+                'row': row_idx,
+                'email': email,
+                'error': 'CURP inválido: debe tener 18 caracteres'
+            })
+            return None
+        if curp in seen_curps:
+            summary['skipped'].append({'row': row_idx, 'email': email, 'reason': f'CURP {curp} duplicado en el archivo'})
+            return None
+
+    genero = row.get('genero')
+    if genero:
+        genero = genero.upper()[0]
+        if genero not in ['M', 'F', 'O']:
+            genero = None
+
+    password = row.get('password')
+    generated_password = None
+    if not password:
+        generated_password = generate_password()
+        password = generated_password
+    else:
+        is_valid, error_msg = validate_password(password)
+        if not is_valid:
+            summary['errors'].append({'row': row_idx, 'email': email, 'error': f'Contraseña inválida: {error_msg}'})
+            return None
+
+    seen_emails.add(email)
+    if curp:
+        seen_curps.add(curp)
+
+    return {
+        'row': row_idx,
+        'email': email,
+        'nombre': nombre,
+        'primer_apellido': primer_apellido,
+        'segundo_apellido': row.get('segundo_apellido') or None,
+        'genero': genero,
+        'curp': curp or None,
+        'telefono': row.get('telefono') or None,
+        'password': password,
+        'generated_password': generated_password
+    }
+
+
+def _insert_users(rows):
+    """
+    INSERT en bloque dentro de la transacción del bloque (sin commit)
+
+    Si otro proceso ganó una carrera, reintenta fila por fila con SAVEPOINT para
+    conservar las filas válidas del bloque.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(User), rows)
+        return rows, []
+    except IntegrityError:
+        pass
+
+    inserted, failed = [], []
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(User), [row])
+            inserted.append(row)
+        except IntegrityError as e:
+            failed.append((row, str(e.orig) if getattr(e, 'orig', None) else str(e)))
+    return inserted, failed
+
+
+def _process_chunk(chunk, summary, seen_emails, seen_curps, assigned_usernames, credentials):
+    """Validar, deduplicar contra la BD, hashear e insertar un bloque de filas
+
+    Las contraseñas generadas de los usuarios insertados se agregan a credentials
+    como {'row', 'password'} (el resumen solo indica password_generated).
+    """
+    candidates = []
+    for row_idx, row in chunk:
+        summary['total_processed'] += 1
+        candidate = _validate_row(row_idx, row, summary, seen_emails, seen_curps)
+        if candidate:
+            candidates.append(candidate)
+
+    if not candidates:
+        return
+
+    # Duplicados contra la base de datos: una query IN por columna
+    existing_emails = _existing_values(User.email, [c['email'] for c in candidates])
+    existing_curps = _existing_values(User.curp, [c['curp'] for c in candidates if c['curp']])
+
+    pending = []
+    for c in candidates:
+        if c['email'] in existing_emails:
+            summary['skipped'].append({'row': c['row'], 'email': c['email'], 'reason': 'Email ya registrado'})
+        elif c['curp'] and c['curp'] in existing_curps:
+            summary['skipped'].append({'row': c['row'], 'email': c['email'], 'reason': f"CURP {c['curp']} ya registrado"})
+        else:
+            pending.append(c)
+
+    if not pending:
+        return
+
+    # Usernames únicos: base = parte local del email, con sufijo numérico si está ocupado
+    bases = [c['email'].split('@')[0][:90] for c in pending]
+    taken = _taken_usernames(bases, assigned_usernames)
+    for c, base in zip(pending, bases):
+        username, counter = base, 1
+        while username in taken:
+            username = f"{base}{counter}"
+            counter += 1
+        taken.add(username)
+        assigned_usernames.add(username)
+        c['username'] = username
+
+    hashes = hash_passwords(c['password'] for c in pending)
+
+    now = datetime.utcnow()
+    rows = [{
+        'id': str(uuid.uuid4()),
+        'email': c['email'],
+        'username': c['username'],
+        'password_hash': password_hash,
+        'name': c['nombre'],
+        'first_surname': c['primer_apellido'],
+        'second_surname': c['segundo_apellido'],
+        'gender': c['genero'],
+        'curp': c['curp'],
+        'phone': c['telefono'],
+        'role': 'candidato',
+        'is_active': True,
+        'is_verified': False,
+        'created_at': now,
+        'updated_at': now
+    } for c, password_hash in zip(pending, hashes)]
+
+    inserted, failed = _insert_users(rows)
+    # Los INSERT de core no disparan los eventos de la sesión: indexar aquí para búsqueda
+    index_user_rows(inserted)
+    by_email = {c['email']: c for c in pending}
+
+    for row in inserted:
+        c = by_email[row['email']]
+        summary['created'].append({
+            'row': c['row'],
+            'email': c['email'],
+            'name': f"{c['nombre']} {c['primer_apellido']}",
+            'username': row['username'],
+            'password_generated': c['generated_password'] is not None
+        })
+        if c['generated_password']:
+            credentials.append({'row': c['row'], 'password': c['generated_password']})
+    for row, error in failed:
+        c = by_email[row['email']]
+        summary['errors'].append({'row': c['row'], 'email': c['email'], 'error': error})
+
+
+def new_summary():
+    return {'created': [], 'errors': [], 'skipped': [], 'total_processed': 0}
+
+
+def import_candidates(path, progress_callback=None, chunk_size=IMPORT_CHUNK_SIZE,
+                      resume_from=None, checkpoint_callback=None, credentials_callback=None):
+    """
+    Importar candidatos desde un archivo Excel
+
+    Args:
+        path: Ruta del archivo .xlsx
+        progress_callback: fn(processed, total, summary) llamada tras cada bloque
+        chunk_size: Filas por bloque (una transacción por bloque)
+        resume_from: Checkpoint {'next_row', 'summary'} de una ejecución anterior
+        checkpoint_callback: fn(checkpoint) llamada antes del commit de cada bloque,
+            para guardar el checkpoint en la misma transacción que los usuarios
+        credentials_callback: fn([{'row', 'password'}]) con las contraseñas generadas
+            del bloque, llamada antes del commit (misma transacción)
+
+    Returns:
+        dict: {'created', 'errors', 'skipped', 'total_processed'}
+
+    Raises:
+        CandidateImportError: si el archivo no es válido
+    """
+    workbook, sheet, indices, total_rows = open_candidate_sheet(path)
+
+    start_row = 2
+    summary = new_summary()
+    if resume_from:
+        start_row = resume_from.get('next_row') or start_row
+        summary = resume_from.get('summary') or summary
+
+    # Al reanudar, los duplicados contra filas anteriores se detectan contra la BD
+    seen_emails = {c['email'] for c in summary['created']}
+    seen_curps = set()
+    assigned_usernames = {c['username'] for c in summary['created']}
+
+    try:
+        for chunk in _chunks(_iter_rows(sheet, indices, start_row=start_row), chunk_size):
+            credentials = []
+            _process_chunk(chunk, summary, seen_emails, seen_curps, assigned_usernames, credentials)
+            if credentials and credentials_callback:
+                credentials_callback(credentials)
+            if checkpoint_callback:
+                checkpoint_callback({'next_row': chunk[-1][0] + 1, 'summary': summary})
+            db.session.commit()
+            if progress_callback:
+                progress_callback(summary['total_processed'], max(total_rows, summary['total_processed']), summary)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        workbook.close()
+
+    if summary['created']:
+        # Los INSERT en bloque no pasan por los eventos ORM del snapshot
+        from app.services.stats_snapshot_service import invalidate_stats_snapshot
+        invalidate_stats_snapshot()
+
+    return summary
+
+
+def build_credentials_workbook(created, passwords):
+    """
+    Hoja de credenciales de los usuarios creados (.xlsx en bytes)
+
+    Args:
+        created: summary['created'] de import_candidates
+        passwords: {fila: contraseña generada}
+
+    Se genera con openpyxl en modo write_only para no mantener el libro en memoria.
+    """
+    import io
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Credenciales')
+    sheet.append(['Fila', 'Nombre', 'Email', 'Usuario', 'Contraseña'])
+    for c in created:
+        sheet.append([
+            c['row'],
+            c['name'],
+            c['email'],
+            c['username'],
+            passwords.get(c['row']) or '(proporcionada en el archivo)'
+        ])
+
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
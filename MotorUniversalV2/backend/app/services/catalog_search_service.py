@@ -0,0 +1,548 @@
+"""
+Búsqueda en el catálogo (exámenes, materiales de estudio y estándares ECM)
+
+Cada worker mantiene en memoria un índice invertido del catálogo: texto sin
+HTML, en minúsculas y sin acentos, con un peso por campo (código ECM > título >
+descripción). El catálogo es chico (cientos de documentos), así que buscar en
+memoria evita los ILIKE '%term%' sobre columnas Text.
+
+Actualización incremental entre workers (Redis):
+    catalog_search:version   -> entero, se incrementa por cada commit que cambia el catálogo
+    catalog_search:changes   -> sorted set {'exam:12': versión del último cambio}
+
+Al buscar, si la versión de Redis es mayor que la del índice local, se
+reindexan solo los documentos con cambios posteriores. Sin Redis, el worker
+aplica sus propios cambios y reconstruye todo cada CATALOG_SEARCH_TTL segundos.
+
+Búsqueda: todos los términos deben coincidir (exacto, prefijo o con un error
+de tipeo) y el resultado trae conteos por tipo, estado de publicación y ECM.
+"""
+import html
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from app import db
+from app.services.user_search_service import normalize
+from app.utils.cache_utils import get_redis_client
+
+VERSION_KEY = 'catalog_search:version'
+CHANGES_KEY = 'catalog_search:changes'
+
+# INCR de la versión y ZADD de los cambios en un solo paso: un lector nunca ve la
+# versión nueva sin sus cambios (y los saltaría para siempre)
+_PUBLISH_CHANGES = """
+local version = redis.call('INCR', KEYS[1])
+for i = 1, #ARGV do
+    redis.call('ZADD', KEYS[2], version, ARGV[i])
+end
+return version
+"""
+
+CATALOG_SEARCH_TTL = int(os.getenv('CATALOG_SEARCH_TTL', 3600))  # reconstrucción completa (segundos)
+VERSION_CHECK_SECONDS = 2  # como mucho un GET a Redis cada 2 s por worker
+
+DOC_TYPES = ('exam', 'material', 'standard')
+MAX_QUERY_TERMS = 6
+
+# Pesos por campo
+WEIGHT_CODE = 5
+WEIGHT_TITLE = 3
+WEIGHT_DESCRIPTION = 1
+
+# Factor del puntaje según el tipo de coincidencia
+MATCH_EXACT = 1.0
+MATCH_PREFIX = 0.7
+MATCH_FUZZY = 0.4
+
+STOPWORDS = frozenset((
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'que', 'se', 'su', 'un', 'una', 'y'
+))
+
+_TAGS = re.compile(r'<[^>]+>')
+_WORD_SPLIT = re.compile(r'[^a-z0-9]+')
+
+_index = None
+_index_lock = threading.RLock()
+_events_registered = False
+
+
+def strip_html(value):
+    """Texto visible de un campo con HTML"""
+    if not value:
+        return ''
+    return html.unescape(_TAGS.sub(' ', str(value)))
+
+
+def tokenize(value):
+    """Palabras normalizadas sin stopwords"""
+    return [w for w in _WORD_SPLIT.split(normalize(strip_html(value))) if len(w) > 1 and w not in STOPWORDS]
+
+
+def edit_distance(a, b, limit):
+    """Distancia de Levenshtein, o limit + 1 si la supera (corta en cuanto la fila excede el límite)"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _typo_limit(term):
+    """Errores tolerados según el largo del término"""
+    if len(term) >= 8:
+        return 2
+    if len(term) >= 4:
+        return 1
+    return 0
+
+
+# ==================== DOCUMENTOS ====================
+
+def _exam_doc(exam, standards):
+    standard = standards.get(exam.competency_standard_id)
+    ecm = standard['code'] if standard else (exam.standard or None)
+    fields = [
+        (exam.name, WEIGHT_TITLE),
+        (exam.description, WEIGHT_DESCRIPTION),
+        (ecm, WEIGHT_CODE),
+        (standard['name'] if standard else None, WEIGHT_DESCRIPTION),
+    ]
+    return {
+        'type': 'exam',
+        'id': exam.id,
+        'title': exam.name,
+        'is_published': bool(exam.is_published),
+        'ecm': ecm,
+    }, fields
+
+
+def _material_doc(material, exam_ecm):
+    ecm = exam_ecm.get(material.exam_id)
+    return {
+        'type': 'material',
+        'id': material.id,
+        'title': material.title,
+        'is_published': bool(material.is_published),
+        'ecm': ecm,
+    }, [
+        (material.title, WEIGHT_TITLE),
+        (material.description, WEIGHT_DESCRIPTION),
+        (ecm, WEIGHT_CODE),
+    ]
+
+
+def _standard_doc(standard):
+    return {
+        'type': 'standard',
+        'id': standard.id,
+        'title': standard.name,
+        # Los ECM no se publican: activo equivale a visible para candidatos
+        'is_published': bool(standard.is_active),
+        'ecm': standard.code,
+    }, [
+        (standard.code, WEIGHT_CODE),
+        (standard.name, WEIGHT_TITLE),
+        (standard.description, WEIGHT_DESCRIPTION),
+        (standard.sector, WEIGHT_DESCRIPTION),
+    ]
+
+
+def load_documents(keys=None):
+    """
+    Documentos del catálogo desde la base de datos
+
+    Args:
+        keys: conjunto de ('exam'|'material'|'standard', id) o None para todo el catálogo
+
+    Returns:
+        dict {(tipo, id): (metadatos, [(texto, peso)])}; las claves pedidas que
+        ya no existen no aparecen (el llamador las elimina del índice)
+    """
+    from app.models.exam import Exam
+    from app.models.study_content import StudyMaterial
+    from app.models.competency_standard import CompetencyStandard
+
+    def ids_of(doc_type):
+        return None if keys is None else [i for t, i in keys if t == doc_type]
+
+    standards = {
+        s.id: {'code': s.code, 'name': s.name}
+        for s in db.session.query(CompetencyStandard.id, CompetencyStandard.code, CompetencyStandard.name)
+    }
+    docs = {}
+
+    exam_ids = ids_of('exam')
+    standard_ids = ids_of('standard')
+    if keys is not None and standard_ids:
+        # El código ECM forma parte del texto de sus exámenes
+        exam_ids += [row.id for row in db.session.query(Exam.id).filter(
+            Exam.competency_standard_id.in_(standard_ids)
+        )]
+
+    exam_columns = (Exam.id, Exam.name, Exam.description, Exam.standard, Exam.competency_standard_id, Exam.is_published)
+    if exam_ids is None or exam_ids:
+        query = db.session.query(*exam_columns)
+        if exam_ids is not None:
+            query = query.filter(Exam.id.in_(set(exam_ids)))
+        for exam in query:
+            meta, fields = _exam_doc(exam, standards)
+            docs[('exam', exam.id)] = (meta, fields)
+
+    material_ids = ids_of('material')
+    if keys is not None and exam_ids:
+        # El ECM de un material es el de su examen
+        material_ids += [row.id for row in db.session.query(StudyMaterial.id).filter(
+            StudyMaterial.exam_id.in_(set(exam_ids))
+        )]
+    if material_ids is None or material_ids:
+        query = db.session.query(
+            StudyMaterial.id, StudyMaterial.title, StudyMaterial.description,
+            StudyMaterial.exam_id, StudyMaterial.is_published
+        )
+        if material_ids is not None:
+            query = query.filter(StudyMaterial.id.in_(set(material_ids)))
+        materials = query.all()
+        linked_exams = {m.exam_id for m in materials if m.exam_id}
+        exam_ecm = {}
+        if linked_exams:
+            for exam in db.session.query(*exam_columns).filter(Exam.id.in_(linked_exams)):
+                exam_ecm[exam.id] = _exam_doc(exam, standards)[0]['ecm']
+        for material in materials:
+            docs[('material', material.id)] = _material_doc(material, exam_ecm)
+
+    if standard_ids is None or standard_ids:
+        query = CompetencyStandard.query
+        if standard_ids is not None:
+            query = query.filter(CompetencyStandard.id.in_(standard_ids))
+        for standard in query:
+            docs[('standard', standard.id)] = _standard_doc(standard)
+
+    return docs
+
+
+# ==================== ÍNDICE ====================
+
+class CatalogIndex:
+    """Índice invertido en memoria: token -> {clave de documento: peso}"""
+
+    def __init__(self, version=0):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.checked_at = self.built_at
+        self.docs = {}
+        self.postings = defaultdict(dict)
+        self.doc_tokens = {}
+        self._sorted_tokens = None
+        self._fuzzy_cache = {}
+        self.pending = set()  # cambios de este worker sin Redis (se aplican en get_index)
+
+    def add(self, key, meta, fields):
+        self.remove(key)
+        weights = {}
+        for text, weight in fields:
+            for token in tokenize(text):
+                if weights.get(token, 0) < weight:
+                    weights[token] = weight
+        for token, weight in weights.items():
+            self.postings[token][key] = weight
+        self.docs[key] = meta
+        self.doc_tokens[key] = tuple(weights)
+        self._sorted_tokens = None
+        self._fuzzy_cache = {}
+
+    def remove(self, key):
+        for token in self.doc_tokens.pop(key, ()):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[token]
+        self.docs.pop(key, None)
+        self._sorted_tokens = None
+        self._fuzzy_cache = {}
+
+    def apply(self, keys, documents):
+        """Reemplazar los documentos de `keys` (los que ya no existen se eliminan)"""
+        for key in keys:
+            if key not in documents:
+                self.remove(key)
+        for key, (meta, fields) in documents.items():
+            self.add(key, meta, fields)
+
+    def _tokens(self):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        return self._sorted_tokens
+
+    def _prefixed(self, term):
+        tokens = self._tokens()
+        i = bisect_left(tokens, term)
+        while i < len(tokens) and tokens[i].startswith(term):
+            yield tokens[i]
+            i += 1
+
+    def _fuzzy(self, term):
+        """Tokens a distancia de edición tolerable (memoizado hasta el siguiente cambio)"""
+        cached = self._fuzzy_cache.get(term)
+        if cached is not None:
+            return cached
+        limit = _typo_limit(term)
+        found = []
+        if limit:
+            for token in self.postings:
+                if abs(len(token) - len(term)) <= limit and edit_distance(term, token, limit) <= limit:
+                    found.append(token)
+        self._fuzzy_cache[term] = found
+        return found
+
+    def match_term(self, term):
+        """
+        Documentos que coinciden con un término
+
+        Returns:
+            ({clave: puntaje}, corrección o None)
+        """
+        scores = {}
+
+        def collect(tokens, factor):
+            for token in tokens:
+                for key, weight in self.postings.get(token, {}).items():
+                    score = weight * factor
+                    if scores.get(key, 0) < score:
+                        scores[key] = score
+
+        collect([term] if term in self.postings else [], MATCH_EXACT)
+        collect([t for t in self._prefixed(term) if t != term], MATCH_PREFIX)
+        if scores:
+            return scores, None
+
+        fuzzy = self._fuzzy(term)
+        collect(fuzzy, MATCH_FUZZY)
+        correction = None
+        if fuzzy:
+            correction = min(fuzzy, key=lambda t: (edit_distance(term, t, _typo_limit(term)), -len(self.postings[t])))
+        return scores, correction
+
+
+def build_index(version=0):
+    """Índice completo del catálogo"""
+    index = CatalogIndex(version)
+    for key, (meta, fields) in load_documents().items():
+        index.add(key, meta, fields)
+    print(f"[CATALOG-SEARCH] Índice construido: {len(index.docs)} documentos, {len(index.postings)} tokens")
+    return index
+
+
+def _redis_version(redis_client):
+    value = redis_client.get(VERSION_KEY)
+    return int(value) if value is not None else 0
+
+
+def get_index():
+    """Índice del worker, sincronizado con los cambios publicados en Redis"""
+    global _index
+    with _index_lock:
+        now = time.monotonic()
+        if _index is not None and now - _index.built_at > CATALOG_SEARCH_TTL:
+            _index = None
+
+        redis_client = None
+        try:
+            redis_client = get_redis_client()
+        except Exception:
+            pass
+
+        if _index is None:
+            version = 0
+            if redis_client is not None:
+                try:
+                    version = _redis_version(redis_client)
+                except Exception as e:
+                    print(f"[CATALOG-SEARCH] Warning: versión sin Redis: {e}")
+            _index = build_index(version)
+            return _index
+
+        if _index.pending:
+            keys, _index.pending = _index.pending, set()
+            _index.apply(keys, load_documents(keys))
+
+        if redis_client is not None and now - _index.checked_at >= VERSION_CHECK_SECONDS:
+            _index.checked_at = now
+            try:
+                version = _redis_version(redis_client)
+                if version > _index.version:
+                    changed = redis_client.zrangebyscore(CHANGES_KEY, f'({_index.version}', version)
+                    keys = set()
+                    for member in changed:
+                        member = member.decode() if isinstance(member, bytes) else member
+                        doc_type, doc_id = member.split(':', 1)
+                        keys.add((doc_type, int(doc_id)))
+                    if keys:
+                        _index.apply(keys, load_documents(keys))
+                    _index.version = version
+            except Exception as e:
+                print(f"[CATALOG-SEARCH] Warning: no se pudieron aplicar cambios: {e}")
+        return _index
+
+
+def publish_changes(keys):
+    """Registrar documentos modificados (después del commit)"""
+    if not keys:
+        return
+    redis_client = None
+    try:
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            redis_client.eval(_PUBLISH_CHANGES, 2, VERSION_KEY, CHANGES_KEY, *[f'{t}:{i}' for t, i in keys])
+    except Exception as e:
+        print(f"[CATALOG-SEARCH] Warning: no se pudieron publicar cambios: {e}")
+        redis_client = None
+
+    # Sin Redis el worker aplica sus propios cambios en la siguiente búsqueda
+    # (en after_commit la sesión no puede consultar la base de datos)
+    if redis_client is None:
+        with _index_lock:
+            if _index is not None:
+                _index.pending.update(keys)
+
+
+# ==================== BÚSQUEDA ====================
+
+def query_terms(q):
+    terms = []
+    for term in tokenize(q):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def match_documents(q, types=None, published_only=False):
+    """
+    Documentos que coinciden con todos los términos
+
+    Returns:
+        (lista de (clave, puntaje) ordenada por relevancia, {término: corrección},
+         {clave: metadatos})
+    """
+    terms = query_terms(q)
+    if not terms:
+        return [], {}, {}
+
+    index = get_index()
+    with _index_lock:
+        combined, corrections = None, {}
+        for term in terms:
+            scores, correction = index.match_term(term)
+            if correction:
+                corrections[term] = correction
+            if combined is None:
+                combined = scores
+            else:
+                combined = {key: combined[key] + score for key, score in scores.items() if key in combined}
+            if not combined:
+                break
+
+        results = []
+        for key, score in (combined or {}).items():
+            meta = index.docs.get(key)
+            if meta is None:
+                continue
+            if types and meta['type'] not in types:
+                continue
+            if published_only and not meta['is_published']:
+                continue
+            results.append((key, score, meta))
+
+    results.sort(key=lambda r: (-r[1], r[2]['title'] or '', r[0][1]))
+    return [(key, score) for key, score, _ in results], corrections, {key: meta for key, _, meta in results}
+
+
+def matching_ids(doc_type, q, published_only=False, limit=1000):
+    """IDs del tipo dado que coinciden con la búsqueda (para filtrar listados con IN)"""
+    matches, _, _ = match_documents(q, types=(doc_type,), published_only=published_only)
+    return [key[1] for key, _ in matches[:limit]]
+
+
+def search_catalog(q, types=None, published_only=False, is_published=None, ecm=None, page=1, per_page=20):
+    """
+    Búsqueda unificada con facetas
+
+    Las facetas se cuentan sobre todas las coincidencias del texto (respetando
+    tipos y visibilidad), antes de aplicar los filtros is_published y ecm.
+    """
+    matches, corrections, metas = match_documents(q, types=types, published_only=published_only)
+
+    facets = {'type': defaultdict(int), 'is_published': defaultdict(int), 'ecm': defaultdict(int)}
+    filtered = []
+    for key, score in matches:
+        meta = metas[key]
+        facets['type'][meta['type']] += 1
+        facets['is_published']['true' if meta['is_published'] else 'false'] += 1
+        if meta['ecm']:
+            facets['ecm'][meta['ecm']] += 1
+        if is_published is not None and meta['is_published'] != is_published:
+            continue
+        if ecm and (meta['ecm'] or '').lower() != ecm.lower():
+            continue
+        filtered.append(dict(meta, score=round(score, 2)))
+
+    start = (page - 1) * per_page
+    return {
+        'results': filtered[start:start + per_page],
+        'total': len(filtered),
+        'pages': (len(filtered) + per_page - 1) // per_page,
+        'current_page': page,
+        'facets': {name: dict(counts) for name, counts in facets.items()},
+        'corrections': corrections,
+    }
+
+
+# ==================== EVENTOS ====================
+
+def register_catalog_search_events():
+    """Publicar los documentos del catálogo modificados al confirmar la transacción"""
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+
+    from app.models.exam import Exam
+    from app.models.study_content import StudyMaterial
+    from app.models.competency_standard import CompetencyStandard
+
+    doc_types = {Exam: 'exam', StudyMaterial: 'material', CompetencyStandard: 'standard'}
+
+    @event.listens_for(db.session, 'after_flush')
+    def _track_catalog_documents(session, flush_context):
+        changed = session.info.setdefault('catalog_search_changed', set())
+        for obj in list(session.new) + list(session.deleted):
+            doc_type = doc_types.get(type(obj))
+            if doc_type:
+                changed.add((doc_type, obj.id))
+        for obj in session.dirty:
+            doc_type = doc_types.get(type(obj))
+            if doc_type and session.is_modified(obj, include_collections=False):
+                changed.add((doc_type, obj.id))
+
+    @event.listens_for(db.session, 'after_commit')
+    def _publish_on_commit(session):
+        changed = session.info.pop('catalog_search_changed', None)
+        if changed:
+            publish_changes(changed)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _reset_on_rollback(session):
+        session.info.pop('catalog_search_changed', None)
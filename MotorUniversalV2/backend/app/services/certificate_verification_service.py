@@ -0,0 +1,286 @@
+"""
+Caché de la verificación pública de certificados CONOCER
+
+/api/conocer/verify/<folio> es público y lo consultan verificadores externos
+en volumen (incluidos folios inventados). Antes de ir a la BD:
+
+1. Filtro de Bloom de los folios emitidos (bitmap en Redis): si dice que el
+   folio no existe, se responde 404 sin consultar nada más
+2. Payload público en Redis por folio, con TTL; los folios inexistentes que
+   pasan el filtro (falsos positivos) se guardan como negativos con TTL corto
+
+    conocer:verify:{folio}      -> JSON del payload público o NEGATIVE
+    conocer:verify-gen:{folio}  -> generación del folio (INCR en cada invalidación)
+    conocer:verify:bloom        -> bitmap de BLOOM_BITS bits + bit centinela
+
+Las llaves usan el folio normalizado (strip().upper()), igual que el filtro,
+para que las variantes de mayúsculas compartan entrada y la invalidación las
+alcance.
+
+El bit centinela (posición BLOOM_BITS) se enciende al terminar de construir el
+filtro (scripts/rebuild_conocer_verification_bloom.py). Si Redis desaloja el
+bitmap, el centinela vuelve a 0 y el filtro se ignora en lugar de dar falsos
+negativos.
+
+Las altas, bajas y cambios de ConocerCertificate (archivar, revocar, editar)
+borran el caché del folio y agregan los folios nuevos al filtro al confirmar
+la transacción. Los INSERT de core (ingesta masiva) llaman a
+mark_verification_changed().
+
+La invalidación incrementa la generación del folio; verify_certificate la lee
+antes de consultar la BD y solo guarda el payload (o el negativo) si no cambió
+(WATCH/MULTI). Así una lectura anterior a una revocación o a una emisión no
+vuelve a escribir el estado viejo después de que se borró el caché.
+"""
+import hashlib
+import json
+from datetime import date
+
+from redis.exceptions import WatchError
+from sqlalchemy import event
+from sqlalchemy import inspect as sa_inspect
+
+from app import db
+from app.models.conocer_certificate import ConocerCertificate
+from app.utils.cache_utils import get_redis_client
+
+PAYLOAD_KEY = 'conocer:verify:{}'
+GENERATION_KEY = 'conocer:verify-gen:{}'
+BLOOM_KEY = 'conocer:verify:bloom'
+PAYLOAD_TTL_SECONDS = 600
+NEGATIVE_TTL_SECONDS = 300
+NEGATIVE = '0'
+MAX_NUMBER_LENGTH = 50  # Longitud de conocer_certificates.certificate_number
+
+# 2^24 bits (2 MB) y 7 funciones hash: ~1% de falsos positivos con 1.5M folios
+BLOOM_BITS = 1 << 24
+BLOOM_HASHES = 7
+BLOOM_SENTINEL = BLOOM_BITS
+
+# Columnas que forman el payload público
+PUBLIC_COLUMNS = (
+    'certificate_number', 'standard_code', 'standard_name', 'issue_date', 'expiration_date',
+    'status', 'evaluation_center_name', 'verification_url'
+)
+
+_events_registered = False
+
+
+def _normalize(certificate_number):
+    """Folio tal como se usa en el filtro y en las llaves de caché"""
+    return certificate_number.strip().upper()
+
+
+def _bloom_positions(certificate_number):
+    """Posiciones del folio en el filtro (doble hash sobre blake2b)"""
+    digest = hashlib.blake2b(_normalize(certificate_number).encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:], 'big') | 1
+    return [(h1 + i * h2) % BLOOM_BITS for i in range(BLOOM_HASHES)]
+
+
+def public_payload(certificate):
+    """Información pública del certificado (sin is_expired, que se calcula al responder)"""
+    return {
+        'valid': True,
+        'certificate_number': certificate.certificate_number,
+        'standard_code': certificate.standard_code,
+        'standard_name': certificate.standard_name,
+        'issue_date': certificate.issue_date.isoformat() if certificate.issue_date else None,
+        'expiration_date': certificate.expiration_date.isoformat() if certificate.expiration_date else None,
+        'status': certificate.status,
+        'evaluation_center_name': certificate.evaluation_center_name,
+        'verification_url': certificate.verification_url
+    }
+
+
+def _with_expiry(payload):
+    expiration = payload.get('expiration_date')
+    payload['is_expired'] = bool(expiration) and date.fromisoformat(expiration) < date.today()
+    return payload
+
+
+def _store(redis_client, number, value, ttl, generation):
+    """Guardar el caché del folio solo si no hubo invalidaciones desde que se leyó generation"""
+    generation_key = GENERATION_KEY.format(number)
+    with redis_client.pipeline() as pipe:
+        try:
+            pipe.watch(generation_key)
+            if pipe.get(generation_key) != generation:
+                return False
+            pipe.multi()
+            pipe.set(PAYLOAD_KEY.format(number), value, ex=ttl)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+def verify_certificate(certificate_number):
+    """
+    Payload público del folio o None si no existe
+
+    Returns:
+        (payload o None, origen) con origen 'invalid', 'bloom', 'cache' o 'db'
+    """
+    if not certificate_number or len(certificate_number) > MAX_NUMBER_LENGTH:
+        return None, 'invalid'
+
+    redis_client = get_redis_client()
+    number = _normalize(certificate_number)
+    generation = None
+
+    if redis_client is not None:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.getbit(BLOOM_KEY, BLOOM_SENTINEL)
+            for position in _bloom_positions(number):
+                pipe.getbit(BLOOM_KEY, position)
+            # La generación se lee antes que la BD: una invalidación posterior la incrementa
+            pipe.get(GENERATION_KEY.format(number))
+            pipe.get(PAYLOAD_KEY.format(number))
+            sentinel, *bits, generation, cached = pipe.execute()
+        except Exception as e:
+            print(f"[CONOCER-VERIFY] Warning: caché no disponible: {e}")
+            redis_client = None
+        else:
+            if sentinel and not all(bits):
+                return None, 'bloom'
+            if cached is not None:
+                cached = cached.decode() if isinstance(cached, bytes) else cached
+                return (None if cached == NEGATIVE else _with_expiry(json.loads(cached))), 'cache'
+
+    certificate = ConocerCertificate.query.filter_by(certificate_number=certificate_number).first()
+    payload = public_payload(certificate) if certificate else None
+
+    if redis_client is not None:
+        try:
+            if payload:
+                _store(redis_client, number, json.dumps(payload), PAYLOAD_TTL_SECONDS, generation)
+            else:
+                _store(redis_client, number, NEGATIVE, NEGATIVE_TTL_SECONDS, generation)
+        except Exception as e:
+            print(f"[CONOCER-VERIFY] Warning: no se pudo guardar en caché: {e}")
+
+    return (_with_expiry(payload) if payload else None), 'db'
+
+
+def add_to_bloom(certificate_numbers, redis_client=None, pipe=None):
+    """Encender los bits de los folios (si se pasa pipe, no se ejecuta)"""
+    own_pipe = pipe is None
+    if own_pipe:
+        redis_client = redis_client or get_redis_client()
+        if redis_client is None:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+    for number in certificate_numbers:
+        for position in _bloom_positions(number):
+            pipe.setbit(BLOOM_KEY, position, 1)
+    if own_pipe:
+        pipe.execute()
+
+
+def rebuild_bloom(batch_size=5000, reset=False, progress_callback=None):
+    """
+    Construir el filtro con todos los folios emitidos y encender el centinela
+
+    Sin reset solo se encienden bits (las altas concurrentes no se pierden);
+    con reset se borra antes, para limpiar folios eliminados.
+
+    Returns:
+        int: folios agregados
+    """
+    redis_client = get_redis_client()
+    if redis_client is None:
+        raise RuntimeError('El filtro de verificación requiere Redis')
+
+    if reset:
+        redis_client.delete(BLOOM_KEY)
+
+    total, batch = 0, []
+    query = db.session.query(ConocerCertificate.certificate_number).order_by(ConocerCertificate.id)
+    for (number,) in query.yield_per(batch_size):
+        batch.append(number)
+        if len(batch) >= batch_size:
+            add_to_bloom(batch, redis_client)
+            total += len(batch)
+            batch = []
+            if progress_callback:
+                progress_callback(total)
+    if batch:
+        add_to_bloom(batch, redis_client)
+        total += len(batch)
+
+    redis_client.setbit(BLOOM_KEY, BLOOM_SENTINEL, 1)
+    return total
+
+
+def bloom_ready():
+    """True si el filtro está construido (centinela encendido)"""
+    redis_client = get_redis_client()
+    return bool(redis_client is not None and redis_client.getbit(BLOOM_KEY, BLOOM_SENTINEL))
+
+
+def invalidate_verification(certificate_numbers, added=()):
+    """Borrar el caché (positivo o negativo) de los folios, subir su generación y agregar los nuevos al filtro"""
+    try:
+        redis_client = get_redis_client()
+        if redis_client is None:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        for number in {_normalize(number) for number in certificate_numbers}:
+            pipe.incr(GENERATION_KEY.format(number))
+            pipe.expire(GENERATION_KEY.format(number), PAYLOAD_TTL_SECONDS)
+            pipe.delete(PAYLOAD_KEY.format(number))
+        add_to_bloom(added, pipe=pipe)
+        pipe.execute()
+    except Exception as e:
+        print(f"[CONOCER-VERIFY] Warning: no se pudo invalidar el caché: {e}")
+
+
+def mark_verification_changed(certificate_numbers, added=False, session=None):
+    """Marcar folios para invalidar al confirmar (INSERT/UPDATE de core sin eventos ORM)"""
+    session = session or db.session
+    changed = session.info.setdefault('conocer_verification_changed', {'changed': set(), 'added': set()})
+    changed['changed'].update(certificate_numbers)
+    if added:
+        changed['added'].update(certificate_numbers)
+
+
+def register_verification_events():
+    """Invalidar el caché de verificación al confirmar cambios de certificados"""
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+
+    @event.listens_for(db.session, 'after_flush')
+    def _track_certificate_changes(session, flush_context):
+        for obj in session.new:
+            if isinstance(obj, ConocerCertificate):
+                mark_verification_changed([obj.certificate_number], added=True, session=session)
+        for obj in session.deleted:
+            if isinstance(obj, ConocerCertificate):
+                mark_verification_changed([obj.certificate_number], session=session)
+        for obj in session.dirty:
+            if not isinstance(obj, ConocerCertificate):
+                continue
+            state = sa_inspect(obj)
+            if not any(state.attrs[column].history.has_changes() for column in PUBLIC_COLUMNS):
+                continue
+            history = state.attrs.certificate_number.history
+            mark_verification_changed(
+                list(history.deleted or ()) + [obj.certificate_number],
+                added=bool(history.deleted),
+                session=session
+            )
+
+    @event.listens_for(db.session, 'after_commit')
+    def _invalidate_on_commit(session):
+        changed = session.info.pop('conocer_verification_changed', None)
+        if changed and changed['changed']:
+            invalidate_verification(changed['changed'], changed['added'])
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _reset_on_rollback(session):
+        session.info.pop('conocer_verification_changed', None)
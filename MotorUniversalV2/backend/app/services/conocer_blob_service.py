@@ -3,9 +3,11 @@ Servicio de Azure Blob Storage para Certificados CONOCER
 Gestiona el almacenamiento, descarga y lifecycle de los certificados
 """
 import os
+import re
 import hashlib
+from urllib.parse import unquote
 from datetime import datetime, timedelta
-from typing import Optional, BinaryIO, Tuple
+from typing import Optional, BinaryIO, Iterator, Tuple
 
 # Lazy imports para evitar errores cuando no hay conexión
 BlobServiceClient = None
@@ -42,6 +44,59 @@ def _lazy_load_azure():
         ContentSettings = CS
 
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Caracteres permitidos en valores de etiquetas de índice de Azure
+_TAG_INVALID_CHARS = re.compile(r'[^A-Za-z0-9 +\-./:=_]')
+
+
+def _tag_value(value) -> str:
+    return _TAG_INVALID_CHARS.sub('', str(value or ''))[:256]
+
+
+def _tier_name(tier) -> Optional[str]:
+    """'Cool', 'Archive', ... (el SDK puede devolver enum o str)"""
+    if tier is None:
+        return None
+    return getattr(tier, 'value', None) or str(tier).split('.')[-1]
+
+
+def certificate_blob_name(user_id: str, certificate_number: str, standard_code: str) -> str:
+    """Ruta del certificado: {user_id}/{standard_code}_{certificate_number}.pdf"""
+    return f"{user_id}/{standard_code}_{certificate_number}.pdf"
+
+
+def certificate_tags(user_id: str, standard_code: str) -> dict:
+    """Etiquetas de índice del blob (consultables con find_blobs_by_tags)"""
+    return {'user_id': _tag_value(user_id), 'standard_code': _tag_value(standard_code)}
+
+
+def _stream_blob(blob_client, properties, select_range=None) -> Tuple[Iterator[bytes], dict]:
+    """Descarga por bloques (chunks()) del blob o de un rango, fijada al ETag leído"""
+    from azure.core import MatchConditions
+    
+    byte_range = select_range(properties.size, properties.etag) if select_range else None
+    offset, length = byte_range if byte_range else (None, None)
+    
+    # IfNotModified: si el blob cambia entre las propiedades y la descarga,
+    # falla en lugar de enviar un Content-Length que no corresponde
+    downloader = blob_client.download_blob(
+        offset=offset,
+        length=length,
+        etag=properties.etag,
+        match_condition=MatchConditions.IfNotModified
+    )
+    
+    return downloader.chunks(), {
+        'size': properties.size,
+        'offset': offset or 0,
+        'length': length if length is not None else properties.size,
+        'etag': properties.etag,
+        'content_type': properties.content_settings.content_type,
+        'last_modified': properties.last_modified
+    }
+
+
 class ConocerBlobService:
     """
     Servicio para gestionar certificados CONOCER en Azure Blob Storage
@@ -80,7 +135,13 @@ class ConocerBlobService:
         if not self.connection_string:
             raise ValueError("AZURE_STORAGE_CONNECTION_STRING no está configurado")
         
-        self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
+        # Bloques de descarga acotados: stream_certificate mantiene en memoria
+        # un bloque por request (por defecto el SDK trae hasta 32MB de una vez)
+        self.blob_service_client = BlobServiceClient.from_connection_string(
+            self.connection_string,
+            max_single_get_size=DOWNLOAD_CHUNK_SIZE,
+            max_chunk_get_size=DOWNLOAD_CHUNK_SIZE
+        )
         self._ensure_container_exists()
     
     def _ensure_container_exists(self):
@@ -100,16 +161,18 @@ class ConocerBlobService:
         """
         Generar nombre único para el blob
         
-        Estructura: {año}/{mes}/{user_id}/{standard_code}_{certificate_number}.pdf
+        Estructura: {user_id}/{standard_code}_{certificate_number}.pdf
         
         Esta estructura:
-        - Agrupa por fecha para facilitar lifecycle management
-        - Incluye user_id para organización lógica
+        - Agrupa por usuario: listar sus certificados es un escaneo por prefijo
         - Incluye standard_code para identificación rápida
         - Termina con certificate_number para unicidad
+        
+        El lifecycle (Cool -> Archive) se basa en la fecha de último acceso del
+        blob, no en la ruta. Los certificados subidos antes con la estructura
+        {año}/{mes}/{user_id}/... conservan su blob_name en la tabla.
         """
-        now = datetime.utcnow()
-        return f"{now.year}/{now.month:02d}/{user_id}/{standard_code}_{certificate_number}.pdf"
+        return certificate_blob_name(user_id, certificate_number, standard_code)
     
     def _calculate_file_hash(self, file_content: bytes) -> str:
         """Calcular SHA-256 del archivo para verificación de integridad"""
@@ -180,34 +243,20 @@ class ConocerBlobService:
                 content_disposition=f'attachment; filename="{standard_code}_{certificate_number}.pdf"'
             ),
             metadata=blob_metadata,
+            tags=certificate_tags(user_id, standard_code),
             standard_blob_tier=StandardBlobTier.COOL,
             overwrite=True  # Sobrescribir si existe (por ejemplo, actualización)
         )
         
         return blob_name, file_hash, file_size
     
-    def download_certificate(self, blob_name: str) -> Tuple[bytes, dict]:
+    def _ensure_available(self, blob_client, properties) -> None:
         """
-        Descargar un certificado del blob storage
-        
-        Args:
-            blob_name: Nombre/ruta del blob
-        
-        Returns:
-            Tuple con (contenido_bytes, propiedades_blob)
+        Verificar que el blob se pueda leer (no está en Archive)
         
         Raises:
-            ResourceNotFoundError: Si el blob no existe
-            Exception: Si el blob está en Archive y necesita rehidratación
+            Exception: Si está en Archive; si no hay rehidratación en curso, la inicia
         """
-        blob_client = self.blob_service_client.get_blob_client(
-            container=self.CONTAINER_CERTIFICATES,
-            blob=blob_name
-        )
-        
-        # Obtener propiedades para verificar el tier
-        properties = blob_client.get_blob_properties()
-        
         # Si está en Archive, necesita rehidratación
         if properties.blob_tier == StandardBlobTier.ARCHIVE:
             # Verificar si ya hay una rehidratación en progreso
@@ -229,6 +278,29 @@ class ConocerBlobService:
                     "El certificado estará disponible en aproximadamente 15 horas. "
                     "Recibirá una notificación cuando esté listo."
                 )
+    
+    def download_certificate(self, blob_name: str) -> Tuple[bytes, dict]:
+        """
+        Descargar un certificado del blob storage
+        
+        Args:
+            blob_name: Nombre/ruta del blob
+        
+        Returns:
+            Tuple con (contenido_bytes, propiedades_blob)
+        
+        Raises:
+            ResourceNotFoundError: Si el blob no existe
+            Exception: Si el blob está en Archive y necesita rehidratación
+        """
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.CONTAINER_CERTIFICATES,
+            blob=blob_name
+        )
+        
+        # Obtener propiedades para verificar el tier
+        properties = blob_client.get_blob_properties()
+        self._ensure_available(blob_client, properties)
         
         # Descargar el blob
         download_stream = blob_client.download_blob()
@@ -242,6 +314,33 @@ class ConocerBlobService:
             'metadata': properties.metadata
         }
     
+    def stream_certificate(self, blob_name: str, select_range=None) -> Tuple[Iterator[bytes], dict]:
+        """
+        Descargar un certificado por bloques, sin cargarlo completo en memoria
+        
+        Args:
+            blob_name: Nombre/ruta del blob
+            select_range: fn(size, etag) -> (offset, length) o None para el
+                archivo completo; se evalúa con las propiedades del blob
+        
+        Returns:
+            Tuple con (iterador de bloques, info) donde info tiene size (total),
+            offset y length (lo que se envía), etag, content_type y last_modified
+        
+        Raises:
+            ResourceNotFoundError: Si el blob no existe
+            Exception: Si el blob está en Archive y necesita rehidratación
+        """
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.CONTAINER_CERTIFICATES,
+            blob=blob_name
+        )
+        
+        properties = blob_client.get_blob_properties()
+        self._ensure_available(blob_client, properties)
+        
+        return _stream_blob(blob_client, properties, select_range)
+    
     def generate_download_url(
         self,
         blob_name: str,
@@ -406,9 +505,46 @@ class ConocerBlobService:
         except ResourceNotFoundError:
             return False
     
+    def set_certificate_tags(self, blob_name: str, user_id: str, standard_code: str) -> None:
+        """Escribir las etiquetas de índice (user_id, standard_code) de un certificado"""
+        blob_client = self.blob_service_client.get_blob_client(
+            container=self.CONTAINER_CERTIFICATES,
+            blob=blob_name
+        )
+        blob_client.set_blob_tags(certificate_tags(user_id, standard_code))
+    
+    def find_certificates_by_tags(self, user_id: str = None, standard_code: str = None) -> list:
+        """
+        Buscar certificados por etiquetas de índice (find_blobs_by_tags)
+        
+        Azure resuelve la consulta con el índice de etiquetas, sin recorrer el
+        contenedor. Incluye blobs con la estructura anterior ya etiquetados.
+        
+        Returns:
+            Lista de {'name', 'tags'}
+        """
+        conditions = []
+        if user_id:
+            conditions.append(f"\"user_id\"='{_tag_value(user_id)}'")
+        if standard_code:
+            conditions.append(f"\"standard_code\"='{_tag_value(standard_code)}'")
+        if not conditions:
+            raise ValueError("Se requiere user_id o standard_code")
+        
+        container_client = self.blob_service_client.get_container_client(self.CONTAINER_CERTIFICATES)
+        return [
+            {'name': blob.name, 'tags': blob.tags or {}}
+            for blob in container_client.find_blobs_by_tags(' AND '.join(conditions))
+        ]
+    
     def list_user_certificates(self, user_id: str) -> list:
         """
-        Listar todos los certificados de un usuario
+        Listar los blobs de certificados de un usuario
+        
+        Para consultar certificados se usa la tabla conocer_certificates; esto
+        es para reconciliar un usuario contra el almacenamiento. Recorre solo el
+        prefijo {user_id}/ y agrega, por etiquetas, los blobs con la estructura
+        anterior ({año}/{mes}/{user_id}/...).
         
         Args:
             user_id: ID del usuario
@@ -418,21 +554,55 @@ class ConocerBlobService:
         """
         container_client = self.blob_service_client.get_container_client(self.CONTAINER_CERTIFICATES)
         
-        # Los blobs están organizados por año/mes/user_id/...
-        # Buscamos en todas las carpetas por el user_id
-        certificates = []
+        certificates = {}
+        for blob in container_client.list_blobs(name_starts_with=f'{user_id}/', include=['metadata', 'tags']):
+            certificates[blob.name] = {
+                'name': blob.name,
+                'size': blob.size,
+                'tier': str(blob.blob_tier) if blob.blob_tier else 'Unknown',
+                'last_modified': blob.last_modified.isoformat(),
+                'metadata': blob.metadata,
+                'tags': blob.tags or {}
+            }
+        
+        for blob in self.find_certificates_by_tags(user_id=user_id):
+            if blob['name'] not in certificates:
+                properties = container_client.get_blob_client(blob['name']).get_blob_properties()
+                certificates[blob['name']] = {
+                    'name': blob['name'],
+                    'size': properties.size,
+                    'tier': str(properties.blob_tier) if properties.blob_tier else 'Unknown',
+                    'last_modified': properties.last_modified.isoformat(),
+                    'metadata': properties.metadata,
+                    'tags': blob['tags']
+                }
+        
+        return list(certificates.values())
+    
+    def iter_certificate_pages(self, page_size: int = 500, continuation_token: str = None):
+        """
+        Recorrer el contenedor por páginas (para reconciliación)
         
-        for blob in container_client.list_blobs(include=['metadata']):
-            if blob.metadata and blob.metadata.get('user_id') == user_id:
-                certificates.append({
+        Yields:
+            (blobs, siguiente_token): blobs como {'name', 'tier', 'size',
+            'last_modified', 'tags'}; el token permite reanudar el recorrido
+        """
+        container_client = self.blob_service_client.get_container_client(self.CONTAINER_CERTIFICATES)
+        pages = container_client.list_blobs(include=['tags'], results_per_page=page_size).by_page(
+            continuation_token=continuation_token
+        )
+        for page in pages:
+            blobs = [
+                {
                     'name': blob.name,
+                    'tier': _tier_name(blob.blob_tier),
                     'size': blob.size,
-                    'tier': str(blob.blob_tier) if blob.blob_tier else 'Unknown',
-                    'last_modified': blob.last_modified.isoformat(),
-                    'metadata': blob.metadata
-                })
-        
-        return certificates
+                    'last_modified': blob.last_modified.replace(tzinfo=None) if blob.last_modified else None,
+                    'tags': blob.tags or {}
+                }
+                for blob in page
+            ]
+            yield blobs, pages.continuation_token
 
 
 # Singleton para reutilizar la conexión
@@ -467,9 +637,7 @@ class FallbackBlobService:
             print(f"FallbackBlobService: Error inicializando storage: {e}")
     
     def _generate_blob_name(self, user_id: str, certificate_number: str, standard_code: str) -> str:
-        from datetime import datetime
-        now = datetime.utcnow()
-        return f"conocer-certificates/{now.year}/{now.month:02d}/{user_id}/{standard_code}_{certificate_number}.pdf"
+        return f"conocer-certificates/{certificate_blob_name(user_id, certificate_number, standard_code)}"
     
     def _calculate_file_hash(self, file_content: bytes) -> str:
         return hashlib.sha256(file_content).hexdigest()
@@ -508,6 +676,7 @@ class FallbackBlobService:
                 blob_client.upload_blob(
                     file_content,
                     overwrite=True,
+                    tags=certificate_tags(user_id, standard_code),
                     content_settings=ContentSettings(
                         content_type=content_type,
                         content_disposition=f'attachment; filename="{standard_code}_{certificate_number}.pdf"'
@@ -540,6 +709,24 @@ class FallbackBlobService:
                 print(f"FallbackBlobService: Error descargando: {e}")
         raise Exception("Certificado no disponible")
     
+    def _blob_path(self, blob_name: str) -> Optional[str]:
+        """Ruta dentro del contenedor principal a partir del URL guardado en blob_name"""
+        marker = f'/{self.container_name}/'
+        if blob_name and self.container_name and marker in blob_name:
+            return unquote(blob_name.split(marker, 1)[1].split('?', 1)[0])
+        return None
+    
+    def stream_certificate(self, blob_name: str, select_range=None):
+        """Descargar certificado por bloques (ver ConocerBlobService.stream_certificate)"""
+        if not self.blob_client:
+            self._init_storage()
+        
+        blob_path = self._blob_path(blob_name)
+        if self.blob_client and blob_path:
+            blob_client = self.blob_client.get_blob_client(container=self.container_name, blob=blob_path)
+            return _stream_blob(blob_client, blob_client.get_blob_properties(), select_range)
+        raise Exception("Certificado no disponible")
+    
     def get_blob_status(self, blob_name: str):
         """Retorna estado dummy para fallback"""
         return {
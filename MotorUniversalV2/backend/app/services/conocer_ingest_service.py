@@ -0,0 +1,458 @@
+"""
+Ingesta masiva de certificados CONOCER desde un ZIP con manifiesto
+
+CONOCER entrega los certificados en lotes: un ZIP con los PDF y un manifiesto
+CSV (dentro del ZIP como manifest.csv o enviado aparte) con una fila por
+archivo. Se procesa por bloques:
+
+- Los PDF se leen del ZIP entrada por entrada (sin extraer a disco)
+- Por bloque: una query IN para los usuarios (por user_id o CURP) y una para
+  los folios ya registrados
+- Hash SHA-256 y subida al blob storage en un pool de hilos acotado
+- INSERT en bloque y commit por bloque, con el checkpoint en la misma
+  transacción para reanudar sin duplicar filas
+
+Se ejecuta como trabajo en segundo plano (handler 'conocer_ingest' en
+services/job_handlers). El resultado incluye un reporte CSV por fila.
+"""
+import csv
+import io
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.user import User
+from app.models.conocer_certificate import ConocerCertificate
+from app.services.certificate_verification_service import mark_verification_changed
+
+INGEST_CHUNK_SIZE = 50
+INGEST_WORKERS = int(os.getenv('CONOCER_INGEST_WORKERS', 4))
+MAX_CERTIFICATE_BYTES = 50 * 1024 * 1024
+MANIFEST_NAME = 'manifest.csv'
+
+# Mapeo de nombres de columna del manifiesto (los mismos campos que la carga individual)
+COLUMN_MAPPING = {
+    'file': ['file', 'archivo', 'filename', 'pdf'],
+    'user_id': ['user_id', 'usuario_id', 'id_usuario'],
+    'curp': ['curp'],
+    'certificate_number': ['certificate_number', 'folio', 'numero_certificado'],
+    'standard_code': ['standard_code', 'estandar', 'ec', 'codigo_estandar'],
+    'standard_name': ['standard_name', 'nombre_estandar'],
+    'issue_date': ['issue_date', 'fecha_emision'],
+    'expiration_date': ['expiration_date', 'fecha_vencimiento'],
+    'evaluation_date': ['evaluation_date', 'fecha_evaluacion'],
+    'competency_level': ['competency_level', 'nivel'],
+    'evaluation_center_name': ['evaluation_center_name', 'centro_evaluador'],
+    'evaluation_center_code': ['evaluation_center_code', 'codigo_centro'],
+    'evaluator_name': ['evaluator_name', 'evaluador'],
+}
+REQUIRED_COLUMNS = ['file', 'curp', 'certificate_number', 'standard_code', 'standard_name', 'issue_date']
+
+REPORT_COLUMNS = ['fila', 'archivo', 'folio', 'curp', 'usuario_id', 'estado', 'detalle']
+STATUS_LABELS = {'created': 'creado', 'errors': 'error', 'skipped': 'omitido'}
+
+
+class ConocerIngestError(ValueError):
+    """El ZIP o el manifiesto no se pueden procesar"""
+
+
+def new_summary():
+    return {'created': 0, 'errors': 0, 'skipped': 0, 'total_processed': 0, 'report': []}
+
+
+def _report(summary, row, status, detail='', user_id=None):
+    summary[status] += 1
+    summary['report'].append({
+        'row': row['row'],
+        'file': row.get('file'),
+        'certificate_number': row.get('certificate_number'),
+        'curp': row.get('curp'),
+        'user_id': user_id,
+        'status': status,
+        'detail': detail
+    })
+
+
+def _zip_entries(archive):
+    """{nombre en minúsculas: ZipInfo}, también por nombre base si no se repite"""
+    entries, basenames = {}, {}
+    for info in archive.infolist():
+        if info.is_dir() or info.filename.startswith('__MACOSX/'):
+            continue
+        entries[info.filename.lower()] = info
+        basenames.setdefault(os.path.basename(info.filename).lower(), []).append(info)
+    for name, infos in basenames.items():
+        if len(infos) == 1:
+            entries.setdefault(name, infos[0])
+    return entries
+
+
+def _read_manifest(data):
+    """Filas del manifiesto CSV como dicts con los campos de COLUMN_MAPPING"""
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('latin-1')
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+
+    header = next(reader, None)
+    if not header:
+        raise ConocerIngestError('El manifiesto está vacío')
+
+    headers = [h.strip().lower() for h in header]
+    indices = {}
+    for field, aliases in COLUMN_MAPPING.items():
+        for i, name in enumerate(headers):
+            if name in aliases:
+                indices[field] = i
+                break
+    missing = [col for col in REQUIRED_COLUMNS if col not in indices]
+    if missing:
+        raise ConocerIngestError(f'Faltan columnas requeridas en el manifiesto: {", ".join(missing)}')
+
+    rows = []
+    for row_idx, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        row = {'row': row_idx}
+        for field, idx in indices.items():
+            value = values[idx].strip() if idx < len(values) else ''
+            row[field] = value or None
+        rows.append(row)
+    return rows
+
+
+def open_ingest(zip_data, manifest_data=None):
+    """
+    Abrir el ZIP y leer el manifiesto (el enviado aparte o manifest.csv del ZIP)
+
+    Returns:
+        (archive, entries, manifest_rows)
+
+    Raises:
+        ConocerIngestError: si el ZIP no es válido o el manifiesto no se puede leer
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(zip_data))
+    except zipfile.BadZipFile:
+        raise ConocerIngestError('El archivo no es un ZIP válido')
+
+    entries = _zip_entries(archive)
+    if manifest_data is None:
+        manifest = entries.get(MANIFEST_NAME)
+        if manifest is None:
+            archive.close()
+            raise ConocerIngestError(f'Envía el manifiesto o incluye {MANIFEST_NAME} en el ZIP')
+        manifest_data = archive.read(manifest)
+
+    try:
+        rows = _read_manifest(manifest_data)
+    except Exception:
+        archive.close()
+        raise
+    if not rows:
+        archive.close()
+        raise ConocerIngestError('El manifiesto no tiene filas')
+    return archive, entries, rows
+
+
+def _parse_date(value, field, required=False):
+    if not value:
+        if required:
+            raise ValueError(f'{field} es requerido')
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'{field} inválida (usa YYYY-MM-DD): {value}')
+
+
+def _validate_row(row, entries, seen_numbers, summary):
+    """Normalizar y validar una fila del manifiesto; devuelve la fila o None"""
+    missing = [field for field in REQUIRED_COLUMNS if not row.get(field)]
+    if missing:
+        _report(summary, row, 'errors', f'Campos requeridos vacíos ({", ".join(missing)})')
+        return None
+
+    row['curp'] = row['curp'].upper()
+    if len(row['curp']) != 18:
+        _report(summary, row, 'errors', 'CURP inválido: debe tener 18 caracteres')
+        return None
+
+    if row['certificate_number'] in seen_numbers:
+        _report(summary, row, 'skipped', 'Folio duplicado en el manifiesto')
+        return None
+
+    try:
+        row['issue_date'] = _parse_date(row['issue_date'], 'issue_date', required=True)
+        row['expiration_date'] = _parse_date(row.get('expiration_date'), 'expiration_date')
+        row['evaluation_date'] = _parse_date(row.get('evaluation_date'), 'evaluation_date')
+    except ValueError as e:
+        _report(summary, row, 'errors', str(e))
+        return None
+
+    info = entries.get(row['file'].lower()) or entries.get(os.path.basename(row['file']).lower())
+    if info is None:
+        _report(summary, row, 'errors', 'El archivo no está en el ZIP')
+        return None
+    if not info.filename.lower().endswith('.pdf'):
+        _report(summary, row, 'errors', 'Solo se permiten archivos PDF')
+        return None
+    if info.file_size == 0 or info.file_size > MAX_CERTIFICATE_BYTES:
+        _report(summary, row, 'errors', f'Tamaño inválido ({info.file_size} bytes)')
+        return None
+
+    seen_numbers.add(row['certificate_number'])
+    row['entry'] = info
+    return row
+
+
+def _resolve_users(rows):
+    """({user_id: curp}, {curp: [user_id]}) de los usuarios del bloque en una query IN"""
+    user_ids = {r['user_id'] for r in rows if r.get('user_id')}
+    curps = {r['curp'] for r in rows if not r.get('user_id')}
+    if not user_ids and not curps:
+        return {}, {}
+
+    criteria = []
+    if user_ids:
+        criteria.append(User.id.in_(user_ids))
+    if curps:
+        criteria.append(User.curp.in_(curps))
+
+    by_id, by_curp = {}, {}
+    for user_id, curp in db.session.query(User.id, User.curp).filter(db.or_(*criteria)):
+        by_id[user_id] = curp
+        if curp:
+            by_curp.setdefault(curp.upper(), []).append(user_id)
+    return by_id, by_curp
+
+
+def _upload(blob_service, row, content, uploaded_by):
+    """Hash + subida de un PDF (en un hilo del pool; no usa la sesión de BD)"""
+    return blob_service.upload_certificate(
+        file_content=content,
+        user_id=row['user_id'],
+        certificate_number=row['certificate_number'],
+        standard_code=row['standard_code'],
+        metadata={
+            'curp': row['curp'],
+            'standard_name': row['standard_name'],
+            'uploaded_by': uploaded_by or ''
+        }
+    )
+
+
+def _upload_all(rows, archive, blob_service, executor, uploaded_by):
+    """
+    Generar (fila, (blob_name, file_hash, file_size) o excepción) en orden
+
+    Las entradas se leen del ZIP en este hilo y el hash y la subida van al
+    pool; como máximo hay 2 * INGEST_WORKERS PDF en memoria a la vez.
+    """
+    in_flight = deque()
+
+    def collect():
+        row, future = in_flight.popleft()
+        try:
+            return row, future.result()
+        except Exception as e:
+            return row, Exception(f'Error al subir: {e}')
+
+    for row in rows:
+        if len(in_flight) >= INGEST_WORKERS * 2:
+            yield collect()
+        content = archive.read(row['entry'])
+        if not content.startswith(b'%PDF'):
+            yield row, Exception('El archivo no es un PDF válido')
+            continue
+        in_flight.append((row, executor.submit(_upload, blob_service, row, content, uploaded_by)))
+    while in_flight:
+        yield collect()
+
+
+def _insert_certificates(rows):
+    """
+    INSERT en bloque dentro de la transacción del bloque (sin commit)
+
+    Si otro proceso registró un folio en paralelo, reintenta fila por fila con
+    SAVEPOINT para conservar las filas válidas del bloque.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(ConocerCertificate), rows)
+        return rows, []
+    except IntegrityError:
+        pass
+
+    inserted, failed = [], []
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(ConocerCertificate), [row])
+            inserted.append(row)
+        except IntegrityError as e:
+            failed.append((row, str(e.orig) if getattr(e, 'orig', None) else str(e)))
+    return inserted, failed
+
+
+def _process_chunk(chunk, archive, entries, blob_service, executor, uploaded_by, seen_numbers, summary):
+    """Validar, resolver usuarios, subir en paralelo e insertar un bloque de filas"""
+    candidates = []
+    for row in chunk:
+        summary['total_processed'] += 1
+        row = _validate_row(row, entries, seen_numbers, summary)
+        if row:
+            candidates.append(row)
+
+    if not candidates:
+        return
+
+    by_id, by_curp = _resolve_users(candidates)
+    existing = {
+        number for (number,) in db.session.query(ConocerCertificate.certificate_number).filter(
+            ConocerCertificate.certificate_number.in_([r['certificate_number'] for r in candidates])
+        )
+    }
+
+    pending = []
+    for row in candidates:
+        if row['certificate_number'] in existing:
+            _report(summary, row, 'skipped', 'Folio ya registrado')
+            continue
+        if row.get('user_id'):
+            if row['user_id'] not in by_id:
+                _report(summary, row, 'errors', 'Usuario no encontrado')
+                continue
+            curp = by_id[row['user_id']]
+            if curp and curp.upper() != row['curp']:
+                _report(summary, row, 'errors', 'El CURP no corresponde al usuario', row['user_id'])
+                continue
+        else:
+            matches = by_curp.get(row['curp'], [])
+            if len(matches) != 1:
+                _report(summary, row, 'errors', 'Ningún usuario con ese CURP' if not matches else 'CURP con varios usuarios')
+                continue
+            row['user_id'] = matches[0]
+        pending.append(row)
+
+    now = datetime.utcnow()
+    rows, by_number = [], {}
+    for row, uploaded in _upload_all(pending, archive, blob_service, executor, uploaded_by):
+        if isinstance(uploaded, Exception):
+            _report(summary, row, 'errors', str(uploaded), row['user_id'])
+            continue
+        blob_name, file_hash, file_size = uploaded
+        by_number[row['certificate_number']] = row
+        rows.append({
+            'user_id': row['user_id'],
+            'certificate_number': row['certificate_number'],
+            'curp': row['curp'],
+            'standard_code': row['standard_code'],
+            'standard_name': row['standard_name'],
+            'competency_level': row.get('competency_level'),
+            'evaluation_center_name': row.get('evaluation_center_name'),
+            'evaluation_center_code': row.get('evaluation_center_code'),
+            'evaluator_name': row.get('evaluator_name'),
+            'issue_date': row['issue_date'],
+            'expiration_date': row['expiration_date'],
+            'evaluation_date': row['evaluation_date'],
+            'blob_name': blob_name,
+            'blob_container': 'conocer-certificates',
+            'blob_tier': 'Cool',
+            'file_size': file_size,
+            'file_hash': file_hash,
+            'content_type': 'application/pdf',
+            'status': 'active',
+            'is_verified': False,
+            'created_at': now,
+            'updated_at': now
+        })
+
+    if not rows:
+        return
+
+    inserted, failed = _insert_certificates(rows)
+    # Los INSERT de core no disparan los eventos de la sesión: folios nuevos para la verificación
+    mark_verification_changed([data['certificate_number'] for data in inserted], added=True)
+    for data in inserted:
+        _report(summary, by_number[data['certificate_number']], 'created', data['blob_name'], data['user_id'])
+    for data, error in failed:
+        # El blob queda sin fila: lo reporta la reconciliación (conocer_reconcile)
+        _report(summary, by_number[data['certificate_number']], 'errors', error, data['user_id'])
+
+
+def ingest_certificates(zip_data, blob_service, manifest_data=None, uploaded_by=None,
+                        chunk_size=INGEST_CHUNK_SIZE, resume_from=None,
+                        checkpoint_callback=None, progress_callback=None):
+    """
+    Ingestar certificados de un ZIP según su manifiesto
+
+    Args:
+        zip_data: Contenido del ZIP (bytes)
+        blob_service: Servicio de get_conocer_blob_service()
+        manifest_data: Manifiesto CSV (bytes); si es None se usa manifest.csv del ZIP
+        uploaded_by: ID del usuario que solicita la carga
+        resume_from: Checkpoint {'next_index', 'summary'} de una ejecución anterior
+        checkpoint_callback: fn(checkpoint) llamada antes del commit de cada bloque
+        progress_callback: fn(processed, total, summary) llamada tras cada bloque
+
+    Returns:
+        dict: {'created', 'errors', 'skipped', 'total_processed', 'report'}
+
+    Raises:
+        ConocerIngestError: si el ZIP o el manifiesto no son válidos
+    """
+    archive, entries, manifest_rows = open_ingest(zip_data, manifest_data)
+
+    next_index = 0
+    summary = new_summary()
+    if resume_from:
+        next_index = resume_from.get('next_index') or 0
+        summary = resume_from.get('summary') or summary
+
+    # Folios creados en una ejecución anterior (los demás se vuelven a validar)
+    seen_numbers = {r['certificate_number'] for r in summary['report'] if r['status'] == 'created'}
+    total = len(manifest_rows)
+
+    try:
+        with ThreadPoolExecutor(max_workers=INGEST_WORKERS) as executor:
+            while next_index < total:
+                chunk = manifest_rows[next_index:next_index + chunk_size]
+                _process_chunk(chunk, archive, entries, blob_service, executor, uploaded_by, seen_numbers, summary)
+                next_index += len(chunk)
+                if checkpoint_callback:
+                    checkpoint_callback({'next_index': next_index, 'summary': summary})
+                db.session.commit()
+                if progress_callback:
+                    progress_callback(next_index, total, summary)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        archive.close()
+
+    print(f"[CONOCER-INGEST] {summary['created']} certificados creados, "
+          f"{summary['errors']} errores, {summary['skipped']} omitidos")
+    return summary
+
+
+def build_report_csv(report):
+    """Reporte por fila del manifiesto (.csv en bytes)"""
+    from app.services.export_service import iter_csv
+
+    rows = (
+        (r['row'], r['file'], r['certificate_number'], r['curp'], r['user_id'], STATUS_LABELS[r['status']], r['detail'])
+        for r in sorted(report, key=lambda r: r['row'])
+    )
+    return b''.join(iter_csv(REPORT_COLUMNS, rows))
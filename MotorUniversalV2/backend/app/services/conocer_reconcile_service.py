@@ -0,0 +1,170 @@
+"""
+Reconciliación de certificados CONOCER: tabla conocer_certificates vs. blobs
+
+Recorre el contenedor por páginas (token de continuación en el checkpoint) y
+busca los certificados de cada página por blob_name con una sola consulta:
+
+- fase 'blobs': blobs sin fila (huérfanos), etiquetas de índice faltantes o
+  distintas (se corrigen con fix_tags) y tier desactualizado en la tabla; las
+  filas encontradas se marcan con blob_checked_at = inicio de la corrida
+- fase 'rows': filas no marcadas en esta corrida (blob faltante), por keyset
+  sobre el id
+
+Los blobs y filas más recientes que GRACE_PERIOD se ignoran: una subida en
+curso puede tener el blob sin la fila o al revés.
+"""
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.conocer_certificate import ConocerCertificate
+from app.services.conocer_blob_service import ConocerBlobService, certificate_tags
+
+RECONCILE_PAGE_SIZE = 500
+GRACE_PERIOD = timedelta(hours=1)
+MAX_REPORTED = 1000  # Elementos listados por categoría en el resumen (los conteos son completos)
+
+
+def new_summary():
+    return {
+        'blobs_scanned': 0,
+        'matched': 0,
+        'orphan_blobs': 0,
+        'missing_blobs': 0,
+        'tag_mismatches': 0,
+        'tags_fixed': 0,
+        'tiers_updated': 0,
+        'orphans': [],
+        'missing': [],
+        'tag_errors': []
+    }
+
+
+def _report(summary, key, item):
+    if len(summary[key]) < MAX_REPORTED:
+        summary[key].append(item)
+
+
+def _reconcile_blob_page(blob_service, blobs, run_started, fix_tags, summary):
+    """Comparar una página de blobs con sus filas (una consulta por página)"""
+    names = [blob['name'] for blob in blobs]
+    rows = {
+        row.blob_name: row
+        for row in ConocerCertificate.query.filter(ConocerCertificate.blob_name.in_(names))
+    } if names else {}
+
+    grace_limit = run_started - GRACE_PERIOD
+    for blob in blobs:
+        summary['blobs_scanned'] += 1
+        row = rows.get(blob['name'])
+        if row is None:
+            if blob['last_modified'] and blob['last_modified'] > grace_limit:
+                continue
+            summary['orphan_blobs'] += 1
+            _report(summary, 'orphans', {
+                'blob_name': blob['name'],
+                'size': blob['size'],
+                'user_id': blob['tags'].get('user_id')
+            })
+            continue
+
+        summary['matched'] += 1
+        row.blob_checked_at = run_started
+
+        if blob['tier'] and row.blob_tier != blob['tier']:
+            row.blob_tier = blob['tier']
+            summary['tiers_updated'] += 1
+
+        expected = certificate_tags(row.user_id, row.standard_code)
+        if any(blob['tags'].get(key) != value for key, value in expected.items()):
+            summary['tag_mismatches'] += 1
+            if fix_tags:
+                try:
+                    blob_service.set_certificate_tags(blob['name'], row.user_id, row.standard_code)
+                    summary['tags_fixed'] += 1
+                except Exception as e:
+                    _report(summary, 'tag_errors', {'blob_name': blob['name'], 'error': str(e)})
+
+
+def _reconcile_row_page(run_started, last_id, page_size, summary):
+    """Filas sin blob en esta corrida; devuelve el último id visto o None al terminar"""
+    rows = ConocerCertificate.query.filter(
+        ConocerCertificate.id > last_id,
+        ConocerCertificate.created_at < run_started - GRACE_PERIOD,
+        db.or_(
+            ConocerCertificate.blob_checked_at.is_(None),
+            ConocerCertificate.blob_checked_at < run_started
+        )
+    ).order_by(ConocerCertificate.id).limit(page_size).all()
+
+    for row in rows:
+        summary['missing_blobs'] += 1
+        _report(summary, 'missing', {
+            'certificate_id': row.id,
+            'certificate_number': row.certificate_number,
+            'user_id': row.user_id,
+            'blob_name': row.blob_name
+        })
+
+    return rows[-1].id if rows else None
+
+
+def reconcile_certificates(blob_service, fix_tags=False, page_size=RECONCILE_PAGE_SIZE, resume_from=None,
+                           checkpoint_callback=None, progress_callback=None):
+    """
+    Reconciliar tabla y contenedor por páginas, con un commit por página
+
+    Args:
+        blob_service: ConocerBlobService (el almacenamiento de respaldo no se reconcilia)
+        fix_tags: Escribir las etiquetas user_id/standard_code faltantes o distintas
+        resume_from: Checkpoint {'phase', 'token', 'last_id', 'run_started', 'summary'}
+        checkpoint_callback: fn(checkpoint) llamada antes del commit de cada página
+        progress_callback: fn(phase, summary) llamada tras cada página
+
+    Returns:
+        dict: resumen con conteos y listas (máximo MAX_REPORTED por categoría)
+    """
+    if not isinstance(blob_service, ConocerBlobService):
+        raise ValueError('La reconciliación requiere el almacenamiento dedicado de CONOCER')
+
+    checkpoint = resume_from or {
+        'phase': 'blobs',
+        'token': None,
+        'last_id': 0,
+        'run_started': datetime.utcnow().isoformat(),
+        'summary': new_summary()
+    }
+    run_started = datetime.fromisoformat(checkpoint['run_started'])
+    summary = checkpoint['summary']
+
+    def commit_page():
+        if checkpoint_callback:
+            checkpoint_callback(checkpoint)
+        db.session.commit()
+        if progress_callback:
+            progress_callback(checkpoint['phase'], summary)
+
+    try:
+        if checkpoint['phase'] == 'blobs':
+            for blobs, token in blob_service.iter_certificate_pages(page_size, checkpoint['token']):
+                _reconcile_blob_page(blob_service, blobs, run_started, fix_tags, summary)
+                # Sin token no hay más páginas: la siguiente fase arranca al reanudar
+                checkpoint['token'] = token
+                if not token:
+                    checkpoint['phase'] = 'rows'
+                commit_page()
+            checkpoint['phase'] = 'rows'
+
+        while checkpoint['phase'] == 'rows':
+            last_id = _reconcile_row_page(run_started, checkpoint['last_id'], page_size, summary)
+            if last_id is None:
+                checkpoint['phase'] = 'done'
+            else:
+                checkpoint['last_id'] = last_id
+            commit_page()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    print(f"[CONOCER-RECONCILE] {summary['blobs_scanned']} blobs, {summary['orphan_blobs']} huérfanos, "
+          f"{summary['missing_blobs']} faltantes, {summary['tag_mismatches']} etiquetas distintas")
+    return summary
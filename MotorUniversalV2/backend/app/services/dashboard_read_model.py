@@ -0,0 +1,468 @@
+"""
+Modelo de lectura del dashboard del candidato
+
+El dashboard (/api/users/me/dashboard) se arma con dos piezas en Redis:
+
+1. Catálogo global (compartido por todos los usuarios y versionado)
+       dashboard:catalog:version     -> entero, se incrementa al cambiar exámenes/materiales
+       dashboard:catalog:{version}   -> JSON con exámenes publicados e inventario de materiales
+
+2. Modelo por usuario (hash), actualizado por eventos
+       dashboard:user:{user_id}
+           exam:ecm:{id} / exam:exam:{id}  -> JSON con estadísticas del usuario
+           material:{id}                   -> contenidos completados
+           _catalog                        -> versión de catálogo de los conteos
+
+Los eventos que lo mantienen son record_result_event() (al guardar o actualizar
+un resultado) y record_progress_event() (al completar un contenido). Si el hash
+no existe se reconstruye completo desde la base de datos en la siguiente lectura.
+Si Redis no está disponible el dashboard se calcula directamente.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import event, func
+
+from app import db
+from app.utils.cache_utils import get_redis_client
+from app.utils.cdn_helper import transform_to_cdn_url
+
+CATALOG_VERSION_KEY = 'dashboard:catalog:version'
+CATALOG_KEY_PREFIX = 'dashboard:catalog:'
+USER_KEY_PREFIX = 'dashboard:user:'
+
+CATALOG_TTL_SECONDS = 3600
+USER_MODEL_TTL_SECONDS = 6 * 3600
+
+_events_registered = False
+
+# Actualizar un campo solo si el hash ya existe (no crear modelos parciales)
+_HSET_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return nil
+"""
+_HINCRBY_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+end
+return nil
+"""
+
+
+# ==================== CATÁLOGO GLOBAL ====================
+
+def _catalog_models():
+    """Modelos cuyo cambio invalida el catálogo global"""
+    from app.models.exam import Exam
+    from app.models.category import Category
+    from app.models.study_content import (
+        StudyMaterial,
+        StudySession,
+        StudyTopic,
+        StudyReading,
+        StudyVideo,
+        StudyDownloadableExercise,
+        StudyInteractiveExercise
+    )
+    return (
+        Exam, Category, StudyMaterial, StudySession, StudyTopic,
+        StudyReading, StudyVideo, StudyDownloadableExercise, StudyInteractiveExercise
+    )
+
+
+def build_catalog():
+    """Construir el catálogo global desde la base de datos"""
+    from app.models.exam import Exam
+    from app.models.category import Category
+    from app.models.study_content import StudyMaterial
+    from app.services.study_material_service import get_material_summaries, get_material_progress_counts
+
+    category_counts = db.session.query(
+        Category.exam_id,
+        func.count(Category.id).label('count')
+    ).group_by(Category.exam_id).subquery()
+
+    available_exams = db.session.query(
+        Exam,
+        func.coalesce(category_counts.c.count, 0).label('categories_count')
+    ).outerjoin(
+        category_counts, Exam.id == category_counts.c.exam_id
+    ).filter(
+        Exam.is_published == True
+    ).order_by(Exam.name).all()
+
+    exams = [{
+        'id': exam.id,
+        'name': exam.name,
+        'description': exam.description,
+        'version': exam.version,
+        'time_limit_minutes': exam.duration_minutes,
+        'passing_score': exam.passing_score,
+        'is_published': exam.is_published,
+        'categories_count': categories_count,
+        'competency_standard_id': exam.competency_standard_id
+    } for exam, categories_count in available_exams]
+
+    materials = []
+    try:
+        available_materials = StudyMaterial.query.filter_by(is_published=True).order_by(
+            StudyMaterial.order, StudyMaterial.title
+        ).all()
+        material_ids = [m.id for m in available_materials]
+
+        if material_ids:
+            summaries = get_material_summaries(material_ids)
+            totals = get_material_progress_counts(material_ids)
+
+            for material in available_materials:
+                materials.append({
+                    'id': material.id,
+                    'title': material.title,
+                    'description': material.description,
+                    'image_url': transform_to_cdn_url(material.image_url) if material.image_url else None,
+                    'sessions_count': summaries.get(material.id, {}).get('sessions_count', 0),
+                    'total_contents': totals.get(material.id, (0, 0))[0]
+                })
+    except Exception as e:
+        db.session.rollback()
+        print(f"[DASHBOARD] Error al construir inventario de materiales: {e}")
+
+    return {
+        'exams': exams,
+        'materials': materials,
+        'built_at': datetime.utcnow().isoformat()
+    }
+
+
+def get_catalog_version(redis_client=None):
+    """Versión actual del catálogo global"""
+    redis_client = redis_client or get_redis_client()
+    if redis_client is None:
+        return '0'
+    version = redis_client.get(CATALOG_VERSION_KEY)
+    return version.decode() if isinstance(version, bytes) else (version or '0')
+
+
+def get_catalog():
+    """
+    Obtener el catálogo global (versión, datos), construyéndolo si no está en Redis
+    """
+    try:
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            version = get_catalog_version(redis_client)
+            raw = redis_client.get(f'{CATALOG_KEY_PREFIX}{version}')
+            if raw:
+                return version, json.loads(raw)
+
+            catalog = build_catalog()
+            redis_client.set(f'{CATALOG_KEY_PREFIX}{version}', json.dumps(catalog), ex=CATALOG_TTL_SECONDS)
+            return version, catalog
+    except Exception as e:
+        print(f"[DASHBOARD] Warning: catálogo sin Redis: {e}")
+
+    return None, build_catalog()
+
+
+def bump_catalog_version():
+    """Invalidar el catálogo global (los modelos por usuario recalculan sus conteos)"""
+    try:
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            return redis_client.incr(CATALOG_VERSION_KEY)
+    except Exception as e:
+        print(f"[DASHBOARD] Warning: no se pudo incrementar versión de catálogo: {e}")
+    return None
+
+
+def register_dashboard_events():
+    """
+    Incrementar la versión del catálogo cuando se confirma un cambio en
+    exámenes, categorías o contenido de materiales (cualquier ruta o script)
+    """
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+    catalog_models = _catalog_models()
+    from app.models.study_content import StudyMaterial
+
+    @event.listens_for(db.session, 'after_flush')
+    def _track_catalog_changes(session, flush_context):
+        if session.info.get('dashboard_catalog_changed'):
+            return
+        for obj in list(session.new) + list(session.deleted):
+            if isinstance(obj, catalog_models):
+                session.info['dashboard_catalog_changed'] = True
+                return
+        for obj in session.dirty:
+            if not isinstance(obj, catalog_models):
+                continue
+            # Los exámenes vinculados a un material (StudyMaterial.exams) son una colección
+            if session.is_modified(obj, include_collections=isinstance(obj, StudyMaterial)):
+                session.info['dashboard_catalog_changed'] = True
+                return
+
+    @event.listens_for(db.session, 'after_commit')
+    def _bump_on_commit(session):
+        if session.info.pop('dashboard_catalog_changed', False):
+            bump_catalog_version()
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _reset_on_rollback(session):
+        session.info.pop('dashboard_catalog_changed', None)
+
+
+# ==================== MODELO POR USUARIO ====================
+
+def _user_key(user_id):
+    return f'{USER_KEY_PREFIX}{user_id}'
+
+
+def _exam_field(exam_id, competency_standard_id):
+    """Los resultados se agrupan por ECM cuando existe, si no por examen"""
+    if competency_standard_id:
+        return f'exam:ecm:{competency_standard_id}'
+    return f'exam:exam:{exam_id}'
+
+
+def summarize_results(results):
+    """
+    Estadísticas de un grupo de resultados (lista de to_dict, más reciente primero)
+    """
+    return {
+        'attempts': len(results),
+        'best_score': max([r['score'] for r in results], default=None),
+        'is_completed': any(r['status'] == 1 for r in results),
+        'is_approved': any(r['result'] == 1 for r in results),
+        'last_attempt': results[0] if results else None,
+        'approved_result': next((r for r in results if r['result'] == 1), None)
+    }
+
+
+def _empty_user_stats():
+    return summarize_results([])
+
+
+def _build_exam_fields(user_id):
+    """Estadísticas por ECM/examen a partir de todos los resultados del usuario"""
+    from app.models.result import Result
+
+    grouped = {}
+    user_results = Result.query.filter_by(user_id=str(user_id)).order_by(Result.created_at.desc()).all()
+    for result in user_results:
+        field = _exam_field(result.exam_id, result.competency_standard_id)
+        grouped.setdefault(field, []).append(result.to_dict())
+
+    return {field: summarize_results(results) for field, results in grouped.items()}
+
+
+def _build_material_fields(user_id, material_ids):
+    """Contenidos completados por material (GROUP BY material_id en SQL)"""
+    from app.services.study_material_service import get_material_progress_counts
+
+    return {
+        f'material:{material_id}': completed
+        for material_id, (total, completed) in get_material_progress_counts(material_ids, user_id).items()
+        if completed
+    }
+
+
+def _store_user_model(redis_client, user_id, exam_fields, material_fields, catalog_version):
+    mapping = {field: json.dumps(stats) for field, stats in exam_fields.items()}
+    mapping.update({field: int(count) for field, count in material_fields.items()})
+    mapping['_catalog'] = catalog_version
+    mapping['_built_at'] = datetime.utcnow().isoformat()
+
+    key = _user_key(user_id)
+    pipe = redis_client.pipeline()
+    pipe.delete(key)
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, USER_MODEL_TTL_SECONDS)
+    pipe.execute()
+
+
+def _refresh_material_fields(redis_client, user_id, catalog_version, material_ids):
+    """El catálogo cambió: recalcular solo los conteos de materiales del usuario"""
+    key = _user_key(user_id)
+    material_fields = _build_material_fields(user_id, material_ids)
+
+    pipe = redis_client.pipeline()
+    stale = [f for f in redis_client.hkeys(key) if (f.decode() if isinstance(f, bytes) else f).startswith('material:')]
+    if stale:
+        pipe.hdel(key, *stale)
+    if material_fields:
+        pipe.hset(key, mapping=material_fields)
+    pipe.hset(key, '_catalog', catalog_version)
+    pipe.execute()
+    return material_fields
+
+
+def get_user_model(user_id, catalog_version, catalog):
+    """
+    Obtener (exam_fields, material_fields) del usuario
+
+    Una sola lectura (HGETALL) cuando el modelo existe y está al día con el catálogo.
+    """
+    redis_client = get_redis_client() if catalog_version is not None else None
+    material_ids = [m['id'] for m in catalog['materials']]
+
+    if redis_client is not None:
+        try:
+            raw = redis_client.hgetall(_user_key(user_id))
+            if raw:
+                data = {
+                    (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+                    for k, v in raw.items()
+                }
+                exam_fields = {k: json.loads(v) for k, v in data.items() if k.startswith('exam:')}
+                if data.get('_catalog') == str(catalog_version):
+                    material_fields = {k: int(v) for k, v in data.items() if k.startswith('material:')}
+                else:
+                    material_fields = _refresh_material_fields(redis_client, user_id, catalog_version, material_ids)
+                return exam_fields, material_fields
+
+            exam_fields = _build_exam_fields(user_id)
+            material_fields = _build_material_fields(user_id, material_ids)
+            _store_user_model(redis_client, user_id, exam_fields, material_fields, catalog_version)
+            return exam_fields, material_fields
+        except Exception as e:
+            print(f"[DASHBOARD] Warning: modelo de usuario sin Redis: {e}")
+
+    return _build_exam_fields(user_id), _build_material_fields(user_id, material_ids)
+
+
+def record_result_event(user_id, exam_id, competency_standard_id=None):
+    """
+    Evento: se guardó o actualizó un resultado del usuario
+
+    Recalcula solo el grupo (ECM o examen) afectado con una consulta indexada.
+    Llamar después del commit.
+    """
+    from app.models.result import Result
+
+    try:
+        redis_client = get_redis_client()
+        if redis_client is None:
+            return False
+
+        query = Result.query.filter(Result.user_id == str(user_id))
+        if competency_standard_id:
+            query = query.filter(Result.competency_standard_id == competency_standard_id)
+        else:
+            query = query.filter(Result.exam_id == exam_id, Result.competency_standard_id.is_(None))
+        results = [r.to_dict() for r in query.order_by(Result.created_at.desc()).all()]
+
+        field = _exam_field(exam_id, competency_standard_id)
+        redis_client.eval(_HSET_IF_EXISTS, 1, _user_key(user_id), field, json.dumps(summarize_results(results)))
+        return True
+    except Exception as e:
+        print(f"[DASHBOARD] Warning: no se pudo aplicar evento de resultado: {e}")
+        drop_user_model(user_id)
+        return False
+
+
+def record_progress_event(user_id, topic_id, delta=1):
+    """
+    Evento: el usuario completó un contenido del tema
+
+    Llamar después del commit y solo cuando el contenido pasa a completado.
+    """
+    from app.models.study_content import StudyTopic, StudySession
+
+    try:
+        redis_client = get_redis_client()
+        if redis_client is None:
+            return False
+
+        material_id = db.session.query(StudySession.material_id).join(
+            StudyTopic, StudyTopic.session_id == StudySession.id
+        ).filter(StudyTopic.id == topic_id).scalar()
+        if material_id is None:
+            return False
+
+        redis_client.eval(_HINCRBY_IF_EXISTS, 1, _user_key(user_id), f'material:{material_id}', delta)
+        return True
+    except Exception as e:
+        print(f"[DASHBOARD] Warning: no se pudo aplicar evento de progreso: {e}")
+        drop_user_model(user_id)
+        return False
+
+
+def drop_user_model(user_id):
+    """Descartar el modelo del usuario (se reconstruye en la siguiente lectura)"""
+    try:
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            redis_client.delete(_user_key(user_id))
+    except Exception as e:
+        print(f"[DASHBOARD] Warning: no se pudo descartar modelo de usuario {user_id}: {e}")
+
+
+# ==================== LECTURA ====================
+
+def get_candidate_dashboard(user_id, entitlements=None):
+    """
+    Armar la respuesta del dashboard: catálogo global + modelo del usuario
+
+    Args:
+        entitlements: índice de acceso del candidato (entitlement_service); si se
+            indica, solo se muestran sus exámenes y materiales asignados
+
+    Returns:
+        dict con 'stats', 'exams' y 'materials'
+    """
+    catalog_version, catalog = get_catalog()
+    exam_fields, material_fields = get_user_model(user_id, catalog_version, catalog)
+
+    if entitlements is not None:
+        exam_ids, material_ids = set(entitlements.exam_ids()), set(entitlements.material_ids())
+        catalog = dict(
+            catalog,
+            exams=[e for e in catalog['exams'] if e['id'] in exam_ids],
+            materials=[m for m in catalog['materials'] if m['id'] in material_ids]
+        )
+
+    exams_data = []
+    for exam in catalog['exams']:
+        user_stats = None
+        if exam['competency_standard_id']:
+            user_stats = exam_fields.get(_exam_field(exam['id'], exam['competency_standard_id']))
+        if user_stats is None:
+            user_stats = exam_fields.get(_exam_field(exam['id'], None))
+        exams_data.append(dict(exam, user_stats=user_stats or _empty_user_stats()))
+
+    completed_exams = sum(1 for e in exams_data if e['user_stats']['is_completed'])
+    approved_exams = sum(1 for e in exams_data if e['user_stats']['is_approved'])
+    scores = [e['user_stats']['best_score'] for e in exams_data if e['user_stats']['best_score'] is not None]
+    average_score = sum(scores) / len(scores) if scores else 0
+
+    materials_data = []
+    for material in catalog['materials']:
+        total = material['total_contents']
+        completed = min(material_fields.get(f"material:{material['id']}", 0), total)
+        materials_data.append({
+            'id': material['id'],
+            'title': material['title'],
+            'description': material['description'],
+            'image_url': material['image_url'],
+            'sessions_count': material['sessions_count'],
+            'progress': {
+                'total_contents': total,
+                'completed_contents': completed,
+                'percentage': round((completed / total * 100)) if total > 0 else 0
+            }
+        })
+
+    return {
+        'stats': {
+            'total_exams': len(catalog['exams']),
+            'completed_exams': completed_exams,
+            'approved_exams': approved_exams,
+            'average_score': round(average_score, 1)
+        },
+        'exams': exams_data,
+        'materials': materials_data
+    }
@@ -0,0 +1,332 @@
+"""
+Índice de acceso de candidatos: qué exámenes y materiales puede ver cada uno
+
+Un candidato que pertenece a grupos solo ve los exámenes asignados a sus grupos
+(GroupExam activos) y los materiales efectivos de esas asignaciones
+(group_exam_material_service). Un candidato sin grupos conserva el catálogo
+abierto de publicados, como antes. ENTITLEMENTS_ENFORCED=false desactiva el filtro.
+
+El índice se precalcula por usuario en un hash de Redis:
+
+    entitlements:user:{user_id}
+        _scoped       -> '1' si el candidato tiene membresías activas
+        _catalog      -> versión del catálogo del dashboard al construirlo
+        exam:{id}     -> JSON [[desde, hasta], ...] ventanas de disponibilidad (ISO o null)
+        material:{id} -> JSON [[desde, hasta], ...] ventanas de los exámenes que lo asignan
+
+Las ventanas se evalúan al leer, así que abrir o cerrar una ventana no requiere
+reconstruir nada. La ventana se exige al abrir el examen; al entregarlo se
+acepta hasta duration_minutes + EXAM_SUBMIT_GRACE_MINUTES después del cierre,
+para no rechazar intentos iniciados dentro de la ventana (can_submit_exam). Al confirmar cambios de membresías, asignaciones o grupos se
+borran solo los hashes de los candidatos afectados (register_entitlement_events)
+y se reconstruyen en su siguiente lectura. Sin Redis se calcula en cada request.
+
+Cada invalidación incrementa entitlements:gen:{user_id}; la reconstrucción lee
+la generación antes de consultar la BD y solo guarda el hash si no cambió
+(WATCH/MULTI), para no reescribir un índice viejo tras una invalidación concurrente.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from redis.exceptions import WatchError
+from sqlalchemy import event, inspect as sa_inspect
+
+from app import db
+from app.utils.cache_utils import get_redis_client
+
+ENTITLEMENTS_ENFORCED = os.getenv('ENTITLEMENTS_ENFORCED', 'true').lower() != 'false'
+
+USER_KEY = 'entitlements:user:{}'
+GENERATION_KEY = 'entitlements:gen:{}'
+USER_TTL_SECONDS = 6 * 3600
+
+# Minutos extra (además de la duración del examen) para entregar tras el cierre
+SUBMIT_GRACE_MINUTES = int(os.getenv('EXAM_SUBMIT_GRACE_MINUTES', '15'))
+
+CANDIDATE_ROLES = ('alumno', 'candidato')
+
+_events_registered = False
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _in_window(windows, now, grace=None):
+    now_iso = now.isoformat()
+    end_iso = (now - grace).isoformat() if grace else now_iso
+    for start, end in windows:
+        if (start is None or start <= now_iso) and (end is None or end >= end_iso):
+            return True
+    return False
+
+
+class Entitlements:
+    """Exámenes y materiales asignados a un candidato con sus ventanas"""
+
+    def __init__(self, scoped, exams, materials):
+        self.scoped = scoped
+        self.exams = exams
+        self.materials = materials
+
+    def exam_ids(self, now=None):
+        now = now or datetime.utcnow()
+        return [exam_id for exam_id, windows in self.exams.items() if _in_window(windows, now)]
+
+    def material_ids(self, now=None):
+        now = now or datetime.utcnow()
+        return [material_id for material_id, windows in self.materials.items() if _in_window(windows, now)]
+
+
+def build_entitlements(user_id):
+    """Calcular el índice del candidato desde la base de datos"""
+    from app.models.partner import CandidateGroup, GroupMember, GroupExam
+    from app.services.group_exam_material_service import resolve_group_exam_materials
+
+    rows = db.session.query(
+        GroupExam.id, GroupExam.exam_id, GroupExam.available_from, GroupExam.available_until
+    ).join(
+        GroupMember, GroupMember.group_id == GroupExam.group_id
+    ).join(
+        CandidateGroup, CandidateGroup.id == GroupExam.group_id
+    ).filter(
+        GroupMember.user_id == str(user_id),
+        GroupMember.status == 'active',
+        CandidateGroup.is_active == True,
+        GroupExam.is_active == True
+    ).all()
+
+    scoped = bool(rows) or db.session.query(GroupMember.id).join(
+        CandidateGroup, CandidateGroup.id == GroupMember.group_id
+    ).filter(
+        GroupMember.user_id == str(user_id),
+        GroupMember.status == 'active',
+        CandidateGroup.is_active == True
+    ).first() is not None
+
+    exams, materials = {}, {}
+    resolved = resolve_group_exam_materials(rows)
+    for row in rows:
+        window = [_iso(row.available_from), _iso(row.available_until)]
+        exams.setdefault(row.exam_id, []).append(window)
+        for material in resolved.get(row.id, {}).get('study_materials', []):
+            materials.setdefault(material['id'], []).append(window)
+
+    return Entitlements(scoped, exams, materials)
+
+
+def _store(redis_client, user_id, entitlements, catalog_version, generation):
+    """Guardar el índice solo si no hubo invalidaciones desde que se leyó generation"""
+    mapping = {'_scoped': '1' if entitlements.scoped else '0', '_catalog': catalog_version}
+    mapping.update({f'exam:{k}': json.dumps(v) for k, v in entitlements.exams.items()})
+    mapping.update({f'material:{k}': json.dumps(v) for k, v in entitlements.materials.items()})
+    key = USER_KEY.format(user_id)
+    generation_key = GENERATION_KEY.format(user_id)
+    with redis_client.pipeline() as pipe:
+        try:
+            pipe.watch(generation_key)
+            if pipe.get(generation_key) != generation:
+                return False
+            pipe.multi()
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            pipe.expire(key, USER_TTL_SECONDS)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+def get_entitlements(user_id):
+    """Índice del candidato (un HGETALL si está al día con el catálogo)"""
+    from app.services.dashboard_read_model import get_catalog_version
+
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return build_entitlements(user_id)
+
+    try:
+        catalog_version = get_catalog_version(redis_client)
+        # Leer la generación antes que la BD: una invalidación posterior la incrementa
+        generation = redis_client.get(GENERATION_KEY.format(user_id))
+        raw = redis_client.hgetall(USER_KEY.format(user_id))
+        data = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        if data.get('_catalog') == str(catalog_version):
+            return Entitlements(
+                data.get('_scoped') == '1',
+                {int(k[5:]): json.loads(v) for k, v in data.items() if k.startswith('exam:')},
+                {int(k[9:]): json.loads(v) for k, v in data.items() if k.startswith('material:')}
+            )
+
+        entitlements = build_entitlements(user_id)
+        _store(redis_client, user_id, entitlements, catalog_version, generation)
+        return entitlements
+    except Exception as e:
+        print(f"[ENTITLEMENTS] Warning: índice sin Redis para {user_id}: {e}")
+        return build_entitlements(user_id)
+
+
+def candidate_scope(identity):
+    """
+    Índice a aplicar al listado del usuario actual
+
+    Returns:
+        Entitlements, o None si no se filtra (no es candidato, no tiene grupos
+        o ENTITLEMENTS_ENFORCED=false)
+    """
+    if not ENTITLEMENTS_ENFORCED or identity is None or identity.role not in CANDIDATE_ROLES:
+        return None
+    entitlements = get_entitlements(identity.id)
+    return entitlements if entitlements.scoped else None
+
+
+def _can_access(identity, kind, item_id, grace=None):
+    """Un HMGET de tres campos: _scoped, _catalog y el del examen/material"""
+    if not ENTITLEMENTS_ENFORCED or identity is None or identity.role not in CANDIDATE_ROLES:
+        return True
+
+    redis_client = get_redis_client()
+    if redis_client is not None:
+        try:
+            from app.services.dashboard_read_model import get_catalog_version
+            scoped, catalog, windows = redis_client.hmget(
+                USER_KEY.format(identity.id), '_scoped', '_catalog', f'{kind}:{item_id}'
+            )
+            catalog = catalog.decode() if isinstance(catalog, bytes) else catalog
+            if catalog is not None and catalog == str(get_catalog_version(redis_client)):
+                scoped = scoped.decode() if isinstance(scoped, bytes) else scoped
+                if scoped != '1':
+                    return True
+                return windows is not None and _in_window(json.loads(windows), datetime.utcnow(), grace)
+        except Exception as e:
+            print(f"[ENTITLEMENTS] Warning: verificación sin Redis: {e}")
+
+    entitlements = get_entitlements(identity.id)
+    if not entitlements.scoped:
+        return True
+    items = entitlements.exams if kind == 'exam' else entitlements.materials
+    return item_id in items and _in_window(items[item_id], datetime.utcnow(), grace)
+
+
+def can_access_exam(identity, exam_id):
+    """¿El usuario actual puede abrir / presentar el examen?"""
+    return _can_access(identity, 'exam', exam_id)
+
+
+def can_submit_exam(identity, exam):
+    """
+    ¿El usuario actual puede entregar el examen?
+
+    La ventana se exigió al abrirlo (can_access_exam); al entregar se acepta
+    hasta la duración del examen más SUBMIT_GRACE_MINUTES después del cierre.
+    """
+    grace = timedelta(minutes=(exam.duration_minutes or 0) + SUBMIT_GRACE_MINUTES)
+    return _can_access(identity, 'exam', exam.id, grace)
+
+
+def can_access_material(identity, material_id):
+    """¿El usuario actual puede abrir el material?"""
+    return _can_access(identity, 'material', material_id)
+
+
+# ==================== INVALIDACIÓN ====================
+
+def invalidate_entitlements(user_ids):
+    """Descartar el índice de los candidatos (se reconstruye en su siguiente lectura)"""
+    user_ids = [str(u) for u in user_ids if u]
+    if not user_ids:
+        return
+    try:
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            for i in range(0, len(user_ids), 500):
+                pipe = redis_client.pipeline(transaction=False)
+                for u in user_ids[i:i + 500]:
+                    pipe.delete(USER_KEY.format(u))
+                    pipe.incr(GENERATION_KEY.format(u))
+                    pipe.expire(GENERATION_KEY.format(u), USER_TTL_SECONDS)
+                pipe.execute()
+    except Exception as e:
+        print(f"[ENTITLEMENTS] Warning: no se pudo invalidar el índice: {e}")
+
+
+def group_member_ids(group_ids, connection=None):
+    """IDs de los miembros de los grupos"""
+    from app.models.partner import GroupMember
+    group_ids = list(group_ids)
+    if not group_ids:
+        return set()
+    execute = connection.execute if connection is not None else db.session.execute
+    return {
+        row.user_id for row in execute(
+            db.select(GroupMember.user_id).where(GroupMember.group_id.in_(group_ids))
+        )
+    }
+
+
+def mark_entitlements_changed(user_ids=(), group_ids=(), session=None):
+    """
+    Marcar candidatos afectados en la transacción actual (se invalidan al commit)
+
+    Para cambios hechos con INSERT/DELETE de core, que no pasan por los eventos.
+    """
+    session = session or db.session
+    changed = session.info.setdefault('entitlements_changed', set())
+    changed.update(str(u) for u in user_ids)
+    if group_ids:
+        changed.update(group_member_ids(group_ids, connection=session.connection()))
+
+
+def register_entitlement_events():
+    """Invalidar el índice de los candidatos afectados al confirmar cambios de grupos"""
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+
+    from app.models.partner import CandidateGroup, GroupMember, GroupExam
+
+    group_exam_columns = ('is_active', 'available_from', 'available_until', 'exam_id', 'group_id')
+
+    def _changed(obj, columns):
+        state = sa_inspect(obj)
+        return any(state.attrs[column].history.has_changes() for column in columns)
+
+    @event.listens_for(db.session, 'before_flush')
+    def _track_deleted_groups(session, flush_context, instances):
+        # Los miembros se borran en cascada en la BD: leerlos antes del DELETE
+        groups = [obj.id for obj in session.deleted if isinstance(obj, CandidateGroup)]
+        if groups:
+            mark_entitlements_changed(group_ids=groups, session=session)
+
+    @event.listens_for(db.session, 'after_flush')
+    def _track_entitlement_changes(session, flush_context):
+        user_ids, group_ids = set(), set()
+        for obj in list(session.new) + list(session.deleted):
+            if isinstance(obj, GroupMember):
+                user_ids.add(obj.user_id)
+            elif isinstance(obj, GroupExam):
+                group_ids.add(obj.group_id)
+        for obj in session.dirty:
+            if isinstance(obj, GroupMember) and _changed(obj, ('status', 'group_id')):
+                user_ids.add(obj.user_id)
+            elif isinstance(obj, GroupExam) and _changed(obj, group_exam_columns):
+                group_ids.add(obj.group_id)
+            elif isinstance(obj, CandidateGroup) and _changed(obj, ('is_active',)):
+                group_ids.add(obj.id)
+        if user_ids or group_ids:
+            mark_entitlements_changed(user_ids, group_ids, session=session)
+
+    @event.listens_for(db.session, 'after_commit')
+    def _invalidate_on_commit(session):
+        changed = session.info.pop('entitlements_changed', None)
+        if changed:
+            invalidate_entitlements(changed)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _reset_on_rollback(session):
+        session.info.pop('entitlements_changed', None)
@@ -0,0 +1,206 @@
+"""
+Servicio de edición masiva de ejercicios interactivos
+
+Aplica en una sola transacción una lista de cambios sobre pasos y acciones
+(posición, tamaño, orden, etiqueta) de un ejercicio. Sirve tanto para los
+ejercicios de examen (exercise_steps / exercise_actions) como para los de
+material de estudio (study_interactive_exercise_steps / ..._actions).
+
+- Un solo SELECT por tabla para validar que los IDs pertenecen al ejercicio
+- Un solo executemany por tabla para aplicar los cambios
+- Renumeración con un UPDATE basado en ROW_NUMBER() (sin loops por fila)
+"""
+from datetime import datetime
+
+from sqlalchemy import bindparam, text, update
+
+from app import db
+
+
+# Campos editables desde el editor (drag / resize / reordenar / renombrar)
+STEP_BULK_FIELDS = ('step_number', 'title', 'description', 'image_width', 'image_height')
+ACTION_BULK_FIELDS = ('action_number', 'position_x', 'position_y', 'width', 'height', 'label', 'label_style')
+
+
+class BulkPatchError(ValueError):
+    """Error de validación del lote (IDs ajenos al ejercicio, datos inválidos)"""
+
+
+def _collect_changes(changes, allowed_fields, kind):
+    """Normalizar la lista de cambios: {id: {campo: valor}}"""
+    result = {}
+    for change in changes or []:
+        if not isinstance(change, dict) or not change.get('id'):
+            raise BulkPatchError(f'Cada {kind} debe incluir "id"')
+        fields = {k: v for k, v in change.items() if k in allowed_fields}
+        if fields:
+            result.setdefault(str(change['id']), {}).update(fields)
+    return result
+
+
+def _executemany_update(model, rows, fields):
+    """
+    Aplicar las filas con un único executemany
+
+    Todas las filas llevan el mismo conjunto de columnas (los valores no
+    modificados se rellenan con el valor actual), por lo que basta un statement.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    stmt = update(table).where(table.c.id == bindparam('b_id')).values(
+        **{field: bindparam(f'b_{field}') for field in fields},
+        updated_at=bindparam('b_updated_at')
+    )
+    db.session.execute(stmt, rows)
+
+
+def _moved_ids(current, changes, number_field):
+    """
+    (subidos, bajados): IDs cuyo número cambió, según la dirección del movimiento
+
+    current son las filas leídas antes de aplicar los cambios.
+    """
+    moved_up, moved_down = [], []
+    for row in current:
+        old_number, new_number = row[number_field], changes[row['id']].get(number_field)
+        if new_number is None or new_number == old_number:
+            continue
+        (moved_up if old_number is None or new_number < old_number else moved_down).append(row['id'])
+    return moved_up, moved_down
+
+
+def _renumber(model, number_column, parent_column, parent_ids, moved_up, moved_down):
+    """
+    Renumerar 1..n por grupo con una sola sentencia usando ROW_NUMBER()
+
+    Cuando un elemento movido comparte número con otro, el desempate depende de
+    la dirección para que "mover a la posición k" lo deje exactamente en k: si
+    subió queda antes del elemento que ocupaba k (que se desplaza hacia abajo);
+    si bajó queda después (el otro ya se desplazó hacia arriba al salir él).
+    """
+    if not parent_ids:
+        return
+
+    table_name = model.__tablename__
+    window = (
+        f"SELECT id, ROW_NUMBER() OVER ("
+        f"PARTITION BY {parent_column} "
+        f"ORDER BY {number_column}, "
+        f"CASE WHEN id IN :moved_up THEN 0 WHEN id IN :moved_down THEN 2 ELSE 1 END, id"
+        f") AS rn FROM {table_name} WHERE {parent_column} IN :parent_ids"
+    )
+
+    if db.engine.dialect.name == 'mssql':
+        sql = (
+            f"UPDATE t SET {number_column} = r.rn "
+            f"FROM {table_name} t JOIN ({window}) r ON t.id = r.id "
+            f"WHERE t.{number_column} <> r.rn"
+        )
+    else:
+        sql = (
+            f"UPDATE {table_name} SET {number_column} = r.rn "
+            f"FROM ({window}) r WHERE {table_name}.id = r.id "
+            f"AND {table_name}.{number_column} <> r.rn"
+        )
+
+    stmt = text(sql).bindparams(
+        bindparam('moved_up', expanding=True),
+        bindparam('moved_down', expanding=True),
+        bindparam('parent_ids', expanding=True)
+    )
+    db.session.execute(stmt, {
+        'moved_up': list(moved_up) or [''],
+        'moved_down': list(moved_down) or [''],
+        'parent_ids': list(parent_ids)
+    })
+
+
+def apply_bulk_patch(exercise_id, step_model, action_model, steps=None, actions=None):
+    """
+    Aplicar un lote de cambios a pasos y acciones de un ejercicio
+
+    Args:
+        exercise_id: ID del ejercicio
+        step_model: Modelo de paso (ExerciseStep o StudyInteractiveExerciseStep)
+        action_model: Modelo de acción (ExerciseAction o StudyInteractiveExerciseAction)
+        steps: Lista de {id, step_number?, title?, description?, image_width?, image_height?}
+        actions: Lista de {id, action_number?, position_x?, position_y?, width?, height?, label?, label_style?}
+
+    Returns:
+        dict: {'steps_updated': n, 'actions_updated': m}
+
+    Raises:
+        BulkPatchError: Si algún ID no pertenece al ejercicio
+
+    No hace commit: el llamador controla la transacción.
+    """
+    step_changes = _collect_changes(steps, STEP_BULK_FIELDS, 'paso')
+    action_changes = _collect_changes(actions, ACTION_BULK_FIELDS, 'acción')
+    now = datetime.utcnow()
+
+    # ---- Pasos ----
+    if step_changes:
+        step_table = step_model.__table__
+        current = db.session.execute(
+            db.select(step_table.c.id, *[step_table.c[f] for f in STEP_BULK_FIELDS]).where(
+                step_table.c.exercise_id == exercise_id,
+                step_table.c.id.in_(list(step_changes.keys()))
+            )
+        ).mappings().all()
+
+        missing = set(step_changes) - {row['id'] for row in current}
+        if missing:
+            raise BulkPatchError(f'Pasos no pertenecen al ejercicio: {", ".join(sorted(missing))}')
+
+        rows = []
+        for row in current:
+            merged = {f: row[f] for f in STEP_BULK_FIELDS}
+            merged.update(step_changes[row['id']])
+            params = {f'b_{f}': v for f, v in merged.items()}
+            params['b_id'] = row['id']
+            params['b_updated_at'] = now
+            rows.append(params)
+        _executemany_update(step_model, rows, STEP_BULK_FIELDS)
+
+        moved_up, moved_down = _moved_ids(current, step_changes, 'step_number')
+        if moved_up or moved_down:
+            _renumber(step_model, 'step_number', 'exercise_id', [exercise_id], moved_up, moved_down)
+
+    # ---- Acciones ----
+    if action_changes:
+        step_table = step_model.__table__
+        action_table = action_model.__table__
+        current = db.session.execute(
+            db.select(action_table.c.id, action_table.c.step_id, *[action_table.c[f] for f in ACTION_BULK_FIELDS]).join(
+                step_table, step_table.c.id == action_table.c.step_id
+            ).where(
+                step_table.c.exercise_id == exercise_id,
+                action_table.c.id.in_(list(action_changes.keys()))
+            )
+        ).mappings().all()
+
+        missing = set(action_changes) - {row['id'] for row in current}
+        if missing:
+            raise BulkPatchError(f'Acciones no pertenecen al ejercicio: {", ".join(sorted(missing))}')
+
+        rows = []
+        for row in current:
+            merged = {f: row[f] for f in ACTION_BULK_FIELDS}
+            merged.update(action_changes[row['id']])
+            params = {f'b_{f}': v for f, v in merged.items()}
+            params['b_id'] = row['id']
+            params['b_updated_at'] = now
+            rows.append(params)
+        _executemany_update(action_model, rows, ACTION_BULK_FIELDS)
+
+        moved_up, moved_down = _moved_ids(current, action_changes, 'action_number')
+        if moved_up or moved_down:
+            moved = set(moved_up) | set(moved_down)
+            touched_steps = {row['step_id'] for row in current if row['id'] in moved}
+            _renumber(action_model, 'action_number', 'step_id', touched_steps, moved_up, moved_down)
+
+    return {
+        'steps_updated': len(step_changes),
+        'actions_updated': len(action_changes)
+    }
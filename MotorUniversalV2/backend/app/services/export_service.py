@@ -0,0 +1,225 @@
+"""
+Servicio de exportación CSV / Excel en streaming
+
+Las exportaciones recorren la consulta con yield_per (cursor del servidor, sin
+cargar el resultado completo) y envían la respuesta por partes (chunked), de
+modo que una exportación de 200k filas usa memoria constante:
+
+- CSV: se escribe y envía cada CSV_FLUSH_ROWS filas
+- XLSX: openpyxl en modo write-only escribe fila por fila a un archivo
+  temporal, que al cerrarse se envía en bloques de XLSX_CHUNK_BYTES
+
+Los conjuntos de datos (usuarios, miembros de grupo y resultados con su
+desglose por categoría) se definen aquí; los filtros los arma cada ruta igual
+que su listado paginado.
+"""
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+
+from flask import Response, stream_with_context
+
+from app import db
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+CSV_FLUSH_ROWS = 1000
+XLSX_CHUNK_BYTES = 64 * 1024
+YIELD_PER = 1000
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Prefijos que Excel interpreta como fórmula (inyección en CSV)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(Exception):
+    """Parámetros de exportación inválidos"""
+
+
+def export_format(value):
+    """Formato solicitado (csv por defecto)"""
+    fmt = (value or 'csv').strip().lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Formato no soportado: {fmt}. Usa {' o '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+def _safe_text(value):
+    if value and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return _safe_text(value)
+    return value
+
+
+def _xlsx_value(value):
+    if isinstance(value, str):
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        return _safe_text(ILLEGAL_CHARACTERS_RE.sub('', value))
+    return value
+
+
+def iter_csv(columns, rows):
+    """CSV (UTF-8 con BOM para Excel) por partes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_xlsx(sheet_title, columns, rows):
+    """XLSX write-only a un archivo temporal, enviado en bloques al terminar"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(columns)
+    for row in rows:
+        sheet.append([_xlsx_value(value) for value in row])
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(XLSX_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_response(filename, columns, rows, fmt, sheet_title='Datos'):
+    """
+    Respuesta en streaming (sin Content-Length: transferencia chunked)
+
+    Args:
+        filename: Nombre del archivo sin extensión
+        columns: Encabezados
+        rows: Iterable perezoso de filas (se consume dentro de la respuesta)
+        fmt: 'csv' o 'xlsx'
+    """
+    if fmt == 'xlsx':
+        body, mimetype = iter_xlsx(sheet_title, columns, rows), XLSX_MIMETYPE
+    else:
+        body, mimetype = iter_csv(columns, rows), 'text/csv; charset=utf-8'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}.{fmt}"',
+            'X-Accel-Buffering': 'no',
+            'Cache-Control': 'no-store',
+        }
+    )
+
+
+# ==================== CONJUNTOS DE DATOS ====================
+
+USER_COLUMNS = [
+    'id', 'username', 'email', 'nombre', 'primer_apellido', 'segundo_apellido', 'curp', 'genero',
+    'telefono', 'rol', 'activo', 'verificado', 'creado', 'ultimo_acceso'
+]
+
+
+def _user_fields():
+    from app.models.user import User
+    return (
+        User.id, User.username, User.email, User.name, User.first_surname, User.second_surname,
+        User.curp, User.gender, User.phone, User.role, User.is_active, User.is_verified,
+        User.created_at, User.last_login
+    )
+
+
+def user_rows(query):
+    """Filas de usuarios de una consulta ya filtrada y ordenada (solo columnas exportadas)"""
+    for row in query.with_entities(*_user_fields()).yield_per(YIELD_PER):
+        yield tuple(row)
+
+
+MEMBER_COLUMNS = USER_COLUMNS[:10] + ['estado_en_grupo', 'fecha_ingreso', 'notas']
+
+
+def member_rows(query):
+    """Filas de miembros de grupo (consulta sobre GroupMember ya filtrada)"""
+    from app.models.user import User
+    from app.models.partner import GroupMember
+
+    rows = query.join(User, User.id == GroupMember.user_id).with_entities(
+        *_user_fields()[:10], GroupMember.status, GroupMember.joined_at, GroupMember.notes
+    ).order_by(User.first_surname, User.name, User.id)
+    for row in rows.yield_per(YIELD_PER):
+        yield tuple(row)
+
+
+RESULT_COLUMNS = [
+    'resultado_id', 'usuario_id', 'username', 'nombre', 'primer_apellido', 'segundo_apellido', 'curp',
+    'examen_id', 'examen', 'ecm', 'calificacion', 'aprobado', 'estado', 'duracion_seg', 'inicio', 'fin',
+    'codigo_certificado', 'categoria', 'tema', 'puntos_obtenidos', 'puntos_maximos', 'porcentaje'
+]
+
+
+def results_query(*criteria):
+    """
+    Resultados con su desglose por categoría y tema (result_category_facts)
+
+    Una fila por (resultado, categoría, tema); los resultados sin desglose
+    aparecen una vez con las columnas de categoría vacías.
+    """
+    from app.models.user import User
+    from app.models.exam import Exam
+    from app.models.result import Result
+    from app.models.competency_standard import CompetencyStandard
+    from app.models.result_analytics import ResultCategoryFact
+
+    return db.session.query(
+        Result.id, Result.user_id, User.username, User.name, User.first_surname, User.second_surname,
+        User.curp, Result.exam_id, Exam.name.label('exam_name'), CompetencyStandard.code.label('ecm_code'),
+        Result.score, Result.result, Result.status, Result.duration_seconds, Result.start_date, Result.end_date,
+        Result.certificate_code, ResultCategoryFact.category, ResultCategoryFact.topic,
+        ResultCategoryFact.earned, ResultCategoryFact.max_score
+    ).join(
+        User, User.id == Result.user_id
+    ).outerjoin(
+        Exam, Exam.id == Result.exam_id
+    ).outerjoin(
+        CompetencyStandard, CompetencyStandard.id == Result.competency_standard_id
+    ).outerjoin(
+        ResultCategoryFact, ResultCategoryFact.result_id == Result.id
+    ).filter(*criteria).order_by(
+        Result.created_at.desc(), Result.id, ResultCategoryFact.category, ResultCategoryFact.topic
+    )
+
+
+RESULT_STATUS_LABELS = {0: 'en_proceso', 1: 'completado', 2: 'abandonado'}
+
+
+def result_rows(query):
+    """Filas de results_query()"""
+    for row in query.yield_per(YIELD_PER):
+        percentage = round(row.earned * 100 / row.max_score, 1) if row.max_score else None
+        yield (
+            row.id, row.user_id, row.username, row.name, row.first_surname, row.second_surname, row.curp,
+            row.exam_id, row.exam_name, row.ecm_code, row.score, row.result == 1,
+            RESULT_STATUS_LABELS.get(row.status, row.status), row.duration_seconds, row.start_date, row.end_date,
+            row.certificate_code, row.category, row.topic,
+            round(row.earned, 2) if row.earned is not None else None,
+            round(row.max_score, 2) if row.max_score is not None else None,
+            percentage
+        )
@@ -0,0 +1,239 @@
+"""
+Servicio de materiales de estudio por grupo-examen
+
+Calcula el conjunto efectivo de materiales de muchos grupo-exámenes a la vez:
+
+- Con personalizaciones (group_exam_materials): los materiales marcados como incluidos
+- Sin personalizaciones: los materiales publicados vinculados al examen
+  (study_material_exams) y, si no hay, los publicados con exam_id (legacy)
+
+Son a lo más cuatro consultas con parámetros para cualquier número de
+grupo-exámenes. El resultado se guarda en Redis por grupo-examen:
+
+    group_exam:materials:version:{id}          -> versión de personalización (INCR al editar)
+    group_exam:materials:{id}:{versión}:{cat}  -> JSON del resultado
+
+`cat` es la versión del catálogo del dashboard (dashboard_read_model), que
+cambia al publicar o editar materiales y exámenes.
+"""
+import json
+
+from app import db
+from app.models.partner import GroupExam, GroupExamMaterial
+from app.models.study_content import StudyMaterial, study_material_exams
+from app.services.dashboard_read_model import get_catalog_version
+from app.utils.cache_utils import get_redis_client
+
+VERSION_KEY = 'group_exam:materials:version:{}'
+RESULT_KEY = 'group_exam:materials:{}:{}:{}'
+RESULT_TTL_SECONDS = 1800
+
+
+def _material_dict(material, is_custom):
+    return {
+        'id': material.id,
+        'title': material.title,
+        'description': material.description,
+        'cover_image_url': material.image_url,
+        'is_custom': is_custom,
+    }
+
+
+def get_customizations(group_exam_ids):
+    """{group_exam_id: {study_material_id: is_included}} en una consulta"""
+    customizations = {}
+    if not group_exam_ids:
+        return customizations
+    rows = db.session.query(
+        GroupExamMaterial.group_exam_id,
+        GroupExamMaterial.study_material_id,
+        GroupExamMaterial.is_included
+    ).filter(GroupExamMaterial.group_exam_id.in_(group_exam_ids))
+    for row in rows:
+        customizations.setdefault(row.group_exam_id, {})[row.study_material_id] = bool(row.is_included)
+    return customizations
+
+
+def get_linked_material_ids(exam_ids):
+    """{exam_id: [study_material_id]} desde study_material_exams (sin filtrar publicados)"""
+    linked = {}
+    if not exam_ids:
+        return linked
+    try:
+        rows = db.session.query(
+            study_material_exams.c.exam_id,
+            study_material_exams.c.study_material_id
+        ).filter(study_material_exams.c.exam_id.in_(exam_ids))
+        for row in rows:
+            linked.setdefault(row.exam_id, []).append(row.study_material_id)
+    except Exception as e:
+        # La tabla puede no existir en bases antiguas
+        print(f"[GROUP-MATERIALS] Warning: study_material_exams no disponible: {e}")
+    return linked
+
+
+def _material_columns():
+    return (
+        StudyMaterial.id, StudyMaterial.title, StudyMaterial.description,
+        StudyMaterial.image_url, StudyMaterial.exam_id, StudyMaterial.is_published
+    )
+
+
+def compute_group_exam_materials(group_exams):
+    """
+    Materiales efectivos de varios grupo-exámenes (sin caché)
+
+    Args:
+        group_exams: iterable de objetos con id y exam_id
+
+    Returns:
+        dict: {group_exam_id: {'study_materials': [...], 'has_custom_materials': bool}}
+    """
+    group_exams = list(group_exams)
+    customizations = get_customizations([ge.id for ge in group_exams])
+
+    default_exam_ids = {ge.exam_id for ge in group_exams if ge.id not in customizations}
+    custom_ids = {
+        material_id
+        for materials in customizations.values()
+        for material_id, is_included in materials.items() if is_included
+    }
+
+    # Vinculados por examen (solo publicados) y materiales personalizados: una consulta
+    linked = get_linked_material_ids(list(default_exam_ids))
+    linked_ids = {material_id for ids in linked.values() for material_id in ids}
+    materials = {}
+    wanted = list(custom_ids | linked_ids)
+    for i in range(0, len(wanted), 1000):
+        for material in db.session.query(*_material_columns()).filter(StudyMaterial.id.in_(wanted[i:i + 1000])):
+            materials[material.id] = material
+
+    by_exam = {}
+    for exam_id, ids in linked.items():
+        published = [materials[m] for m in ids if m in materials and materials[m].is_published]
+        if published:
+            by_exam[exam_id] = published
+
+    # Legacy: materiales con exam_id para los exámenes sin vínculos publicados
+    legacy_exam_ids = [exam_id for exam_id in default_exam_ids if exam_id not in by_exam]
+    if legacy_exam_ids:
+        for material in db.session.query(*_material_columns()).filter(
+            StudyMaterial.exam_id.in_(legacy_exam_ids),
+            StudyMaterial.is_published == True
+        ).order_by(StudyMaterial.id):
+            by_exam.setdefault(material.exam_id, []).append(material)
+
+    result = {}
+    for ge in group_exams:
+        custom = customizations.get(ge.id)
+        if custom:
+            items = [
+                _material_dict(materials[material_id], True)
+                for material_id, is_included in custom.items()
+                if is_included and material_id in materials
+            ]
+        else:
+            items = [_material_dict(m, False) for m in by_exam.get(ge.exam_id, [])]
+        result[ge.id] = {'study_materials': items, 'has_custom_materials': bool(custom)}
+    return result
+
+
+def resolve_group_exam_materials(group_exams):
+    """
+    Materiales efectivos de varios grupo-exámenes, desde Redis si están al día
+
+    Dos lecturas (MGET de versiones y MGET de resultados); los faltantes se
+    calculan juntos con compute_group_exam_materials() y se guardan.
+    """
+    group_exams = list(group_exams)
+    if not group_exams:
+        return {}
+
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return compute_group_exam_materials(group_exams)
+
+    try:
+        catalog_version = get_catalog_version(redis_client)
+        versions = redis_client.mget([VERSION_KEY.format(ge.id) for ge in group_exams])
+        keys = {
+            ge.id: RESULT_KEY.format(ge.id, int(version or 0), catalog_version)
+            for ge, version in zip(group_exams, versions)
+        }
+        cached = redis_client.mget(list(keys.values()))
+    except Exception as e:
+        print(f"[GROUP-MATERIALS] Warning: caché no disponible: {e}")
+        return compute_group_exam_materials(group_exams)
+
+    result, missing = {}, []
+    for ge, raw in zip(group_exams, cached):
+        if raw:
+            result[ge.id] = json.loads(raw)
+        else:
+            missing.append(ge)
+
+    if missing:
+        computed = compute_group_exam_materials(missing)
+        result.update(computed)
+        try:
+            pipe = redis_client.pipeline()
+            for group_exam_id, data in computed.items():
+                pipe.set(keys[group_exam_id], json.dumps(data), ex=RESULT_TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            print(f"[GROUP-MATERIALS] Warning: no se pudo guardar en caché: {e}")
+
+    return result
+
+
+def invalidate_group_exam_materials(group_exam_id):
+    """Nueva versión de personalización (llamar después del commit)"""
+    try:
+        redis_client = get_redis_client()
+        if redis_client is not None:
+            redis_client.incr(VERSION_KEY.format(group_exam_id))
+    except Exception as e:
+        print(f"[GROUP-MATERIALS] Warning: no se pudo invalidar {group_exam_id}: {e}")
+
+
+def get_candidate_study_materials(user_id, now=None):
+    """
+    Materiales que el candidato puede estudiar por sus grupos
+
+    Recorre las membresías activas del candidato en grupos activos y los
+    grupo-exámenes activos y vigentes (available_from / available_until).
+
+    Returns:
+        list: materiales sin duplicados, cada uno con los exámenes que lo asignan
+    """
+    from datetime import datetime
+    from app.models.partner import CandidateGroup, GroupMember
+    from app.models.exam import Exam
+
+    now = now or datetime.utcnow()
+    rows = db.session.query(
+        GroupExam.id, GroupExam.exam_id, GroupExam.group_id, Exam.name.label('exam_name')
+    ).join(
+        GroupMember, GroupMember.group_id == GroupExam.group_id
+    ).join(
+        CandidateGroup, CandidateGroup.id == GroupExam.group_id
+    ).join(
+        Exam, Exam.id == GroupExam.exam_id
+    ).filter(
+        GroupMember.user_id == str(user_id),
+        GroupMember.status == 'active',
+        CandidateGroup.is_active == True,
+        GroupExam.is_active == True,
+        db.or_(GroupExam.available_from.is_(None), GroupExam.available_from <= now),
+        db.or_(GroupExam.available_until.is_(None), GroupExam.available_until >= now)
+    ).all()
+
+    resolved = resolve_group_exam_materials(rows)
+
+    materials = {}
+    for row in rows:
+        for material in resolved.get(row.id, {}).get('study_materials', []):
+            entry = materials.setdefault(material['id'], dict(material, exams=[]))
+            if not any(e['exam_id'] == row.exam_id for e in entry['exams']):
+                entry['exams'].append({'exam_id': row.exam_id, 'exam_name': row.exam_name, 'group_id': row.group_id})
+    return sorted(materials.values(), key=lambda m: (m['title'] or '').lower())
@@ -0,0 +1,344 @@
+"""
+Servicio de membresía de grupos
+
+Alta masiva de candidatos en un grupo con operaciones por conjunto: por cada
+bloque se hace una consulta IN de usuarios, una de miembros existentes, un
+COUNT para la capacidad y un solo INSERT de varias filas, sin importar el
+tamaño del bloque.
+
+Se usa de forma síncrona desde routes/partners para listas pequeñas y como
+handler 'group_members_bulk' (services/job_handlers) para listas grandes, por
+bloques con checkpoint. También resuelve listas (CSV/Excel) por CURP o email y
+mueve candidatos entre grupos en una sola transacción.
+"""
+import csv
+import io
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.user import User
+from app.models.partner import GroupMember
+from app.services.entitlement_service import mark_entitlements_changed
+
+GROUP_BULK_CHUNK_SIZE = 200
+ROSTER_KEY_COLUMNS = ('curp', 'email')
+
+
+class RosterError(Exception):
+    """Archivo de lista inválido (formato o encabezados)"""
+
+
+def new_summary():
+    return {'added': [], 'errors': []}
+
+
+def _mark_changed(user_ids):
+    # Los INSERT/DELETE de core no pasan por los eventos de la sesión
+    db.session.info['stats_snapshot_changed'] = True
+    mark_entitlements_changed(user_ids)
+
+
+def _unique_ids(user_ids, summary):
+    """IDs sin duplicados, en el orden recibido (los repetidos se reportan)"""
+    seen, unique = set(), []
+    for user_id in user_ids:
+        user_id = str(user_id)
+        if user_id in seen:
+            summary['errors'].append({'user_id': user_id, 'error': 'Duplicado en la lista'})
+            continue
+        seen.add(user_id)
+        unique.append(user_id)
+    return unique
+
+
+def _eligible_candidates(user_ids, summary):
+    """
+    Una consulta IN: conservar solo candidatos activos
+
+    Returns:
+        list: IDs válidos en el orden recibido
+    """
+    rows = db.session.query(User.id, User.role, User.is_active).filter(User.id.in_(user_ids)).all()
+    found = {row.id: row for row in rows}
+
+    eligible = []
+    for user_id in user_ids:
+        row = found.get(user_id)
+        if row is None:
+            summary['errors'].append({'user_id': user_id, 'error': 'Usuario no encontrado'})
+        elif row.role != 'candidato':
+            summary['errors'].append({'user_id': user_id, 'error': 'No es candidato'})
+        elif not row.is_active:
+            summary['errors'].append({'user_id': user_id, 'error': 'Usuario inactivo'})
+        else:
+            eligible.append(user_id)
+    return eligible
+
+
+def _existing_members(group_id, user_ids):
+    if not user_ids:
+        return set()
+    return {
+        row.user_id for row in db.session.query(GroupMember.user_id).filter(
+            GroupMember.group_id == group_id,
+            GroupMember.user_id.in_(user_ids)
+        )
+    }
+
+
+def _available_slots(group):
+    """Lugares libres del grupo (None = sin límite)"""
+    if group.max_members is None:
+        return None
+    current_count = db.session.query(db.func.count(GroupMember.id)).filter(
+        GroupMember.group_id == group.id
+    ).scalar()
+    return max(group.max_members - current_count, 0)
+
+
+def _plan_additions(group, user_ids, summary):
+    """Candidatos del bloque que entran al grupo (validación, duplicados y capacidad)"""
+    eligible = _eligible_candidates(_unique_ids(user_ids, summary), summary)
+
+    existing = _existing_members(group.id, eligible)
+    pending = []
+    for user_id in eligible:
+        if user_id in existing:
+            summary['errors'].append({'user_id': user_id, 'error': 'Ya es miembro'})
+        else:
+            pending.append(user_id)
+
+    slots = _available_slots(group)
+    if slots is not None and len(pending) > slots:
+        for user_id in pending[slots:]:
+            summary['errors'].append({'user_id': user_id, 'error': 'Capacidad máxima alcanzada'})
+        pending = pending[:slots]
+    return pending
+
+
+def _insert_members(group_id, user_ids):
+    """Un INSERT de varias filas (sin commit)"""
+    if not user_ids:
+        return
+    now = datetime.utcnow()
+    db.session.execute(db.insert(GroupMember), [
+        {'group_id': group_id, 'user_id': user_id, 'status': 'active', 'joined_at': now}
+        for user_id in user_ids
+    ])
+    _mark_changed(user_ids)
+
+
+def add_members_chunk(group, user_ids, summary):
+    """
+    Agregar un bloque de candidatos al grupo (sin commit)
+
+    Acumula los resultados en summary {'added', 'errors'}. Si otro request
+    agregó alguno de los usuarios entre la validación y el INSERT, se repite
+    la validación del bloque una vez.
+    """
+    for attempt in range(2):
+        attempt_summary = new_summary()
+        pending = _plan_additions(group, user_ids, attempt_summary)
+        try:
+            with db.session.begin_nested():
+                _insert_members(group.id, pending)
+        except IntegrityError:
+            if attempt:
+                raise
+            continue
+        summary['errors'].extend(attempt_summary['errors'])
+        summary['added'].extend(pending)
+        return summary
+
+
+def add_members_bulk(group, user_ids, chunk_size=GROUP_BULK_CHUNK_SIZE, resume_from=None,
+                     checkpoint_callback=None, progress_callback=None, initial_errors=None):
+    """
+    Agregar candidatos al grupo por bloques, con un commit por bloque
+
+    Args:
+        group: CandidateGroup destino
+        user_ids: IDs de usuario en el orden recibido
+        resume_from: Checkpoint {'offset', 'summary'} de una ejecución anterior
+        checkpoint_callback: fn(checkpoint) llamada antes del commit de cada bloque
+        progress_callback: fn(processed, total, summary) llamada tras cada bloque
+        initial_errors: Errores previos (p. ej. filas de la lista sin usuario)
+
+    Returns:
+        dict: {'added', 'errors'}
+    """
+    offset = 0
+    summary = new_summary()
+    summary['errors'].extend(initial_errors or [])
+    if resume_from:
+        offset = resume_from.get('offset') or 0
+        summary = resume_from.get('summary') or summary
+
+    total = len(user_ids)
+    try:
+        while offset < total:
+            chunk = user_ids[offset:offset + chunk_size]
+            add_members_chunk(group, chunk, summary)
+            offset += len(chunk)
+            if checkpoint_callback:
+                checkpoint_callback({'offset': offset, 'summary': summary})
+            db.session.commit()
+            if progress_callback:
+                progress_callback(offset, total, summary)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return summary
+
+
+def move_members(source_group, target_group, user_ids):
+    """
+    Mover candidatos de un grupo a otro en una sola transacción
+
+    Solo se mueven los miembros actuales del grupo origen que no estén ya en el
+    destino y que quepan en él; el resto se reporta en errors. Los miembros
+    movidos entran al destino como activos (las notas del origen no se copian).
+
+    Returns:
+        dict: {'moved', 'errors'}
+    """
+    summary = new_summary()
+    unique = _unique_ids(user_ids, summary)
+
+    in_source = _existing_members(source_group.id, unique)
+    candidates = []
+    for user_id in unique:
+        if user_id in in_source:
+            candidates.append(user_id)
+        else:
+            summary['errors'].append({'user_id': user_id, 'error': 'No es miembro del grupo origen'})
+
+    in_target = _existing_members(target_group.id, candidates)
+    pending = []
+    for user_id in candidates:
+        if user_id in in_target:
+            summary['errors'].append({'user_id': user_id, 'error': 'Ya es miembro del grupo destino'})
+        else:
+            pending.append(user_id)
+
+    slots = _available_slots(target_group)
+    if slots is not None and len(pending) > slots:
+        for user_id in pending[slots:]:
+            summary['errors'].append({'user_id': user_id, 'error': 'Capacidad máxima alcanzada'})
+        pending = pending[:slots]
+
+    try:
+        for i in range(0, len(pending), GROUP_BULK_CHUNK_SIZE):
+            chunk = pending[i:i + GROUP_BULK_CHUNK_SIZE]
+            db.session.execute(db.delete(GroupMember).where(
+                GroupMember.group_id == source_group.id,
+                GroupMember.user_id.in_(chunk)
+            ))
+            _insert_members(target_group.id, chunk)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'moved': pending, 'errors': summary['errors']}
+
+
+# ==================== LISTAS (CSV / EXCEL) ====================
+
+def _roster_rows(filename, content):
+    """Filas (lista de valores) de un CSV o de la primera hoja de un Excel"""
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        try:
+            text = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            text = content.decode('latin-1')
+        sample = text[:2048]
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        return list(csv.reader(io.StringIO(text), dialect))
+
+    if name.endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+        try:
+            workbook = load_workbook(filename=io.BytesIO(content), read_only=True, data_only=True)
+        except Exception as e:
+            raise RosterError(f'Error al leer el archivo Excel: {str(e)}')
+        try:
+            return [list(values) for values in workbook.active.iter_rows(values_only=True)]
+        finally:
+            workbook.close()
+
+    raise RosterError('Formato no soportado. Usa un archivo .csv o .xlsx')
+
+
+def parse_roster(filename, content):
+    """
+    Leer una lista de candidatos identificados por CURP o email
+
+    La primera fila es el encabezado y debe tener una columna 'curp' o 'email'
+    (si tiene ambas, se usa CURP y el email como respaldo por fila).
+
+    Returns:
+        list: [(fila, {'curp': ..., 'email': ...})]
+
+    Raises:
+        RosterError: si el archivo no se puede leer o no tiene columna clave
+    """
+    rows = _roster_rows(filename, content)
+    if not rows:
+        raise RosterError('El archivo está vacío')
+
+    header = [str(h or '').strip().lower() for h in rows[0]]
+    indices = {column: header.index(column) for column in ROSTER_KEY_COLUMNS if column in header}
+    if not indices:
+        raise RosterError('El archivo debe tener una columna "curp" o "email"')
+
+    entries = []
+    for row_number, values in enumerate(rows[1:], start=2):
+        keys = {}
+        for column, index in indices.items():
+            value = values[index] if index < len(values) else None
+            value = str(value).strip() if value is not None else ''
+            if value:
+                keys[column] = value.upper() if column == 'curp' else value.lower()
+        if keys:
+            entries.append((row_number, keys))
+    return entries
+
+
+def resolve_roster(entries):
+    """
+    Resolver las filas de la lista a IDs de usuario (una consulta IN por columna y bloque)
+
+    Returns:
+        (user_ids en el orden de la lista, errores de filas sin usuario)
+    """
+    by_curp, by_email = {}, {}
+    curps = list({keys['curp'] for _, keys in entries if 'curp' in keys})
+    emails = list({keys['email'] for _, keys in entries if 'email' in keys})
+
+    for i in range(0, len(curps), 1000):
+        for row in db.session.query(User.id, User.curp).filter(User.curp.in_(curps[i:i + 1000])):
+            by_curp[row.curp.upper()] = row.id
+    for i in range(0, len(emails), 1000):
+        for row in db.session.query(User.id, User.email).filter(User.email.in_(emails[i:i + 1000])):
+            by_email[row.email.lower()] = row.id
+
+    user_ids, errors = [], []
+    for row_number, keys in entries:
+        user_id = by_curp.get(keys.get('curp')) or by_email.get(keys.get('email'))
+        if user_id:
+            user_ids.append(user_id)
+        else:
+            errors.append({
+                'row': row_number,
+                'key': keys.get('curp') or keys.get('email'),
+                'error': 'Usuario no encontrado'
+            })
+    return user_ids, errors
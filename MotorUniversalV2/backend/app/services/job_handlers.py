@@ -0,0 +1,182 @@
+"""
+Handlers de trabajos en segundo plano
+
+Cada handler recibe un JobContext, procesa por bloques guardando el checkpoint
+en la misma transacción del bloque y devuelve el resultado (JSON) del trabajo.
+"""
+import json
+import os
+import tempfile
+
+from app.services.job_service import register_handler
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+@register_handler('candidate_import')
+def candidate_import(ctx):
+    """Importación masiva de candidatos desde el Excel subido (entrada 'upload.xlsx')"""
+    from app.services.candidate_import_service import import_candidates, build_credentials_workbook
+
+    data = ctx.get_input('upload.xlsx')
+    if data is None:
+        raise ValueError('No se encontró el archivo de la importación')
+
+    fd, path = tempfile.mkstemp(prefix='candidates-', suffix='.xlsx')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(data)
+
+    def on_progress(processed, total, summary):
+        ctx.set_progress(
+            processed=processed,
+            total=total,
+            created=len(summary['created']),
+            errors=len(summary['errors']),
+            skipped=len(summary['skipped'])
+        )
+
+    def on_credentials(credentials):
+        # Contraseñas generadas del bloque: fuera del checkpoint y del resultado
+        ctx.stage_data('credenciales', json.dumps(credentials).encode('utf-8'))
+
+    try:
+        results = import_candidates(
+            path,
+            progress_callback=on_progress,
+            resume_from=ctx.checkpoint,
+            checkpoint_callback=ctx.stage_checkpoint,
+            credentials_callback=on_credentials
+        )
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    passwords = {}
+    for data in ctx.pop_staged_data():
+        passwords.update((c['row'], c['password']) for c in json.loads(data))
+    if results['created']:
+        ctx.add_artifact(
+            'credenciales_candidatos.xlsx',
+            build_credentials_workbook(results['created'], passwords),
+            XLSX_CONTENT_TYPE,
+            sensitive=True
+        )
+
+    return {
+        'message': f'Proceso completado: {len(results["created"])} usuarios creados',
+        'summary': {
+            'total_processed': results['total_processed'],
+            'created': len(results['created']),
+            'errors': len(results['errors']),
+            'skipped': len(results['skipped'])
+        },
+        'details': results
+    }
+
+
+@register_handler('group_members_bulk')
+def group_members_bulk(ctx):
+    """Alta masiva de candidatos en un grupo (payload: group_id, user_ids, initial_errors)"""
+    from app.models.partner import CandidateGroup
+    from app.services.group_member_service import add_members_bulk
+
+    group = CandidateGroup.query.get(ctx.payload.get('group_id'))
+    if not group:
+        raise ValueError('Grupo no encontrado')
+
+    def on_progress(processed, total, summary):
+        ctx.set_progress(
+            processed=processed,
+            total=total,
+            added=len(summary['added']),
+            errors=len(summary['errors'])
+        )
+
+    results = add_members_bulk(
+        group,
+        ctx.payload.get('user_ids') or [],
+        resume_from=ctx.checkpoint,
+        checkpoint_callback=ctx.stage_checkpoint,
+        progress_callback=on_progress,
+        initial_errors=ctx.payload.get('initial_errors')
+    )
+
+    return {
+        'message': f'{len(results["added"])} miembros agregados',
+        'added': results['added'],
+        'errors': results['errors']
+    }
+
+
+@register_handler('conocer_reconcile')
+def conocer_reconcile(ctx):
+    """Reconciliación de certificados CONOCER contra el contenedor (payload: fix_tags)"""
+    from app.services.conocer_blob_service import get_conocer_blob_service
+    from app.services.conocer_reconcile_service import reconcile_certificates
+
+    def on_progress(phase, summary):
+        ctx.set_progress(
+            phase=phase,
+            blobs_scanned=summary['blobs_scanned'],
+            orphan_blobs=summary['orphan_blobs'],
+            missing_blobs=summary['missing_blobs'],
+            tag_mismatches=summary['tag_mismatches']
+        )
+
+    summary = reconcile_certificates(
+        get_conocer_blob_service(),
+        fix_tags=bool(ctx.payload.get('fix_tags')),
+        resume_from=ctx.checkpoint,
+        checkpoint_callback=ctx.stage_checkpoint,
+        progress_callback=on_progress
+    )
+
+    return {
+        'message': (f"{summary['orphan_blobs']} blobs huérfanos, "
+                    f"{summary['missing_blobs']} certificados sin archivo"),
+        'summary': summary
+    }
+
+
+@register_handler('conocer_ingest')
+def conocer_ingest(ctx):
+    """Ingesta masiva de certificados CONOCER (entradas 'certificados.zip' y opcional 'manifest.csv')"""
+    from app.services.conocer_blob_service import get_conocer_blob_service
+    from app.services.conocer_ingest_service import ingest_certificates, build_report_csv
+
+    zip_data = ctx.get_input('certificados.zip')
+    if zip_data is None:
+        raise ValueError('No se encontró el archivo ZIP de la carga')
+
+    def on_progress(processed, total, summary):
+        ctx.set_progress(
+            processed=processed,
+            total=total,
+            created=summary['created'],
+            errors=summary['errors'],
+            skipped=summary['skipped']
+        )
+
+    results = ingest_certificates(
+        zip_data,
+        get_conocer_blob_service(),
+        manifest_data=ctx.get_input('manifest.csv'),
+        uploaded_by=ctx.payload.get('uploaded_by'),
+        resume_from=ctx.checkpoint,
+        checkpoint_callback=ctx.stage_checkpoint,
+        progress_callback=on_progress
+    )
+
+    ctx.add_artifact('reporte_certificados.csv', build_report_csv(results['report']), 'text/csv; charset=utf-8')
+
+    return {
+        'message': f'Proceso completado: {results["created"]} certificados creados',
+        'summary': {
+            'total_processed': results['total_processed'],
+            'created': results['created'],
+            'errors': results['errors'],
+            'skipped': results['skipped']
+        }
+    }
@@ -0,0 +1,400 @@
+"""
+Servicio de trabajos en segundo plano
+
+- enqueue_job(): crea el registro en `jobs` (y sus archivos de entrada)
+- claim_next_job(): el worker toma un trabajo con un UPDATE condicional,
+  de modo que varios workers nunca ejecutan el mismo trabajo
+- run_job(): ejecuta el handler registrado para el tipo de trabajo
+- requeue_stale_jobs(): reencola trabajos cuyo worker dejó de latir; el
+  handler continúa desde el último checkpoint confirmado. Si el worker
+  original seguía vivo (solo lento), sus escrituras de checkpoint, progreso y
+  resultado van condicionadas a locked_by: no se aplican y abandona el intento
+
+Los handlers se registran con @register_handler('<tipo>') en
+services/job_handlers y reciben un JobContext.
+"""
+import copy
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.models.job import Job, JobArtifact
+
+JOB_HEARTBEAT_TIMEOUT = int(os.getenv('JOB_HEARTBEAT_TIMEOUT', 300))  # segundos
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', 7))
+SENSITIVE_ARTIFACT_TTL = timedelta(minutes=int(os.getenv('SENSITIVE_ARTIFACT_TTL_MINUTES', 60)))
+JOBS_RUN_INLINE = os.getenv('JOBS_RUN_INLINE', 'false').lower() == 'true'  # Desarrollo local sin worker
+
+HANDLERS = {}
+
+_handlers_loaded = False
+
+
+class JobCancelled(Exception):
+    """El usuario solicitó cancelar el trabajo"""
+
+
+class JobOwnershipLost(Exception):
+    """El trabajo se reencoló (heartbeat vencido) y ya no pertenece a este worker"""
+
+
+def register_handler(job_type):
+    """Decorador: registra fn(ctx) -> result como handler del tipo de trabajo"""
+    def decorator(fn):
+        HANDLERS[job_type] = fn
+        return fn
+    return decorator
+
+
+def _load_handlers():
+    global _handlers_loaded
+    if not _handlers_loaded:
+        import app.services.job_handlers  # noqa: F401 (registra los handlers)
+        _handlers_loaded = True
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobContext:
+    """Acceso del handler a su trabajo: payload, checkpoint, progreso y archivos"""
+
+    def __init__(self, job):
+        self.job = job
+        self.worker_id = job.locked_by  # Asignado por claim_job
+
+    @property
+    def payload(self):
+        return self.job.payload or {}
+
+    @property
+    def checkpoint(self):
+        return self.job.checkpoint
+
+    def _update_job(self, **values):
+        """
+        UPDATE del trabajo solo si este worker aún lo tiene tomado
+
+        Lanza JobOwnershipLost si requeue_stale_jobs lo devolvió a la cola (u
+        otro worker ya lo tomó): el llamador descarta la transacción del bloque.
+        """
+        values['heartbeat_at'] = datetime.utcnow()
+        updated = db.session.query(Job).filter(
+            Job.id == self.job.id,
+            Job.locked_by == self.worker_id,
+            Job.status == Job.STATUS_RUNNING
+        ).update({getattr(Job, name): value for name, value in values.items()}, synchronize_session=False)
+        if updated != 1:
+            raise JobOwnershipLost()
+        for name, value in values.items():
+            set_committed_value(self.job, name, value)
+
+    def set_progress(self, commit=True, **progress):
+        """Publicar el avance (lo leen el polling y el SSE)"""
+        self._update_job(progress=dict(progress))
+        if commit:
+            db.session.commit()
+
+    def stage_checkpoint(self, checkpoint):
+        """
+        Guardar el checkpoint sin commit
+
+        El handler lo llama antes del commit de cada bloque, así que el checkpoint
+        y los datos del bloque se confirman en la misma transacción.
+        """
+        # Copia: el handler sigue mutando su resumen después de este bloque
+        self._update_job(checkpoint=copy.deepcopy(checkpoint))
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        """Lanzar JobCancelled si se solicitó cancelar (se consulta a la BD)"""
+        requested = db.session.query(Job.cancel_requested).filter(Job.id == self.job.id).scalar()
+        if requested:
+            raise JobCancelled()
+
+    def get_input(self, name):
+        """Contenido (bytes) de un archivo de entrada"""
+        artifact = JobArtifact.query.filter_by(
+            job_id=self.job.id, kind=JobArtifact.KIND_INPUT, name=name
+        ).first()
+        return artifact.data if artifact else None
+
+    def add_artifact(self, name, data, content_type, sensitive=False):
+        """
+        Adjuntar un archivo descargable de resultado
+
+        Args:
+            sensitive: Contiene secretos (contraseñas): se elimina al descargarlo
+                por primera vez o tras SENSITIVE_ARTIFACT_TTL
+        """
+        artifact = JobArtifact(
+            job_id=self.job.id,
+            kind=JobArtifact.KIND_OUTPUT,
+            name=name,
+            content_type=content_type,
+            size_bytes=len(data),
+            data=data,
+            expires_at=datetime.utcnow() + SENSITIVE_ARTIFACT_TTL if sensitive else None
+        )
+        db.session.add(artifact)
+        return artifact
+
+    def stage_data(self, name, data):
+        """
+        Guardar datos temporales del handler sin commit (no visibles ni descargables)
+
+        Para lo que no debe ir en el checkpoint (p. ej. contraseñas generadas)
+        pero sí confirmarse con el bloque; se recuperan con pop_staged_data().
+        """
+        db.session.add(JobArtifact(
+            job_id=self.job.id,
+            kind=JobArtifact.KIND_STAGING,
+            name=name,
+            content_type='application/octet-stream',
+            size_bytes=len(data),
+            data=data
+        ))
+
+    def pop_staged_data(self):
+        """Contenido (bytes) de los datos temporales en orden de creación; los elimina (sin commit)"""
+        staged = JobArtifact.query.filter_by(
+            job_id=self.job.id, kind=JobArtifact.KIND_STAGING
+        ).order_by(JobArtifact.id).all()
+        data = [artifact.data for artifact in staged]
+        for artifact in staged:
+            db.session.delete(artifact)
+        return data
+
+
+def enqueue_job(job_type, payload=None, created_by=None, inputs=None, progress=None):
+    """
+    Crear un trabajo en cola
+
+    Args:
+        job_type: Tipo registrado en HANDLERS
+        payload: Parámetros JSON del handler
+        created_by: ID del usuario que lo solicita
+        inputs: Lista de (nombre, bytes, content_type) disponibles vía ctx.get_input()
+        progress: Progreso inicial (p. ej. el total estimado)
+
+    Returns:
+        Job
+    """
+    job = Job(
+        id=str(uuid.uuid4()),
+        job_type=job_type,
+        status=Job.STATUS_QUEUED,
+        payload=payload or {},
+        progress=progress or {},
+        created_by=created_by
+    )
+    db.session.add(job)
+    for name, data, content_type in inputs or []:
+        db.session.add(JobArtifact(
+            job_id=job.id,
+            kind=JobArtifact.KIND_INPUT,
+            name=name,
+            content_type=content_type,
+            size_bytes=len(data),
+            data=data
+        ))
+    db.session.commit()
+
+    if JOBS_RUN_INLINE:
+        from flask import current_app
+        app = current_app._get_current_object()
+        threading.Thread(target=_run_inline, args=(app, job.id), daemon=True).start()
+
+    return job
+
+
+def _run_inline(app, job_id):
+    with app.app_context():
+        try:
+            job = claim_job(job_id, worker_id())
+            if job:
+                run_job(job)
+        finally:
+            db.session.remove()
+
+
+def claim_job(job_id, owner):
+    """Tomar un trabajo en cola; devuelve el Job solo si este worker ganó el UPDATE"""
+    now = datetime.utcnow()
+    updated = db.session.query(Job).filter(
+        Job.id == job_id,
+        Job.status == Job.STATUS_QUEUED
+    ).update({
+        Job.status: Job.STATUS_RUNNING,
+        Job.locked_by: owner,
+        Job.heartbeat_at: now,
+        Job.started_at: db.func.coalesce(Job.started_at, now),
+        Job.attempts: Job.attempts + 1
+    }, synchronize_session=False)
+    db.session.commit()
+    if updated != 1:
+        return None
+    return db.session.get(Job, job_id)
+
+
+def claim_next_job(owner, batch=5):
+    """Tomar el trabajo en cola más antiguo (o None)"""
+    candidate_ids = db.session.query(Job.id).filter(
+        Job.status == Job.STATUS_QUEUED
+    ).order_by(Job.created_at).limit(batch).all()
+    db.session.commit()
+
+    for (job_id,) in candidate_ids:
+        job = claim_job(job_id, owner)
+        if job:
+            return job
+    return None
+
+
+def requeue_stale_jobs(heartbeat_timeout=JOB_HEARTBEAT_TIMEOUT, max_attempts=JOB_MAX_ATTEMPTS):
+    """
+    Recuperar trabajos de workers caídos
+
+    Los que aún tienen intentos vuelven a la cola (conservando su checkpoint);
+    los que agotaron los intentos se marcan como fallidos.
+
+    Returns:
+        tuple: (reencolados, fallidos)
+    """
+    now = datetime.utcnow()
+    stale = db.and_(
+        Job.status == Job.STATUS_RUNNING,
+        Job.heartbeat_at < now - timedelta(seconds=heartbeat_timeout)
+    )
+    failed = db.session.query(Job).filter(stale, Job.attempts >= max_attempts).update({
+        Job.status: Job.STATUS_FAILED,
+        Job.error: 'El worker dejó de responder y se agotaron los reintentos',
+        Job.locked_by: None,
+        Job.finished_at: now
+    }, synchronize_session=False)
+    requeued = db.session.query(Job).filter(stale, Job.attempts < max_attempts).update({
+        Job.status: Job.STATUS_QUEUED,
+        Job.locked_by: None
+    }, synchronize_session=False)
+    db.session.commit()
+    return requeued, failed
+
+
+def run_job(job):
+    """Ejecutar el handler del trabajo y registrar el resultado"""
+    _load_handlers()
+    handler = HANDLERS.get(job.job_type)
+    job_id = job.id
+
+    if not handler:
+        _finish(job_id, Job.STATUS_FAILED, error=f'Tipo de trabajo desconocido: {job.job_type}')
+        return
+
+    owner = job.locked_by
+    print(f"[JOBS] ▶ {job.job_type} {job_id} (intento {job.attempts})")
+    try:
+        result = handler(JobContext(job))
+        finished = _finish(job_id, Job.STATUS_COMPLETED, result=result, owner=owner)
+        if finished:
+            print(f"[JOBS] ✅ {job_id} completado")
+    except JobOwnershipLost:
+        db.session.rollback()
+        finished = False
+    except JobCancelled:
+        db.session.rollback()
+        finished = _finish(job_id, Job.STATUS_CANCELLED, owner=owner)
+        if finished:
+            print(f"[JOBS] ⏹ {job_id} cancelado")
+    except Exception as e:
+        db.session.rollback()
+        finished = _finish(job_id, Job.STATUS_FAILED, error=str(e), owner=owner)
+        if finished:
+            print(f"[JOBS] ❌ {job_id} falló: {e}")
+
+    if not finished:
+        print(f"[JOBS] ⚠️ {job_id} se reencoló mientras corría: se abandona este intento")
+
+
+def _finish(job_id, status, result=None, error=None, owner=None):
+    """
+    Registrar el estado final (y confirmar las escrituras pendientes del handler)
+
+    Con owner, solo si el trabajo sigue tomado por ese worker; si no, se
+    descarta la transacción.
+
+    Returns:
+        bool: True si se registró
+    """
+    query = db.session.query(Job).filter(Job.id == job_id)
+    if owner is not None:
+        query = query.filter(Job.locked_by == owner)
+    updated = query.update({
+        Job.status: status,
+        Job.result: result,
+        Job.error: error,
+        Job.locked_by: None,
+        Job.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    if not updated:
+        db.session.rollback()
+        return False
+    db.session.commit()
+    return True
+
+
+def request_cancel(job):
+    """Solicitar la cancelación; un trabajo aún en cola se cancela de inmediato"""
+    job.cancel_requested = True
+    db.session.commit()
+    db.session.query(Job).filter(
+        Job.id == job.id,
+        Job.status == Job.STATUS_QUEUED
+    ).update({
+        Job.status: Job.STATUS_CANCELLED,
+        Job.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    db.session.refresh(job)
+    return job
+
+
+def purge_expired_artifacts():
+    """Eliminar las salidas sensibles vencidas y los temporales de trabajos terminados"""
+    now = datetime.utcnow()
+    finished_ids = db.session.query(Job.id).filter(Job.status.in_(Job.FINISHED_STATUSES))
+    deleted = db.session.query(JobArtifact).filter(
+        db.or_(
+            JobArtifact.expires_at < now,
+            db.and_(
+                JobArtifact.kind == JobArtifact.KIND_STAGING,
+                JobArtifact.job_id.in_(finished_ids.scalar_subquery())
+            )
+        )
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def purge_old_jobs(days=JOB_RETENTION_DAYS):
+    """Eliminar trabajos terminados (y sus archivos) con más de `days` días"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    old_ids = db.session.query(Job.id).filter(
+        Job.status.in_(Job.FINISHED_STATUSES),
+        Job.finished_at < cutoff
+    )
+    db.session.query(JobArtifact).filter(
+        JobArtifact.job_id.in_(old_ids.scalar_subquery())
+    ).delete(synchronize_session=False)
+    deleted = db.session.query(Job).filter(
+        Job.status.in_(Job.FINISHED_STATUSES),
+        Job.finished_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
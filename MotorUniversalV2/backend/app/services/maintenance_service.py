@@ -0,0 +1,31 @@
+"""
+Marcas de finalización de reconstrucciones (tabla maintenance_markers)
+
+Los scripts de reconstrucción que startup.sh lanza en cada arranque consultan
+la marca en lugar de revisar si la tabla derivada está vacía: los eventos que
+mantienen esas tablas escriben filas antes de que la reconstrucción termine.
+"""
+from datetime import datetime
+
+from app import db
+from app.models.maintenance_marker import MaintenanceMarker
+
+
+def is_completed(name):
+    """True si la reconstrucción `name` terminó completa"""
+    return db.session.get(MaintenanceMarker, name) is not None
+
+
+def clear_completed(name):
+    """Borrar la marca al iniciar una reconstrucción (si se interrumpe, se repite)"""
+    MaintenanceMarker.query.filter_by(name=name).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def mark_completed(name, details=None):
+    """Registrar que la reconstrucción `name` terminó"""
+    marker = db.session.get(MaintenanceMarker, name) or MaintenanceMarker(name=name)
+    marker.completed_at = datetime.utcnow()
+    marker.details = details
+    db.session.add(marker)
+    db.session.commit()
@@ -0,0 +1,147 @@
+"""
+Servicio de jerarquía Partner → estados → planteles → grupos
+
+Serializa listas de partners, planteles y grupos con el mismo JSON que sus
+to_dict(), pero cargando cada nivel en bloque: una consulta por nivel y los
+conteos (planteles por partner, grupos por plantel, miembros por grupo) con
+GROUP BY. El detalle de un partner con 80 planteles y 400 grupos pasa de ~500
+consultas a 4, sin importar el tamaño.
+
+scripts/check_partner_queries.py verifica que el JSON sea idéntico al de
+to_dict() y que el número de consultas no crezca con la jerarquía.
+"""
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models.partner import Partner, PartnerStatePresence, Campus, CandidateGroup, GroupMember
+
+IN_CHUNK_SIZE = 1000
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[i:i + IN_CHUNK_SIZE]
+
+
+def _grouped_counts(column, key_column, keys):
+    """{clave: COUNT} con un GROUP BY por bloque de claves"""
+    counts = {}
+    for chunk in _chunks(set(keys)):
+        counts.update(
+            db.session.query(key_column, db.func.count(column)).filter(
+                key_column.in_(chunk)
+            ).group_by(key_column).all()
+        )
+    return counts
+
+
+def group_counts(campus_ids):
+    """{campus_id: número de grupos}"""
+    return _grouped_counts(CandidateGroup.id, CandidateGroup.campus_id, campus_ids)
+
+
+def member_counts(group_ids):
+    """{group_id: número de miembros}"""
+    return _grouped_counts(GroupMember.id, GroupMember.group_id, group_ids)
+
+
+def _load_children(model, parent_column, parent_ids, order_by, options=()):
+    """{parent_id: [hijos]} en una consulta por bloque"""
+    children = {}
+    for chunk in _chunks(set(parent_ids)):
+        query = model.query.options(*options).filter(parent_column.in_(chunk)).order_by(*order_by)
+        for child in query:
+            children.setdefault(getattr(child, parent_column.key), []).append(child)
+    return children
+
+
+def serialize_groups(groups, include_members=False, include_campus=False):
+    """Grupos como CandidateGroup.to_dict(), con conteos y relaciones en bloque"""
+    groups = list(groups)
+    group_ids = [g.id for g in groups]
+    counts = member_counts(group_ids)
+
+    members = {}
+    if include_members:
+        members = _load_children(
+            GroupMember, GroupMember.group_id, group_ids, (GroupMember.id,),
+            options=(joinedload(GroupMember.user),)
+        )
+
+    campuses = {}
+    if include_campus:
+        campus_list = Campus.query.filter(Campus.id.in_({g.campus_id for g in groups})).all() if groups else []
+        campuses = {c['id']: c for c in serialize_campuses(campus_list, include_partner=True)}
+
+    return [
+        g.to_dict(
+            include_members=include_members,
+            include_campus=include_campus,
+            member_count=counts.get(g.id, 0),
+            members=[m.to_dict(include_user=True) for m in members.get(g.id, [])] if include_members else None,
+            campus=campuses.get(g.campus_id) if include_campus else None
+        )
+        for g in groups
+    ]
+
+
+def serialize_campuses(campuses, include_groups=False, include_partner=False):
+    """Planteles como Campus.to_dict(), con grupos, conteos y partner en bloque"""
+    campuses = list(campuses)
+    campus_ids = [c.id for c in campuses]
+    counts = group_counts(campus_ids)
+
+    groups = {}
+    if include_groups:
+        children = _load_children(CandidateGroup, CandidateGroup.campus_id, campus_ids, (CandidateGroup.id,))
+        all_groups = [g for items in children.values() for g in items]
+        serialized = {d['id']: d for d in serialize_groups(all_groups)}
+        groups = {campus_id: [serialized[g.id] for g in items] for campus_id, items in children.items()}
+
+    partners = {}
+    if include_partner and campuses:
+        partners = {
+            p.id: p.to_dict()
+            for p in Partner.query.filter(Partner.id.in_({c.partner_id for c in campuses}))
+        }
+
+    return [
+        c.to_dict(
+            include_groups=include_groups,
+            include_partner=include_partner,
+            group_count=counts.get(c.id, 0),
+            groups=groups.get(c.id, []) if include_groups else None,
+            partner=partners.get(c.partner_id)
+        )
+        for c in campuses
+    ]
+
+
+def serialize_partners(partners, include_states=False, include_campuses=False):
+    """Partners como Partner.to_dict(), con estados y planteles en bloque"""
+    partners = list(partners)
+    partner_ids = [p.id for p in partners]
+
+    states = {}
+    if include_states:
+        states = _load_children(
+            PartnerStatePresence, PartnerStatePresence.partner_id, partner_ids, (PartnerStatePresence.id,)
+        )
+
+    campuses = {}
+    if include_campuses:
+        children = _load_children(Campus, Campus.partner_id, partner_ids, (Campus.id,))
+        all_campuses = [c for items in children.values() for c in items]
+        serialized = {d['id']: d for d in serialize_campuses(all_campuses)}
+        campuses = {partner_id: [serialized[c.id] for c in items] for partner_id, items in children.items()}
+
+    return [
+        p.to_dict(
+            include_states=include_states,
+            include_campuses=include_campuses,
+            states=[sp.to_dict() for sp in states.get(p.id, [])] if include_states else None,
+            campuses=campuses.get(p.id, []) if include_campuses else None
+        )
+        for p in partners
+    ]
@@ -0,0 +1,159 @@
+"""
+Servicio de Lecturas de Estudio
+
+Procesa el HTML de las lecturas una sola vez al guardarlas:
+- Extrae imágenes embebidas en base64 a Azure Blob Storage
+- Normaliza espacios no rompibles
+- Precomprime el resultado con gzip
+- Calcula un ETag estable (SHA-256 del HTML procesado)
+
+El contenido procesado se sirve como recurso independiente con soporte de
+ETag, Content-Encoding y Range (ver routes/study_contents.get_reading_content).
+Las lecturas anteriores a la caché se sirven procesadas al vuelo sin escribir
+en el GET; scripts/backfill_reading_cache.py las persiste (backfill_readings).
+"""
+import gzip
+import hashlib
+import re
+from typing import Optional
+
+from sqlalchemy import update
+
+from app import db
+from app.models.study_content import StudyReading, normalize_html_spaces
+
+
+# <img ... src="data:image/png;base64,...">
+BASE64_IMG_PATTERN = re.compile(
+    r'(<img\b[^>]*?\bsrc\s*=\s*)(["\'])(data:image/[a-zA-Z0-9.+-]+;base64,[A-Za-z0-9+/=\s]+)\2',
+    re.IGNORECASE
+)
+
+READING_IMAGES_FOLDER = 'study-readings'
+
+
+def extract_base64_images(html_content: str, folder: str = READING_IMAGES_FOLDER) -> str:
+    """
+    Reemplazar imágenes base64 embebidas por URLs de Azure Blob Storage
+
+    Si la subida falla, la imagen se deja embebida para no perder contenido.
+    """
+    if not html_content or 'base64,' not in html_content:
+        return html_content
+
+    from app.utils.azure_storage import azure_storage
+
+    def _replace(match):
+        prefix, quote, data_uri = match.group(1), match.group(2), match.group(3)
+        blob_url = azure_storage.upload_base64_image(re.sub(r'\s+', '', data_uri), folder=folder)
+        if not blob_url:
+            return match.group(0)
+        return f'{prefix}{quote}{blob_url}{quote}'
+
+    return BASE64_IMG_PATTERN.sub(_replace, html_content)
+
+
+def render_reading_html(html_content: Optional[str]) -> str:
+    """HTML listo para servir (espacios normalizados)"""
+    if not html_content:
+        return ''
+    return normalize_html_spaces(html_content)
+
+
+def compute_etag(rendered_html: str) -> str:
+    """ETag fuerte del contenido procesado"""
+    return hashlib.sha256(rendered_html.encode('utf-8')).hexdigest()
+
+
+def compress_gzip(rendered_html: str) -> bytes:
+    """Comprimir el HTML procesado con gzip (nivel máximo, se hace una sola vez)"""
+    return gzip.compress(rendered_html.encode('utf-8'), compresslevel=9)
+
+
+def prepare_reading(reading, extract_images: bool = True):
+    """
+    Procesar la lectura y guardar el resultado en sus columnas de caché
+
+    Debe llamarse antes de hacer commit al crear/actualizar una lectura.
+
+    Args:
+        reading: Instancia de StudyReading
+        extract_images: Extraer imágenes base64 a blob storage
+    """
+    content = reading.content
+    if extract_images:
+        content = extract_base64_images(content)
+        # Guardar también el original sin base64 para que el editor no arrastre MBs
+        reading.content = content
+
+    rendered = render_reading_html(content)
+    reading.content_rendered = rendered
+    reading.content_etag = compute_etag(rendered)
+    reading.content_gzip = compress_gzip(rendered)
+    return reading
+
+
+def backfill_readings(batch_size: int = 200, progress_callback=None) -> int:
+    """
+    Procesar las lecturas sin caché (content_etag nulo) y guardar el resultado
+
+    Se escribe con UPDATE de core conservando updated_at, para que el
+    Last-Modified de las lecturas no cambie; el ETag coincide con el que ya se
+    servía al vuelo.
+
+    Returns:
+        int: lecturas procesadas
+    """
+    total, last_id = 0, 0
+    while True:
+        rows = db.session.query(StudyReading.id, StudyReading.content).filter(
+            StudyReading.id > last_id,
+            StudyReading.content_etag.is_(None)
+        ).order_by(StudyReading.id).limit(batch_size).all()
+        if not rows:
+            return total
+
+        for reading_id, content in rows:
+            rendered = render_reading_html(content)
+            db.session.execute(
+                update(StudyReading).where(
+                    StudyReading.id == reading_id,
+                    StudyReading.content_etag.is_(None)
+                ).values(
+                    content_rendered=rendered,
+                    content_etag=compute_etag(rendered),
+                    content_gzip=compress_gzip(rendered),
+                    updated_at=StudyReading.updated_at
+                )
+            )
+        db.session.commit()
+
+        total += len(rows)
+        last_id = rows[-1][0]
+        if progress_callback:
+            progress_callback(total)
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Indica si el cliente acepta gzip según el header Accept-Encoding"""
+    if not accept_encoding:
+        return False
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token = part.strip()
+        if not token:
+            continue
+        name, _, params = token.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    if 'gzip' in accepted:
+        return accepted['gzip'] > 0
+    return accepted.get('*', 0) > 0
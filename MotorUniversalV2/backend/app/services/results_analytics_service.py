@@ -0,0 +1,694 @@
+"""
+Servicio de analítica de resultados por grupo, plantel y partner
+
+Al guardar un resultado (routes/exams.save_exam_result) se extrae el
+evaluation_breakdown de answers_data a result_category_facts y se incrementan,
+en la misma transacción, los acumulados por (grupo, examen, día):
+
+- result_daily_rollups: intentos, aprobados, suma de calificaciones y duración
+- result_category_rollups: puntos obtenidos y posibles por categoría y tema
+
+y sus derivados, que evitan sumar fila por grupo en los tableros de plantel y partner:
+
+- result_scope_daily_rollups / result_scope_category_rollups: los mismos
+  acumulados por (plantel o partner, examen, día), suma de los de sus grupos
+- result_group_monthly_rollups: acumulado por (grupo, examen, mes) para el
+  desglose por grupo
+
+Un resultado cuenta para los grupos activos del candidato que tienen el examen
+asignado; si ninguno lo tiene, para todos sus grupos activos. Los tableros
+suman solo filas de acumulados (unas pocas consultas agregadas e indexadas por
+alcance y día), sin tocar results ni answers_data. Los acumulados de plantel y
+partner usan la ubicación del grupo al guardar el resultado: al mover o borrar
+grupos se corrigen con la reconstrucción.
+
+scripts/rebuild_results_analytics.py recalcula todo desde results (resultados
+previos a la tabla, borrados o cambios de reglas) sin detener record_result: los
+hechos se reemplazan por resultado y los acumulados se sustituyen en una sola
+transacción con las tablas bloqueadas (rebuild_analytics).
+"""
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.partner import Campus, CandidateGroup, GroupMember, GroupExam
+from app.models.result_analytics import (
+    ResultCategoryFact, ResultDailyRollup, ResultCategoryRollup,
+    ResultScopeDailyRollup, ResultScopeCategoryRollup, ResultGroupMonthlyRollup
+)
+
+NAME_MAX_LENGTH = 200
+SCOPES = ('group', 'campus', 'partner')
+STATUS_COMPLETED = 1
+
+# Marca de maintenance_markers al terminar rebuild_analytics; cambia de versión
+# cuando se agregan acumulados para que startup.sh los llene en el siguiente arranque
+REBUILD_MARKER = 'results_analytics_v2'
+# Los resultados creados antes de (inicio - margen) ya están confirmados: el margen
+# cubre el request más largo posible (timeout de gunicorn)
+REBUILD_MARGIN = timedelta(seconds=int(os.getenv('ANALYTICS_REBUILD_MARGIN_SECONDS', '1800')))
+
+ROLLUP_MODELS = (
+    ResultDailyRollup, ResultCategoryRollup,
+    ResultScopeDailyRollup, ResultScopeCategoryRollup, ResultGroupMonthlyRollup
+)
+SCOPE_MODELS = (ResultScopeDailyRollup, ResultScopeCategoryRollup)
+DAILY_SUMS = ('attempts', 'passed', 'score_sum', 'duration_sum')
+
+ANALYTICS_COLUMNS = [
+    'fecha', 'plantel', 'grupo_id', 'grupo', 'examen_id', 'examen', 'ecm',
+    'intentos', 'aprobados', 'tasa_aprobacion', 'calificacion_promedio', 'duracion_promedio_seg'
+]
+
+
+# ==================== EXTRACCIÓN ====================
+
+def extract_breakdown(answers_data):
+    """evaluation_breakdown de answers_data (en la raíz o dentro de summary)"""
+    if isinstance(answers_data, str):
+        try:
+            answers_data = json.loads(answers_data)
+        except ValueError:
+            return {}
+    if not isinstance(answers_data, dict):
+        return {}
+    breakdown = answers_data.get('evaluation_breakdown')
+    if not breakdown and isinstance(answers_data.get('summary'), dict):
+        breakdown = answers_data['summary'].get('evaluation_breakdown')
+    return breakdown if isinstance(breakdown, dict) else {}
+
+
+def _name(value):
+    return (str(value).strip() if value is not None else '')[:NAME_MAX_LENGTH]
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def breakdown_facts(breakdown):
+    """
+    Filas (categoría, tema, obtenido, máximo) del desglose
+
+    Una categoría sin temas queda como una fila con tema ''.
+    """
+    facts = {}
+
+    def _add(category, topic, data):
+        earned, max_score = facts.get((category, topic), (0.0, 0.0))
+        facts[(category, topic)] = (earned + _number(data.get('earned')), max_score + _number(data.get('max')))
+
+    for category, data in breakdown.items():
+        if not isinstance(data, dict):
+            continue
+        topics = data.get('topics')
+        if isinstance(topics, dict) and topics:
+            for topic, topic_data in topics.items():
+                if isinstance(topic_data, dict):
+                    _add(_name(category) or 'Sin categoría', _name(topic), topic_data)
+        else:
+            _add(_name(category) or 'Sin categoría', '', data)
+    return [(category, topic, earned, max_score) for (category, topic), (earned, max_score) in facts.items()]
+
+
+# ==================== REGISTRO ====================
+
+def _groups_for(memberships, assignments, user_id, exam_id):
+    """Grupos activos del candidato con el examen asignado (o todos si ninguno lo tiene)"""
+    groups = memberships.get(user_id, set())
+    assigned = {group_id for group_id in groups if exam_id in assignments.get(group_id, ())}
+    return assigned or groups
+
+
+def _load_memberships(user_ids):
+    """({user_id: {group_id}}, {group_id: {exam_id}}) de grupos activos"""
+    memberships, assignments = {}, {}
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), 1000):
+        rows = db.session.query(GroupMember.user_id, GroupMember.group_id).join(
+            CandidateGroup, CandidateGroup.id == GroupMember.group_id
+        ).filter(
+            GroupMember.user_id.in_(user_ids[i:i + 1000]),
+            GroupMember.status == 'active',
+            CandidateGroup.is_active == True
+        )
+        for row in rows:
+            memberships.setdefault(row.user_id, set()).add(row.group_id)
+
+    group_ids = list({group_id for groups in memberships.values() for group_id in groups})
+    for i in range(0, len(group_ids), 1000):
+        rows = db.session.query(GroupExam.group_id, GroupExam.exam_id).filter(
+            GroupExam.group_id.in_(group_ids[i:i + 1000]),
+            GroupExam.is_active == True
+        )
+        for row in rows:
+            assignments.setdefault(row.group_id, set()).add(row.exam_id)
+    return memberships, assignments
+
+
+def _group_scopes(group_ids):
+    """{group_id: [('campus', campus_id), ('partner', partner_id)]} de los grupos"""
+    scopes = {}
+    group_ids = list(group_ids)
+    for i in range(0, len(group_ids), 1000):
+        rows = db.session.query(CandidateGroup.id, CandidateGroup.campus_id, Campus.partner_id).join(
+            Campus, Campus.id == CandidateGroup.campus_id
+        ).filter(CandidateGroup.id.in_(group_ids[i:i + 1000]))
+        for row in rows:
+            scopes[row.id] = [('campus', row.campus_id), ('partner', row.partner_id)]
+    return scopes
+
+
+def _month(day):
+    return day.replace(day=1)
+
+
+def _increment(model, key, deltas, extra=None):
+    """Sumar deltas a la fila del acumulado (la crea si no existe)"""
+    update = db.update(model).where(
+        *[getattr(model, column) == value for column, value in key.items()]
+    ).values(**{column: getattr(model, column) + delta for column, delta in deltas.items()})
+
+    for attempt in range(2):
+        if db.session.execute(update).rowcount:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(model).values(**key, **deltas, **(extra or {})))
+            return
+        except IntegrityError:
+            # Otro request creó la fila entre el UPDATE y el INSERT
+            if attempt:
+                raise
+
+
+def record_result(result, day=None):
+    """
+    Registrar el desglose y los acumulados de un resultado (sin commit)
+
+    Se llama después de agregar el resultado a la sesión y antes del commit. Un
+    error aquí no impide guardar el resultado: se descarta el savepoint y el
+    acumulado se corrige con scripts/rebuild_results_analytics.py.
+
+    Returns:
+        bool: True si se registró
+    """
+    try:
+        with db.session.begin_nested():
+            facts = breakdown_facts(extract_breakdown(result.answers_data))
+            if facts:
+                db.session.execute(db.insert(ResultCategoryFact), [
+                    {'result_id': result.id, 'category': category, 'topic': topic,
+                     'earned': earned, 'max_score': max_score}
+                    for category, topic, earned, max_score in facts
+                ])
+
+            if result.status != STATUS_COMPLETED:
+                return True
+
+            memberships, assignments = _load_memberships([result.user_id])
+            day = day or datetime.utcnow().date()
+            deltas = {'attempts': 1, 'passed': 1 if result.result == 1 else 0,
+                      'score_sum': result.score or 0, 'duration_sum': result.duration_seconds or 0}
+            # Orden fijo de grupos y alcances para no cruzar bloqueos entre requests concurrentes
+            group_ids = sorted(_groups_for(memberships, assignments, result.user_id, result.exam_id))
+            for group_id in group_ids:
+                _increment(
+                    ResultDailyRollup,
+                    {'group_id': group_id, 'exam_id': result.exam_id, 'day': day},
+                    deltas,
+                    extra={'competency_standard_id': result.competency_standard_id}
+                )
+                _increment(
+                    ResultGroupMonthlyRollup,
+                    {'group_id': group_id, 'exam_id': result.exam_id, 'month': _month(day)},
+                    deltas
+                )
+                for category, topic, earned, max_score in facts:
+                    _increment(
+                        ResultCategoryRollup,
+                        {'group_id': group_id, 'exam_id': result.exam_id, 'day': day,
+                         'category': category, 'topic': topic},
+                        {'results': 1, 'earned': earned, 'max_score': max_score}
+                    )
+
+            # Plantel y partner suman una vez por cada grupo suyo en el que cuenta el resultado
+            scopes = _group_scopes(group_ids)
+            counts = Counter(key for group_id in group_ids for key in scopes.get(group_id, ()))
+            for (scope, scope_id), count in sorted(counts.items()):
+                _increment(
+                    ResultScopeDailyRollup,
+                    {'scope': scope, 'scope_id': scope_id, 'exam_id': result.exam_id, 'day': day},
+                    {column: value * count for column, value in deltas.items()},
+                    extra={'competency_standard_id': result.competency_standard_id}
+                )
+                for category, topic, earned, max_score in facts:
+                    _increment(
+                        ResultScopeCategoryRollup,
+                        {'scope': scope, 'scope_id': scope_id, 'exam_id': result.exam_id, 'day': day,
+                         'category': category, 'topic': topic},
+                        {'results': count, 'earned': earned * count, 'max_score': max_score * count}
+                    )
+        return True
+    except Exception as e:
+        print(f"[ANALYTICS] Warning: no se registró la analítica del resultado {result.id}: {e}")
+        return False
+
+
+def _result_rows():
+    from app.models.result import Result
+    return db.session.query(
+        Result.id, Result.user_id, Result.exam_id, Result.competency_standard_id, Result.score,
+        Result.status, Result.result, Result.duration_seconds, Result.answers_data,
+        Result.end_date, Result.created_at
+    )
+
+
+def _accumulate(rows, daily, categories):
+    """Sumar los resultados a los acumulados en memoria; devuelve sus filas de hechos"""
+    memberships, assignments = _load_memberships({row.user_id for row in rows})
+    fact_rows = []
+    for row in rows:
+        facts = breakdown_facts(extract_breakdown(row.answers_data))
+        fact_rows.extend(
+            {'result_id': row.id, 'category': category, 'topic': topic, 'earned': earned, 'max_score': max_score}
+            for category, topic, earned, max_score in facts
+        )
+        if row.status != STATUS_COMPLETED:
+            continue
+
+        day = (row.end_date or row.created_at).date()
+        for group_id in _groups_for(memberships, assignments, row.user_id, row.exam_id):
+            entry = daily.setdefault((group_id, row.exam_id, day), {
+                'competency_standard_id': row.competency_standard_id,
+                'attempts': 0, 'passed': 0, 'score_sum': 0, 'duration_sum': 0
+            })
+            entry['attempts'] += 1
+            entry['passed'] += 1 if row.result == 1 else 0
+            entry['score_sum'] += row.score or 0
+            entry['duration_sum'] += row.duration_seconds or 0
+            for category, topic, earned, max_score in facts:
+                entry = categories.setdefault((group_id, row.exam_id, day, category, topic), [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += earned
+                entry[2] += max_score
+    return fact_rows
+
+
+def _replace_facts(result_ids, fact_rows):
+    """Reemplazar los hechos de los resultados (idempotente si record_result ya los insertó)"""
+    for i in range(0, len(result_ids), 1000):
+        db.session.execute(db.delete(ResultCategoryFact).where(
+            ResultCategoryFact.result_id.in_(result_ids[i:i + 1000])
+        ))
+    for i in range(0, len(fact_rows), 1000):
+        db.session.execute(db.insert(ResultCategoryFact), fact_rows[i:i + 1000])
+
+
+def insert_rollups(daily, categories):
+    """
+    Insertar los acumulados de grupo y sus derivados (plantel, partner y mes)
+
+    Args:
+        daily: {(group_id, exam_id, day): {competency_standard_id, attempts, passed, score_sum, duration_sum}}
+        categories: {(group_id, exam_id, day, category, topic): [results, earned, max_score]}
+    """
+    scopes = _group_scopes({group_id for group_id, _, _ in daily})
+    scope_daily, scope_categories, monthly = {}, {}, {}
+
+    for (group_id, exam_id, day), values in daily.items():
+        targets = [monthly.setdefault((group_id, exam_id, _month(day)), dict.fromkeys(DAILY_SUMS, 0))]
+        for scope, scope_id in scopes.get(group_id, ()):
+            targets.append(scope_daily.setdefault((scope, scope_id, exam_id, day), {
+                'competency_standard_id': values['competency_standard_id'], **dict.fromkeys(DAILY_SUMS, 0)
+            }))
+        for target in targets:
+            for column in DAILY_SUMS:
+                target[column] += values[column]
+
+    for (group_id, exam_id, day, category, topic), values in categories.items():
+        for scope, scope_id in scopes.get(group_id, ()):
+            entry = scope_categories.setdefault((scope, scope_id, exam_id, day, category, topic), [0, 0.0, 0.0])
+            for i in range(3):
+                entry[i] += values[i]
+
+    tables = (
+        (ResultDailyRollup, [
+            {'group_id': group_id, 'exam_id': exam_id, 'day': day, **values}
+            for (group_id, exam_id, day), values in daily.items()
+        ]),
+        (ResultCategoryRollup, [
+            {'group_id': group_id, 'exam_id': exam_id, 'day': day, 'category': category, 'topic': topic,
+             'results': results, 'earned': earned, 'max_score': max_score}
+            for (group_id, exam_id, day, category, topic), (results, earned, max_score) in categories.items()
+        ]),
+        (ResultGroupMonthlyRollup, [
+            {'group_id': group_id, 'exam_id': exam_id, 'month': month, **values}
+            for (group_id, exam_id, month), values in monthly.items()
+        ]),
+        (ResultScopeDailyRollup, [
+            {'scope': scope, 'scope_id': scope_id, 'exam_id': exam_id, 'day': day, **values}
+            for (scope, scope_id, exam_id, day), values in scope_daily.items()
+        ]),
+        (ResultScopeCategoryRollup, [
+            {'scope': scope, 'scope_id': scope_id, 'exam_id': exam_id, 'day': day, 'category': category,
+             'topic': topic, 'results': results, 'earned': earned, 'max_score': max_score}
+            for (scope, scope_id, exam_id, day, category, topic), (results, earned, max_score)
+            in scope_categories.items()
+        ]),
+    )
+    for model, rows in tables:
+        for i in range(0, len(rows), 1000):
+            db.session.execute(db.insert(model), rows[i:i + 1000])
+
+
+def _lock_and_clear_rollups():
+    """
+    Vaciar los acumulados con bloqueo exclusivo hasta el commit
+
+    Los incrementos de record_result que lleguen mientras tanto esperan y se
+    aplican sobre las filas nuevas.
+    """
+    dialect = db.engine.dialect.name
+    for model in ROLLUP_MODELS:
+        if dialect == 'mssql':
+            db.session.execute(text(f"DELETE FROM {model.__tablename__} WITH (TABLOCKX)"))
+            continue
+        if dialect == 'postgresql':
+            db.session.execute(text(f"LOCK TABLE {model.__tablename__} IN EXCLUSIVE MODE"))
+        # SQLite: el DELETE toma el bloqueo de escritura de toda la base
+        db.session.execute(db.delete(model))
+
+
+def rebuild_analytics(batch_size=500, progress_callback=None):
+    """
+    Recalcular hechos y acumulados desde results sin pausar record_result
+
+    1. Resultados creados antes de (inicio - REBUILD_MARGIN), por bloques (keyset
+       por id, un commit por bloque): sus hechos se reemplazan y los acumulados
+       se suman en memoria. Todos estaban confirmados al empezar.
+    2. Intercambio en una transacción: se bloquean y vacían los acumulados, se
+       suman los resultados recientes ya confirmados (los que aún no confirman se
+       saltan con READPAST y se incrementan solos al liberar el bloqueo) y se
+       insertan los acumulados nuevos con sus derivados (insert_rollups).
+
+    Los grupos de cada resultado se toman de las membresías actuales. Al
+    terminar se escribe la marca REBUILD_MARKER.
+
+    Returns:
+        int: resultados procesados
+    """
+    from app.models.result import Result
+    from app.services.maintenance_service import clear_completed, mark_completed
+
+    clear_completed(REBUILD_MARKER)
+    cutoff = datetime.utcnow() - REBUILD_MARGIN
+
+    # Hechos de resultados borrados (SQLite no aplica ON DELETE CASCADE)
+    db.session.execute(db.delete(ResultCategoryFact).where(
+        ResultCategoryFact.result_id.not_in(db.select(Result.id))
+    ))
+    db.session.commit()
+
+    daily, categories = {}, {}
+    last_id, total = None, 0
+    try:
+        while True:
+            query = _result_rows().filter(db.or_(Result.created_at < cutoff, Result.created_at.is_(None)))
+            if last_id is not None:
+                query = query.filter(Result.id > last_id)
+            rows = query.order_by(Result.id).limit(batch_size).all()
+            if not rows:
+                break
+
+            _replace_facts([row.id for row in rows], _accumulate(rows, daily, categories))
+            db.session.commit()
+            total += len(rows)
+            last_id = rows[-1].id
+            if progress_callback:
+                progress_callback(total)
+
+        _lock_and_clear_rollups()
+        recent = _result_rows().with_hint(Result, 'WITH (READPAST)', 'mssql').filter(
+            Result.created_at >= cutoff
+        ).all()
+        if recent:
+            _replace_facts([row.id for row in recent], _accumulate(recent, daily, categories))
+            total += len(recent)
+
+        insert_rollups(daily, categories)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    mark_completed(REBUILD_MARKER, {'results': total})
+    return total
+
+
+# ==================== CONSULTA ====================
+
+def scope_group_ids(scope, scope_id):
+    """Subconsulta con los IDs de grupo del grupo, plantel o partner"""
+    if scope == 'group':
+        return db.select(CandidateGroup.id).where(CandidateGroup.id == scope_id)
+    if scope == 'campus':
+        return db.select(CandidateGroup.id).where(CandidateGroup.campus_id == scope_id)
+    if scope == 'partner':
+        return db.select(CandidateGroup.id).join(
+            Campus, Campus.id == CandidateGroup.campus_id
+        ).where(Campus.partner_id == scope_id)
+    raise ValueError(f'Alcance inválido: {scope}')
+
+
+def _filters(model, scope, scope_id, date_from=None, date_to=None, exam_id=None):
+    if model in SCOPE_MODELS:
+        filters = [model.scope == scope, model.scope_id == scope_id]
+    else:
+        filters = [model.group_id.in_(scope_group_ids(scope, scope_id))]
+    if date_from:
+        filters.append(model.day >= date_from)
+    if date_to:
+        filters.append(model.day <= date_to)
+    if exam_id:
+        filters.append(model.exam_id == exam_id)
+    return filters
+
+
+def _sums(model=ResultDailyRollup):
+    return tuple(db.func.sum(getattr(model, column)).label(column) for column in DAILY_SUMS)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _group_breakdown(scope, scope_id, date_from=None, date_to=None, exam_id=None):
+    """
+    Estadísticas por grupo del plantel o partner
+
+    Los meses completos del rango se leen de result_group_monthly_rollups y solo
+    los días de los meses parciales (a lo más dos) de result_daily_rollups.
+    """
+    # Meses completos: [first_month, end_month)
+    first_month = _next_month(date_from - timedelta(days=1)) if date_from else None
+    end_month = _month(date_to + timedelta(days=1)) if date_to else None
+
+    daily_filters = _filters(ResultDailyRollup, scope, scope_id, date_from, date_to, exam_id)
+    queries = []
+    if first_month and end_month and first_month >= end_month:
+        # Rango dentro de un mes: solo días
+        queries.append((ResultDailyRollup, daily_filters))
+    else:
+        monthly_filters = [ResultGroupMonthlyRollup.group_id.in_(scope_group_ids(scope, scope_id))]
+        if first_month:
+            monthly_filters.append(ResultGroupMonthlyRollup.month >= first_month)
+        if end_month:
+            monthly_filters.append(ResultGroupMonthlyRollup.month < end_month)
+        if exam_id:
+            monthly_filters.append(ResultGroupMonthlyRollup.exam_id == exam_id)
+        queries.append((ResultGroupMonthlyRollup, monthly_filters))
+
+        edges = []
+        if first_month and date_from < first_month:
+            edges.append(ResultDailyRollup.day < first_month)
+        if end_month and end_month <= date_to:
+            edges.append(ResultDailyRollup.day >= end_month)
+        if edges:
+            queries.append((ResultDailyRollup, daily_filters + [db.or_(*edges)]))
+
+    totals = {}
+    for model, filters in queries:
+        for row in db.session.query(model.group_id, *_sums(model)).filter(*filters).group_by(model.group_id):
+            entry = totals.setdefault(row.group_id, dict.fromkeys(DAILY_SUMS, 0))
+            for column in DAILY_SUMS:
+                entry[column] += int(getattr(row, column) or 0)
+    if not totals:
+        return []
+
+    groups = db.session.query(CandidateGroup.id, CandidateGroup.name, CandidateGroup.campus_id).filter(
+        CandidateGroup.id.in_(scope_group_ids(scope, scope_id))
+    )
+    return sorted([
+        {'group_id': group.id, 'group_name': group.name, 'campus_id': group.campus_id,
+         **_stats(SimpleNamespace(**totals[group.id]))}
+        for group in groups if group.id in totals
+    ], key=lambda item: item['pass_rate'])
+
+
+def _stats(row):
+    attempts = int(row.attempts or 0)
+    passed = int(row.passed or 0)
+    return {
+        'attempts': attempts,
+        'passed': passed,
+        'failed': attempts - passed,
+        'pass_rate': round(passed * 100 / attempts, 1) if attempts else 0,
+        'average_score': round(int(row.score_sum or 0) / attempts, 1) if attempts else 0,
+        'average_duration_seconds': round(int(row.duration_sum or 0) / attempts) if attempts else 0,
+    }
+
+
+def _percentage(earned, max_score):
+    return round(earned * 100 / max_score, 1) if max_score else 0
+
+
+def get_analytics(scope, scope_id, date_from=None, date_to=None, exam_id=None):
+    """
+    Tablero de resultados de un grupo, plantel o partner desde los acumulados
+
+    Returns:
+        dict: totals, by_exam, by_day, by_group (plantel/partner) y categories,
+        ordenadas de la más débil a la más fuerte con sus temas
+    """
+    from app.models.exam import Exam
+    from app.models.competency_standard import CompetencyStandard
+
+    # Grupo: sus acumulados; plantel y partner: los acumulados de su alcance
+    daily_model = ResultDailyRollup if scope == 'group' else ResultScopeDailyRollup
+    category_model = ResultCategoryRollup if scope == 'group' else ResultScopeCategoryRollup
+    filters = _filters(daily_model, scope, scope_id, date_from, date_to, exam_id)
+
+    totals = db.session.query(*_sums(daily_model)).filter(*filters).one()
+
+    exam_rows = db.session.query(daily_model.exam_id, *_sums(daily_model)).filter(
+        *filters
+    ).group_by(daily_model.exam_id).all()
+    exams = {}
+    if exam_rows:
+        exams = {
+            row.id: row for row in db.session.query(
+                Exam.id, Exam.name, CompetencyStandard.code.label('ecm_code')
+            ).outerjoin(
+                CompetencyStandard, CompetencyStandard.id == Exam.competency_standard_id
+            ).filter(Exam.id.in_([row.exam_id for row in exam_rows]))
+        }
+    by_exam = sorted([
+        {
+            'exam_id': row.exam_id,
+            'exam_name': exams[row.exam_id].name if row.exam_id in exams else None,
+            'ecm_code': exams[row.exam_id].ecm_code if row.exam_id in exams else None,
+            **_stats(row)
+        }
+        for row in exam_rows
+    ], key=lambda item: -item['attempts'])
+
+    by_day = [
+        {'day': row.day.isoformat(), **_stats(row)}
+        for row in db.session.query(daily_model.day, *_sums(daily_model)).filter(
+            *filters
+        ).group_by(daily_model.day).order_by(daily_model.day)
+    ]
+
+    by_group = None
+    if scope != 'group':
+        by_group = _group_breakdown(scope, scope_id, date_from, date_to, exam_id)
+
+    category_rows = db.session.query(
+        category_model.category,
+        category_model.topic,
+        db.func.sum(category_model.results).label('results'),
+        db.func.sum(category_model.earned).label('earned'),
+        db.func.sum(category_model.max_score).label('max_score')
+    ).filter(
+        *_filters(category_model, scope, scope_id, date_from, date_to, exam_id)
+    ).group_by(category_model.category, category_model.topic).all()
+
+    categories = {}
+    for row in category_rows:
+        entry = categories.setdefault(row.category, {'category': row.category, 'earned': 0.0, 'max': 0.0, 'topics': []})
+        entry['earned'] += row.earned or 0
+        entry['max'] += row.max_score or 0
+        if row.topic:
+            entry['topics'].append({
+                'topic': row.topic,
+                'results': int(row.results or 0),
+                'earned': round(row.earned or 0, 2),
+                'max': round(row.max_score or 0, 2),
+                'percentage': _percentage(row.earned or 0, row.max_score or 0)
+            })
+    for entry in categories.values():
+        entry['percentage'] = _percentage(entry['earned'], entry['max'])
+        entry['earned'] = round(entry['earned'], 2)
+        entry['max'] = round(entry['max'], 2)
+        entry['topics'].sort(key=lambda topic: topic['percentage'])
+
+    result = {
+        'scope': scope,
+        'scope_id': scope_id,
+        'date_from': date_from.isoformat() if date_from else None,
+        'date_to': date_to.isoformat() if date_to else None,
+        'exam_id': exam_id,
+        'totals': _stats(totals),
+        'by_exam': by_exam,
+        'by_day': by_day,
+        'categories': sorted(categories.values(), key=lambda entry: entry['percentage']),
+    }
+    if by_group is not None:
+        result['by_group'] = by_group
+    return result
+
+
+def analytics_rows(scope, scope_id, date_from=None, date_to=None, exam_id=None):
+    """
+    Acumulados diarios para exportar (una fila por día, grupo y examen)
+
+    Se recorre con yield_per para no cargar el resultado completo en memoria;
+    las columnas son ANALYTICS_COLUMNS (services/export_service.export_response).
+    """
+    from app.models.exam import Exam
+    from app.models.competency_standard import CompetencyStandard
+
+    query = db.session.query(
+        ResultDailyRollup, Campus.name.label('campus_name'), CandidateGroup.name.label('group_name'),
+        Exam.name.label('exam_name'), CompetencyStandard.code.label('ecm_code')
+    ).join(
+        CandidateGroup, CandidateGroup.id == ResultDailyRollup.group_id
+    ).join(
+        Campus, Campus.id == CandidateGroup.campus_id
+    ).outerjoin(
+        Exam, Exam.id == ResultDailyRollup.exam_id
+    ).outerjoin(
+        CompetencyStandard, CompetencyStandard.id == ResultDailyRollup.competency_standard_id
+    ).filter(
+        *_filters(ResultDailyRollup, scope, scope_id, date_from, date_to, exam_id)
+    ).order_by(
+        ResultDailyRollup.day, Campus.name, CandidateGroup.name, ResultDailyRollup.exam_id
+    ).yield_per(1000)
+
+    for rollup, campus_name, group_name, exam_name, ecm_code in query:
+        stats = _stats(rollup)
+        yield (
+            rollup.day, campus_name, rollup.group_id, group_name, rollup.exam_id, exam_name, ecm_code,
+            stats['attempts'], stats['passed'], stats['pass_rate'],
+            stats['average_score'], stats['average_duration_seconds']
+        )
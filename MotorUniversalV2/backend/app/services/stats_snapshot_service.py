@@ -0,0 +1,223 @@
+"""
+Servicio de snapshot de estadísticas
+
+Calcula en una sola consulta SQL (agregados condicionales como subconsultas
+escalares) todos los contadores que muestran los dashboards de editor/admin,
+coordinador y gestión de usuarios, y los guarda en caché con un TTL corto.
+
+La caché se invalida además por eventos: un hook de sesión detecta altas, bajas
+y cambios en las columnas relevantes (is_published, is_active, role, status...)
+y descarta el snapshot al confirmar la transacción.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, event, func, inspect as sa_inspect, true
+
+from app import db, cache
+
+STATS_SNAPSHOT_KEY = 'stats:snapshot'
+STATS_SNAPSHOT_TTL = 60
+
+_events_registered = False
+
+
+def _count(model, *conditions):
+    """COUNT(*) o SUM(CASE WHEN ... THEN 1 ELSE 0 END) como subconsulta escalar"""
+    if not conditions:
+        return db.select(func.count()).select_from(model).scalar_subquery()
+    condition = conditions[0] if len(conditions) == 1 else db.and_(*conditions)
+    return db.select(
+        func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+    ).select_from(model).scalar_subquery()
+
+
+def _counter_columns():
+    """Columnas (nombre, subconsulta escalar) del snapshot"""
+    from app.models.user import User, AVAILABLE_ROLES
+    from app.models.exam import Exam
+    from app.models.question import Question
+    from app.models.competency_standard import CompetencyStandard
+    from app.models.study_content import StudyMaterial
+    from app.models.partner import Partner, Campus, CandidateGroup, GroupMember
+
+    candidate = User.role == 'candidato'
+    columns = [
+        ('standards_total', _count(CompetencyStandard)),
+        ('standards_active', _count(CompetencyStandard, CompetencyStandard.is_active == True)),
+        ('exams_total', _count(Exam)),
+        ('exams_published', _count(Exam, Exam.is_published == True)),
+        ('materials_total', _count(StudyMaterial)),
+        ('materials_published', _count(StudyMaterial, StudyMaterial.is_published == True)),
+        ('questions_total', _count(Question)),
+        ('partners_active', _count(Partner, Partner.is_active == True)),
+        ('campuses_active', _count(Campus, Campus.is_active == True)),
+        ('groups_active', _count(CandidateGroup, CandidateGroup.is_active == True)),
+        ('members_active', _count(GroupMember, GroupMember.status == 'active')),
+        ('users_total', _count(User)),
+        ('users_active', _count(User, User.is_active == True)),
+        ('users_verified', _count(User, User.is_verified == True)),
+        ('candidates_active', _count(User, candidate, User.is_active == True)),
+        ('candidates_verified', _count(User, candidate, User.is_verified == True)),
+    ]
+    columns += [(f'role_{role}', _count(User, User.role == role)) for role in AVAILABLE_ROLES]
+    return columns
+
+
+def compute_stats_snapshot():
+    """
+    Calcular todos los contadores en un solo round trip
+
+    Los contadores van como subconsultas escalares en una fila; las preguntas por
+    tipo se unen con LEFT JOIN ... ON 1=1, así que el resultado tiene una fila
+    por tipo de pregunta (o una sola fila si no hay tipos).
+    """
+    from app.models.question import Question, QuestionType
+    from app.models.user import AVAILABLE_ROLES
+
+    columns = _counter_columns()
+    counters = db.select(*[expr.label(name) for name, expr in columns]).subquery()
+
+    by_type = db.select(
+        QuestionType.name.label('type_name'),
+        func.count(Question.id).label('type_count')
+    ).join(
+        Question, Question.question_type_id == QuestionType.id
+    ).group_by(QuestionType.name).subquery()
+
+    stmt = db.select(counters, by_type.c.type_name, by_type.c.type_count).select_from(
+        counters
+    ).outerjoin(by_type, true())
+
+    rows = db.session.execute(stmt).mappings().all()
+    first = rows[0] if rows else {}
+    values = {name: int(first.get(name) or 0) for name, _ in columns}
+
+    return {
+        'standards': {
+            'total': values['standards_total'],
+            'active': values['standards_active']
+        },
+        'exams': {
+            'total': values['exams_total'],
+            'published': values['exams_published'],
+            'draft': values['exams_total'] - values['exams_published']
+        },
+        'materials': {
+            'total': values['materials_total'],
+            'published': values['materials_published'],
+            'draft': values['materials_total'] - values['materials_published']
+        },
+        'questions': {
+            'total': values['questions_total'],
+            'by_type': {row['type_name']: int(row['type_count']) for row in rows if row['type_name'] is not None}
+        },
+        'partners': {
+            'partners': values['partners_active'],
+            'campuses': values['campuses_active'],
+            'groups': values['groups_active'],
+            'members': values['members_active']
+        },
+        'users': {
+            'total': values['users_total'],
+            'active': values['users_active'],
+            'inactive': values['users_total'] - values['users_active'],
+            'verified': values['users_verified'],
+            'by_role': {role: values[f'role_{role}'] for role in AVAILABLE_ROLES}
+        },
+        'candidates': {
+            'total': values['role_candidato'],
+            'active': values['candidates_active'],
+            'inactive': values['role_candidato'] - values['candidates_active'],
+            'verified': values['candidates_verified']
+        },
+        'computed_at': datetime.utcnow().isoformat()
+    }
+
+
+def get_stats_snapshot():
+    """Obtener el snapshot desde caché o calcularlo"""
+    try:
+        snapshot = cache.get(STATS_SNAPSHOT_KEY)
+        if snapshot is not None:
+            return snapshot
+    except Exception as e:
+        print(f"[STATS] Warning: no se pudo leer la caché: {e}")
+
+    snapshot = compute_stats_snapshot()
+    try:
+        cache.set(STATS_SNAPSHOT_KEY, snapshot, timeout=STATS_SNAPSHOT_TTL)
+    except Exception as e:
+        print(f"[STATS] Warning: no se pudo escribir la caché: {e}")
+    return snapshot
+
+
+def invalidate_stats_snapshot():
+    """Descartar el snapshot (se recalcula en la siguiente lectura)"""
+    try:
+        cache.delete(STATS_SNAPSHOT_KEY)
+    except Exception as e:
+        print(f"[STATS] Warning: no se pudo invalidar el snapshot: {e}")
+
+
+def _tracked_columns():
+    """Modelos que afectan el snapshot y columnas cuyo cambio lo invalida"""
+    from app.models.user import User
+    from app.models.exam import Exam
+    from app.models.question import Question
+    from app.models.competency_standard import CompetencyStandard
+    from app.models.study_content import StudyMaterial
+    from app.models.partner import Partner, Campus, CandidateGroup, GroupMember
+
+    return {
+        CompetencyStandard: ('is_active',),
+        Exam: ('is_published',),
+        StudyMaterial: ('is_published',),
+        Question: ('question_type_id',),
+        Partner: ('is_active',),
+        Campus: ('is_active',),
+        CandidateGroup: ('is_active',),
+        GroupMember: ('status',),
+        User: ('role', 'is_active', 'is_verified'),
+    }
+
+
+def register_stats_events():
+    """
+    Invalidar el snapshot al confirmar altas, bajas o cambios relevantes
+
+    Cambios en otras columnas (p. ej. last_login de User) no lo invalidan.
+    """
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+    tracked = _tracked_columns()
+
+    def _affects_snapshot(obj):
+        columns = tracked.get(type(obj))
+        if not columns:
+            return False
+        state = sa_inspect(obj)
+        return any(state.attrs[column].history.has_changes() for column in columns)
+
+    @event.listens_for(db.session, 'after_flush')
+    def _track_stats_changes(session, flush_context):
+        if session.info.get('stats_snapshot_changed'):
+            return
+        for obj in list(session.new) + list(session.deleted):
+            if type(obj) in tracked:
+                session.info['stats_snapshot_changed'] = True
+                return
+        for obj in session.dirty:
+            if _affects_snapshot(obj):
+                session.info['stats_snapshot_changed'] = True
+                return
+
+    @event.listens_for(db.session, 'after_commit')
+    def _invalidate_on_commit(session):
+        if session.info.pop('stats_snapshot_changed', False):
+            invalidate_stats_snapshot()
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _reset_on_rollback(session):
+        session.info.pop('stats_snapshot_changed', None)
@@ -0,0 +1,218 @@
+"""
+Servicio de resúmenes de Materiales de Estudio
+
+Calcula en bloque los datos agregados que necesitan los listados de materiales
+(conteo de sesiones y temas, tiempo estimado, exámenes vinculados, progreso del
+usuario) para evitar recorrer sesiones → temas por cada material (problema N+1).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, cast, func, literal, union_all
+
+from app import db
+from app.models.exam import Exam
+from app.models.study_content import (
+    StudyMaterial,
+    StudySession,
+    StudyTopic,
+    StudyReading,
+    StudyVideo,
+    StudyDownloadableExercise,
+    StudyInteractiveExercise,
+    study_material_exams
+)
+from app.models.student_progress import StudentContentProgress
+
+# Tipos de contenido de un tema y su tabla (mismos valores que student_content_progress.content_type)
+CONTENT_MODELS = (
+    ('reading', StudyReading),
+    ('video', StudyVideo),
+    ('downloadable', StudyDownloadableExercise),
+    ('interactive', StudyInteractiveExercise),
+)
+
+
+def _empty_summary() -> dict:
+    return {
+        'sessions_count': 0,
+        'topics_count': 0,
+        'estimated_time_minutes': 0,
+        'exam_title': None,
+        'exam_ids': [],
+        'linked_exams': []
+    }
+
+
+def get_material_summaries(material_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Obtener los agregados de varios materiales en dos queries
+
+    1. Conteo de sesiones, temas y suma de tiempo estimado (subqueries agrupadas)
+       junto con el nombre del examen legacy (exam_id).
+    2. Exámenes vinculados vía study_material_exams.
+
+    Args:
+        material_ids: IDs de los materiales a resumir
+
+    Returns:
+        dict: material_id -> {sessions_count, topics_count, estimated_time_minutes,
+              exam_title, exam_ids, linked_exams}
+    """
+    material_ids = list({mid for mid in material_ids if mid is not None})
+    if not material_ids:
+        return {}
+
+    summaries = {mid: _empty_summary() for mid in material_ids}
+
+    sessions_sq = db.session.query(
+        StudySession.material_id.label('material_id'),
+        func.count(StudySession.id).label('sessions_count')
+    ).filter(
+        StudySession.material_id.in_(material_ids)
+    ).group_by(StudySession.material_id).subquery()
+
+    topics_sq = db.session.query(
+        StudySession.material_id.label('material_id'),
+        func.count(StudyTopic.id).label('topics_count'),
+        func.sum(StudyTopic.estimated_time_minutes).label('estimated_time')
+    ).join(
+        StudyTopic, StudyTopic.session_id == StudySession.id
+    ).filter(
+        StudySession.material_id.in_(material_ids)
+    ).group_by(StudySession.material_id).subquery()
+
+    rows = db.session.query(
+        StudyMaterial.id,
+        func.coalesce(sessions_sq.c.sessions_count, 0),
+        func.coalesce(topics_sq.c.topics_count, 0),
+        func.coalesce(topics_sq.c.estimated_time, 0),
+        Exam.name
+    ).outerjoin(
+        sessions_sq, sessions_sq.c.material_id == StudyMaterial.id
+    ).outerjoin(
+        topics_sq, topics_sq.c.material_id == StudyMaterial.id
+    ).outerjoin(
+        Exam, Exam.id == StudyMaterial.exam_id
+    ).filter(
+        StudyMaterial.id.in_(material_ids)
+    ).all()
+
+    for material_id, sessions_count, topics_count, estimated_time, exam_title in rows:
+        summary = summaries[material_id]
+        summary['sessions_count'] = int(sessions_count or 0)
+        summary['topics_count'] = int(topics_count or 0)
+        summary['estimated_time_minutes'] = int(estimated_time or 0)
+        summary['exam_title'] = exam_title
+
+    # Exámenes vinculados (la tabla study_material_exams puede no existir aún).
+    # Se consulta en un SAVEPOINT: esta función se llama desde to_dict() y un
+    # fallo aquí no debe descartar el trabajo pendiente de quien serializa.
+    try:
+        with db.session.begin_nested():
+            linked_rows = db.session.query(
+                study_material_exams.c.study_material_id,
+                Exam.id,
+                Exam.name,
+                Exam.version
+            ).join(
+                Exam, Exam.id == study_material_exams.c.exam_id
+            ).filter(
+                study_material_exams.c.study_material_id.in_(material_ids)
+            ).order_by(
+                study_material_exams.c.study_material_id, Exam.id
+            ).all()
+
+        for material_id, exam_id, exam_name, exam_version in linked_rows:
+            summary = summaries[material_id]
+            summary['exam_ids'].append(exam_id)
+            summary['linked_exams'].append({
+                'id': exam_id,
+                'name': exam_name,
+                'version': exam_version
+            })
+    except Exception as e:
+        current_app.logger.warning(f"[STUDY-MATERIALS] No se pudieron cargar exámenes vinculados: {e}")
+
+    return summaries
+
+
+def serialize_materials(materials: List[StudyMaterial]) -> List[dict]:
+    """
+    Serializar una lista de materiales usando los agregados en bloque
+
+    Devuelve el mismo formato que StudyMaterial.to_dict() sin queries por fila.
+    """
+    summaries = get_material_summaries(m.id for m in materials)
+    return [m.to_dict(summary=summaries.get(m.id)) for m in materials]
+
+
+def _material_contents_subquery(material_ids: List[int]):
+    """
+    Subquery (material_id, content_type, content_id) con todos los contenidos
+    de los materiales indicados, unificando las cuatro tablas con UNION ALL
+    """
+    selects = [
+        db.select(
+            StudySession.material_id.label('material_id'),
+            literal(content_type).label('content_type'),
+            cast(model.id, db.String(36)).label('content_id')
+        ).select_from(model).join(
+            StudyTopic, StudyTopic.id == model.topic_id
+        ).join(
+            StudySession, StudySession.id == StudyTopic.session_id
+        ).where(StudySession.material_id.in_(material_ids))
+        for content_type, model in CONTENT_MODELS
+    ]
+    return union_all(*selects).subquery()
+
+
+def get_material_progress_counts(material_ids: Iterable[int],
+                                 user_id: Optional[str] = None) -> Dict[int, Tuple[int, int]]:
+    """
+    Total de contenidos y completados por el usuario, por material, en una sola query
+
+        SELECT material_id, COUNT(*), COUNT(progress.id)
+        FROM (contenidos UNION ALL ...) c
+        LEFT JOIN student_content_progress progress
+               ON progress.user_id = :user AND progress.is_completed = 1
+              AND progress.content_type = c.content_type AND progress.content_id = c.content_id
+        GROUP BY material_id
+
+    Args:
+        material_ids: IDs de materiales
+        user_id: Usuario; si es None solo se calculan los totales
+
+    Returns:
+        dict: material_id -> (total, completados). Los materiales sin contenido no aparecen.
+    """
+    material_ids = list(dict.fromkeys(material_ids))
+    if not material_ids:
+        return {}
+
+    contents = _material_contents_subquery(material_ids)
+
+    if user_id is None:
+        stmt = db.select(
+            contents.c.material_id,
+            func.count().label('total'),
+            literal(0).label('completed')
+        ).group_by(contents.c.material_id)
+    else:
+        stmt = db.select(
+            contents.c.material_id,
+            func.count().label('total'),
+            func.count(StudentContentProgress.id).label('completed')
+        ).select_from(contents).outerjoin(
+            StudentContentProgress, and_(
+                StudentContentProgress.user_id == str(user_id),
+                StudentContentProgress.is_completed == True,
+                StudentContentProgress.content_type == contents.c.content_type,
+                StudentContentProgress.content_id == contents.c.content_id
+            )
+        ).group_by(contents.c.material_id)
+
+    return {
+        material_id: (int(total), int(completed))
+        for material_id, total, completed in db.session.execute(stmt).all()
+    }
@@ -0,0 +1,248 @@
+"""
+Servicio de búsqueda de usuarios
+
+Reemplaza ILIKE '%term%' (que recorre toda la tabla users) por un índice
+invertido de tokens normalizados en user_search_tokens:
+
+- Normalización: minúsculas y sin acentos ('Muñoz' -> 'munoz')
+- Tokens por usuario: cada palabra del nombre y apellidos, username, CURP,
+  email completo, parte local del email y sus segmentos (juan.perez -> juan, perez)
+- Búsqueda: cada término del query se busca por prefijo (rango del índice);
+  el usuario debe coincidir con todos los términos y se ordena por relevancia
+  (coincidencia exacta > prefijo, CURP/email > nombre > otros)
+
+El índice se mantiene en la misma transacción que el cambio del usuario
+(register_user_search_events) y, para inserts en bloque, con index_user_rows().
+"""
+import re
+import unicodedata
+
+from sqlalchemy import case, delete, distinct, event, func, inspect as sa_inspect, literal, union_all
+
+from app import db
+from app.models.user_search import UserSearchToken
+
+SEARCH_FIELDS = ('name', 'first_surname', 'second_surname', 'username', 'email', 'curp')
+MAX_QUERY_TERMS = 5
+MAX_TOKEN_LENGTH = 120
+REBUILD_MARKER = 'user_search_index'  # Marca de maintenance_markers al terminar rebuild_index
+
+WEIGHT_EXACT_FIELD = 3  # CURP y email completos
+WEIGHT_NAME = 2
+WEIGHT_OTHER = 1
+
+_TOKEN_CHARS = re.compile(r'[^a-z0-9@._-]+')
+_WORD_SPLIT = re.compile(r'[\s@._-]+')
+
+_events_registered = False
+
+
+def normalize(value):
+    """Minúsculas, sin acentos y solo caracteres de búsqueda"""
+    if not value:
+        return ''
+    folded = unicodedata.normalize('NFKD', str(value))
+    folded = ''.join(c for c in folded if not unicodedata.combining(c)).lower()
+    return _TOKEN_CHARS.sub(' ', folded).strip()
+
+
+def _words(value):
+    return [w for w in _WORD_SPLIT.split(normalize(value)) if w]
+
+
+def user_tokens(values):
+    """
+    Tokens de búsqueda de un usuario
+
+    Args:
+        values: dict (o fila) con name, first_surname, second_surname, username, email, curp
+
+    Returns:
+        dict: {token: peso}
+    """
+    get = values.get if isinstance(values, dict) else lambda key: getattr(values, key, None)
+    tokens = {}
+
+    def add(token, weight):
+        token = token[:MAX_TOKEN_LENGTH]
+        if token and tokens.get(token, 0) < weight:
+            tokens[token] = weight
+
+    for field in ('name', 'first_surname', 'second_surname'):
+        for word in _words(get(field)):
+            add(word, WEIGHT_NAME)
+
+    username = normalize(get('username')).replace(' ', '')
+    add(username, WEIGHT_OTHER)
+
+    email = normalize(get('email')).replace(' ', '')
+    if email:
+        add(email, WEIGHT_EXACT_FIELD)
+        local = email.split('@')[0]
+        add(local, WEIGHT_OTHER)
+        for word in _words(local):
+            add(word, WEIGHT_OTHER)
+
+    curp = normalize(get('curp')).replace(' ', '')
+    add(curp, WEIGHT_EXACT_FIELD)
+
+    return tokens
+
+
+def query_terms(search):
+    """Términos normalizados del texto buscado (sin duplicados, máximo MAX_QUERY_TERMS)"""
+    terms = []
+    for raw in (search or '').split():
+        term = normalize(raw).replace(' ', '')[:MAX_TOKEN_LENGTH]
+        if term and term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def index_user_rows(rows, connection=None):
+    """
+    Reemplazar los tokens de los usuarios dados (sin commit)
+
+    Args:
+        rows: dicts u objetos con id y los campos de SEARCH_FIELDS
+        connection: conexión a usar (dentro de un after_flush); por defecto la sesión
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    execute = connection.execute if connection is not None else db.session.execute
+    get_id = (lambda r: r['id']) if isinstance(rows[0], dict) else (lambda r: r.id)
+    user_ids = [get_id(r) for r in rows]
+
+    for i in range(0, len(user_ids), 500):
+        execute(delete(UserSearchToken).where(UserSearchToken.user_id.in_(user_ids[i:i + 500])))
+
+    token_rows = [
+        {'token': token, 'user_id': get_id(r), 'weight': weight}
+        for r in rows
+        for token, weight in user_tokens(r).items()
+    ]
+    for i in range(0, len(token_rows), 1000):
+        execute(db.insert(UserSearchToken), token_rows[i:i + 1000])
+
+
+def reindex_users(user_ids):
+    """Reindexar usuarios por ID leyendo sus datos actuales (sin commit)"""
+    from app.models.user import User
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), 500):
+        rows = db.session.query(User.id, *[getattr(User, f) for f in SEARCH_FIELDS]).filter(
+            User.id.in_(user_ids[i:i + 500])
+        ).all()
+        index_user_rows([dict(row._mapping) for row in rows])
+
+
+def _prefix_match(term):
+    """Condición de prefijo que usa el índice de token"""
+    condition = UserSearchToken.token.startswith(term, autoescape=True)
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite solo usa el índice con LIKE si la columna es NOCASE: se agrega el rango
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+        condition = db.and_(UserSearchToken.token >= term, UserSearchToken.token < upper, condition)
+    return condition
+
+
+def ranked_user_ids(search):
+    """
+    Subconsulta (user_id, score) de los usuarios que coinciden con todos los términos
+
+    Returns:
+        Subquery o None si el texto no tiene términos buscables
+    """
+    terms = query_terms(search)
+    if not terms:
+        return None
+
+    per_term = [
+        db.select(
+            UserSearchToken.user_id.label('user_id'),
+            literal(i).label('term'),
+            case(
+                (UserSearchToken.token == term, UserSearchToken.weight * 2),
+                else_=UserSearchToken.weight
+            ).label('score')
+        ).where(_prefix_match(term))
+        for i, term in enumerate(terms)
+    ]
+    matches = union_all(*per_term).subquery()
+
+    return db.select(
+        matches.c.user_id,
+        func.sum(matches.c.score).label('score')
+    ).group_by(matches.c.user_id).having(
+        func.count(distinct(matches.c.term)) == len(terms)
+    ).subquery()
+
+
+def apply_user_search(query, search):
+    """
+    Filtrar un query de User por el texto buscado y ordenarlo por relevancia
+
+    El orden por relevancia va primero; el llamador puede agregar el suyo como
+    desempate. Si el texto no tiene términos buscables, devuelve el query intacto.
+    """
+    from app.models.user import User
+    ranked = ranked_user_ids(search)
+    if ranked is None:
+        return query
+    return query.join(ranked, ranked.c.user_id == User.id).order_by(ranked.c.score.desc())
+
+
+def rebuild_index(batch_size=2000, progress_callback=None):
+    """
+    Reconstruir el índice completo por bloques (keyset por id, un commit por bloque)
+
+    Al terminar escribe la marca REBUILD_MARKER; si se interrumpe, la marca no
+    queda y el siguiente arranque (--if-incomplete) la vuelve a lanzar.
+    """
+    from app.models.user import User
+    from app.services.maintenance_service import clear_completed, mark_completed
+    clear_completed(REBUILD_MARKER)
+    last_id, total = None, 0
+    while True:
+        query = db.session.query(User.id, *[getattr(User, f) for f in SEARCH_FIELDS])
+        if last_id is not None:
+            query = query.filter(User.id > last_id)
+        rows = query.order_by(User.id).limit(batch_size).all()
+        if not rows:
+            break
+        index_user_rows([dict(row._mapping) for row in rows])
+        db.session.commit()
+        total += len(rows)
+        last_id = rows[-1].id
+        if progress_callback:
+            progress_callback(total)
+    mark_completed(REBUILD_MARKER, {'users': total})
+    return total
+
+
+def register_user_search_events():
+    """Reindexar en la misma transacción los usuarios creados o con campos de búsqueda modificados"""
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+
+    from app.models.user import User
+
+    def _search_fields_changed(obj):
+        state = sa_inspect(obj)
+        return any(state.attrs[field].history.has_changes() for field in SEARCH_FIELDS)
+
+    @event.listens_for(db.session, 'after_flush')
+    def _maintain_search_index(session, flush_context):
+        changed = [obj for obj in session.new if isinstance(obj, User)]
+        changed += [obj for obj in session.dirty if isinstance(obj, User) and _search_fields_changed(obj)]
+        deleted = [obj.id for obj in session.deleted if isinstance(obj, User)]
+
+        connection = session.connection()
+        if deleted:
+            # SQLite no aplica ON DELETE CASCADE sin PRAGMA foreign_keys
+            connection.execute(delete(UserSearchToken).where(UserSearchToken.user_id.in_(deleted)))
+        if changed:
+            index_user_rows(changed, connection=connection)
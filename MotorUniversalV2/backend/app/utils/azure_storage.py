@@ -14,6 +14,7 @@ from werkzeug.utils import secure_filename
 
 # Configuración de SAS tokens
 SAS_TOKEN_DURATION_HOURS = 24  # Duración de SAS tokens en horas
+SAS_MIN_REMAINING_HOURS = int(os.getenv('SAS_MIN_REMAINING_HOURS', 6))  # Vigencia mínima de un SAS reutilizado desde caché
 VIDEO_ACCOUNT_NAME = 'evaluaasivideos'
 VIDEO_ACCOUNT_KEY = os.getenv('AZURE_VIDEO_ACCOUNT_KEY')
 
@@ -179,13 +180,14 @@ class AzureStorageService:
             print(f"Error uploading video to Azure Cool tier: {str(e)}")
             return None
     
-    def generate_video_sas_url(self, blob_url, duration_hours=None):
+    def generate_video_sas_url(self, blob_url, duration_hours=None, expiry=None):
         """
         Generar URL con SAS token de corta duración para un video existente
         
         Args:
             blob_url: URL del blob (con o sin SAS token existente)
             duration_hours: Duración del token en horas (default: SAS_TOKEN_DURATION_HOURS)
+            expiry: Fecha de expiración explícita (datetime UTC); tiene prioridad sobre duration_hours
         
         Returns:
             str: URL con SAS token fresco o None si falla
@@ -226,7 +228,7 @@ class AzureStorageService:
                 blob_name=blob_name,
                 account_key=VIDEO_ACCOUNT_KEY,
                 permission=BlobSasPermissions(read=True),
-                expiry=datetime.now(timezone.utc) + timedelta(hours=hours)
+                expiry=expiry or (datetime.now(timezone.utc) + timedelta(hours=hours))
             )
             
             return f"{base_url}?{sas_token}"
@@ -67,6 +67,21 @@ def cached_with_user(timeout=300):
     return decorator
 
 
+def get_redis_client():
+    """
+    Cliente Redis crudo del cache (para hashes, INCR, scripts)
+
+    Returns:
+        redis.Redis o None si el backend de cache no es Redis
+    """
+    backend = getattr(cache, 'cache', None)
+    client = getattr(backend, '_write_client', None)
+    if client is None:
+        clients = getattr(backend, '_read_clients', None)
+        client = clients[0] if clients else None
+    return client
+
+
 def invalidate_cache_pattern(pattern):
     """
     Invalida todas las claves de cache que coincidan con un patrón
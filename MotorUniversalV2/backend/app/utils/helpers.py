@@ -2,6 +2,7 @@
 Utilidades varias
 """
 import os
+import re
 from werkzeug.utils import secure_filename
 
 
@@ -52,3 +53,22 @@ def generate_voucher_code(length=12):
     
     chars = string.ascii_uppercase + string.digits
     return ''.join(random.choice(chars) for _ in range(length))
+
+
+def validate_email(email):
+    """Validar formato de email"""
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return re.match(pattern, email) is not None
+
+
+def validate_password(password):
+    """Validar requisitos de contraseña"""
+    if len(password) < 8:
+        return False, "La contraseña debe tener al menos 8 caracteres"
+    if not re.search(r'[A-Z]', password):
+        return False, "La contraseña debe tener al menos una mayúscula"
+    if not re.search(r'[a-z]', password):
+        return False, "La contraseña debe tener al menos una minúscula"
+    if not re.search(r'[0-9]', password):
+        return False, "La contraseña debe tener al menos un número"
+    return True, None
@@ -0,0 +1,257 @@
+"""
+Identidad del usuario autenticado sin consultar la BD en cada request
+
+El access token lleva en sus claims el rol, el username y la versión de
+autorización del usuario ('av'). En cada request:
+
+1. Se lee la versión actual en Redis (auth:version:<user_id>, un GET)
+2. Si coincide con la del token, la identidad se arma con los claims
+3. Si no coincide (cambió el rol o se desactivó el usuario), el token no trae
+   claims, la clave no existe o Redis no está disponible, se usa una caché LRU
+   por worker de filas de usuario con TTL corto y, si no está ahí, un SELECT
+   por PK
+
+La fuente de verdad es users.auth_version: sube en la misma transacción que
+cambia role / is_active (register_identity_events) y al confirmar se publica
+en Redis, así que los tokens emitidos antes del cambio dejan de confiar en sus
+claims de inmediato. Una clave ausente (flush o desalojo de Redis) nunca se
+interpreta como versión 0: se vuelve a sembrar desde la fila. Las escrituras
+en Redis solo suben la versión (_SET_IF_GREATER), de modo que una siembra con
+una lectura anterior al cambio no la regresa.
+
+Decoradores migrados a get_current_identity():
+    routes/exams.py                 require_permission, get_exams
+    routes/exams_modular/utils.py   require_permission
+    routes/study_contents.py        admin_or_editor_required, get_current_user, get_materials
+    routes/user_management.py       management_required, admin_required
+    routes/partners.py              coordinator_required
+    routes/jobs.py                  job_user_required
+    routes/users.py                 get_users, get_user, update_user,
+                                    update_document_options, get_editor_dashboard
+    routes/conocer.py               upload_certificate, archive_certificate,
+                                    get_user_certificates (admin)
+Se mantienen con User.query.get las rutas que necesitan la fila completa o sus
+relaciones (auth.me, cambio de contraseña/correo, users.get_dashboard,
+partners.my-partners); identity.user la carga bajo demanda.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event, inspect as sa_inspect
+
+from app import db
+
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 2048))
+IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 30))  # segundos
+
+AUTH_VERSION_KEY = 'auth:version:{}'
+
+_SET_IF_GREATER = """
+local current = tonumber(redis.call('GET', KEYS[1]))
+if current == nil or tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_events_registered = False
+
+
+class CurrentIdentity:
+    """Usuario autenticado del request (id, rol y permisos)"""
+
+    __slots__ = ('id', 'role', 'username', 'is_active', 'version', '_user')
+
+    def __init__(self, id, role, username=None, is_active=True, version=None):
+        self.id = id
+        self.role = role
+        self.username = username
+        self.is_active = is_active
+        self.version = version
+        self._user = None
+
+    def has_permission(self, permission):
+        """Mismos permisos por rol que User.has_permission"""
+        from app.models.user import ROLE_PERMISSIONS
+        permissions = ROLE_PERMISSIONS.get(self.role, [])
+        return '*' in permissions or permission in permissions
+
+    @property
+    def user(self):
+        """Fila completa del usuario (se consulta solo si la ruta la necesita)"""
+        if self._user is None:
+            from app.models.user import User
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __repr__(self):
+        return f'<CurrentIdentity {self.id} {self.role}>'
+
+
+def _redis():
+    from app.utils.cache_utils import get_redis_client
+    return get_redis_client()
+
+
+def get_auth_version(user_id):
+    """Versión de autorización publicada en Redis (None si no hay clave o no hay Redis)"""
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        value = client.get(AUTH_VERSION_KEY.format(user_id))
+        return int(value) if value is not None else None
+    except Exception as e:
+        print(f"[IDENTITY] Warning: no se pudo leer la versión de {user_id}: {e}")
+        return None
+
+
+def publish_auth_versions(versions):
+    """
+    Publicar en Redis las versiones de users.auth_version (solo si son mayores)
+
+    Args:
+        versions: {user_id: auth_version}
+    """
+    client = _redis()
+    if client is None or not versions:
+        return
+    try:
+        pipe = client.pipeline()
+        for user_id, version in versions.items():
+            pipe.eval(_SET_IF_GREATER, 1, AUTH_VERSION_KEY.format(user_id), int(version or 0))
+        pipe.execute()
+    except Exception as e:
+        print(f"[IDENTITY] Warning: no se pudo publicar la versión: {e}")
+
+
+def bump_auth_versions(versions):
+    """Invalidar las identidades en caché y los claims de tokens ya emitidos"""
+    for user_id in versions:
+        drop_cached_identity(user_id)
+    publish_auth_versions(versions)
+
+
+def identity_claims(user):
+    """Claims adicionales del access token (login y refresh)"""
+    version = user.auth_version or 0
+    publish_auth_versions({user.id: version})
+    return {
+        'role': user.role,
+        'username': user.username,
+        'av': version
+    }
+
+
+def drop_cached_identity(user_id):
+    with _cache_lock:
+        _cache.pop(user_id, None)
+
+
+def _load_identity(user_id, version):
+    """
+    Identidad desde la LRU del worker o, si expiró, desde la BD
+
+    Sin versión en Redis (clave ausente), la de la fila se vuelve a publicar.
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry and entry[0] > now and (version is None or entry[1].version == version):
+            _cache.move_to_end(user_id)
+            cached = entry[1]
+            return CurrentIdentity(cached.id, cached.role, cached.username, cached.is_active, cached.version)
+
+    from app.models.user import User
+    row = db.session.query(
+        User.id, User.role, User.username, User.is_active, User.auth_version
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    if version is None:
+        publish_auth_versions({row.id: row.auth_version})
+
+    identity = CurrentIdentity(row.id, row.role, row.username, bool(row.is_active), row.auth_version)
+    with _cache_lock:
+        _cache[user_id] = (now + IDENTITY_CACHE_TTL, identity)
+        _cache.move_to_end(user_id)
+        while len(_cache) > IDENTITY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return CurrentIdentity(identity.id, identity.role, identity.username, identity.is_active, identity.version)
+
+
+def get_current_identity():
+    """
+    Identidad del request actual (requiere @jwt_required)
+
+    Returns:
+        CurrentIdentity o None si el usuario no existe o está inactivo
+    """
+    if 'identity' in g:
+        return g.identity
+
+    user_id = get_jwt_identity()
+    claims = get_jwt()
+    version = get_auth_version(user_id)
+
+    if version is not None and claims.get('av') == version and claims.get('role'):
+        identity = CurrentIdentity(user_id, claims['role'], claims.get('username'), True, version)
+    else:
+        identity = _load_identity(user_id, version)
+        if identity is not None and not identity.is_active:
+            identity = None
+
+    g.identity = identity
+    return identity
+
+
+def register_identity_events():
+    """Incrementar la versión con los cambios de rol / estado o bajas de usuarios y publicarla al confirmar"""
+    global _events_registered
+    if _events_registered:
+        return
+    _events_registered = True
+
+    from app.models.user import User
+
+    @event.listens_for(db.session, 'before_flush')
+    def _bump_identity_versions(session, flush_context, instances):
+        changed = session.info.setdefault('identity_changed', {})
+        for obj in session.deleted:
+            if isinstance(obj, User):
+                # Sin fila: basta con publicar una versión mayor que la de cualquier token
+                changed[obj.id] = (obj.auth_version or 0) + 1
+        for obj in session.dirty:
+            if isinstance(obj, User):
+                state = sa_inspect(obj)
+                if state.attrs.role.history.has_changes() or state.attrs.is_active.history.has_changes():
+                    # Incremento en SQL: dos cambios concurrentes no se pisan
+                    obj.auth_version = User.auth_version + 1
+                    changed[obj.id] = None
+
+    @event.listens_for(db.session, 'after_flush')
+    def _read_identity_versions(session, flush_context):
+        changed = session.info.get('identity_changed')
+        pending = [user_id for user_id, version in (changed or {}).items() if version is None]
+        if pending:
+            rows = session.connection().execute(
+                db.select(User.id, User.auth_version).where(User.id.in_(pending))
+            )
+            changed.update({row.id: row.auth_version for row in rows})
+
+    @event.listens_for(db.session, 'after_commit')
+    def _bump_on_commit(session):
+        changed = session.info.pop('identity_changed', None)
+        if changed:
+            bump_auth_versions({user_id: version for user_id, version in changed.items() if version is not None})
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _reset_on_rollback(session):
+        session.info.pop('identity_changed', None)
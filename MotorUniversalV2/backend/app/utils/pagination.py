@@ -0,0 +1,199 @@
+"""
+Paginación de listados: OFFSET clásico o keyset (cursor)
+
+El modo keyset es opcional: se activa enviando `cursor` en el query string
+(vacío para la primera página). En lugar de OFFSET + COUNT(*), filtra por las
+claves del ORDER BY de la última fila recibida, así que el costo de la página
+500 es el mismo que el de la primera si existe un índice con esas columnas.
+
+    GET /api/user-management/users?cursor=&per_page=50
+    -> {'users': [...], 'next_cursor': 'eyJ2Ijo...', 'has_more': true, 'total': null}
+    GET /api/user-management/users?cursor=eyJ2Ijo...&per_page=50&count=exact
+
+`count` (solo en modo cursor): 'none' (default), 'exact' (COUNT del filtro) o
+'estimate' (filas estimadas de la tabla según las estadísticas del motor).
+
+El cursor es opaco: JSON en base64url firmado con SECRET_KEY.
+"""
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import and_, or_, false, text
+
+MAX_PER_PAGE = 100
+
+
+class CursorError(ValueError):
+    """Cursor mal formado, alterado o de otro listado"""
+
+
+def _sign(payload):
+    key = current_app.config.get('SECRET_KEY', '').encode()
+    return hmac.new(key, payload, hashlib.sha256).digest()[:12]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def encode_cursor(values, scope):
+    """Cursor opaco con los valores de las claves de orden de la última fila"""
+    payload = json.dumps({'s': scope, 'v': [_encode_value(v) for v in values]}, separators=(',', ':')).encode()
+    token = payload + b'.' + base64.urlsafe_b64encode(_sign(payload))
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+
+def decode_cursor(cursor, scope, size):
+    """Valores del cursor; CursorError si no es válido para este listado"""
+    try:
+        token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload, signature = token.rsplit(b'.', 1)
+        if not hmac.compare_digest(base64.urlsafe_b64decode(signature), _sign(payload)):
+            raise CursorError('Cursor inválido')
+        data = json.loads(payload)
+    except CursorError:
+        raise
+    except Exception:
+        raise CursorError('Cursor inválido')
+    if data.get('s') != scope or len(data.get('v', [])) != size:
+        raise CursorError('El cursor no corresponde a este listado')
+    return [_decode_value(v) for v in data['v']]
+
+
+def _after(column, descending, value):
+    """
+    Filas estrictamente posteriores a `value` en el orden de la columna
+
+    NULL se trata como el valor más pequeño (orden de SQL Server y SQLite).
+    """
+    if descending:
+        if value is None:
+            return false()
+        return or_(column < value, column.is_(None))
+    if value is None:
+        return column.isnot(None)
+    return column > value
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def seek_condition(order, values):
+    """(a, b, c) > (va, vb, vc) respetando la dirección de cada columna"""
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        prefix = [_equal(order[j][0], values[j]) for j in range(i)]
+        clauses.append(and_(*prefix, _after(column, descending, values[i])))
+    return or_(*clauses)
+
+
+def order_clauses(order):
+    return [column.desc() if descending else column.asc() for column, descending in order]
+
+
+def estimate_table_rows(model):
+    """Filas estimadas de la tabla (estadísticas del motor, sin recorrerla)"""
+    from app import db
+    table = model.__tablename__
+    try:
+        if db.engine.dialect.name == 'mssql':
+            return db.session.execute(text(
+                "SELECT SUM(row_count) FROM sys.dm_db_partition_stats "
+                "WHERE object_id = OBJECT_ID(:table) AND index_id IN (0, 1)"
+            ), {'table': table}).scalar()
+        return db.session.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+    except Exception as e:
+        print(f"[PAGINATION] Warning: no se pudo estimar {table}: {e}")
+        return None
+
+
+def keyset_page(query, order, per_page, cursor=None, scope='', count='none', model=None):
+    """
+    Página keyset de un query
+
+    Args:
+        query: Query ya filtrado (sin order_by)
+        order: Lista de (columna, descendente) terminando en una clave única (id)
+        cursor: Cursor recibido ('' o None para la primera página)
+        scope: Nombre del listado (el cursor solo es válido en ese listado)
+        count: 'none', 'exact' o 'estimate'
+        model: Modelo base (para count='estimate')
+
+    Returns:
+        (items, meta) con meta = {'next_cursor', 'has_more', 'per_page', 'total'}
+    """
+    if cursor:
+        values = decode_cursor(cursor, scope, len(order))
+        query_page = query.filter(seek_condition(order, values))
+    else:
+        query_page = query
+
+    rows = query_page.order_by(*order_clauses(order)).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column, _ in order], scope)
+
+    total = None
+    if count == 'exact':
+        total = query.order_by(None).count()
+    elif count == 'estimate' and model is not None:
+        total = estimate_table_rows(model)
+
+    return items, {
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'per_page': per_page,
+        'total': total
+    }
+
+
+def paginate_listing(query, order, scope, default_per_page=20, model=None, allow_cursor=True):
+    """
+    Paginar un listado en el modo que pidió el cliente
+
+    Sin `cursor` en el query string se mantiene la paginación por página
+    (`page`, `per_page`) con total y número de páginas; con `cursor` se usa keyset.
+    allow_cursor=False fuerza el modo por página (p. ej. si el query ya viene
+    ordenado por relevancia y ese orden no sirve como clave del cursor).
+
+    Returns:
+        (items, meta)
+
+    Raises:
+        CursorError: si el cursor no es válido
+    """
+    per_page = min(max(request.args.get('per_page', default_per_page, type=int), 1), MAX_PER_PAGE)
+
+    if allow_cursor and 'cursor' in request.args:
+        return keyset_page(
+            query, order, per_page,
+            cursor=request.args.get('cursor') or None,
+            scope=scope,
+            count=request.args.get('count', 'none'),
+            model=model
+        )
+
+    page = request.args.get('page', 1, type=int)
+    pagination = query.order_by(*order_clauses(order)).paginate(page=page, per_page=per_page, error_out=False)
+    return pagination.items, {
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': page
+    }
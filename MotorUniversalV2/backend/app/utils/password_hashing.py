@@ -0,0 +1,186 @@
+"""
+Hash y verificación de contraseñas fuera del hilo del request
+
+Argon2 (time_cost=3, 64 MB) tarda decenas de milisegundos y bloquea el GIL del
+worker. Los hashes (cargas masivas) y las verificaciones (login) se calculan en
+un pool de procesos acotado:
+
+- PASSWORD_HASH_WORKERS: procesos del pool; por defecto uno por núcleo, limitado
+  por la parte de PASSWORD_HASH_MEMORY_MB que le toca a este proceso / memoria
+  de Argon2. PASSWORD_HASH_MEMORY_MB es el presupuesto total de la instancia y
+  se reparte entre PASSWORD_HASH_PROCESSES procesos con pool (por defecto
+  WEB_CONCURRENCY workers de gunicorn + el worker de trabajos), p. ej.
+  512 MB / 3 procesos / 64 MB = 2 procesos de pool en cada uno
+- Métrica de cola: operaciones en curso y en espera (get_hash_pool_stats)
+- Control de admisión (LOGIN_ADMISSION_MAX_QUEUE, por defecto 2 x procesos del
+  pool; 0 lo desactiva): si la cola ya tiene N verificaciones en espera, se
+  rechaza de inmediato con PasswordHashingBusy (la ruta responde 503 +
+  Retry-After) en lugar de que el request espere hasta el timeout
+- Rehash al iniciar sesión: si cambian los parámetros de Argon2 (ARGON2_*), el
+  proceso hijo devuelve el hash nuevo junto con la verificación
+
+El pool y la cola son por proceso: cada worker de gunicorn tiene los suyos. La
+cola solo se forma con workers gthread (startup.sh: --threads = 4 x núcleos,
+suficiente para el pool, su cola máxima y requests que no usan Argon2); con
+workers sync cada proceso atiende un request a la vez y nunca hay espera.
+"""
+import atexit
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 65536))  # KiB
+
+
+def _default_workers():
+    processes = int(os.getenv('PASSWORD_HASH_PROCESSES', int(os.getenv('WEB_CONCURRENCY', 1)) + 1))
+    memory_budget_mb = int(os.getenv('PASSWORD_HASH_MEMORY_MB', 512)) // max(1, processes)
+    by_memory = max(1, memory_budget_mb // max(1, ARGON2_MEMORY_COST // 1024))
+    return max(1, min(os.cpu_count() or 1, by_memory))
+
+
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', _default_workers()))
+LOGIN_ADMISSION_MAX_QUEUE = int(os.getenv('LOGIN_ADMISSION_MAX_QUEUE', PASSWORD_HASH_WORKERS * 2))  # 0 = sin control
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    'inflight': 0,
+    'peak_inflight': 0,
+    'completed': 0,
+    'rejected': 0,
+    'avg_ms': 0.0  # Media móvil exponencial de la duración de una operación
+}
+
+
+class PasswordHashingBusy(Exception):
+    """La cola de verificación está llena; reintentar tras retry_after segundos"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Servicio de autenticación saturado, reintentar en {retry_after}s')
+        self.retry_after = retry_after
+
+
+def _hash_one(password):
+    """Ejecutado en el proceso hijo: mismo PasswordHasher que el modelo User"""
+    from app.models.user import ph
+    return ph.hash(password)
+
+
+def _verify_one(password_hash, password):
+    """
+    Ejecutado en el proceso hijo
+
+    Returns:
+        (bool, str|None): (contraseña válida, hash nuevo si hay que rehashear)
+    """
+    from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHashError
+    from app.models.user import ph
+    try:
+        ph.verify(password_hash, password)
+    except (VerifyMismatchError, VerificationError, InvalidHashError):
+        return False, None
+    if ph.check_needs_rehash(password_hash):
+        return True, ph.hash(password)
+    return True, None
+
+
+def get_hash_pool():
+    """Pool de procesos compartido (se crea al primer uso, uno por worker de gunicorn)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+                atexit.register(_pool.shutdown, wait=False)
+    return _pool
+
+
+def get_hash_pool_stats():
+    """Métrica de cola del pool (para /health y el benchmark)"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['workers'] = PASSWORD_HASH_WORKERS
+    stats['queued'] = max(0, stats['inflight'] - PASSWORD_HASH_WORKERS)
+    stats['max_queue'] = LOGIN_ADMISSION_MAX_QUEUE
+    stats['avg_ms'] = round(stats['avg_ms'], 1)
+    return stats
+
+
+def _retry_after(queued):
+    """Segundos estimados hasta que se libere la cola actual"""
+    avg_seconds = (_stats['avg_ms'] or 100) / 1000
+    return max(1, math.ceil((queued + 1) / PASSWORD_HASH_WORKERS * avg_seconds))
+
+
+def _admit(admission):
+    with _stats_lock:
+        queued = _stats['inflight'] - PASSWORD_HASH_WORKERS
+        if admission and LOGIN_ADMISSION_MAX_QUEUE > 0 and queued >= LOGIN_ADMISSION_MAX_QUEUE:
+            _stats['rejected'] += 1
+            raise PasswordHashingBusy(_retry_after(queued))
+        _stats['inflight'] += 1
+        _stats['peak_inflight'] = max(_stats['peak_inflight'], _stats['inflight'])
+
+
+def _release(started):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _stats_lock:
+        _stats['inflight'] -= 1
+        _stats['completed'] += 1
+        _stats['avg_ms'] = elapsed_ms if not _stats['avg_ms'] else _stats['avg_ms'] * 0.9 + elapsed_ms * 0.1
+
+
+def _run(fn, *args, admission=False):
+    """Ejecutar una operación de Argon2 en el pool contabilizando la cola"""
+    _admit(admission)
+    started = time.perf_counter()
+    try:
+        if PASSWORD_HASH_WORKERS <= 1:
+            return fn(*args)
+        return get_hash_pool().submit(fn, *args).result()
+    finally:
+        _release(started)
+
+
+def hash_password(password):
+    """Hashear una contraseña en el pool"""
+    return _run(_hash_one, password)
+
+
+def verify_password(password_hash, password, admission=False):
+    """
+    Verificar una contraseña en el pool
+
+    Args:
+        admission: Aplicar el control de admisión (solo login)
+
+    Returns:
+        (bool, str|None): (válida, hash nuevo si los parámetros cambiaron)
+
+    Raises:
+        PasswordHashingBusy: si admission=True y la cola está llena
+    """
+    if not password_hash:
+        return False, None
+    return _run(_verify_one, password_hash, password, admission=admission)
+
+
+def hash_passwords(passwords):
+    """
+    Hashear una lista de contraseñas en el pool de procesos
+
+    Returns:
+        list: hashes en el mismo orden que las contraseñas
+    """
+    passwords = list(passwords)
+    if not passwords:
+        return []
+    if PASSWORD_HASH_WORKERS <= 1 or len(passwords) == 1:
+        return [_hash_one(p) for p in passwords]
+    chunksize = max(1, len(passwords) // (PASSWORD_HASH_WORKERS * 4))
+    return list(get_hash_pool().map(_hash_one, passwords, chunksize=chunksize))
@@ -2,17 +2,19 @@
 Rate Limiting utilities para proteger endpoints sensibles
 """
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
 from app import cache
 import time
 
 
 def get_client_ip():
-    """Obtener IP del cliente, considerando proxies"""
-    if request.headers.get('X-Forwarded-For'):
-        return request.headers.get('X-Forwarded-For').split(',')[0].strip()
-    if request.headers.get('X-Real-IP'):
-        return request.headers.get('X-Real-IP')
+    """
+    Obtener IP del cliente
+
+    ProxyFix (app/__init__.py, TRUSTED_PROXY_COUNT) ya reemplazó remote_addr por
+    la IP que agregó el proxy de confianza; el primer valor de X-Forwarded-For lo
+    escribe el cliente y no sirve como clave de rate limit.
+    """
     return request.remote_addr or 'unknown'
 
 
@@ -191,3 +193,63 @@ def rate_limit_by_user(limit=200, window=60):
         
         return decorated_function
     return decorator
+
+
+def rate_limit_public_verification(limit=60, miss_limit=20, window=60):
+    """
+    Rate limiting para la verificación pública de certificados (anónima)
+    
+    Contadores atómicos (INCR) por IP en ventana fija: 60 consultas por minuto
+    y, para frenar la enumeración de folios, bloqueo de la IP al acumular 20
+    folios inexistentes en la ventana. La vista marca los fallos con
+    g.verification_miss = True.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            from app.utils.cache_utils import get_redis_client
+            
+            redis_client = get_redis_client()
+            if redis_client is None:
+                return f(*args, **kwargs)
+            
+            bucket = int(time.time() // window)
+            base_key = f"rl_verify:{get_client_ip()}:{bucket}"
+            
+            try:
+                pipe = redis_client.pipeline()
+                pipe.incr(base_key)
+                pipe.expire(base_key, window)
+                pipe.get(f"{base_key}:miss")
+                current, _, misses = pipe.execute()
+            except Exception as e:
+                print(f"Rate limit warning: {e}")
+                return f(*args, **kwargs)
+            
+            if current > limit or int(misses or 0) >= miss_limit:
+                retry_after = window - int(time.time()) % window
+                response = jsonify({
+                    'error': 'Too Many Requests',
+                    'message': 'Demasiadas consultas de verificación. Intenta más tarde.',
+                    'retry_after': retry_after
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+            
+            response = f(*args, **kwargs)
+            
+            if g.get('verification_miss'):
+                try:
+                    pipe = redis_client.pipeline()
+                    pipe.incr(f"{base_key}:miss")
+                    pipe.expire(f"{base_key}:miss", window)
+                    pipe.execute()
+                except Exception as e:
+                    print(f"Rate limit warning: {e}")
+            
+            return response
+        
+        return decorated_function
+    return decorator
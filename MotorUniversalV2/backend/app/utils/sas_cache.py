@@ -0,0 +1,147 @@
+"""
+Caché de URLs firmadas (SAS) para videos
+
+Evita generar y firmar un SAS nuevo en cada request. Los tokens se agrupan en
+"buckets" de expiración: todos los requests que caen en el mismo bucket reciben
+el mismo token, que siempre conserva al menos SAS_MIN_REMAINING_HOURS de vigencia.
+
+    bucket  = floor(now / B)            con B = duración - vigencia mínima
+    expiry  = (bucket + 1) * B + vigencia mínima
+
+La caché es compartida entre workers vía Redis (Flask-Caching). Si Redis no está
+disponible se firma directamente, igual que antes.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from app import cache
+from app.utils.cdn_helper import get_original_blob_url
+from app.utils.azure_storage import (
+    azure_storage,
+    SAS_TOKEN_DURATION_HOURS,
+    SAS_MIN_REMAINING_HOURS
+)
+
+SAS_CACHE_PREFIX = 'sas'
+
+
+def _bucket_seconds(duration_hours, min_remaining_hours):
+    """Tamaño del bucket de expiración en segundos (al menos 1 hora)"""
+    return max(duration_hours - min_remaining_hours, 1) * 3600
+
+
+def _expiry_for_bucket(now_ts, duration_hours, min_remaining_hours):
+    """
+    Calcular (bucket, expiry_datetime, segundos_restantes_del_bucket)
+    """
+    bucket_size = _bucket_seconds(duration_hours, min_remaining_hours)
+    bucket = int(now_ts // bucket_size)
+    bucket_end = (bucket + 1) * bucket_size
+    expiry_ts = bucket_end + min_remaining_hours * 3600
+    expiry = datetime.fromtimestamp(expiry_ts, tz=timezone.utc)
+    return bucket, expiry, max(int(bucket_end - now_ts), 1)
+
+
+def is_signable_video_url(url):
+    """Solo los videos alojados en Azure Blob requieren SAS"""
+    return bool(url) and 'blob.core.windows.net' in url
+
+
+def make_sas_cache_key(blob_url, permission, bucket):
+    """Clave: (ruta del blob, permiso, bucket de expiración)"""
+    blob_path = azure_storage.get_base_url(blob_url) or blob_url.split('?')[0]
+    path_hash = hashlib.sha1(blob_path.encode('utf-8')).hexdigest()
+    return f"{SAS_CACHE_PREFIX}:{permission}:{path_hash}:{bucket}"
+
+
+def get_signed_video_urls(blob_urls, permission='r',
+                          duration_hours=SAS_TOKEN_DURATION_HOURS,
+                          min_remaining_hours=SAS_MIN_REMAINING_HOURS):
+    """
+    Firmar en lote una lista de URLs de video reutilizando tokens en caché
+
+    Args:
+        blob_urls: Iterable de URLs de blob (con o sin SAS previo)
+        permission: Permiso del SAS (solo lectura 'r' por ahora)
+        duration_hours: Vigencia máxima del token
+        min_remaining_hours: Vigencia mínima garantizada del token devuelto
+
+    Returns:
+        dict: url_original -> url_firmada (las URLs no-Azure se devuelven tal cual)
+    """
+    now_ts = datetime.now(timezone.utc).timestamp()
+    bucket, expiry, ttl = _expiry_for_bucket(now_ts, duration_hours, min_remaining_hours)
+
+    result = {}
+    keys_by_url = {}
+    for url in blob_urls:
+        if not url or url in result or url in keys_by_url:
+            continue
+        if not is_signable_video_url(url):
+            result[url] = url
+            continue
+        keys_by_url[url] = make_sas_cache_key(url, permission, bucket)
+
+    if not keys_by_url:
+        return result
+
+    urls = list(keys_by_url.keys())
+    keys = [keys_by_url[u] for u in urls]
+
+    cached_values = [None] * len(keys)
+    try:
+        cached_values = cache.get_many(*keys)
+    except Exception as e:
+        print(f"[SAS-CACHE] Warning: no se pudo leer la caché: {e}")
+
+    to_store = {}
+    for url, key, cached in zip(urls, keys, cached_values):
+        if cached:
+            result[url] = cached
+            continue
+        signed = azure_storage.generate_video_sas_url(url, expiry=expiry)
+        result[url] = signed
+        if signed and signed != url:
+            to_store[key] = signed
+
+    if to_store:
+        try:
+            cache.set_many(to_store, timeout=ttl)
+        except Exception as e:
+            print(f"[SAS-CACHE] Warning: no se pudo escribir la caché: {e}")
+
+    return result
+
+
+def get_signed_video_url(blob_url, permission='r', **kwargs):
+    """Firmar una sola URL de video usando la caché compartida"""
+    if not is_signable_video_url(blob_url):
+        return blob_url
+    return get_signed_video_urls([blob_url], permission=permission, **kwargs).get(blob_url, blob_url)
+
+
+def attach_signed_video_urls(material_data):
+    """
+    Agregar 'signed_url' a cada video del índice de un material (to_dict con sesiones)
+
+    Firma todos los videos del material en un solo lote para que el cliente
+    no necesite pedir una URL por video antes de reproducir.
+    """
+    videos = []
+    for session in material_data.get('sessions') or []:
+        for topic in session.get('topics') or []:
+            video = topic.get('video')
+            if not video or video.get('video_type') != 'upload':
+                continue
+            # to_dict() devuelve la URL del CDN; el SAS se firma sobre la URL original del blob
+            blob_url = get_original_blob_url(video.get('video_url'))
+            if is_signable_video_url(blob_url):
+                videos.append((video, blob_url))
+
+    if not videos:
+        return material_data
+
+    signed = get_signed_video_urls(blob_url for _, blob_url in videos)
+    for video, blob_url in videos:
+        video['signed_url'] = signed.get(blob_url)
+    return material_data
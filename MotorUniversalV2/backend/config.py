@@ -65,6 +65,9 @@ class Config:
     RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL', 'redis://localhost:6379/1')
     RATELIMIT_DEFAULT = "200 per day, 50 per hour"
     RATELIMIT_HEADERS_ENABLED = True
+    # Proxies de confianza delante de la app (App Service agrega uno a X-Forwarded-For);
+    # ProxyFix toma de la derecha la IP que agregó el último de ellos
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 1))
     
     # Swagger
     SWAGGER = {
@@ -0,0 +1,42 @@
+"""Add blob_tombstones table for deferred blob deletion
+
+Revision ID: 20261019_blob_tombstones
+Revises: 20261019_study_reading_cache
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_blob_tombstones'
+down_revision = '20261019_study_reading_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Blobs pendientes de eliminar por el recolector diferido
+    op.create_table(
+        'blob_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('blob_url', sa.Text(), nullable=False),
+        sa.Column('account_name', sa.String(length=100), nullable=False),
+        sa.Column('container_name', sa.String(length=100), nullable=False),
+        sa.Column('blob_name', sa.String(length=1024), nullable=False),
+        sa.Column('reason', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('not_before', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_blob_tombstones_status', 'blob_tombstones', ['status'])
+    op.create_index('ix_blob_tombstones_not_before', 'blob_tombstones', ['not_before'])
+
+
+def downgrade():
+    op.drop_index('ix_blob_tombstones_not_before', table_name='blob_tombstones')
+    op.drop_index('ix_blob_tombstones_status', table_name='blob_tombstones')
+    op.drop_table('blob_tombstones')
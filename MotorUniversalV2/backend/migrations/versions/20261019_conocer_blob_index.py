@@ -0,0 +1,25 @@
+"""Index conocer_certificates.blob_name and track blob reconciliation
+
+Revision ID: 20261019_conocer_blob_index
+Revises: 20261019_results_analytics
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_conocer_blob_index'
+down_revision = '20261019_results_analytics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La reconciliación busca los certificados de cada página de blobs por blob_name
+    op.create_index('ix_conocer_certificates_blob_name', 'conocer_certificates', ['blob_name'])
+    op.add_column('conocer_certificates', sa.Column('blob_checked_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('conocer_certificates', 'blob_checked_at')
+    op.drop_index('ix_conocer_certificates_blob_name', table_name='conocer_certificates')
@@ -0,0 +1,25 @@
+"""Add expires_at to job_artifacts for single-use sensitive downloads
+
+Revision ID: 20261019_job_artifact_expiry
+Revises: 20261019_maintenance_markers
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_job_artifact_expiry'
+down_revision = '20261019_maintenance_markers'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las credenciales de la importación se eliminan al descargarlas o al vencer
+    op.add_column('job_artifacts', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_job_artifacts_expires_at', 'job_artifacts', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_job_artifacts_expires_at', table_name='job_artifacts')
+    op.drop_column('job_artifacts', 'expires_at')
@@ -0,0 +1,34 @@
+"""Add composite indexes for keyset pagination of listing endpoints
+
+Revision ID: 20261019_listing_indexes
+Revises: 20261019_jobs
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+# revision identifiers
+revision = '20261019_listing_indexes'
+down_revision = '20261019_jobs'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas) en el mismo orden que el ORDER BY del listado
+INDEXES = [
+    ('ix_exams_listing', 'exams', ['is_published', 'updated_at', 'id']),
+    ('ix_exams_published_name', 'exams', ['is_published', 'name', 'id']),
+    ('ix_study_contents_listing', 'study_contents', ['is_published', 'updated_at', 'id']),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_users_role_created_at_id', 'users', ['role', 'created_at', 'id']),
+    ('ix_users_candidate_search', 'users', ['role', 'is_active', 'first_surname', 'name', 'id']),
+    ('ix_partners_listing', 'partners', ['is_active', 'name', 'id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,29 @@
+"""Add maintenance_markers table for rebuild completion markers
+
+Revision ID: 20261019_maintenance_markers
+Revises: 20261019_conocer_blob_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_maintenance_markers'
+down_revision = '20261019_conocer_blob_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Marcas que escriben las reconstrucciones al terminar (scripts/rebuild_*.py)
+    op.create_table(
+        'maintenance_markers',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=False),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('maintenance_markers')
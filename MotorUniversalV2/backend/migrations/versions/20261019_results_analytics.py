@@ -0,0 +1,74 @@
+"""Add result analytics fact and rollup tables
+
+Revision ID: 20261019_results_analytics
+Revises: 20261019_user_search_tokens
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_results_analytics'
+down_revision = '20261019_user_search_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Desglose por categoría/tema de cada resultado (se llena con scripts/rebuild_results_analytics.py)
+    op.create_table(
+        'result_category_facts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('result_id', sa.String(length=36), nullable=False),
+        sa.Column('category', sa.String(length=200), nullable=False),
+        sa.Column('topic', sa.String(length=200), nullable=False),
+        sa.Column('earned', sa.Float(), nullable=False),
+        sa.Column('max_score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['result_id'], ['results.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_result_category_facts_result_id', 'result_category_facts', ['result_id'])
+
+    # Acumulados por (grupo, examen, día)
+    op.create_table(
+        'result_daily_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('exam_id', sa.Integer(), nullable=False),
+        sa.Column('competency_standard_id', sa.Integer(), nullable=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('passed', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Integer(), nullable=False),
+        sa.Column('duration_sum', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['candidate_groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('group_id', 'exam_id', 'day', name='uq_result_daily_rollups_key')
+    )
+    op.create_index('ix_result_daily_rollups_group_day', 'result_daily_rollups', ['group_id', 'day'])
+
+    op.create_table(
+        'result_category_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('exam_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=200), nullable=False),
+        sa.Column('topic', sa.String(length=200), nullable=False),
+        sa.Column('results', sa.Integer(), nullable=False),
+        sa.Column('earned', sa.Float(), nullable=False),
+        sa.Column('max_score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['candidate_groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('group_id', 'exam_id', 'day', 'category', 'topic', name='uq_result_category_rollups_key')
+    )
+    op.create_index('ix_result_category_rollups_group_day', 'result_category_rollups', ['group_id', 'day'])
+
+
+def downgrade():
+    op.drop_index('ix_result_category_rollups_group_day', table_name='result_category_rollups')
+    op.drop_table('result_category_rollups')
+    op.drop_index('ix_result_daily_rollups_group_day', table_name='result_daily_rollups')
+    op.drop_table('result_daily_rollups')
+    op.drop_index('ix_result_category_facts_result_id', table_name='result_category_facts')
+    op.drop_table('result_category_facts')
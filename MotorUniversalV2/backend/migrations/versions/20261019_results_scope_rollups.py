@@ -0,0 +1,78 @@
+"""Add campus/partner and monthly group result rollups
+
+Revision ID: 20261019_results_scope_rollups
+Revises: 20261019_job_artifact_expiry
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_results_scope_rollups'
+down_revision = '20261019_job_artifact_expiry'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Acumulados por (plantel o partner, examen, día) (se llenan con scripts/rebuild_results_analytics.py)
+    op.create_table(
+        'result_scope_daily_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(length=10), nullable=False),
+        sa.Column('scope_id', sa.Integer(), nullable=False),
+        sa.Column('exam_id', sa.Integer(), nullable=False),
+        sa.Column('competency_standard_id', sa.Integer(), nullable=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('passed', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Integer(), nullable=False),
+        sa.Column('duration_sum', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scope', 'scope_id', 'exam_id', 'day', name='uq_result_scope_daily_rollups_key')
+    )
+    op.create_index('ix_result_scope_daily_rollups_scope_day', 'result_scope_daily_rollups',
+                    ['scope', 'scope_id', 'day'])
+
+    op.create_table(
+        'result_scope_category_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(length=10), nullable=False),
+        sa.Column('scope_id', sa.Integer(), nullable=False),
+        sa.Column('exam_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=200), nullable=False),
+        sa.Column('topic', sa.String(length=200), nullable=False),
+        sa.Column('results', sa.Integer(), nullable=False),
+        sa.Column('earned', sa.Float(), nullable=False),
+        sa.Column('max_score', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scope', 'scope_id', 'exam_id', 'day', 'category', 'topic',
+                            name='uq_result_scope_category_rollups_key')
+    )
+    op.create_index('ix_result_scope_category_rollups_scope_day', 'result_scope_category_rollups',
+                    ['scope', 'scope_id', 'day'])
+
+    # Acumulados por (grupo, examen, mes) para el desglose por grupo
+    op.create_table(
+        'result_group_monthly_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('exam_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('passed', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.Integer(), nullable=False),
+        sa.Column('duration_sum', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['candidate_groups.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('group_id', 'exam_id', 'month', name='uq_result_group_monthly_rollups_key')
+    )
+
+
+def downgrade():
+    op.drop_table('result_group_monthly_rollups')
+    op.drop_index('ix_result_scope_category_rollups_scope_day', table_name='result_scope_category_rollups')
+    op.drop_table('result_scope_category_rollups')
+    op.drop_index('ix_result_scope_daily_rollups_scope_day', table_name='result_scope_daily_rollups')
+    op.drop_table('result_scope_daily_rollups')
@@ -0,0 +1,29 @@
+"""Add processed content cache columns to study_readings
+
+Revision ID: 20261019_study_reading_cache
+Revises: 
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_study_reading_cache'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # HTML procesado, ETag y versión gzip precalculados al guardar la lectura
+    with op.batch_alter_table('study_readings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_rendered', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('content_etag', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('content_gzip', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('study_readings', schema=None) as batch_op:
+        batch_op.drop_column('content_gzip')
+        batch_op.drop_column('content_etag')
+        batch_op.drop_column('content_rendered')
@@ -0,0 +1,23 @@
+"""Add auth_version to users for identity claim checks
+
+Revision ID: 20261019_user_auth_version
+Revises: 20261019_results_scope_rollups
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_user_auth_version'
+down_revision = '20261019_results_scope_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fuente de verdad de auth:version:<id> en Redis (se vuelve a sembrar tras un flush)
+    op.add_column('users', sa.Column('auth_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    op.drop_column('users', 'auth_version')
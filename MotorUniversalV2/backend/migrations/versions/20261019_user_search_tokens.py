@@ -0,0 +1,32 @@
+"""Add user_search_tokens table for indexed user search
+
+Revision ID: 20261019_user_search_tokens
+Revises: 20261019_listing_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '20261019_user_search_tokens'
+down_revision = '20261019_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Índice invertido de búsqueda de usuarios (se llena con scripts/rebuild_user_search_index.py)
+    op.create_table(
+        'user_search_tokens',
+        sa.Column('token', sa.String(length=120), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('weight', sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('token', 'user_id')
+    )
+    op.create_index('ix_user_search_tokens_user_id', 'user_search_tokens', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('ix_user_search_tokens_user_id', table_name='user_search_tokens')
+    op.drop_table('user_search_tokens')
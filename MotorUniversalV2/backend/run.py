@@ -9,11 +9,17 @@ app = create_app(os.getenv('FLASK_ENV', 'development'))
 # Auto-migración: Agregar columnas faltantes si no existen
 with app.app_context():
     try:
-        from app.auto_migrate import check_and_add_columns, check_and_add_study_interactive_columns, check_and_add_answers_columns, check_and_add_question_types
+        from app.auto_migrate import check_and_add_columns, check_and_add_study_interactive_columns, check_and_add_answers_columns, check_and_add_question_types, check_and_add_study_reading_columns, check_and_add_conocer_columns, check_and_create_tables, check_and_add_job_artifact_columns, check_and_create_listing_indexes, check_and_add_user_columns
+        check_and_add_user_columns()
         check_and_add_columns()
         check_and_add_study_interactive_columns()
         check_and_add_answers_columns()
         check_and_add_question_types()
+        check_and_add_study_reading_columns()
+        check_and_add_conocer_columns()
+        check_and_create_tables()
+        check_and_add_job_artifact_columns()
+        check_and_create_listing_indexes()
     except Exception as e:
         print(f"⚠️  Auto-migración falló (continuando de todas formas): {e}")
 
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Procesar y guardar la caché de las lecturas anteriores a ella
+
+Las lecturas sin content_etag se sirven procesadas al vuelo en cada GET de
+/readings/<id>/content; este script guarda el HTML procesado, su ETag y la
+versión gzip sin modificar updated_at (services/reading_service.backfill_readings).
+
+Ejecutar con:
+    python scripts/backfill_reading_cache.py
+    python scripts/backfill_reading_cache.py --batch-size 500
+
+startup.sh lo lanza en cada arranque; si no hay lecturas pendientes termina
+tras una sola consulta.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Guardar la caché de las lecturas anteriores a ella')
+    parser.add_argument('--batch-size', type=int, default=200, help='Lecturas por bloque (default: 200)')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+    with app.app_context():
+        from app.services.reading_service import backfill_readings
+
+        started = time.perf_counter()
+        total = backfill_readings(
+            batch_size=args.batch_size,
+            progress_callback=lambda n: print(f"[READINGS] {n} lecturas procesadas")
+        )
+        print(f"[READINGS] ✅ {total} lecturas procesadas en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark del dashboard del candidato (camino de cache miss)
+
+Crea una base SQLite temporal con un catálogo de tamaño realista y mide lo que
+cuesta reconstruir el dashboard cuando no hay nada en Redis:
+    - build_catalog()              (catálogo global)
+    - _build_exam_fields()         (estadísticas de resultados del usuario)
+    - _build_material_fields()     (GROUP BY material_id con LEFT JOIN al progreso)
+
+Ejecutar con:
+    python scripts/benchmark_dashboard.py
+    python scripts/benchmark_dashboard.py --materials 50 --sessions 10 --topics 10 --budget-ms 400
+
+Termina con código 1 si el p95 supera el presupuesto (--budget-ms o
+DASHBOARD_MISS_BUDGET_MS), para poder usarlo como verificación en CI.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+DEFAULT_BUDGET_MS = int(os.getenv('DASHBOARD_MISS_BUDGET_MS', 500))
+
+
+def seed(db, args):
+    """Insertar el catálogo y la actividad del candidato con inserts en bloque"""
+    from app.models import (
+        User, Exam, Category, Result, StudyMaterial, StudySession, StudyTopic,
+        StudyReading, StudyVideo, StudyDownloadableExercise, StudyInteractiveExercise,
+        StudentContentProgress
+    )
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    editor_id = str(uuid.uuid4())
+    candidate_id = str(uuid.uuid4())
+    db.session.execute(db.insert(User), [
+        {'id': editor_id, 'email': 'editor@bench.local', 'username': 'editor', 'password_hash': 'x',
+         'name': 'Editor', 'first_surname': 'Bench', 'role': 'editor'},
+        {'id': candidate_id, 'email': 'candidato@bench.local', 'username': 'candidato', 'password_hash': 'x',
+         'name': 'Candidato', 'first_surname': 'Bench', 'role': 'candidato'},
+    ])
+
+    db.session.execute(db.insert(Exam), [
+        {'id': i, 'name': f'Examen {i:04d}', 'version': '1.0', 'stage_id': 1,
+         'is_published': True, 'created_by': editor_id}
+        for i in range(1, args.exams + 1)
+    ])
+    db.session.execute(db.insert(Category), [
+        {'exam_id': exam_id, 'name': f'Categoría {c}', 'percentage': 20, 'order': c, 'created_by': editor_id}
+        for exam_id in range(1, args.exams + 1) for c in range(5)
+    ])
+
+    db.session.execute(db.insert(StudyMaterial), [
+        {'id': m, 'title': f'Material {m:03d}', 'is_published': True, 'created_by': editor_id}
+        for m in range(1, args.materials + 1)
+    ])
+
+    sessions, topics = [], []
+    session_id = topic_id = 0
+    for material_id in range(1, args.materials + 1):
+        for s in range(1, args.sessions + 1):
+            session_id += 1
+            sessions.append({'id': session_id, 'material_id': material_id, 'session_number': s,
+                             'title': f'Sesión {s}'})
+            for t in range(args.topics):
+                topic_id += 1
+                topics.append({'id': topic_id, 'session_id': session_id, 'title': f'Tema {t}'})
+    db.session.execute(db.insert(StudySession), sessions)
+    db.session.execute(db.insert(StudyTopic), topics)
+
+    readings, videos, downloadables, interactives = [], [], [], []
+    for topic in topics:
+        tid = topic['id']
+        readings.append({'id': tid, 'topic_id': tid, 'title': 'Lectura'})
+        videos.append({'id': tid, 'topic_id': tid, 'title': 'Video', 'video_url': 'https://example.com/v.mp4'})
+        if tid % 2 == 0:
+            downloadables.append({'id': tid, 'topic_id': tid, 'title': 'Descargable',
+                                  'file_url': 'https://example.com/f.zip'})
+        if tid % 3 == 0:
+            interactives.append({'id': str(uuid.uuid4()), 'topic_id': tid, 'title': 'Interactivo',
+                                 'created_by': editor_id})
+    db.session.execute(db.insert(StudyReading), readings)
+    db.session.execute(db.insert(StudyVideo), videos)
+    if downloadables:
+        db.session.execute(db.insert(StudyDownloadableExercise), downloadables)
+    if interactives:
+        db.session.execute(db.insert(StudyInteractiveExercise), interactives)
+
+    contents = (
+        [('reading', str(r['id']), r['topic_id']) for r in readings] +
+        [('video', str(v['id']), v['topic_id']) for v in videos] +
+        [('downloadable', str(d['id']), d['topic_id']) for d in downloadables] +
+        [('interactive', i['id'], i['topic_id']) for i in interactives]
+    )
+    completed = rng.sample(contents, int(len(contents) * args.completed_ratio))
+    db.session.execute(db.insert(StudentContentProgress), [
+        {'user_id': candidate_id, 'content_type': ct, 'content_id': cid, 'topic_id': tid,
+         'is_completed': True, 'completed_at': now}
+        for ct, cid, tid in completed
+    ])
+
+    db.session.execute(db.insert(Result), [
+        {'id': str(uuid.uuid4()), 'user_id': candidate_id, 'exam_id': rng.randint(1, args.exams),
+         'score': rng.randint(30, 100), 'status': 1, 'result': rng.randint(0, 1)}
+        for _ in range(args.results)
+    ])
+    db.session.commit()
+
+    return candidate_id, len(contents)
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'p50': statistics.median(samples),
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max': samples[-1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del dashboard del candidato (cache miss)')
+    parser.add_argument('--materials', type=int, default=50)
+    parser.add_argument('--sessions', type=int, default=10, help='Sesiones por material')
+    parser.add_argument('--topics', type=int, default=10, help='Temas por sesión')
+    parser.add_argument('--exams', type=int, default=100)
+    parser.add_argument('--results', type=int, default=200, help='Resultados del candidato')
+    parser.add_argument('--completed-ratio', type=float, default=0.3)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Presupuesto p95 del camino completo de cache miss')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='dashboard-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app, db
+    from app.services import dashboard_read_model as read_model
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        print(f"[BENCH] Sembrando catálogo en {db_path}...")
+        candidate_id, contents_count = seed(db, args)
+        print(f"[BENCH] {args.materials} materiales, {args.materials * args.sessions * args.topics} temas, "
+              f"{contents_count} contenidos, {args.exams} exámenes, {args.results} resultados")
+
+        material_ids = list(range(1, args.materials + 1))
+
+        def full_miss():
+            read_model.build_catalog()
+            read_model._build_exam_fields(candidate_id)
+            read_model._build_material_fields(candidate_id, material_ids)
+
+        measurements = {
+            'build_catalog': timed(read_model.build_catalog, args.iterations),
+            'exam_fields': timed(lambda: read_model._build_exam_fields(candidate_id), args.iterations),
+            'material_fields': timed(lambda: read_model._build_material_fields(candidate_id, material_ids), args.iterations),
+            'full_miss': timed(full_miss, args.iterations),
+        }
+
+    print(f"\n{'paso':<18}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, m in measurements.items():
+        print(f"{name:<18}{m['p50']:>10.1f}{m['p95']:>10.1f}{m['max']:>10.1f}")
+
+    p95 = measurements['full_miss']['p95']
+    if p95 > args.budget_ms:
+        print(f"\n❌ p95 {p95:.1f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"\n✅ p95 {p95:.1f} ms dentro del presupuesto de {args.budget_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ráfaga de logins (inicio de examen)
+
+Crea una base SQLite temporal con N candidatos, levanta gunicorn con la misma
+configuración que startup.sh (varios workers gthread) y lanza una ráfaga de
+logins HTTP concurrentes contra POST /api/auth/login (un hilo por candidato
+simultáneo). Reporta latencias y respuestas 200/401/503: los 503 son los
+rechazos del control de admisión de los workers.
+
+Ejecutar con:
+    python scripts/benchmark_login_storm.py
+    python scripts/benchmark_login_storm.py --candidates 200 --concurrency 200 --workers 2 --threads 16
+    LOGIN_ADMISSION_MAX_QUEUE=16 python scripts/benchmark_login_storm.py --budget-ms 3000
+
+Contra un servidor ya levantado (los candidatos candidato{i} deben existir en su
+base; --seed-only los inserta en la base de DATABASE_URL):
+    DATABASE_URL=... python scripts/benchmark_login_storm.py --seed-only --candidates 200
+    python scripts/benchmark_login_storm.py --url http://127.0.0.1:8000
+
+Termina con código 1 si el p95 de los logins aceptados supera --budget-ms
+(o LOGIN_STORM_BUDGET_MS).
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_BUDGET_MS = int(os.getenv('LOGIN_STORM_BUDGET_MS', 5000))
+PASSWORD = 'Examen2026'
+SERVER_START_TIMEOUT = 60
+
+
+def seed(count):
+    """Insertar candidatos con el mismo hash (el costo medido es la verificación)"""
+    from app import create_app, db
+    from app.models import User
+    from app.utils.password_hashing import hash_password
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password(PASSWORD)
+        db.session.execute(db.insert(User), [
+            {'id': str(uuid.uuid4()), 'email': f'candidato{i}@bench.local', 'username': f'candidato{i}',
+             'password_hash': password_hash, 'name': 'Candidato', 'first_surname': f'{i:05d}',
+             'role': 'candidato', 'is_active': True}
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, workers, threads):
+    """gunicorn con los workers gthread de startup.sh sobre la base de DATABASE_URL"""
+    process = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', f'--bind=127.0.0.1:{port}', f'--workers={workers}',
+        '--worker-class=gthread', f'--threads={threads}', '--timeout=120', '--log-level=warning', 'run:app'
+    ], cwd=BACKEND_DIR, env={**os.environ, 'FLASK_ENV': 'production'})
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn terminó al iniciar (código {process.returncode})')
+        try:
+            urllib.request.urlopen(f'{url}/api/ping', timeout=1)
+            return process, url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f'gunicorn no respondió en {SERVER_START_TIMEOUT}s')
+
+
+def post_login(url, username, client_ip):
+    """POST /api/auth/login; devuelve el código de estado"""
+    request = urllib.request.Request(
+        f'{url}/api/auth/login',
+        data=json.dumps({'username': username, 'password': PASSWORD}).encode(),
+        # Una IP por candidato (como la agrega el proxy): el límite por IP no es lo que se mide
+        headers={'Content-Type': 'application/json', 'X-Forwarded-For': client_ip},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ráfaga de logins')
+    parser.add_argument('--candidates', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=200, help='Logins simultáneos')
+    parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn (default: 2, como startup.sh)')
+    parser.add_argument('--threads', type=int, default=(os.cpu_count() or 1) * 4,
+                        help='Hilos por worker (default: 4 x núcleos, como startup.sh)')
+    parser.add_argument('--url', help='Servidor ya levantado (no se crea base ni gunicorn)')
+    parser.add_argument('--seed-only', action='store_true', help='Solo sembrar candidatos en DATABASE_URL')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Presupuesto p95 de los logins aceptados')
+    args = parser.parse_args()
+
+    if args.seed_only:
+        print(f"[BENCH] Sembrando {args.candidates} candidatos...")
+        seed(args.candidates)
+        return
+
+    process, url = None, args.url
+    if not url:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='login-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+        print(f"[BENCH] Sembrando {args.candidates} candidatos en {db_path}...")
+        seed(args.candidates)
+        print(f"[BENCH] Iniciando gunicorn: {args.workers} workers x {args.threads} hilos...")
+        process, url = start_server(free_port(), args.workers, args.threads)
+
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    start_gate = threading.Barrier(args.concurrency)
+
+    def login(i):
+        start_gate.wait()
+        started = time.perf_counter()
+        status = post_login(url, f'candidato{i % args.candidates}', f'10.0.{i // 250}.{i % 250}')
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    try:
+        print(f"[BENCH] Ráfaga de {args.concurrency} logins contra {url}...")
+        threads = [threading.Thread(target=login, args=(i,)) for i in range(args.concurrency)]
+        wall_start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall_ms = (time.perf_counter() - wall_start) * 1000
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+
+    latencies.sort()
+    print(f"\n{'respuestas':<14}{dict(sorted(statuses.items()))}")
+    if latencies:
+        print(f"{'p50 ms':<14}{statistics.median(latencies):.1f}")
+        print(f"{'p95 ms':<14}{percentile(latencies, 0.95):.1f}")
+        print(f"{'max ms':<14}{latencies[-1]:.1f}")
+    print(f"{'total ms':<14}{wall_ms:.1f} ({args.concurrency / (wall_ms / 1000):.1f} logins/s)")
+    print(f"{'rechazados':<14}{statuses.get(503, 0)} (503 del control de admisión)")
+
+    p95 = percentile(latencies, 0.95)
+    if p95 > args.budget_ms:
+        print(f"\n❌ p95 {p95:.1f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"\n✅ p95 {p95:.1f} ms dentro del presupuesto de {args.budget_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark del tablero de resultados desde los acumulados
+
+Crea una base SQLite temporal con un partner de --campuses planteles y
+--groups grupos, siembra --days días de acumulados por grupo y examen (con sus
+derivados de plantel, partner y mes) y mide get_analytics() para un grupo, un
+plantel y el partner completo.
+
+Ejecutar con:
+    python scripts/benchmark_results_analytics.py
+    python scripts/benchmark_results_analytics.py --groups 1000 --days 365 --budget-ms 100
+
+Termina con código 1 si el p95 supera --budget-ms (o RESULTS_ANALYTICS_BUDGET_MS).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+DEFAULT_BUDGET_MS = int(os.getenv('RESULTS_ANALYTICS_BUDGET_MS', 100))
+
+CATEGORIES = {
+    'Fundamentos': ['Conceptos', 'Terminología'],
+    'Procedimientos': ['Planeación', 'Ejecución', 'Cierre'],
+    'Seguridad': ['Normativa', 'Riesgos'],
+}
+EXAMS = 2
+
+
+def seed(db, campuses, groups, days):
+    """Partner, planteles, grupos y acumulados sintéticos; devuelve (partner_id, campus_id, group_id)"""
+    from app.models import Partner, Campus, CandidateGroup
+    from app.services.results_analytics_service import insert_rollups
+
+    rng = random.Random(42)
+    partner = Partner(name='Partner benchmark', is_active=True)
+    db.session.add(partner)
+    db.session.flush()
+    db.session.execute(db.insert(Campus), [
+        {'partner_id': partner.id, 'name': f'Plantel {i}', 'state_name': 'Jalisco', 'is_active': True}
+        for i in range(campuses)
+    ])
+    campus_ids = [row.id for row in db.session.query(Campus.id).order_by(Campus.id)]
+    db.session.execute(db.insert(CandidateGroup), [
+        {'campus_id': campus_ids[i % len(campus_ids)], 'name': f'Grupo {i}', 'is_active': True}
+        for i in range(groups)
+    ])
+    group_ids = [row.id for row in db.session.query(CandidateGroup.id).order_by(CandidateGroup.id)]
+    db.session.commit()
+
+    # Mismo formato que acumula rebuild_analytics; insert_rollups agrega plantel, partner y mes
+    start = date.today() - timedelta(days=days)
+    daily, categories = {}, {}
+    for group_id in group_ids:
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            for exam_id in range(1, EXAMS + 1):
+                attempts = rng.randint(1, 6)
+                passed = rng.randint(0, attempts)
+                daily[(group_id, exam_id, day)] = {
+                    'competency_standard_id': None, 'attempts': attempts, 'passed': passed,
+                    'score_sum': attempts * rng.randint(40, 100), 'duration_sum': attempts * rng.randint(600, 3600)
+                }
+                for category, topics in CATEGORIES.items():
+                    for topic in topics:
+                        max_score = attempts * 5.0
+                        categories[(group_id, exam_id, day, category, topic)] = [
+                            attempts, round(max_score * rng.random(), 2), max_score
+                        ]
+    insert_rollups(daily, categories)
+    db.session.commit()
+    return partner.id, campus_ids[0], group_ids[0]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del tablero de resultados')
+    parser.add_argument('--campuses', type=int, default=50)
+    parser.add_argument('--groups', type=int, default=400)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--rounds', type=int, default=10, help='Repeticiones por alcance')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='Presupuesto p95 por tablero')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='results-analytics-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app, db
+    from app.services.results_analytics_service import get_analytics
+
+    app = create_app('production')
+    samples = []
+    with app.app_context():
+        db.create_all()
+        print(f"[BENCH] Sembrando {args.groups} grupos x {args.days} días en {db_path}...")
+        partner_id, campus_id, group_id = seed(db, args.campuses, args.groups, args.days)
+        last_month = date.today() - timedelta(days=30)
+
+        print(f"\n{'alcance':<20}{'p50 ms':>10}{'p95 ms':>10}")
+        for label, scope, scope_id, date_from in [
+            ('grupo', 'group', group_id, None),
+            ('plantel', 'campus', campus_id, None),
+            ('partner', 'partner', partner_id, None),
+            ('partner 30 días', 'partner', partner_id, last_month),
+        ]:
+            timings = []
+            for _ in range(args.rounds):
+                started = time.perf_counter()
+                get_analytics(scope, scope_id, date_from=date_from)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            samples.extend(timings)
+            print(f"{label:<20}{percentile(timings, 0.5):>10.1f}{percentile(timings, 0.95):>10.1f}")
+
+    samples.sort()
+    p95 = percentile(samples, 0.95)
+    if p95 > args.budget_ms:
+        print(f"\n❌ p95 {p95:.1f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"\n✅ p95 {p95:.1f} ms dentro del presupuesto de {args.budget_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark de búsqueda de usuarios: ILIKE '%term%' contra user_search_tokens
+
+Crea una base SQLite temporal con N usuarios sintéticos, construye el índice
+de tokens y mide la primera página (20 filas) de varias búsquedas típicas de
+coordinador con ambos métodos.
+
+Ejecutar con:
+    python scripts/benchmark_user_search.py
+    python scripts/benchmark_user_search.py --users 500000 --budget-ms 50
+
+Termina con código 1 si el p95 de la búsqueda indexada supera --budget-ms
+(o USER_SEARCH_BUDGET_MS).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+DEFAULT_BUDGET_MS = int(os.getenv('USER_SEARCH_BUDGET_MS', 50))
+
+NAMES = ['José', 'María', 'Juan', 'Ana', 'Luis', 'Sofía', 'Carlos', 'Lucía', 'Jesús', 'Fernanda',
+         'Miguel', 'Valentina', 'Ángel', 'Ximena', 'Raúl', 'Andrea', 'Óscar', 'Renata']
+SURNAMES = ['Hernández', 'García', 'Martínez', 'López', 'González', 'Pérez', 'Rodríguez', 'Sánchez',
+            'Ramírez', 'Cruz', 'Flores', 'Gómez', 'Morales', 'Vázquez', 'Jiménez', 'Muñoz', 'Núñez']
+
+QUERIES = ['garcia', 'muñoz', 'maria lopez', 'jose hernandez', 'cand123', 'candidato4567@', 'hegj', 'zzz']
+
+
+def seed(db, count):
+    """Usuarios sintéticos con nombres con acentos y CURP aleatoria"""
+    from app.models import User
+    rng = random.Random(42)
+    for start in range(0, count, 10000):
+        db.session.execute(db.insert(User), [
+            {'id': str(uuid.uuid4()), 'email': f'candidato{i}@bench.local', 'username': f'cand{i}',
+             'password_hash': 'x', 'name': rng.choice(NAMES), 'first_surname': rng.choice(SURNAMES),
+             'second_surname': rng.choice(SURNAMES),
+             'curp': ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789') for _ in range(18)),
+             'role': 'candidato', 'is_active': True}
+            for i in range(start, min(start + 10000, count))
+        ])
+        db.session.commit()
+
+
+def ilike_search(db, User, search):
+    term = f'%{search}%'
+    return User.query.filter(db.or_(
+        User.name.ilike(term), User.first_surname.ilike(term), User.second_surname.ilike(term),
+        User.email.ilike(term), User.curp.ilike(term), User.username.ilike(term)
+    )).order_by(User.first_surname, User.name, User.id).limit(20).all()
+
+
+def index_search(db, User, search):
+    from app.services.user_search_service import apply_user_search
+    return apply_user_search(User.query, search).order_by(User.first_surname, User.name, User.id).limit(20).all()
+
+
+def measure(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de búsqueda de usuarios')
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--rounds', type=int, default=5, help='Repeticiones por búsqueda')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Presupuesto p95 de la búsqueda indexada')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='user-search-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app, db
+    from app.models import User
+    from app.services.user_search_service import rebuild_index
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        print(f"[BENCH] Sembrando {args.users} usuarios en {db_path}...")
+        seed(db, args.users)
+        started = time.perf_counter()
+        rebuild_index(batch_size=5000)
+        print(f"[BENCH] Índice construido en {time.perf_counter() - started:.1f}s")
+
+        print(f"\n{'búsqueda':<20}{'ilike p50':>12}{'índice p50':>12}{'filas':>8}")
+        all_index = []
+        for search in QUERIES:
+            ilike = measure(lambda: ilike_search(db, User, search), args.rounds)
+            indexed = measure(lambda: index_search(db, User, search), args.rounds)
+            all_index.extend(indexed)
+            rows = len(index_search(db, User, search))
+            print(f"{search:<20}{statistics.median(ilike):>12.1f}{statistics.median(indexed):>12.1f}{rows:>8}")
+
+    all_index.sort()
+    p95 = percentile(all_index, 0.95)
+    if p95 > args.budget_ms:
+        print(f"\n❌ p95 {p95:.1f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"\n✅ p95 {p95:.1f} ms dentro del presupuesto de {args.budget_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
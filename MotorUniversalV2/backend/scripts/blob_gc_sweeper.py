@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Recolector diferido de blobs
+
+Elimina en lote los blobs registrados en blob_tombstones y, opcionalmente,
+busca blobs huérfanos por prefijo.
+
+Ejecutar con:
+    python scripts/blob_gc_sweeper.py --once
+    python scripts/blob_gc_sweeper.py --interval 300
+    python scripts/blob_gc_sweeper.py --reconcile exercise-steps/ downloadables/ --dry-run
+
+Puede correr como WebJob / contenedor aparte; no bloquea los workers de gunicorn.
+En Azure lo lanza startup.sh junto a gunicorn (BLOB_GC_ENABLED=false para omitirlo).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recolector diferido de blobs')
+    parser.add_argument('--once', action='store_true', help='Ejecutar una sola pasada y salir')
+    parser.add_argument('--interval', type=int, default=300, help='Segundos entre pasadas (default: 300)')
+    parser.add_argument('--limit', type=int, default=1000, help='Máximo de lápidas por pasada')
+    parser.add_argument('--reconcile', nargs='*', metavar='PREFIX',
+                        help='Buscar blobs huérfanos bajo estos prefijos')
+    parser.add_argument('--container', help='Contenedor a reconciliar (default: contenedor general)')
+    parser.add_argument('--account', help='Cuenta a reconciliar (default: cuenta general)')
+    parser.add_argument('--dry-run', action='store_true', help='Solo reportar huérfanos, sin registrarlos')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+    with app.app_context():
+        from app.services.blob_gc_service import sweep_tombstones, reconcile_orphans
+
+        if args.reconcile is not None:
+            prefixes = args.reconcile or ['exercise-steps/', 'downloadables/']
+            report = reconcile_orphans(
+                prefixes,
+                container_name=args.container,
+                account_name=args.account,
+                enqueue=not args.dry_run
+            )
+            print(f"[BLOB-GC] Revisados: {report['scanned']}, huérfanos: {len(report['orphans'])}, "
+                  f"registrados: {report['enqueued']}")
+            for name in report['orphans'][:50]:
+                print(f"  - {name}")
+            return
+
+        while True:
+            try:
+                stats = sweep_tombstones(limit=args.limit)
+                if stats['processed']:
+                    print(f"[BLOB-GC] {stats}")
+            except Exception as e:
+                print(f"[BLOB-GC] Error en pasada: {e}")
+                from app import db
+                db.session.rollback()
+
+            if args.once:
+                break
+            time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
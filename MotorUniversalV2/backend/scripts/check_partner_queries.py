@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Regresión de consultas de la jerarquía de partners
+
+Crea una base SQLite temporal con un partner de --campuses planteles y
+--groups grupos (con miembros), llama a los endpoints de detalle y listado
+con el cliente de pruebas y verifica:
+
+- que el número de sentencias SQL de cada endpoint no pase de su presupuesto
+  (no debe crecer con el número de planteles o grupos)
+- que el JSON sea idéntico al que producen los to_dict() consulta por consulta
+
+Ejecutar con:
+    python scripts/check_partner_queries.py
+    python scripts/check_partner_queries.py --campuses 200 --groups 1000
+
+Termina con código 1 si algún endpoint supera su presupuesto o cambia el JSON.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Sentencias por request, incluidas las de identidad / rol del token
+QUERY_BUDGETS = {
+    'partner_detail': 12,
+    'partners_list': 12,
+    'campuses_list': 12,
+    'campus_detail': 14,
+    'groups_list': 12,
+    'group_detail': 14,
+}
+
+
+def seed(db, campuses, groups, members_per_group):
+    """Partner con estados, planteles, grupos y candidatos; devuelve (partner_id, admin)"""
+    from app.models import User, Partner, PartnerStatePresence, Campus, CandidateGroup, GroupMember
+
+    admin = User(id=str(uuid.uuid4()), email='admin@check.local', username='admin-check',
+                 password_hash='x', name='Admin', first_surname='Check', role='admin', is_active=True)
+    partner = Partner(name='Partner de prueba', rfc='XAXX010101000', is_active=True)
+    db.session.add_all([admin, partner])
+    db.session.flush()
+
+    states = ['Jalisco', 'Nuevo León', 'Puebla', 'Yucatán']
+    db.session.add_all([
+        PartnerStatePresence(partner_id=partner.id, state_name=state, is_active=True) for state in states
+    ])
+    db.session.execute(db.insert(Campus), [
+        {'partner_id': partner.id, 'name': f'Plantel {i:03d}', 'code': f'PL{i:03d}',
+         'state_name': states[i % len(states)], 'is_active': True}
+        for i in range(campuses)
+    ])
+    campus_ids = [row.id for row in db.session.query(Campus.id).order_by(Campus.id)]
+    db.session.execute(db.insert(CandidateGroup), [
+        {'campus_id': campus_ids[i % len(campus_ids)], 'name': f'Grupo {i:04d}', 'max_members': 50, 'is_active': True}
+        for i in range(groups)
+    ])
+    group_ids = [row.id for row in db.session.query(CandidateGroup.id).order_by(CandidateGroup.id)]
+
+    user_ids = [str(uuid.uuid4()) for _ in range(members_per_group * 4)]
+    db.session.execute(db.insert(User), [
+        {'id': user_id, 'email': f'cand{i}@check.local', 'username': f'cand-check-{i}', 'password_hash': 'x',
+         'name': 'Candidato', 'first_surname': f'Prueba{i}', 'role': 'candidato', 'is_active': True}
+        for i, user_id in enumerate(user_ids)
+    ])
+    db.session.execute(db.insert(GroupMember), [
+        {'group_id': group_id, 'user_id': user_ids[(g + m) % len(user_ids)], 'status': 'active'}
+        for g, group_id in enumerate(group_ids)
+        for m in range(members_per_group)
+    ])
+    db.session.commit()
+    return partner.id, campus_ids[0], group_ids[0], admin
+
+
+def legacy_payloads(partner_id, campus_id, group_id):
+    """JSON de referencia con los to_dict() originales (una consulta por relación)"""
+    from app.models import Partner, Campus, CandidateGroup
+    partner = Partner.query.get(partner_id)
+    campus = Campus.query.get(campus_id)
+    group = CandidateGroup.query.get(group_id)
+    return {
+        'partner_detail': partner.to_dict(include_states=True, include_campuses=True),
+        'campus_detail': campus.to_dict(include_groups=True, include_partner=True),
+        'group_detail': group.to_dict(include_members=True, include_campus=True),
+        'groups_list': [
+            g.to_dict(include_members=True)
+            for g in CandidateGroup.query.filter_by(campus_id=campus_id, is_active=True).order_by(CandidateGroup.name)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regresión de consultas de la jerarquía de partners')
+    parser.add_argument('--campuses', type=int, default=80)
+    parser.add_argument('--groups', type=int, default=400)
+    parser.add_argument('--members', type=int, default=5, help='Miembros por grupo')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='partner-queries-'), 'check.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.utils.identity import identity_claims
+
+    app = create_app('production')
+    with app.app_context():
+        db.create_all()
+        print(f"[CHECK] Sembrando {args.campuses} planteles y {args.groups} grupos en {db_path}...")
+        partner_id, campus_id, group_id, admin = seed(db, args.campuses, args.groups, args.members)
+        token = create_access_token(identity=admin.id, additional_claims=identity_claims(admin))
+        expected = legacy_payloads(partner_id, campus_id, group_id)
+        db.session.remove()
+
+        statements = []
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        endpoints = {
+            'partner_detail': (f'/api/partners/{partner_id}', lambda body: body['partner']),
+            'partners_list': ('/api/partners', None),
+            'campuses_list': (f'/api/partners/{partner_id}/campuses', None),
+            'campus_detail': (f'/api/partners/campuses/{campus_id}', lambda body: body['campus']),
+            'groups_list': (f'/api/partners/campuses/{campus_id}/groups', lambda body: body['groups']),
+            'group_detail': (f'/api/partners/groups/{group_id}', lambda body: body['group']),
+        }
+
+        failures = []
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        print(f"\n{'endpoint':<18}{'consultas':>10}{'presupuesto':>13}")
+        for name, (url, extract) in endpoints.items():
+            statements.clear()
+            response = client.get(url, headers=headers)
+            count = len(statements)
+            print(f"{name:<18}{count:>10}{QUERY_BUDGETS[name]:>13}")
+
+            if response.status_code != 200:
+                failures.append(f"{name}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+                continue
+            if count > QUERY_BUDGETS[name]:
+                failures.append(f"{name}: {count} consultas (presupuesto {QUERY_BUDGETS[name]})")
+            if extract and name in expected:
+                # Comparar vía JSON (fechas ya serializadas, claves ordenadas)
+                got = json.dumps(extract(response.get_json()), sort_keys=True)
+                want = json.dumps(expected[name], sort_keys=True, default=str)
+                if got != want:
+                    failures.append(f"{name}: el JSON difiere del de to_dict()")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("\n✅ Consultas dentro del presupuesto y JSON idéntico")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Worker de trabajos en segundo plano
+
+Toma trabajos de la tabla `jobs` y ejecuta su handler (services/job_handlers).
+Varios workers pueden correr a la vez: cada trabajo se toma con un UPDATE
+condicional. Si un worker muere, el trabajo se reencola al vencer el heartbeat
+y continúa desde el último bloque confirmado.
+
+Ejecutar con:
+    python scripts/job_worker.py
+    python scripts/job_worker.py --once
+    python scripts/job_worker.py --interval 2
+
+En Azure lo lanza startup.sh junto a gunicorn (JOB_WORKER_ENABLED=false para omitirlo).
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+
+PURGE_EVERY_SECONDS = 3600
+ARTIFACT_PURGE_EVERY_SECONDS = 60  # Credenciales vencidas (SENSITIVE_ARTIFACT_TTL_MINUTES)
+
+_stop = False
+
+
+def _request_stop(signum, frame):
+    global _stop
+    _stop = True
+    print("[JOBS] Señal recibida: se detendrá al terminar el trabajo actual")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker de trabajos en segundo plano')
+    parser.add_argument('--once', action='store_true', help='Procesar los trabajos en cola y salir')
+    parser.add_argument('--interval', type=float, default=2, help='Segundos de espera con la cola vacía (default: 2)')
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+    with app.app_context():
+        from app import db
+        from app.auto_migrate import check_and_add_user_columns
+        from app.services.job_service import (
+            claim_next_job, run_job, requeue_stale_jobs, purge_old_jobs, purge_expired_artifacts, worker_id
+        )
+
+        # startup.sh lo lanza antes de que gunicorn importe run.py (que agrega las columnas)
+        check_and_add_user_columns()
+
+        owner = worker_id()
+        print(f"[JOBS] Worker {owner} iniciado")
+        last_purge = last_artifact_purge = 0
+
+        while not _stop:
+            try:
+                requeued, failed = requeue_stale_jobs()
+                if requeued or failed:
+                    print(f"[JOBS] Reencolados: {requeued}, fallidos por heartbeat: {failed}")
+
+                if time.time() - last_purge > PURGE_EVERY_SECONDS:
+                    purged = purge_old_jobs()
+                    if purged:
+                        print(f"[JOBS] {purged} trabajos antiguos eliminados")
+                    last_purge = time.time()
+
+                if time.time() - last_artifact_purge > ARTIFACT_PURGE_EVERY_SECONDS:
+                    expired = purge_expired_artifacts()
+                    if expired:
+                        print(f"[JOBS] {expired} archivos temporales o vencidos eliminados")
+                    last_artifact_purge = time.time()
+
+                job = claim_next_job(owner)
+            except Exception as e:
+                print(f"[JOBS] Error consultando la cola: {e}")
+                db.session.rollback()
+                job = None
+
+            if job:
+                run_job(job)
+                db.session.remove()
+                continue
+
+            if args.once:
+                break
+            time.sleep(args.interval)
+
+        print(f"[JOBS] Worker {owner} detenido")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Construir el filtro de Bloom de folios CONOCER para la verificación pública
+
+Agrega todos los folios de conocer_certificates al bitmap de Redis y enciende
+el bit centinela; mientras el centinela esté apagado la verificación ignora
+el filtro y consulta el caché / la BD. Las altas posteriores se agregan solas
+al confirmar (services/certificate_verification_service).
+
+Ejecutar con:
+    python scripts/rebuild_conocer_verification_bloom.py
+    python scripts/rebuild_conocer_verification_bloom.py --if-missing
+    python scripts/rebuild_conocer_verification_bloom.py --reset
+
+--reset borra el filtro antes de reconstruirlo (limpia folios eliminados).
+startup.sh lo lanza con --if-missing en cada arranque, lo que también lo
+repone si Redis desalojó el bitmap.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construir el filtro de Bloom de folios CONOCER')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Folios por bloque (default: 5000)')
+    parser.add_argument('--if-missing', action='store_true', help='Solo si el filtro no está construido')
+    parser.add_argument('--reset', action='store_true', help='Borrar el filtro antes de reconstruirlo')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+    with app.app_context():
+        from app.utils.cache_utils import get_redis_client
+        from app.services.certificate_verification_service import bloom_ready, rebuild_bloom
+
+        if get_redis_client() is None:
+            print("[CONOCER-VERIFY] Redis no disponible, se omite el filtro")
+            return
+
+        if args.if_missing and bloom_ready():
+            print("[CONOCER-VERIFY] El filtro ya está construido, nada que hacer")
+            return
+
+        started = time.perf_counter()
+        print("[CONOCER-VERIFY] Construyendo filtro de folios...")
+        total = rebuild_bloom(
+            batch_size=args.batch_size,
+            reset=args.reset,
+            progress_callback=lambda n: print(f"[CONOCER-VERIFY] {n} folios agregados")
+        )
+        print(f"[CONOCER-VERIFY] ✅ {total} folios en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
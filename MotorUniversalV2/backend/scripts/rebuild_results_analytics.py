@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Reconstruir la analítica de resultados (hechos por categoría y acumulados)
+
+Recalcula result_category_facts, los acumulados por grupo y sus derivados por
+plantel, partner y mes desde results por bloques (keyset por id) mientras se
+siguen guardando resultados (ver rebuild_analytics). Necesario tras crear las
+tablas, tras borrar o mover grupos, tras borrar resultados y tras cambiar las
+reglas de services/results_analytics_service. Los grupos de cada resultado se
+toman de las membresías actuales.
+
+Ejecutar con:
+    python scripts/rebuild_results_analytics.py
+    python scripts/rebuild_results_analytics.py --if-incomplete
+    python scripts/rebuild_results_analytics.py --batch-size 1000
+
+startup.sh lo lanza con --if-incomplete para llenar las tablas en el primer arranque
+(o terminar una reconstrucción interrumpida). La marca la escribe
+rebuild_analytics() al terminar; no se usa "tablas vacías" porque record_result
+escribe filas antes de que la reconstrucción termine.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruir la analítica de resultados')
+    parser.add_argument('--batch-size', type=int, default=500, help='Resultados por bloque (default: 500)')
+    parser.add_argument('--if-incomplete', action='store_true',
+                        help='Solo si no hay una reconstrucción completa registrada')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+    with app.app_context():
+        from app.auto_migrate import check_and_create_tables
+        from app.services.maintenance_service import is_completed
+        from app.services.results_analytics_service import REBUILD_MARKER, rebuild_analytics
+
+        # startup.sh lo lanza antes de que gunicorn importe run.py (que crea las tablas)
+        check_and_create_tables()
+
+        if args.if_incomplete and is_completed(REBUILD_MARKER):
+            print("[ANALYTICS] La analítica ya se reconstruyó completa, nada que hacer")
+            return
+
+        started = time.perf_counter()
+        print("[ANALYTICS] Reconstruyendo analítica de resultados...")
+        total = rebuild_analytics(
+            batch_size=args.batch_size,
+            progress_callback=lambda n: print(f"[ANALYTICS] {n} resultados procesados")
+        )
+        print(f"[ANALYTICS] ✅ {total} resultados procesados en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
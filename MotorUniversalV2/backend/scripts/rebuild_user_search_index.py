@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Reconstruir el índice de búsqueda de usuarios (user_search_tokens)
+
+Recorre users por bloques (keyset por id, un commit por bloque) y reemplaza
+los tokens de cada usuario. Necesario tras crear la tabla y tras cambiar las
+reglas de tokenización en services/user_search_service.
+
+Ejecutar con:
+    python scripts/rebuild_user_search_index.py
+    python scripts/rebuild_user_search_index.py --if-incomplete
+    python scripts/rebuild_user_search_index.py --batch-size 5000
+
+startup.sh lo lanza con --if-incomplete para llenar el índice en el primer arranque
+(o terminarlo si una reconstrucción anterior se interrumpió). La marca la escribe
+rebuild_index() al terminar; no se usa "tabla vacía" porque los eventos de
+usuarios escriben tokens antes de que la reconstrucción termine.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruir el índice de búsqueda de usuarios')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Usuarios por bloque (default: 2000)')
+    parser.add_argument('--if-incomplete', action='store_true',
+                        help='Solo si no hay una reconstrucción completa registrada')
+    args = parser.parse_args()
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+
+    with app.app_context():
+        from app.auto_migrate import check_and_create_tables
+        from app.services.maintenance_service import is_completed
+        from app.services.user_search_service import REBUILD_MARKER, rebuild_index
+
+        # startup.sh lo lanza antes de que gunicorn importe run.py (que crea las tablas)
+        check_and_create_tables()
+
+        if args.if_incomplete and is_completed(REBUILD_MARKER):
+            print("[USER-SEARCH] El índice ya se reconstruyó completo, nada que hacer")
+            return
+
+        started = time.perf_counter()
+        print("[USER-SEARCH] Reconstruyendo índice de búsqueda de usuarios...")
+        total = rebuild_index(
+            batch_size=args.batch_size,
+            progress_callback=lambda n: print(f"[USER-SEARCH] {n} usuarios indexados")
+        )
+        print(f"[USER-SEARCH] ✅ {total} usuarios indexados en {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -15,10 +15,47 @@ if [ -d "migrations" ]; then
     python -m flask db upgrade || echo "⚠️  Migraciones fallaron o no se pudieron aplicar"
 fi
 
-# Iniciar Gunicorn
-echo "✅ Iniciando Gunicorn..."
+# Llenar el índice de búsqueda de usuarios si no se ha reconstruido completo (primer arranque o interrupción)
+python scripts/rebuild_user_search_index.py --if-incomplete &
+
+# Llenar la analítica de resultados si no se ha reconstruido completa (primer arranque o interrupción)
+python scripts/rebuild_results_analytics.py --if-incomplete &
+
+# Guardar la caché de las lecturas anteriores a ella (se sirven al vuelo mientras tanto)
+python scripts/backfill_reading_cache.py &
+
+# Filtro de Bloom de folios CONOCER para la verificación pública
+python scripts/rebuild_conocer_verification_bloom.py --if-missing &
+
+# Procesos con pool de Argon2 (workers de gunicorn + worker de trabajos): se
+# reparten PASSWORD_HASH_MEMORY_MB entre ellos (ver app/utils/password_hashing.py)
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-2}"
+if [ "${JOB_WORKER_ENABLED:-true}" != "false" ]; then
+    export PASSWORD_HASH_PROCESSES="${PASSWORD_HASH_PROCESSES:-$(( WEB_CONCURRENCY + 1 ))}"
+else
+    export PASSWORD_HASH_PROCESSES="${PASSWORD_HASH_PROCESSES:-${WEB_CONCURRENCY}}"
+fi
+
+# Iniciar el worker de trabajos en segundo plano (importaciones, altas masivas)
+if [ "${JOB_WORKER_ENABLED:-true}" != "false" ]; then
+    echo "🔄 Iniciando worker de trabajos..."
+    python scripts/job_worker.py &
+fi
+
+# Iniciar el recolector diferido de blobs (lápidas de imágenes y archivos eliminados)
+if [ "${BLOB_GC_ENABLED:-true}" != "false" ]; then
+    echo "🔄 Iniciando recolector de blobs..."
+    python scripts/blob_gc_sweeper.py --interval "${BLOB_GC_INTERVAL:-300}" &
+fi
+
+# Iniciar Gunicorn (workers gthread: los hilos de cada proceso comparten el pool de
+# Argon2 y su control de admisión; ver app/utils/password_hashing.py)
+GUNICORN_THREADS="${GUNICORN_THREADS:-$(( $(nproc) * 4 ))}"
+echo "✅ Iniciando Gunicorn (${WEB_CONCURRENCY} workers x ${GUNICORN_THREADS} hilos)..."
 exec gunicorn --bind=0.0.0.0:8000 \
-         --workers=2 \
+         --workers="${WEB_CONCURRENCY}" \
+         --worker-class=gthread \
+         --threads="${GUNICORN_THREADS}" \
          --timeout=1800 \
          --access-logfile=- \
          --error-logfile=- \
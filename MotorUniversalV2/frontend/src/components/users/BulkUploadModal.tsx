@@ -13,15 +13,14 @@ import {
   Loader2,
   Users,
   ChevronDown,
-  ChevronUp,
-  Copy,
-  Check
+  ChevronUp
 } from 'lucide-react';
 import {
   bulkUploadCandidates,
   downloadBulkUploadTemplate,
   BulkUploadResult
 } from '../../services/userManagementService';
+import { downloadJobArtifact, JobArtifact } from '../../services/jobsService';
 
 interface BulkUploadModalProps {
   isOpen: boolean;
@@ -42,8 +41,8 @@ export default function BulkUploadModal({ isOpen, onClose, onSuccess }: BulkUplo
   const [showErrors, setShowErrors] = useState(true);
   const [showSkipped, setShowSkipped] = useState(false);
   
-  // Estado para copiar contraseñas
-  const [copiedRow, setCopiedRow] = useState<number | null>(null);
+  // Las credenciales se descargan una sola vez (el servidor elimina el archivo)
+  const [downloadedArtifacts, setDownloadedArtifacts] = useState<number[]>([]);
 
   const handleDragOver = useCallback((e: React.DragEvent) => {
     e.preventDefault();
@@ -115,15 +114,23 @@ export default function BulkUploadModal({ isOpen, onClose, onSuccess }: BulkUplo
     setFile(null);
     setResult(null);
     setError(null);
+    setDownloadedArtifacts([]);
     if (fileInputRef.current) {
       fileInputRef.current.value = '';
     }
   };
 
-  const handleCopyPassword = (row: number, password: string) => {
-    navigator.clipboard.writeText(password);
-    setCopiedRow(row);
-    setTimeout(() => setCopiedRow(null), 2000);
+  const handleDownloadArtifact = async (artifact: JobArtifact) => {
+    try {
+      await downloadJobArtifact(artifact);
+      if (artifact.single_use) {
+        setDownloadedArtifacts((prev) => [...prev, artifact.id]);
+      }
+    } catch (err: any) {
+      setError(err.response?.status === 410 || err.response?.status === 404
+        ? 'La hoja de credenciales ya fue descargada o venció'
+        : 'Error al descargar la hoja de credenciales');
+    }
   };
 
   const handleClose = () => {
@@ -297,6 +304,34 @@ export default function BulkUploadModal({ isOpen, onClose, onSuccess }: BulkUplo
                 </div>
               </div>
 
+              {/* Hoja de credenciales generada por el trabajo */}
+              {result.artifacts && result.artifacts.length > 0 && (
+                <div className="flex flex-wrap gap-2">
+                  {result.artifacts.map((artifact) => (
+                    downloadedArtifacts.includes(artifact.id) ? (
+                      <span key={artifact.id} className="inline-flex items-center gap-2 px-4 py-2 text-sm text-gray-500">
+                        <CheckCircle2 className="h-4 w-4" />
+                        Credenciales descargadas ({artifact.name})
+                      </span>
+                    ) : (
+                      <button
+                        key={artifact.id}
+                        onClick={() => handleDownloadArtifact(artifact)}
+                        className="inline-flex items-center gap-2 px-4 py-2 text-sm font-medium text-green-700 bg-green-50 border border-green-200 rounded-lg hover:bg-green-100 transition-colors"
+                      >
+                        <Download className="h-4 w-4" />
+                        Descargar credenciales ({artifact.name})
+                      </button>
+                    )
+                  ))}
+                  {result.artifacts.some((artifact) => artifact.single_use) && (
+                    <p className="w-full text-xs text-gray-500">
+                      Las contraseñas generadas solo están en esta hoja y se puede descargar una sola vez.
+                    </p>
+                  )}
+                </div>
+              )}
+
               {/* Usuarios creados */}
               {result.details.created.length > 0 && (
                 <div className="border border-green-200 rounded-xl overflow-hidden">
@@ -331,23 +366,8 @@ export default function BulkUploadModal({ isOpen, onClose, onSuccess }: BulkUplo
                               <td className="px-4 py-2 text-gray-800">{item.email}</td>
                               <td className="px-4 py-2 text-gray-800">{item.name}</td>
                               <td className="px-4 py-2">
-                                {item.password ? (
-                                  <div className="flex items-center gap-2">
-                                    <code className="text-xs bg-gray-100 px-2 py-1 rounded">
-                                      {item.password}
-                                    </code>
-                                    <button
-                                      onClick={() => handleCopyPassword(item.row, item.password!)}
-                                      className="p-1 hover:bg-gray-200 rounded transition-colors"
-                                      title="Copiar contraseña"
-                                    >
-                                      {copiedRow === item.row ? (
-                                        <Check className="h-4 w-4 text-green-600" />
-                                      ) : (
-                                        <Copy className="h-4 w-4 text-gray-500" />
-                                      )}
-                                    </button>
-                                  </div>
+                                {item.password_generated ? (
+                                  <span className="text-gray-600 text-xs">Generada (ver hoja de credenciales)</span>
                                 ) : (
                                   <span className="text-gray-400 text-xs">(proporcionada)</span>
                                 )}
@@ -802,9 +802,29 @@ const ConocerCertificateSection = ({ exams, formatDate }: { exams: any[], format
       const response = await fetch(`${apiUrl}/conocer/certificates/${certificate.id}/download`, {
         headers: {
           'Authorization': `Bearer ${accessToken}`
-        }
+        },
+        redirect: 'manual'
       })
       
+      if (response.type === 'opaqueredirect') {
+        // Archivos grandes: el backend redirige a un URL SAS; se descarga directo del storage
+        const urlResponse = await fetch(`${apiUrl}/conocer/certificates/${certificate.id}/download-url`, {
+          headers: {
+            'Authorization': `Bearer ${accessToken}`
+          }
+        })
+        if (!urlResponse.ok) {
+          throw new Error('Error al descargar el certificado')
+        }
+        const { download_url } = await urlResponse.json()
+        const a = document.createElement('a')
+        a.href = download_url
+        document.body.appendChild(a)
+        a.click()
+        document.body.removeChild(a)
+        return
+      }
+      
       if (response.status === 202) {
         // Certificado en Archive, necesita rehidratación
         const data = await response.json()
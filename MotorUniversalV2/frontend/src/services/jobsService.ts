@@ -0,0 +1,89 @@
+/**
+ * Servicio de trabajos en segundo plano (importaciones y altas masivas)
+ */
+import api from './api';
+
+// ============== TIPOS ==============
+
+export type JobStatus = 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+
+export interface JobArtifact {
+  id: number;
+  name: string;
+  content_type: string;
+  size_bytes: number;
+  download_url: string;
+  single_use: boolean;  // Se elimina al descargarlo (credenciales)
+  expires_at: string | null;
+  created_at: string;
+}
+
+export interface Job<TProgress = Record<string, number>, TResult = unknown> {
+  id: string;
+  type: string;
+  status: JobStatus;
+  progress: TProgress;
+  result?: TResult | null;
+  error?: string | null;
+  attempts: number;
+  cancel_requested: boolean;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  artifacts: JobArtifact[];
+}
+
+// ============== TRABAJOS ==============
+
+export async function getJob<TProgress = Record<string, number>, TResult = unknown>(
+  jobId: string
+): Promise<Job<TProgress, TResult>> {
+  const response = await api.get(`/jobs/${jobId}`);
+  return response.data;
+}
+
+export async function cancelJob(jobId: string): Promise<Job> {
+  const response = await api.post(`/jobs/${jobId}/cancel`);
+  return response.data.job;
+}
+
+/**
+ * Consultar el trabajo hasta que termine y devolver su resultado
+ */
+export async function waitForJob<TProgress = Record<string, number>, TResult = unknown>(
+  jobId: string,
+  onProgress?: (progress: TProgress) => void,
+  intervalMs = 1500
+): Promise<Job<TProgress, TResult>> {
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    const job = await getJob<TProgress, TResult>(jobId);
+    if (onProgress && job.progress) {
+      onProgress(job.progress);
+    }
+    if (job.status === 'completed') {
+      return job;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Error en el proceso');
+    }
+    if (job.status === 'cancelled') {
+      throw new Error('El proceso fue cancelado');
+    }
+  }
+}
+
+export async function downloadJobArtifact(artifact: JobArtifact): Promise<void> {
+  // download_url incluye el prefijo /api
+  const response = await api.get(artifact.download_url.replace(/^\/api/, ''), {
+    responseType: 'blob'
+  });
+  const url = window.URL.createObjectURL(response.data);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = artifact.name;
+  document.body.appendChild(a);
+  a.click();
+  window.URL.revokeObjectURL(url);
+  document.body.removeChild(a);
+}
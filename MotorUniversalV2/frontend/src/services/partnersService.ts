@@ -2,6 +2,7 @@
  * Servicio para gestión de Partners, Planteles y Grupos
  */
 import api from './api';
+import { waitForJob } from './jobsService';
 
 // ============== TIPOS ==============
 
@@ -287,12 +288,69 @@ export async function addGroupMember(groupId: number, data: {
   return response.data.member;
 }
 
-export async function addGroupMembersBulk(groupId: number, userIds: string[]): Promise<{
+export interface GroupMembersBulkResult {
   message: string;
   added: string[];
-  errors: Array<{ user_id: string; error: string }>;
-}> {
+  // Las filas de una lista sin usuario traen row/key en lugar de user_id
+  errors: Array<{ user_id?: string; row?: number; key?: string; error: string }>;
+}
+
+type GroupMembersBulkProgress = { processed: number; total: number; added: number; errors: number };
+
+async function resolveGroupMembersBulk(
+  response: { status: number; data: any },
+  onProgress?: (progress: GroupMembersBulkProgress) => void
+): Promise<GroupMembersBulkResult> {
+  if (response.status !== 202) {
+    return response.data;
+  }
+  // Listas grandes se procesan como trabajo en segundo plano
+  const job = await waitForJob<GroupMembersBulkProgress, GroupMembersBulkResult>(
+    response.data.job_id,
+    onProgress
+  );
+  if (!job.result) {
+    throw new Error(job.error || 'Error al agregar miembros');
+  }
+  return job.result;
+}
+
+export async function addGroupMembersBulk(
+  groupId: number,
+  userIds: string[],
+  onProgress?: (progress: GroupMembersBulkProgress) => void
+): Promise<GroupMembersBulkResult> {
   const response = await api.post(`/partners/groups/${groupId}/members/bulk`, { user_ids: userIds });
+  return resolveGroupMembersBulk(response, onProgress);
+}
+
+// Lista CSV/Excel con columna "curp" o "email"
+export async function addGroupMembersFromRoster(
+  groupId: number,
+  file: File,
+  onProgress?: (progress: GroupMembersBulkProgress) => void
+): Promise<GroupMembersBulkResult> {
+  const formData = new FormData();
+  formData.append('file', file);
+  const response = await api.post(`/partners/groups/${groupId}/members/roster`, formData);
+  return resolveGroupMembersBulk(response, onProgress);
+}
+
+export interface GroupMembersMoveResult {
+  message: string;
+  moved: string[];
+  errors: Array<{ user_id: string; error: string }>;
+}
+
+export async function moveGroupMembers(
+  targetGroupId: number,
+  sourceGroupId: number,
+  userIds: string[]
+): Promise<GroupMembersMoveResult> {
+  const response = await api.post(`/partners/groups/${targetGroupId}/members/move`, {
+    source_group_id: sourceGroupId,
+    user_ids: userIds,
+  });
   return response.data;
 }
 
@@ -443,6 +501,24 @@ export async function getMyPartners(): Promise<{
   return response.data;
 }
 
+export interface MyStudyMaterial {
+  id: number;
+  title: string;
+  description?: string;
+  cover_image_url?: string;
+  is_custom: boolean;
+  exams: Array<{ exam_id: number; exam_name: string; group_id: number }>;
+}
+
+// Materiales asignados por los grupos del candidato (con personalizaciones)
+export async function getMyStudyMaterials(): Promise<{
+  materials: MyStudyMaterial[];
+  total: number;
+}> {
+  const response = await api.get('/partners/my-study-materials');
+  return response.data;
+}
+
 /**
  * Obtener lista de partners disponibles para ligarse
  */
@@ -621,3 +697,115 @@ export async function resetGroupExamMaterials(groupExamId: number): Promise<{ me
   const response = await api.post(`/partners/group-exams/${groupExamId}/materials/reset`);
   return response.data;
 }
+
+// ============== ANALÍTICA DE RESULTADOS ==============
+
+export type AnalyticsScope = 'group' | 'campus' | 'partner';
+
+export interface AnalyticsStats {
+  attempts: number;
+  passed: number;
+  failed: number;
+  pass_rate: number;
+  average_score: number;
+  average_duration_seconds: number;
+}
+
+export interface AnalyticsCategory {
+  category: string;
+  earned: number;
+  max: number;
+  percentage: number;
+  topics: Array<{ topic: string; results: number; earned: number; max: number; percentage: number }>;
+}
+
+export interface ResultsAnalytics {
+  scope: AnalyticsScope;
+  scope_id: number;
+  date_from: string | null;
+  date_to: string | null;
+  exam_id: number | null;
+  totals: AnalyticsStats;
+  by_exam: Array<AnalyticsStats & { exam_id: number; exam_name: string | null; ecm_code: string | null }>;
+  by_day: Array<AnalyticsStats & { day: string }>;
+  by_group?: Array<AnalyticsStats & { group_id: number; group_name: string; campus_id: number }>;
+  categories: AnalyticsCategory[];  // De la más débil a la más fuerte
+}
+
+export interface AnalyticsFilters {
+  from?: string;  // YYYY-MM-DD
+  to?: string;
+  exam_id?: number;
+}
+
+const ANALYTICS_PATHS: Record<AnalyticsScope, string> = {
+  group: 'groups',
+  campus: 'campuses',
+  partner: '',
+};
+
+function analyticsPath(scope: AnalyticsScope, id: number): string {
+  const prefix = ANALYTICS_PATHS[scope];
+  return prefix ? `/partners/${prefix}/${id}/analytics` : `/partners/${id}/analytics`;
+}
+
+/**
+ * Tasa de aprobación, promedios y debilidades por categoría de un grupo, plantel o partner
+ */
+export async function getResultsAnalytics(
+  scope: AnalyticsScope,
+  id: number,
+  filters?: AnalyticsFilters
+): Promise<ResultsAnalytics> {
+  const response = await api.get(analyticsPath(scope, id), { params: filters });
+  return response.data;
+}
+
+export type ExportFormat = 'csv' | 'xlsx';
+
+// Descarga de una exportación en streaming (CSV o Excel)
+async function downloadExport(path: string, params: object, filename: string): Promise<void> {
+  const response = await api.get(path, { params, responseType: 'blob' });
+  const url = window.URL.createObjectURL(response.data);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = filename;
+  document.body.appendChild(a);
+  a.click();
+  window.URL.revokeObjectURL(url);
+  document.body.removeChild(a);
+}
+
+/**
+ * Descargar los acumulados diarios (día, grupo, examen)
+ */
+export async function exportResultsAnalytics(
+  scope: AnalyticsScope,
+  id: number,
+  filters?: AnalyticsFilters,
+  format: ExportFormat = 'csv'
+): Promise<void> {
+  await downloadExport(`${analyticsPath(scope, id)}/export`, { ...filters, format }, `resultados_${scope}_${id}.${format}`);
+}
+
+/**
+ * Descargar los resultados de los miembros del grupo con desglose por categoría y tema
+ */
+export async function exportGroupResults(
+  groupId: number,
+  filters?: AnalyticsFilters & { status?: number },
+  format: ExportFormat = 'csv'
+): Promise<void> {
+  await downloadExport(`/partners/groups/${groupId}/results/export`, { ...filters, format }, `resultados_grupo_${groupId}.${format}`);
+}
+
+/**
+ * Descargar los miembros del grupo
+ */
+export async function exportGroupMembers(
+  groupId: number,
+  status?: string,
+  format: ExportFormat = 'csv'
+): Promise<void> {
+  await downloadExport(`/partners/groups/${groupId}/members/export`, { status, format }, `miembros_grupo_${groupId}.${format}`);
+}
@@ -2,6 +2,7 @@
  * Servicio para gestión de usuarios (admin/coordinador)
  */
 import api from './api';
+import { getJob, waitForJob, Job, JobArtifact } from './jobsService';
 
 // ============== TIPOS ==============
 
@@ -90,6 +91,29 @@ export async function getUsers(params?: {
   return response.data;
 }
 
+export type ExportFormat = 'csv' | 'xlsx';
+
+/**
+ * Descargar la lista de usuarios con los mismos filtros del listado (CSV o Excel)
+ */
+export async function exportUsers(
+  params?: { search?: string; role?: string; is_active?: string },
+  format: ExportFormat = 'csv'
+): Promise<void> {
+  const response = await api.get('/user-management/users/export', {
+    params: { ...params, format },
+    responseType: 'blob'
+  });
+  const url = window.URL.createObjectURL(response.data);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = `usuarios.${format}`;
+  document.body.appendChild(a);
+  a.click();
+  window.URL.revokeObjectURL(url);
+  a.remove();
+}
+
 export async function getUser(userId: string): Promise<ManagedUser> {
   const response = await api.get(`/user-management/users/${userId}`);
   return response.data.user;
@@ -202,7 +226,7 @@ export interface BulkUploadResult {
       email: string;
       name: string;
       username: string;
-      password: string | null;
+      password_generated: boolean;
     }>;
     errors: Array<{
       row: number;
@@ -216,9 +240,27 @@ export interface BulkUploadResult {
     }>;
     total_processed: number;
   };
+  artifacts?: JobArtifact[];
 }
 
-export async function bulkUploadCandidates(file: File): Promise<BulkUploadResult> {
+export interface BulkUploadProgress {
+  processed: number;
+  total: number;
+  created: number;
+  errors: number;
+  skipped: number;
+}
+
+export type BulkUploadJob = Job<BulkUploadProgress, BulkUploadResult>;
+
+export async function getBulkUploadJob(jobId: string): Promise<BulkUploadJob> {
+  return getJob<BulkUploadProgress, BulkUploadResult>(jobId);
+}
+
+export async function bulkUploadCandidates(
+  file: File,
+  onProgress?: (progress: BulkUploadProgress) => void
+): Promise<BulkUploadResult> {
   const formData = new FormData();
   formData.append('file', file);
   
@@ -227,7 +269,14 @@ export async function bulkUploadCandidates(file: File): Promise<BulkUploadResult
       'Content-Type': 'multipart/form-data'
     }
   });
-  return response.data;
+  
+  // La importación corre como trabajo en segundo plano: esperar a que termine
+  const job = await waitForJob<BulkUploadProgress, BulkUploadResult>(response.data.job_id, onProgress);
+  if (!job.result) {
+    throw new Error(job.error || 'Error en la carga masiva');
+  }
+  // Hoja de credenciales descargable
+  return { ...job.result, artifacts: job.artifacts };
 }
 
 export async function downloadBulkUploadTemplate(): Promise<void> {